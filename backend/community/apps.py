@@ -8,3 +8,6 @@ class CommunityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'community'
     verbose_name = 'Community'
+
+    def ready(self) -> None:
+        from community import signals  # noqa: F401
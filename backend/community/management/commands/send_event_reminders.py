@@ -1,7 +1,7 @@
 """
 Management command to send push notifications for upcoming community events.
 
-Sends reminders to users with 'going' RSVP for events starting within 15 minutes.
+Queues reminders to users with 'going' RSVP for events starting within 15 minutes.
 Designed to be run on a cron schedule: */5 * * * * (every 5 minutes).
 """
 from __future__ import annotations
@@ -17,5 +17,5 @@ class Command(BaseCommand):
 
         reminded_count = EventService.send_event_reminders()
         self.stdout.write(
-            self.style.SUCCESS(f'Sent reminders for {reminded_count} event(s).')
+            self.style.SUCCESS(f'Queued reminders for {reminded_count} event(s).')
         )
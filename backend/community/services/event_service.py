@@ -7,11 +7,13 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 
+from django.db import transaction
 from django.db.models import Count, QuerySet
 from django.utils import timezone
 
 from users.models import User
 from ..models import CommunityEvent, EventRSVP
+from .push_audience_service import event_going_topic, event_rsvp_topic, events_topic
 
 logger = logging.getLogger(__name__)
 
@@ -127,137 +129,101 @@ class EventService:
             ends_at__gte=timezone.now(),
         ).order_by('starts_at')[:limit]
 
-    @staticmethod
-    def _get_non_banned_trainee_ids(trainer: User) -> list[int]:
-        """Return active trainee IDs excluding community-banned users."""
-        from ..models import UserBan
-
-        banned_ids = set(
-            UserBan.objects.filter(
-                trainer=trainer, is_active=True,
-            ).values_list('user_id', flat=True)
-        )
-
-        trainee_ids = list(
-            User.objects.filter(
-                parent_trainer=trainer,
-                role=User.Role.TRAINEE,
-                is_active=True,
-            ).values_list('id', flat=True)
-        )
-
-        if banned_ids:
-            trainee_ids = [uid for uid in trainee_ids if uid not in banned_ids]
-
-        return trainee_ids
-
-    @staticmethod
-    def _get_rsvpd_user_ids(event: CommunityEvent) -> list[int]:
-        """Return user IDs with going or maybe RSVP for an event."""
-        return list(
-            EventRSVP.objects.filter(
-                event=event,
-                status__in=[
-                    EventRSVP.RSVPStatus.GOING,
-                    EventRSVP.RSVPStatus.MAYBE,
-                ],
-            ).values_list('user_id', flat=True)
-        )
-
     @staticmethod
     def notify_event_created(event: CommunityEvent) -> None:
-        """Push notification to all trainer's trainees about a new event."""
+        """
+        Queue a push notification to all trainer's non-banned trainees about
+        a new event, as one message to the trainer's events topic.
+        """
         try:
-            from core.services.notification_service import send_push_to_group
-
-            trainee_ids = EventService._get_non_banned_trainee_ids(event.trainer)
-            if not trainee_ids:
-                return
-
-            send_push_to_group(
-                user_ids=trainee_ids,
-                title='New Event',
-                body=event.title,
-                data={
-                    'type': 'community_event_created',
-                    'event_id': str(event.id),
-                },
-                category='community_event',
-            )
+            from core.services.push_outbox_service import queue_push_to_topic
+
+            with transaction.atomic():
+                queue_push_to_topic(
+                    events_topic(event.trainer_id),
+                    title='New Event',
+                    body=event.title,
+                    data={
+                        'type': 'community_event_created',
+                        'event_id': str(event.id),
+                    },
+                    category='community_event',
+                )
         except Exception:
-            logger.error("Failed to send event-created notifications for event %d", event.id, exc_info=True)
+            logger.error("Failed to queue event-created notifications for event %d", event.id, exc_info=True)
 
     @staticmethod
     def notify_event_updated(
         event: CommunityEvent,
         changed_fields: set[str],
     ) -> None:
-        """Push notification to RSVP'd users (going/maybe) about an event update."""
+        """
+        Queue a push notification to RSVP'd users (going/maybe) about an
+        event update, as one message to the event's RSVP topic.
+        """
         try:
-            from core.services.notification_service import send_push_to_group
-
-            rsvpd_user_ids = EventService._get_rsvpd_user_ids(event)
-            if not rsvpd_user_ids:
-                return
-
-            # Build a descriptive body based on what changed
-            change_parts: list[str] = []
-            if changed_fields & {'starts_at', 'ends_at'}:
-                change_parts.append('time changed')
-            if 'meeting_url' in changed_fields:
-                change_parts.append('meeting link updated')
-            change_desc = ' — ' + ', '.join(change_parts) if change_parts else ''
-
-            send_push_to_group(
-                user_ids=rsvpd_user_ids,
-                title='Event Updated',
-                body=f'{event.title}{change_desc}',
-                data={
-                    'type': 'community_event_updated',
-                    'event_id': str(event.id),
-                },
-                category='community_event',
-            )
+            from core.services.push_outbox_service import queue_push_to_topic
+
+            with transaction.atomic():
+                # Build a descriptive body based on what changed
+                change_parts: list[str] = []
+                if changed_fields & {'starts_at', 'ends_at'}:
+                    change_parts.append('time changed')
+                if 'meeting_url' in changed_fields:
+                    change_parts.append('meeting link updated')
+                change_desc = ' — ' + ', '.join(change_parts) if change_parts else ''
+
+                queue_push_to_topic(
+                    event_rsvp_topic(event.id),
+                    title='Event Updated',
+                    body=f'{event.title}{change_desc}',
+                    data={
+                        'type': 'community_event_updated',
+                        'event_id': str(event.id),
+                    },
+                    category='community_event',
+                )
         except Exception:
-            logger.error("Failed to send event-updated notifications for event %d", event.id, exc_info=True)
+            logger.error("Failed to queue event-updated notifications for event %d", event.id, exc_info=True)
 
     @staticmethod
     def notify_event_cancelled(event: CommunityEvent) -> None:
-        """Push notification to RSVP'd users (going/maybe) that an event was cancelled."""
+        """
+        Queue a push notification to RSVP'd users (going/maybe) that an
+        event was cancelled, as one message to the event's RSVP topic.
+        """
         try:
-            from core.services.notification_service import send_push_to_group
-
-            rsvpd_user_ids = EventService._get_rsvpd_user_ids(event)
-            if not rsvpd_user_ids:
-                return
-
-            send_push_to_group(
-                user_ids=rsvpd_user_ids,
-                title='Event Cancelled',
-                body=event.title,
-                data={
-                    'type': 'community_event_cancelled',
-                    'event_id': str(event.id),
-                },
-                category='community_event',
-            )
+            from core.services.push_outbox_service import queue_push_to_topic
+
+            with transaction.atomic():
+                queue_push_to_topic(
+                    event_rsvp_topic(event.id),
+                    title='Event Cancelled',
+                    body=event.title,
+                    data={
+                        'type': 'community_event_cancelled',
+                        'event_id': str(event.id),
+                    },
+                    category='community_event',
+                )
         except Exception:
-            logger.error("Failed to send event-cancelled notifications for event %d", event.id, exc_info=True)
+            logger.error("Failed to queue event-cancelled notifications for event %d", event.id, exc_info=True)
 
     @staticmethod
     def send_event_reminders() -> int:
         """
-        Send push notifications to users with 'going' RSVP for events
-        starting in 10-15 minutes from now.
+        Queue push notifications to users with 'going' RSVP for events
+        starting in 10-15 minutes from now: one message per event, to the
+        event's going topic.
 
         The cron schedule should be `*/5 * * * *` (every 5 minutes).
         Using a 5-minute window (10-15 min before start) ensures each
         event matches exactly one cron run, preventing duplicate sends.
         Users receive the reminder approximately 10-15 minutes before start.
 
-        Returns the number of events for which reminders were sent.
+        Returns the number of events for which reminders were queued.
         """
-        from core.services.notification_service import send_push_to_group
+        from core.services.push_outbox_service import queue_push_to_topic
 
         now = timezone.now()
         reminder_window_start = now + timezone.timedelta(minutes=10)
@@ -268,44 +234,40 @@ class EventService:
                 status=CommunityEvent.EventStatus.SCHEDULED,
                 starts_at__gt=reminder_window_start,
                 starts_at__lte=reminder_window_end,
-            ).select_related('trainer')
+            )
         )
 
         if not events:
             return 0
 
-        # Batch: fetch all RSVPs for matched events in one query
-        event_ids = [e.id for e in events]
-        rsvps = (
+        # Skip events nobody is going to: one query for all matched events
+        going_event_ids = set(
             EventRSVP.objects.filter(
-                event_id__in=event_ids,
+                event_id__in=[e.id for e in events],
                 status=EventRSVP.RSVPStatus.GOING,
-            ).values_list('event_id', 'user_id')
+            ).values_list('event_id', flat=True)
         )
-        event_user_map: dict[int, list[int]] = {}
-        for event_id, user_id in rsvps:
-            event_user_map.setdefault(event_id, []).append(user_id)
 
         reminded_count = 0
         for event in events:
-            going_user_ids = event_user_map.get(event.id, [])
-            if not going_user_ids:
+            if event.id not in going_event_ids:
                 continue
             try:
-                send_push_to_group(
-                    user_ids=going_user_ids,
-                    title='Event Reminder',
-                    body=f'{event.title} starts soon',
-                    data={
-                        'type': 'community_event_reminder',
-                        'event_id': str(event.id),
-                    },
-                    category='community_event',
-                )
+                with transaction.atomic():
+                    queue_push_to_topic(
+                        event_going_topic(event.id),
+                        title='Event Reminder',
+                        body=f'{event.title} starts soon',
+                        data={
+                            'type': 'community_event_reminder',
+                            'event_id': str(event.id),
+                        },
+                        category='community_event',
+                    )
                 reminded_count += 1
             except Exception:
                 logger.warning(
-                    "Failed to send reminder for event %d", event.id, exc_info=True,
+                    "Failed to queue reminder for event %d", event.id, exc_info=True,
                 )
 
         return reminded_count
@@ -12,6 +12,7 @@ from typing import Optional
 from django.db.models import QuerySet
 from django.utils import timezone
 
+from core.services.push_topic_service import request_topic_sync
 from users.models import User
 from ..models import (
     AutoModRule,
@@ -139,10 +140,12 @@ class ModerationService:
     @staticmethod
     def _mute_user(user: User, trainer: User) -> None:
         """Mute a user across all spaces in a trainer's community."""
-        SpaceMembership.objects.filter(
+        updated = SpaceMembership.objects.filter(
             user=user,
             space__trainer=trainer,
         ).update(is_muted=True)
+        if updated:
+            request_topic_sync(user.id)  # bulk update: no post_save
 
     # ---- Bans ----
 
@@ -184,6 +187,7 @@ class ModerationService:
             user=user, trainer=trainer, is_active=True,
         ).update(is_active=False)
         if updated:
+            request_topic_sync(user.id)  # bulk update: no post_save
             logger.info("User %s unbanned from %s", user.email, trainer.email)
         return updated
 
@@ -0,0 +1,181 @@
+"""
+FCM topics for community audiences.
+
+Group notifications go to one topic per audience instead of one push per
+member (core.services.push_topic_service keeps devices subscribed):
+
+- trainer-<id>-announcements: the trainer's active trainees
+- trainer-<id>-events: the trainer's active trainees, minus banned users
+- space-<id>-posts: unmuted space members, minus users banned by the
+  space's trainer. is_muted is the moderation penalty set by the MUTE
+  report action (ModerationService._mute_user), not a member silencing
+  the space; a muted member stops getting its post pushes as well
+- event-<id>-rsvp: going / maybe RSVPs, for updates and cancellations
+- event-<id>-going: going RSVPs, for reminders
+
+A user who disabled the matching notification category is left out of the
+audience. topics_for_users() is listed in settings.PUSH_TOPIC_RESOLVERS;
+code that changes an audience requests a sync (see community.signals).
+Event topics lapse EVENT_TOPIC_GRACE after the event ends, and temporary
+bans when they expire, with no change to signal it;
+request_lapsed_event_syncs() and request_expired_ban_syncs()
+(settings.PUSH_TOPIC_SWEEPS) queue those devices.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from users.models import NotificationPreference, User
+
+from ..models import CommunityEvent, EventRSVP, SpaceMembership, UserBan
+
+# Event topics outlive the event by this much, so a late update or
+# cancellation still reaches attendees whose devices resync meanwhile
+EVENT_TOPIC_GRACE = timedelta(days=1)
+# How far back request_lapsed_event_syncs() looks for lapsed event topics;
+# covers sweeps missed while the worker was down
+EVENT_TOPIC_SWEEP_WINDOW = timedelta(days=7)
+# Likewise for request_expired_ban_syncs() and temporary bans
+BAN_TOPIC_SWEEP_WINDOW = timedelta(days=7)
+
+
+def announcements_topic(trainer_id: int) -> str:
+    return f'trainer-{trainer_id}-announcements'
+
+
+def events_topic(trainer_id: int) -> str:
+    return f'trainer-{trainer_id}-events'
+
+
+def space_posts_topic(space_id: int) -> str:
+    return f'space-{space_id}-posts'
+
+
+def event_rsvp_topic(event_id: int) -> str:
+    return f'event-{event_id}-rsvp'
+
+
+def event_going_topic(event_id: int) -> str:
+    return f'event-{event_id}-going'
+
+
+def topics_for_users(user_ids: list[int]) -> dict[int, set[str]]:
+    """Community topics for each active user; five queries for any number of users."""
+    users = list(
+        User.objects.filter(id__in=user_ids, is_active=True)
+        .values_list('id', 'role', 'parent_trainer_id')
+    )
+    ids = [user_id for user_id, _, _ in users]
+    topics: dict[int, set[str]] = {user_id: set() for user_id in ids}
+    if not ids:
+        return topics
+
+    # Preferences are read from the database, not the recipient cache: an
+    # opt-out must never be lost to a stale cache entry
+    categories = ('trainer_announcement', 'community_event', 'community_activity')
+    disabled: dict[int, set[str]] = {}
+    for row in NotificationPreference.objects.filter(user_id__in=ids).values('user_id', *categories):
+        disabled[row['user_id']] = {c for c in categories if not row[c]}
+
+    def accepts(user_id: int, category: str) -> bool:
+        return category not in disabled.get(user_id, ())
+
+    # Same rule as ModerationService.is_user_banned: expired temporary bans lapse
+    banned: dict[int, set[int]] = defaultdict(set)
+    for user_id, trainer_id in UserBan.objects.filter(
+        user_id__in=ids, is_active=True,
+    ).exclude(
+        is_permanent=False, expires_at__lt=timezone.now(),
+    ).values_list('user_id', 'trainer_id'):
+        banned[user_id].add(trainer_id)
+
+    for user_id, role, trainer_id in users:
+        if role != User.Role.TRAINEE or trainer_id is None:
+            continue
+        if accepts(user_id, 'trainer_announcement'):
+            topics[user_id].add(announcements_topic(trainer_id))
+        if accepts(user_id, 'community_event') and trainer_id not in banned[user_id]:
+            topics[user_id].add(events_topic(trainer_id))
+
+    for user_id, space_id, trainer_id in SpaceMembership.objects.filter(
+        user_id__in=ids, is_muted=False,
+    ).values_list('user_id', 'space_id', 'space__trainer_id'):
+        if accepts(user_id, 'community_activity') and trainer_id not in banned[user_id]:
+            topics[user_id].add(space_posts_topic(space_id))
+
+    for user_id, event_id, status in EventRSVP.objects.filter(
+        user_id__in=ids,
+        status__in=[EventRSVP.RSVPStatus.GOING, EventRSVP.RSVPStatus.MAYBE],
+        event__ends_at__gte=timezone.now() - EVENT_TOPIC_GRACE,
+    ).values_list('user_id', 'event_id', 'status'):
+        if not accepts(user_id, 'community_event'):
+            continue
+        topics[user_id].add(event_rsvp_topic(event_id))
+        if status == EventRSVP.RSVPStatus.GOING:
+            topics[user_id].add(event_going_topic(event_id))
+
+    return topics
+
+
+def request_lapsed_event_syncs() -> int:
+    """
+    Queue a sync for devices still subscribed to the topics of events whose
+    grace period is over. Tokens already queued are left alone, so a token
+    waiting out a retry keeps its backoff. Returns the number of tokens queued.
+    """
+    from core.models import PushTopicSubscription, PushTopicSync
+    from core.services.push_topic_service import request_token_sync
+
+    cutoff = timezone.now() - EVENT_TOPIC_GRACE
+    topics = [
+        topic
+        for event_id in CommunityEvent.objects.filter(
+            ends_at__lt=cutoff, ends_at__gte=cutoff - EVENT_TOPIC_SWEEP_WINDOW,
+        ).values_list('id', flat=True)
+        for topic in (event_rsvp_topic(event_id), event_going_topic(event_id))
+    ]
+    if not topics:
+        return 0
+    return request_token_sync(
+        PushTopicSubscription.objects.filter(topic__in=topics)
+        .exclude(token__in=PushTopicSync.objects.values('token'))
+        .values_list('token', flat=True)
+        .distinct()
+    )
+
+
+def request_expired_ban_syncs() -> int:
+    """
+    Queue a sync for the devices of users whose temporary ban expired within
+    BAN_TOPIC_SWEEP_WINDOW and that are not back on the trainer's events
+    topic yet. Tokens already queued are left alone. A user who opted out of
+    event notifications is queued on every sweep until the window passes;
+    those syncs change nothing. Returns the number of tokens queued.
+    """
+    from core.models import PushTopicSubscription, PushTopicSync
+    from core.services.push_topic_service import request_token_sync
+    from users.models import DeviceToken
+
+    now = timezone.now()
+    expired = list(
+        UserBan.objects.filter(
+            is_active=True,
+            is_permanent=False,
+            expires_at__lt=now,
+            expires_at__gte=now - BAN_TOPIC_SWEEP_WINDOW,
+        ).values_list('user_id', 'trainer_id')
+    )
+    if not expired:
+        return 0
+    return request_token_sync(
+        DeviceToken.objects.filter(user_id__in={user_id for user_id, _ in expired})
+        .exclude(token__in=PushTopicSubscription.objects.filter(
+            topic__in={events_topic(trainer_id) for _, trainer_id in expired},
+        ).values('token'))
+        .exclude(token__in=PushTopicSync.objects.values('token'))
+        .values_list('token', flat=True)
+        .distinct()
+    )
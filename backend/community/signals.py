@@ -0,0 +1,51 @@
+"""
+Signal handlers for the community app.
+
+Queue FCM topic subscription syncs (core.services.push_topic_service) when
+a change moves a user into or out of a community audience. Bulk operations
+(``QuerySet.update``, ``bulk_create``) do not fire these signals; callers
+that use them request the sync explicitly.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.services.push_topic_service import request_topic_sync
+from users.models import User
+
+from .models import EventRSVP, SpaceMembership, UserBan
+
+# User fields that decide trainer-wide audiences
+_AUDIENCE_FIELDS = frozenset({'role', 'is_active', 'parent_trainer', 'parent_trainer_id'})
+
+
+@receiver(post_save, sender=SpaceMembership)
+@receiver(post_delete, sender=SpaceMembership)
+@receiver(post_save, sender=EventRSVP)
+@receiver(post_delete, sender=EventRSVP)
+@receiver(post_save, sender=UserBan)
+@receiver(post_delete, sender=UserBan)
+def on_audience_membership_changed(
+    sender: type[SpaceMembership] | type[EventRSVP] | type[UserBan],
+    instance: SpaceMembership | EventRSVP | UserBan,
+    **kwargs: Any,
+) -> None:
+    request_topic_sync(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def on_user_saved(
+    sender: type[User],
+    instance: User,
+    created: bool,
+    update_fields: frozenset[str] | None = None,
+    **kwargs: Any,
+) -> None:
+    if created:
+        return  # no device tokens yet
+    if update_fields is not None and not update_fields & _AUDIENCE_FIELDS:
+        return  # e.g. last_login
+    request_topic_sync(instance.pk)
@@ -0,0 +1,271 @@
+"""
+Tests for community push audiences (FCM topics).
+
+Covers:
+- Which topics trainees, space members and RSVP'd users resolve to
+- Bans, mutes and notification opt-outs leave users out
+- Audience changes (including moderation mutes) queue a topic sync for
+  the user's device tokens
+- Event topics are swept once their grace period is over, and temporary
+  bans once they expire
+- Announcements, event notifications, reminders and (when enabled) space
+  posts queue one topic push each
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+from typing import Any
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from community.models import (
+    CommunityEvent,
+    CommunityPost,
+    ContentReport,
+    EventRSVP,
+    ModerationAction,
+    Space,
+    SpaceMembership,
+    UserBan,
+)
+from community.services.event_service import EventService
+from community.services.moderation_service import ModerationService
+from community.services.push_audience_service import (
+    announcements_topic,
+    event_going_topic,
+    event_rsvp_topic,
+    events_topic,
+    request_expired_ban_syncs,
+    request_lapsed_event_syncs,
+    space_posts_topic,
+    topics_for_users,
+)
+from core.models import PushOutbox, PushTopicSubscription, PushTopicSync
+from core.services.push_clients import LocalPushClient, get_push_client
+from users.models import DeviceToken, NotificationPreference, User
+
+_THROTTLE_OVERRIDE: dict[str, Any] = {
+    'DEFAULT_THROTTLE_CLASSES': [],
+    'DEFAULT_THROTTLE_RATES': {},
+}
+
+
+class _AudienceTestBase(TestCase):
+    def setUp(self) -> None:
+        self.trainer = User.objects.create_user(
+            email='trainer@example.com', password='pass123', role=User.Role.TRAINER,
+        )
+        self.trainee = User.objects.create_user(
+            email='trainee@example.com', password='pass123', role=User.Role.TRAINEE,
+            parent_trainer=self.trainer, first_name='Tia',
+        )
+        self.space = Space.objects.create(trainer=self.trainer, name='Runners')
+        self.membership = SpaceMembership.objects.create(space=self.space, user=self.trainee)
+        now = timezone.now()
+        self.event = CommunityEvent.objects.create(
+            trainer=self.trainer,
+            title='Live Q&A',
+            starts_at=now + timedelta(minutes=12),
+            ends_at=now + timedelta(hours=1),
+        )
+
+
+class TopicsForUsersTests(_AudienceTestBase):
+
+    def test_trainee_topics(self) -> None:
+        EventRSVP.objects.create(event=self.event, user=self.trainee, status=EventRSVP.RSVPStatus.GOING)
+
+        self.assertEqual(topics_for_users([self.trainee.id])[self.trainee.id], {
+            announcements_topic(self.trainer.id),
+            events_topic(self.trainer.id),
+            space_posts_topic(self.space.id),
+            event_rsvp_topic(self.event.id),
+            event_going_topic(self.event.id),
+        })
+
+    def test_bans_mutes_and_opt_outs_leave_users_out(self) -> None:
+        EventRSVP.objects.create(event=self.event, user=self.trainee, status=EventRSVP.RSVPStatus.MAYBE)
+        self.assertIn(event_rsvp_topic(self.event.id), topics_for_users([self.trainee.id])[self.trainee.id])
+
+        UserBan.objects.create(user=self.trainee, trainer=self.trainer, banned_by=self.trainer, reason='spam')
+        self.membership.is_muted = True
+        self.membership.save()
+        pref = NotificationPreference.get_or_create_for_user(self.trainee)
+        pref.community_event = False
+        pref.save()
+
+        self.assertEqual(
+            topics_for_users([self.trainee.id])[self.trainee.id],
+            {announcements_topic(self.trainer.id)},
+        )
+
+    def test_expired_temporary_ban_no_longer_applies(self) -> None:
+        UserBan.objects.create(
+            user=self.trainee, trainer=self.trainer, banned_by=self.trainer, reason='spam',
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        topics = topics_for_users([self.trainee.id])[self.trainee.id]
+        self.assertIn(events_topic(self.trainer.id), topics)
+        self.assertIn(space_posts_topic(self.space.id), topics)
+
+    def test_inactive_users_and_finished_events_have_no_topics(self) -> None:
+        EventRSVP.objects.create(event=self.event, user=self.trainee, status=EventRSVP.RSVPStatus.GOING)
+        CommunityEvent.objects.filter(id=self.event.id).update(ends_at=timezone.now() - timedelta(days=2))
+        self.assertNotIn(event_going_topic(self.event.id), topics_for_users([self.trainee.id])[self.trainee.id])
+
+        self.trainee.is_active = False
+        self.trainee.save()
+        self.assertEqual(topics_for_users([self.trainee.id]), {})
+
+
+class AudienceChangeSyncTests(_AudienceTestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        DeviceToken.objects.create(user=self.trainee, token='tia-phone', platform='ios')
+        PushTopicSync.objects.all().delete()
+
+    def _queued(self) -> list[str]:
+        tokens = list(PushTopicSync.objects.values_list('token', flat=True))
+        PushTopicSync.objects.all().delete()
+        return tokens
+
+    def test_changes_queue_the_users_tokens(self) -> None:
+        EventService.rsvp(self.event, self.trainee, EventRSVP.RSVPStatus.GOING)
+        self.assertEqual(self._queued(), ['tia-phone'])
+
+        self.membership.delete()
+        self.assertEqual(self._queued(), ['tia-phone'])
+
+        ModerationService.ban_user(self.trainee, self.trainer, self.trainer, 'spam')
+        self.assertEqual(self._queued(), ['tia-phone'])
+        ModerationService.unban_user(self.trainee, self.trainer)
+        self.assertEqual(self._queued(), ['tia-phone'])
+
+        SpaceMembership.objects.create(space=self.space, user=self.trainee)
+        self._queued()
+        post = CommunityPost.objects.create(author=self.trainee, trainer=self.trainer, content='Buy now')
+        report = ModerationService.create_report(
+            self.trainer, self.trainer, ContentReport.ContentTypeChoice.POST,
+            ContentReport.ReportReason.SPAM, post=post,
+        )
+        ModerationService.review_report(report, self.trainer, ModerationAction.ActionType.MUTE)
+        self.assertEqual(self._queued(), ['tia-phone'])
+
+        self.trainee.parent_trainer = None
+        self.trainee.save(update_fields=['parent_trainer'])
+        self.assertEqual(self._queued(), ['tia-phone'])
+
+    def test_unrelated_user_saves_do_not_queue(self) -> None:
+        self.trainee.save(update_fields=['last_login'])
+        self.assertEqual(self._queued(), [])
+
+    @override_settings(PUSH_CLIENT='core.services.push_clients.LocalPushClient')
+    def test_lapsed_event_topics_are_swept(self) -> None:
+        client = get_push_client()
+        assert isinstance(client, LocalPushClient)
+        client.reset()
+        EventRSVP.objects.create(event=self.event, user=self.trainee, status=EventRSVP.RSVPStatus.GOING)
+        call_command('deliver_push_notifications', stdout=StringIO())
+        event_topics = {event_rsvp_topic(self.event.id), event_going_topic(self.event.id)}
+        self.assertEqual(client.subscriptions[event_going_topic(self.event.id)], {'tia-phone'})
+
+        CommunityEvent.objects.filter(id=self.event.id).update(ends_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(request_lapsed_event_syncs(), 0)  # still within the grace period
+
+        CommunityEvent.objects.filter(id=self.event.id).update(ends_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(request_lapsed_event_syncs(), 1)
+        self.assertEqual(request_lapsed_event_syncs(), 0)  # already queued
+        PushTopicSync.objects.all().delete()
+
+        out = StringIO()
+        call_command('deliver_push_notifications', stdout=out)
+
+        self.assertIn('1 device token(s) queued for lapsed topics', out.getvalue())
+        self.assertFalse(PushTopicSubscription.objects.filter(topic__in=event_topics).exists())
+        self.assertEqual(request_lapsed_event_syncs(), 0)
+
+
+    def test_expired_bans_are_swept(self) -> None:
+        ban = UserBan.objects.create(
+            user=self.trainee, trainer=self.trainer, banned_by=self.trainer, reason='spam',
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        PushTopicSync.objects.all().delete()
+        self.assertEqual(request_expired_ban_syncs(), 0)  # still banned
+
+        UserBan.objects.filter(id=ban.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(request_expired_ban_syncs(), 1)
+        self.assertEqual(request_expired_ban_syncs(), 0)  # already queued
+        PushTopicSync.objects.all().delete()
+
+        PushTopicSubscription.objects.create(token='tia-phone', topic=events_topic(self.trainer.id))
+        self.assertEqual(request_expired_ban_syncs(), 0)  # back on the topic
+
+        UserBan.objects.filter(id=ban.id).update(expires_at=timezone.now() - timedelta(days=8))
+        PushTopicSubscription.objects.all().delete()
+        self.assertEqual(request_expired_ban_syncs(), 0)  # outside the sweep window
+
+
+class TopicNotificationTests(_AudienceTestBase):
+
+    def _topic_rows(self) -> list[tuple[str, str]]:
+        return list(PushOutbox.objects.order_by('id').values_list('topic', 'title'))
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+    def test_announcement_queues_one_topic_push(self) -> None:
+        User.objects.create_user(
+            email='other@example.com', password='pass123', role=User.Role.TRAINEE,
+            parent_trainer=self.trainer,
+        )
+        api = APIClient()
+        api.force_authenticate(user=self.trainer)
+
+        response = api.post('/api/trainer/announcements/', {'title': 'Hi', 'body': 'All'}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self._topic_rows(), [(announcements_topic(self.trainer.id), 'New Announcement: Hi')])
+        self.assertFalse(PushOutbox.objects.filter(user__isnull=False).exists())
+
+    def test_event_notifications_and_reminders_use_topics(self) -> None:
+        EventRSVP.objects.create(event=self.event, user=self.trainee, status=EventRSVP.RSVPStatus.GOING)
+
+        EventService.notify_event_created(self.event)
+        EventService.notify_event_updated(self.event, {'starts_at'})
+        EventService.notify_event_cancelled(self.event)
+        self.assertEqual(EventService.send_event_reminders(), 1)
+
+        self.assertEqual(self._topic_rows(), [
+            (events_topic(self.trainer.id), 'New Event'),
+            (event_rsvp_topic(self.event.id), 'Event Updated'),
+            (event_rsvp_topic(self.event.id), 'Event Cancelled'),
+            (event_going_topic(self.event.id), 'Event Reminder'),
+        ])
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+    def test_space_post_push_is_off_by_default(self) -> None:
+        api = APIClient()
+        api.force_authenticate(user=self.trainee)
+
+        response = api.post('/api/community/feed/', {'content': 'Morning run!', 'space': self.space.id})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(PushOutbox.objects.exists())
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE, SPACE_POST_PUSH_ENABLED=True)
+    def test_space_post_queues_one_topic_push(self) -> None:
+        api = APIClient()
+        api.force_authenticate(user=self.trainee)
+
+        response = api.post('/api/community/feed/', {'content': 'Morning run!', 'space': self.space.id})
+        api.post('/api/community/feed/', {'content': 'No space'})
+
+        self.assertEqual(response.status_code, 201)
+        [row] = PushOutbox.objects.all()
+        self.assertEqual(
+            (row.topic, row.title, row.body, row.data['author_id']),
+            (space_posts_topic(self.space.id), 'New post in Runners', 'Tia: Morning run!', str(self.trainee.id)),
+        )
@@ -6,6 +6,7 @@ from __future__ import annotations
 import logging
 from typing import Any, cast
 
+from django.db import transaction
 from django.db.models import Count, QuerySet
 from rest_framework import generics, status, views
 from rest_framework.pagination import PageNumberPagination
@@ -71,18 +72,18 @@ class TrainerAnnouncementListCreateView(generics.ListCreateAPIView[Announcement]
         create_serializer = AnnouncementCreateSerializer(data=request.data)
         create_serializer.is_valid(raise_exception=True)
 
-        announcement = Announcement.objects.create(
-            trainer=user,
-            title=create_serializer.validated_data['title'],
-            body=create_serializer.validated_data['body'],
-            is_pinned=create_serializer.validated_data.get('is_pinned', False),
-            content_format=create_serializer.validated_data.get(
-                'content_format', Announcement.ContentFormat.PLAIN,
-            ),
-        )
-
-        # Send push notification to all trainees (fire-and-forget)
-        _notify_trainees_announcement(user, announcement)
+        with transaction.atomic():
+            announcement = Announcement.objects.create(
+                trainer=user,
+                title=create_serializer.validated_data['title'],
+                body=create_serializer.validated_data['body'],
+                is_pinned=create_serializer.validated_data.get('is_pinned', False),
+                content_format=create_serializer.validated_data.get(
+                    'content_format', Announcement.ContentFormat.PLAIN,
+                ),
+            )
+            # Queue push notification to all trainees (fire-and-forget)
+            _notify_trainees_announcement(user, announcement)
 
         response_serializer = AnnouncementSerializer(announcement)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -222,21 +223,20 @@ def _notify_trainees_announcement(
     trainer: User,
     announcement: Announcement,
 ) -> None:
-    """Send push notification to all trainer's trainees about new announcement."""
-    try:
-        from core.services.notification_service import send_push_to_group
+    """
+    Queue a push notification to all trainer's trainees about a new announcement.
 
-        trainee_ids = list(
-            User.objects.filter(
-                parent_trainer=trainer,
-                role=User.Role.TRAINEE,
-                is_active=True,
-            ).values_list('id', flat=True)
-        )
+    Sent as one message to the trainer's announcements topic; trainees who
+    opted out are not subscribed. Call inside the announcement's
+    transaction; a failure here rolls back only the push.
+    """
+    try:
+        from core.services.push_outbox_service import queue_push_to_topic
+        from .services.push_audience_service import announcements_topic
 
-        if trainee_ids:
-            send_push_to_group(
-                user_ids=trainee_ids,
+        with transaction.atomic():
+            queue_push_to_topic(
+                announcements_topic(trainer.id),
                 title=f'New Announcement: {announcement.title}',
                 body=announcement.body[:100],
                 data={
@@ -246,7 +246,7 @@ def _notify_trainees_announcement(
                 category='trainer_announcement',
             )
     except Exception:
-        logger.warning("Failed to send announcement push notifications", exc_info=True)
+        logger.warning("Failed to queue announcement push notifications", exc_info=True)
 
 
 # ===========================================================================
@@ -492,26 +492,26 @@ class TrainerEventListCreateView(generics.ListCreateAPIView[CommunityEvent]):
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-        event = CommunityEvent.objects.create(
-            trainer=user,
-            space=space,
-            title=data['title'],
-            description=data.get('description', ''),
-            event_type=data.get('event_type', CommunityEvent.EventType.LIVE_SESSION),
-            starts_at=data['starts_at'],
-            ends_at=data['ends_at'],
-            meeting_url=data.get('meeting_url', ''),
-            max_attendees=data.get('max_attendees'),
-            location_address=data.get('location_address', ''),
-            location_lat=data.get('location_lat'),
-            location_lng=data.get('location_lng'),
-            is_recurring=data.get('is_recurring', False),
-            recurrence_rule=data.get('recurrence_rule', {}),
-        )
-
-        # Send push notification to all trainees (fire-and-forget)
-        from .services.event_service import EventService
-        EventService.notify_event_created(event)
+        with transaction.atomic():
+            event = CommunityEvent.objects.create(
+                trainer=user,
+                space=space,
+                title=data['title'],
+                description=data.get('description', ''),
+                event_type=data.get('event_type', CommunityEvent.EventType.LIVE_SESSION),
+                starts_at=data['starts_at'],
+                ends_at=data['ends_at'],
+                meeting_url=data.get('meeting_url', ''),
+                max_attendees=data.get('max_attendees'),
+                location_address=data.get('location_address', ''),
+                location_lat=data.get('location_lat'),
+                location_lng=data.get('location_lng'),
+                is_recurring=data.get('is_recurring', False),
+                recurrence_rule=data.get('recurrence_rule', {}),
+            )
+            # Queue push notification to all trainees (fire-and-forget)
+            from .services.event_service import EventService
+            EventService.notify_event_created(event)
 
         response_serializer = CommunityEventSerializer(
             event, context={'request': request},
@@ -581,12 +581,12 @@ class TrainerEventDetailView(views.APIView):
                     setattr(event, field, new_value)
                     update_fields.append(field)
 
-        event.save(update_fields=update_fields)
-
-        # Notify RSVP'd users if time/location actually changed (fire-and-forget)
-        if actually_changed and event.status == CommunityEvent.EventStatus.SCHEDULED:
-            from .services.event_service import EventService
-            EventService.notify_event_updated(event, changed_fields=actually_changed)
+        with transaction.atomic():
+            event.save(update_fields=update_fields)
+            # Notify RSVP'd users if time/location actually changed (fire-and-forget)
+            if actually_changed and event.status == CommunityEvent.EventStatus.SCHEDULED:
+                from .services.event_service import EventService
+                EventService.notify_event_updated(event, changed_fields=actually_changed)
 
         response_serializer = CommunityEventSerializer(event, context={'request': request})
         return Response(response_serializer.data)
@@ -601,16 +601,16 @@ class TrainerEventDetailView(views.APIView):
 
         from .services.event_service import EventService
         try:
-            EventService.transition_status(event, CommunityEvent.EventStatus.CANCELLED)
+            with transaction.atomic():
+                EventService.transition_status(event, CommunityEvent.EventStatus.CANCELLED)
+                # Notify RSVP'd users about cancellation (fire-and-forget)
+                EventService.notify_event_cancelled(event)
         except ValueError as exc:
             return Response(
                 {'error': str(exc)},
                 status=status.HTTP_409_CONFLICT,
             )
 
-        # Notify RSVP'd users about cancellation (fire-and-forget)
-        EventService.notify_event_cancelled(event)
-
         serializer = CommunityEventSerializer(event, context={'request': request})
         return Response(serializer.data)
 
@@ -639,17 +639,17 @@ class TrainerEventStatusView(views.APIView):
 
         from .services.event_service import EventService
         try:
-            EventService.transition_status(event, new_status)
+            with transaction.atomic():
+                EventService.transition_status(event, new_status)
+                # Notify RSVP'd users if event was cancelled via status transition
+                if new_status == CommunityEvent.EventStatus.CANCELLED:
+                    EventService.notify_event_cancelled(event)
         except ValueError as exc:
             return Response(
                 {'error': str(exc)},
                 status=status.HTTP_409_CONFLICT,
             )
 
-        # Notify RSVP'd users if event was cancelled via status transition
-        if new_status == CommunityEvent.EventStatus.CANCELLED:
-            EventService.notify_event_cancelled(event)
-
         serializer = CommunityEventSerializer(event, context={'request': request})
         return Response(serializer.data)
 
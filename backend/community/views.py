@@ -7,7 +7,8 @@ from __future__ import annotations
 import logging
 from typing import Any, cast
 
-from django.db import IntegrityError
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Count, Exists, OuterRef, QuerySet, Subquery, Value
 from django.utils import timezone
 from rest_framework import generics, status, views
@@ -17,6 +18,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from core import broadcast_dispatcher
 from core.permissions import IsTrainee
 from core.throttles import MediaUploadThrottle
 from users.models import User
@@ -388,6 +390,9 @@ class CommunityFeedView(views.APIView):
                     sort_order=idx,
                 )
 
+            if space is not None and settings.SPACE_POST_PUSH_ENABLED:
+                _notify_space_post(post, space, user)
+
         # Annotate comment_count for serialization
         post.comment_count = 0  # type: ignore[attr-defined]
 
@@ -590,21 +595,21 @@ class CommentListCreateView(views.APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        comment = Comment.objects.create(
-            post=post,
-            author=user,
-            content=serializer.validated_data['content'],
-            parent_comment=parent_comment,
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                author=user,
+                content=serializer.validated_data['content'],
+                parent_comment=parent_comment,
+            )
+            # Queue push notification to post author if commenter is not the author
+            if post.author_id != user.id:
+                _notify_post_comment(post, user)
 
         response_serializer = CommentReplySerializer(
             comment, context={'request': request},
         )
 
-        # Send push notification to post author if commenter is not the author
-        if post.author_id != user.id:
-            _notify_post_comment(post, user)
-
         # Broadcast new comment via WebSocket
         _broadcast_new_comment(post.trainer_id, post_id, response_serializer.data)
 
@@ -1215,54 +1220,27 @@ def _broadcast_new_post(
     post_data: dict[str, Any],
     space_id: int | None = None,
 ) -> None:
-    """Broadcast new post to WebSocket group (fire-and-forget)."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        msg = {
-            'type': 'feed.new_post',
-            'post': post_data,
-            'timestamp': timezone.now().isoformat(),
-        }
-
-        # Broadcast to trainer-level group
-        group_name = f'community_feed_{trainer_id}'
-        async_to_sync(channel_layer.group_send)(group_name, msg)
-
-        # Also broadcast to space-specific group if applicable
-        if space_id is not None:
-            space_group = f'community_space_{space_id}'
-            async_to_sync(channel_layer.group_send)(space_group, msg)
-    except Exception:
-        logger.warning("Failed to broadcast new post to WebSocket", exc_info=True)
+    """Queue a new-post broadcast for the trainer's feed (and space) groups."""
+    msg = {
+        'type': 'feed.new_post',
+        'post': post_data,
+        'timestamp': timezone.now().isoformat(),
+    }
+    broadcast_dispatcher.publish(f'community_feed_{trainer_id}', msg)
+    if space_id is not None:
+        broadcast_dispatcher.publish(f'community_space_{space_id}', msg)
 
 
 def _broadcast_post_deleted(trainer_id: int, post_id: int) -> None:
-    """Broadcast post deletion to WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'community_feed_{trainer_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'feed.post_deleted',
-                'post_id': post_id,
-                'timestamp': timezone.now().isoformat(),
-            },
-        )
-    except Exception:
-        logger.warning("Failed to broadcast post deletion to WebSocket", exc_info=True)
+    """Queue a post-deletion broadcast for the trainer's feed group."""
+    broadcast_dispatcher.publish(
+        f'community_feed_{trainer_id}',
+        {
+            'type': 'feed.post_deleted',
+            'post_id': post_id,
+            'timestamp': timezone.now().isoformat(),
+        },
+    )
 
 
 def _broadcast_reaction_update(
@@ -1270,27 +1248,17 @@ def _broadcast_reaction_update(
     post_id: int,
     reactions: dict[str, int],
 ) -> None:
-    """Broadcast reaction update to WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'community_feed_{trainer_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'feed.reaction_update',
-                'post_id': post_id,
-                'reactions': reactions,
-                'timestamp': timezone.now().isoformat(),
-            },
-        )
-    except Exception:
-        logger.warning("Failed to broadcast reaction update to WebSocket", exc_info=True)
+    """Queue a reaction-count broadcast; a burst on one post sends only the latest counts."""
+    broadcast_dispatcher.publish(
+        f'community_feed_{trainer_id}',
+        {
+            'type': 'feed.reaction_update',
+            'post_id': post_id,
+            'reactions': reactions,
+            'timestamp': timezone.now().isoformat(),
+        },
+        coalesce_key=('reactions', post_id),
+    )
 
 
 def _broadcast_new_comment(
@@ -1298,48 +1266,79 @@ def _broadcast_new_comment(
     post_id: int,
     comment_data: dict[str, Any],
 ) -> None:
-    """Broadcast new comment to WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'community_feed_{trainer_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'feed.new_comment',
-                'post_id': post_id,
-                'comment': comment_data,
-                'timestamp': timezone.now().isoformat(),
-            },
-        )
-    except Exception:
-        logger.warning("Failed to broadcast new comment to WebSocket", exc_info=True)
+    """Queue a new-comment broadcast for the trainer's feed group."""
+    broadcast_dispatcher.publish(
+        f'community_feed_{trainer_id}',
+        {
+            'type': 'feed.new_comment',
+            'post_id': post_id,
+            'comment': comment_data,
+            'timestamp': timezone.now().isoformat(),
+        },
+    )
 
 
 def _notify_post_comment(post: CommunityPost, commenter: User) -> None:
-    """Send push notification to post author when someone comments."""
+    """
+    Queue a push notification to the post author when someone comments.
+
+    Call inside the comment's transaction; a failure here rolls back only
+    the push, never the comment.
+    """
     try:
-        from core.services.notification_service import send_push_notification
-
-        send_push_notification(
-            user_id=post.author_id,
-            title='New Comment',
-            body=f'{commenter.first_name} commented on your post',
-            data={
-                'type': 'community_comment',
-                'post_id': str(post.id),
-            },
-            category='community_activity',
-        )
+        from core.services.push_outbox_service import queue_push_notification
+
+        with transaction.atomic():
+            queue_push_notification(
+                user_id=post.author_id,
+                title='New Comment',
+                body=f'{commenter.first_name} commented on your post',
+                data={
+                    'type': 'community_comment',
+                    'post_id': str(post.id),
+                },
+                category='community_activity',
+            )
     except Exception:
         logger.warning("Failed to send comment notification", exc_info=True)
 
 
+def _notify_space_post(post: CommunityPost, space: Space, author: User) -> None:
+    """
+    Queue a push notification to the members of a space about a new post,
+    as one message to the space's posts topic (muted members, opted-out and
+    banned users are not subscribed). The topic includes the author's own
+    devices; clients must drop pushes whose author_id is the signed-in
+    user, so this only runs with settings.SPACE_POST_PUSH_ENABLED.
+
+    Call inside the post's transaction; a failure here rolls back only the
+    push, never the post.
+    """
+    try:
+        from core.services.push_outbox_service import queue_push_to_topic
+        from .services.push_audience_service import space_posts_topic
+
+        if post.content:
+            body = f'{author.first_name}: {post.content[:100]}'
+        else:
+            body = f'{author.first_name} shared a post'
+        with transaction.atomic():
+            queue_push_to_topic(
+                space_posts_topic(space.id),
+                title=f'New post in {space.name}',
+                body=body,
+                data={
+                    'type': 'space_post',
+                    'post_id': str(post.id),
+                    'space_id': str(space.id),
+                    'author_id': str(author.id),
+                },
+                category='community_activity',
+            )
+    except Exception:
+        logger.warning("Failed to queue space post notification", exc_info=True)
+
+
 # ===========================================================================
 # Phase 2 — Classroom (Trainee-facing)
 # ===========================================================================
@@ -18,10 +18,11 @@ from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E40
 
 from community.routing import websocket_urlpatterns as community_ws  # noqa: E402
 from messaging.routing import websocket_urlpatterns as messaging_ws  # noqa: E402
+from workouts.routing import websocket_urlpatterns as workouts_ws  # noqa: E402
 
 application = ProtocolTypeRouter({
     'http': django_asgi_app,
     'websocket': AllowedHostsOriginValidator(
-        URLRouter(community_ws + messaging_ws),
+        URLRouter(community_ws + messaging_ws + workouts_ws),
     ),
 })
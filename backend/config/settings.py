@@ -106,6 +106,24 @@ CHANNEL_LAYERS = {
 
 # Firebase Cloud Messaging configuration
 FIREBASE_CREDENTIALS_PATH = os.getenv('FIREBASE_CREDENTIALS_PATH', '')
+# Push delivery client; core.services.push_clients.LocalPushClient records
+# pushes in memory instead of sending them (development, tests)
+PUSH_CLIENT = os.getenv('PUSH_CLIENT', 'core.services.push_clients.FirebasePushClient')
+
+# Functions mapping user ids to the FCM topics their devices should be
+# subscribed to (core.services.push_topic_service)
+PUSH_TOPIC_RESOLVERS = [
+    'community.services.push_audience_service.topics_for_users',
+]
+# Push space members about new posts. Off until the mobile clients drop
+# pushes whose author_id is the signed-in user (authors get their own)
+SPACE_POST_PUSH_ENABLED = os.getenv('SPACE_POST_PUSH_ENABLED', 'False') == 'True'
+# Functions queueing syncs for topic memberships that lapse with time; run
+# by the push worker every TOPIC_SWEEP_INTERVAL
+PUSH_TOPIC_SWEEPS = [
+    'community.services.push_audience_service.request_lapsed_event_syncs',
+    'community.services.push_audience_service.request_expired_ban_syncs',
+]
 
 # Database
 DATABASES = {
@@ -0,0 +1,15 @@
+"""
+Admin site registration for core models.
+"""
+from django.contrib import admin
+
+from .models import PushOutbox
+
+
+@admin.register(PushOutbox)
+class PushOutboxAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ('id', 'user', 'topic', 'title', 'category', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('status', 'category')
+    search_fields = ('user__email', 'topic', 'title')
+    raw_id_fields = ('user',)
+    readonly_fields = ('payload_hash', 'created_at', 'sent_at')
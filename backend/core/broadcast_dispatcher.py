@@ -0,0 +1,254 @@
+"""
+Non-blocking dispatcher for channel-layer group broadcasts.
+
+publish() never talks to the channel layer on the calling thread. The event
+is queued once the surrounding transaction commits (at once outside a
+transaction), and one background thread sends what is queued:
+
+- Coalescing: queued events with the same group and coalesce_key replace
+  each other, so a burst of read receipts or reaction counts on one group
+  sends only the latest. The replacement keeps the first event's place, so
+  it can go out ahead of events queued after the one it replaced; only
+  latest-state events should pass a coalesce_key.
+- Batching: the sender waits BROADCAST_WINDOW_MS after waking up so bursts
+  can collapse, prepares the batch (blocking work such as assigning
+  sequence numbers) on its own thread, then sends up to
+  BROADCAST_BATCH_SIZE events on one event loop: concurrently across
+  groups, in publish order within a group.
+- Bounded: while BROADCAST_MAX_QUEUE events are waiting, new ones are
+  dropped. Broadcasts are best-effort; clients catch up over REST.
+- Queue depth, coalescing, drops and publish-to-send latency are recorded
+  (see get_broadcast_metrics()).
+
+The queue, thread and metrics are per process. Events still queued when
+the process exits are lost.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, replace
+from typing import Any
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+BROADCAST_WINDOW_MS: int = _env_int("BROADCAST_WINDOW_MS", 25)
+BROADCAST_BATCH_SIZE: int = _env_int("BROADCAST_BATCH_SIZE", 200)
+BROADCAST_MAX_QUEUE: int = _env_int("BROADCAST_MAX_QUEUE", 10_000)
+
+# Runs on the sender thread, outside the event loop, just before the event
+# is sent; returns the event to send (e.g. with a sequence number assigned)
+Prepare = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+@dataclass
+class _Queued:
+    group: str
+    event: dict[str, Any]
+    prepare: Prepare | None
+    queued_at: float
+
+
+@dataclass
+class BroadcastStats:
+    """Running totals for the dispatcher since process start (or the last reset)."""
+    published: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    sent: int = 0
+    failed: int = 0
+    batches: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+
+    @property
+    def avg_latency_ms(self) -> float:
+        done = self.sent + self.failed
+        return round(self.total_latency_ms / done, 1) if done else 0.0
+
+
+_lock = threading.Lock()
+_queue: OrderedDict[tuple[str, Hashable], _Queued] = OrderedDict()
+_unique = itertools.count()
+_wakeup = threading.Event()
+_idle = threading.Event()
+_idle.set()
+_thread: threading.Thread | None = None
+_stats = BroadcastStats()
+
+
+def publish(
+    group: str,
+    event: dict[str, Any],
+    *,
+    coalesce_key: Hashable | None = None,
+    prepare: Prepare | None = None,
+) -> None:
+    """
+    Queue ``event`` for ``group`` after the current transaction commits.
+
+    Pass ``coalesce_key`` for events where only the latest matters (read
+    receipts, counters); a queued event for the same group and key is
+    replaced instead of sent twice.
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _enqueue(group, event, coalesce_key, prepare))
+    else:
+        # Nothing to wait for; also avoids opening a connection just to ask
+        _enqueue(group, event, coalesce_key, prepare)
+
+
+def _enqueue(
+    group: str,
+    event: dict[str, Any],
+    coalesce_key: Hashable | None,
+    prepare: Prepare | None,
+) -> None:
+    key: tuple[str, Hashable] = (
+        (group, ('coalesce', coalesce_key)) if coalesce_key is not None
+        else (group, ('unique', next(_unique)))
+    )
+    with _lock:
+        _stats.published += 1
+        existing = _queue.get(key)
+        if existing is not None:
+            # Latest payload, first publish's place and latency clock
+            existing.event = event
+            existing.prepare = prepare
+            _stats.coalesced += 1
+            return
+        if len(_queue) >= BROADCAST_MAX_QUEUE:
+            _stats.dropped += 1
+            logger.warning("Broadcast queue full (%d); dropped event for %s", len(_queue), group)
+            return
+        _queue[key] = _Queued(group, event, prepare, time.monotonic())
+        _stats.queue_depth = len(_queue)
+        _stats.max_queue_depth = max(_stats.max_queue_depth, len(_queue))
+        _idle.clear()
+        _wakeup.set()
+    _ensure_thread()
+
+
+def _ensure_thread() -> None:
+    global _thread
+    if _thread is not None and _thread.is_alive():
+        return
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_run, name='broadcast-dispatcher', daemon=True)
+            _thread.start()
+
+
+def _take_batch() -> list[_Queued]:
+    with _lock:
+        batch: list[_Queued] = []
+        while _queue and len(batch) < BROADCAST_BATCH_SIZE:
+            batch.append(_queue.popitem(last=False)[1])
+        _stats.queue_depth = len(_queue)
+        if not _queue:
+            _wakeup.clear()
+        return batch
+
+
+def _run() -> None:
+    loop = asyncio.new_event_loop()
+    while True:
+        _wakeup.wait()
+        time.sleep(BROADCAST_WINDOW_MS / 1000)
+        batch = _prepare_batch(_take_batch())
+        if batch:
+            try:
+                loop.run_until_complete(_send_batch(batch))
+            except Exception:
+                logger.exception("Broadcast batch failed")
+        with _lock:
+            if not _queue:
+                _idle.set()
+
+
+def _prepare_batch(batch: list[_Queued]) -> list[_Queued]:
+    """Run each event's prepare hook in queue order, off the event loop."""
+    ready: list[_Queued] = []
+    for item in batch:
+        if item.prepare is not None:
+            try:
+                item.event = item.prepare(item.event)
+            except Exception as exc:
+                logger.warning("Failed to prepare broadcast for %s: %s", item.group, exc)
+                _record_sent(item, failed=True)
+                continue
+        ready.append(item)
+    return ready
+
+
+async def _send_batch(batch: list[_Queued]) -> None:
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    by_group: dict[str, list[_Queued]] = {}
+    for item in batch:
+        by_group.setdefault(item.group, []).append(item)
+
+    async def send_group(items: list[_Queued]) -> None:
+        for item in items:
+            failed = False
+            try:
+                if channel_layer is not None:
+                    await channel_layer.group_send(item.group, item.event)
+            except Exception as exc:
+                failed = True
+                logger.warning("Failed to broadcast to %s: %s", item.group, exc)
+            _record_sent(item, failed)
+
+    await asyncio.gather(*(send_group(items) for items in by_group.values()))
+    with _lock:
+        _stats.batches += 1
+
+
+def _record_sent(item: _Queued, failed: bool) -> None:
+    latency_ms = (time.monotonic() - item.queued_at) * 1000
+    with _lock:
+        if failed:
+            _stats.failed += 1
+        else:
+            _stats.sent += 1
+        _stats.total_latency_ms += latency_ms
+        _stats.max_latency_ms = max(_stats.max_latency_ms, latency_ms)
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Wait until every queued event has been sent. Returns False on timeout."""
+    return _idle.wait(timeout)
+
+
+def get_broadcast_metrics() -> BroadcastStats:
+    """Snapshot of dispatcher statistics."""
+    with _lock:
+        return replace(_stats)
+
+
+def reset_broadcast_metrics() -> None:
+    """Zero the statistics (tests, or after reading them into a dashboard)."""
+    global _stats
+    with _lock:
+        depth = len(_queue)
+        _stats = BroadcastStats(queue_depth=depth, max_queue_depth=depth)
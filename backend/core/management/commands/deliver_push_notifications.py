@@ -0,0 +1,114 @@
+"""
+Management command to deliver queued push notifications from the outbox.
+
+Each pass first syncs queued FCM topic subscriptions, so topic pushes reach
+audiences as they stood when the push was queued. Lapsed topic memberships
+(settings.PUSH_TOPIC_SWEEPS) are queued for a sync on the first pass and
+every TOPIC_SWEEP_INTERVAL after.
+
+Run continuously as a worker (the push_worker service in docker-compose),
+or from cron every minute:
+    python manage.py deliver_push_notifications --loop
+    python manage.py deliver_push_notifications
+
+With --check, only reports rows that have waited too long for a worker and
+exits non-zero if there are any. Intended to run via cron, outside the
+worker, so a dead worker is noticed:
+    python manage.py deliver_push_notifications --check
+"""
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.push_outbox_service import (
+    PUSH_CLAIM_SIZE,
+    check_push_backlog,
+    deliver_pending_pushes,
+)
+from core.services.push_topic_service import (
+    TOPIC_SWEEP_INTERVAL,
+    sweep_topic_subscriptions,
+    sync_topic_subscriptions,
+)
+
+
+# Seconds between backlog checks while looping
+BACKLOG_CHECK_INTERVAL = 60.0
+
+
+class Command(BaseCommand):
+    help = "Deliver pending push notifications from the outbox."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it is drained.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls of an empty outbox with --loop (default: 2).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=PUSH_CLAIM_SIZE,
+            help=f"Outbox rows claimed per pass (default: {PUSH_CLAIM_SIZE}).",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report overdue outbox rows and exit non-zero if any, without delivering.",
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        batch_size = max(1, int(options["batch_size"]))  # type: ignore[arg-type]
+        interval = max(0.1, float(options["interval"]))  # type: ignore[arg-type]
+
+        if options["check"]:
+            backlog = check_push_backlog()
+            if backlog.is_stalled:
+                raise CommandError(
+                    f"{backlog.overdue} push(es) overdue since "
+                    f"{backlog.oldest_due_at:%Y-%m-%d %H:%M:%S %Z}."
+                )
+            self.stdout.write(self.style.SUCCESS("Push outbox is being drained."))
+            return
+
+        next_check = time.monotonic() + BACKLOG_CHECK_INTERVAL
+        next_sweep = time.monotonic()
+        while True:
+            if time.monotonic() >= next_check:
+                check_push_backlog()  # logs a warning when workers fall behind
+                next_check = time.monotonic() + BACKLOG_CHECK_INTERVAL
+            if time.monotonic() >= next_sweep:
+                swept = sweep_topic_subscriptions()
+                if swept:
+                    self.stdout.write(f"{swept} device token(s) queued for lapsed topics.")
+                next_sweep = time.monotonic() + TOPIC_SWEEP_INTERVAL.total_seconds()
+
+            sync = sync_topic_subscriptions(limit=batch_size)
+            if sync.claimed:
+                self.stdout.write(
+                    f"{sync.claimed} device token(s) synced: {sync.subscribed} topic "
+                    f"subscription(s) added, {sync.unsubscribed} removed, "
+                    f"{sync.retried} to retry, {sync.tokens_pruned} token(s) pruned."
+                )
+            result = deliver_pending_pushes(limit=batch_size)
+            if result.claimed or result.expired:
+                self.stdout.write(
+                    f"{result.claimed} claimed: {result.sent} sent, "
+                    f"{result.deduplicated} duplicate(s), {result.skipped} skipped, "
+                    f"{result.retried} to retry, {result.failed} failed, "
+                    f"{result.tokens_pruned} token(s) pruned, {result.expired} expired."
+                )
+            if result.claimed < batch_size and sync.claimed < batch_size:
+                if not options["loop"]:
+                    break
+                time.sleep(interval)
+        self.stdout.write(self.style.SUCCESS("Push outbox drained."))
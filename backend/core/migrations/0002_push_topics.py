@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_push_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pushoutbox',
+            name='topic',
+            field=models.CharField(blank=True, help_text="FCM topic for group pushes; the audience is the topic's subscribers", max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='pushoutbox',
+            name='category',
+            field=models.CharField(blank=True, help_text='NotificationPreference field checked at delivery; blank for always-on pushes. Informational for topic pushes: opted-out users are not subscribed', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='pushoutbox',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.CreateModel(
+            name='PushTopicSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=512)),
+                ('topic', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'push_topic_subscriptions',
+                'indexes': [models.Index(fields=['topic'], name='push_topic_sub_topic_idx')],
+                'constraints': [models.UniqueConstraint(fields=('token', 'topic'), name='unique_push_topic_subscription')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PushTopicSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=512, unique=True)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'push_topic_sync',
+                'indexes': [models.Index(fields=['next_attempt_at', 'id'], name='push_topic_sync_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def queue_existing_tokens(apps, schema_editor):
+    # Devices registered before topic pushes existed are subscribed to
+    # their owners' topics by the next deliver_push_notifications pass
+    DeviceToken = apps.get_model('users', 'DeviceToken')
+    PushTopicSync = apps.get_model('core', 'PushTopicSync')
+
+    now = timezone.now()
+    PushTopicSync.objects.bulk_create(
+        [
+            PushTopicSync(token=token, requested_at=now, next_attempt_at=now)
+            for token in (
+                DeviceToken.objects.filter(is_active=True)
+                .values_list('token', flat=True).distinct().iterator()
+            )
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_push_topics'),
+        ('users', '0011_add_re_engagement_notification_pref'),
+    ]
+
+    operations = [
+        migrations.RunPython(queue_existing_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,124 @@
+"""
+Shared infrastructure models.
+"""
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class PushOutbox(models.Model):
+    """
+    A push notification waiting to be delivered to one user, or to every
+    device subscribed to an FCM topic (exactly one of ``user`` / ``topic``).
+
+    Rows are written in the same transaction as the event that triggers the
+    push and drained by the deliver_push_notifications worker
+    (core.services.push_outbox_service), so a push is neither lost when the
+    request crashes after commit nor sent for a rolled-back event.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        SKIPPED = 'skipped', 'Skipped'  # opted out, or no usable device token
+        FAILED = 'failed', 'Failed'  # out of retries, or too old to be worth sending
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True,
+    )
+    topic = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="FCM topic for group pushes; the audience is the topic's subscribers",
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    category = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text=(
+            "NotificationPreference field checked at delivery; blank for always-on pushes. "
+            "Informational for topic pushes: opted-out users are not subscribed"
+        ),
+    )
+    payload_hash = models.CharField(
+        max_length=64,
+        help_text="Hash of title, body and data; identical payloads share a multicast",
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'push_outbox'
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='push_outbox_pending_idx',
+            ),
+            models.Index(fields=['status', 'created_at'], name='push_outbox_status_idx'),
+        ]
+
+    def __str__(self) -> str:
+        target = f"topic {self.topic}" if self.topic else f"user {self.user_id}"
+        return f"Push to {target}: {self.title} ({self.status})"
+
+
+class PushTopicSubscription(models.Model):
+    """
+    A device token's subscription to an FCM topic, as confirmed by the
+    provider. Maintained by core.services.push_topic_service; never edit
+    by hand, the provider would disagree.
+    """
+    token = models.CharField(max_length=512)
+    topic = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'push_topic_subscriptions'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['token', 'topic'],
+                name='unique_push_topic_subscription',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['topic'], name='push_topic_sub_topic_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.token[:12]}… on {self.topic}"
+
+
+class PushTopicSync(models.Model):
+    """
+    A device token whose topic subscriptions must be reconciled with its
+    owners' audiences. Written in the transaction that changes an
+    audience; drained by the deliver_push_notifications worker.
+    """
+    token = models.CharField(max_length=512, unique=True)
+    requested_at = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'push_topic_sync'
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'id'], name='push_topic_sync_due_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Topic sync for {self.token[:12]}…"
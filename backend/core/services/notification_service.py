@@ -1,17 +1,25 @@
 """
 Firebase Cloud Messaging push notification service.
 
-Wraps firebase-admin SDK for sending push notifications to users.
-Firebase app is initialized lazily from FIREBASE_CREDENTIALS_PATH env var.
-All errors are handled gracefully -- this service never raises.
+Sends push notifications to users through the configured push client
+(core.services.push_clients). Firebase app is initialized lazily from
+FIREBASE_CREDENTIALS_PATH env var. All errors are handled gracefully --
+this service never raises.
+
+These functions send immediately. Request-path code should queue pushes
+through core.services.push_outbox_service instead.
 """
 from __future__ import annotations
 
 import logging
+from collections.abc import Iterable
 from typing import Any
 
 from django.conf import settings
 
+from core.services.push_clients import MULTICAST_BATCH_SIZE, get_push_client
+from core.services.push_recipient_service import get_recipients, invalidate_recipients
+
 logger = logging.getLogger(__name__)
 
 _firebase_app: Any = None
@@ -66,11 +74,7 @@ def _check_notification_preference(user_id: int, category: str | None) -> bool:
 
     from django.db import DatabaseError
     try:
-        from users.models import NotificationPreference
-        pref = NotificationPreference.objects.filter(user_id=user_id).first()
-        if pref is None:
-            return True  # Default: all enabled
-        return pref.is_category_enabled(category)
+        return get_recipients([user_id])[user_id].accepts(category)
     except (DatabaseError, ConnectionError):
         logger.warning("Failed to check notification preference for user %d", user_id)
         return True  # Fail open: send the notification
@@ -104,17 +108,16 @@ def send_push_notification(
         )
         return False
 
-    if not _ensure_firebase_initialized():
+    if not get_push_client().is_available():
         return False
 
-    from users.models import DeviceToken
-
-    tokens = list(
-        DeviceToken.objects.filter(
-            user_id=user_id,
-            is_active=True,
-        ).values_list('id', 'token')
-    )
+    from django.db import DatabaseError
+    try:
+        # Served from the cache entry the preference check just filled
+        tokens = list(get_recipients([user_id])[user_id].tokens)
+    except (DatabaseError, ConnectionError):
+        logger.warning("Failed to load device tokens for user %d", user_id)
+        return False
 
     if not tokens:
         return False
@@ -132,6 +135,9 @@ def send_push_to_group(
     """
     Send push notification to all active device tokens for a group of users.
 
+    Preferences and tokens for the whole group come from one cached lookup
+    (core.services.push_recipient_service).
+
     Args:
         user_ids: Target user IDs.
         title: Notification title.
@@ -143,81 +149,52 @@ def send_push_to_group(
     Returns count of users reached (at least one token per user succeeded).
     Never raises -- returns 0 on complete failure.
     """
-    if not _ensure_firebase_initialized():
+    if not get_push_client().is_available():
         return 0
 
     if not user_ids:
         return 0
 
+    from django.db import DatabaseError
+    try:
+        recipients = get_recipients(user_ids)
+    except (DatabaseError, ConnectionError):
+        logger.warning("Failed to load push recipients for group send")
+        return 0
+
     # Filter out users who have disabled this notification category
     if category:
-        from django.db import DatabaseError
-        try:
-            from users.models import NotificationPreference
-            # Validate category before querying
-            if category not in NotificationPreference.VALID_CATEGORIES:
-                logger.warning(
-                    "Invalid notification category %r passed to send_push_to_group",
-                    category,
-                )
-            else:
-                opted_out_ids = set(
-                    NotificationPreference.objects.filter(
-                        user_id__in=user_ids,
-                        **{category: False},
-                    ).values_list('user_id', flat=True)
-                )
-                if opted_out_ids:
-                    user_ids = [uid for uid in user_ids if uid not in opted_out_ids]
-                    logger.debug(
-                        "Filtered %d users who opted out of category=%s",
-                        len(opted_out_ids), category,
-                    )
-                if not user_ids:
-                    return 0
-        except (DatabaseError, ConnectionError):
+        from users.models import NotificationPreference
+        if category not in NotificationPreference.VALID_CATEGORIES:
             logger.warning(
-                "Failed to check notification preferences for group send, proceeding anyway"
+                "Invalid notification category %r passed to send_push_to_group",
+                category,
             )
+        else:
+            opted_in_ids = [uid for uid in recipients if recipients[uid].accepts(category)]
+            if len(opted_in_ids) < len(recipients):
+                logger.debug(
+                    "Filtered %d users who opted out of category=%s",
+                    len(recipients) - len(opted_in_ids), category,
+                )
+            recipients = {uid: recipients[uid] for uid in opted_in_ids}
 
-    from users.models import DeviceToken
-
-    tokens = list(
-        DeviceToken.objects.filter(
-            user_id__in=user_ids,
-            is_active=True,
-        ).values_list('id', 'token', 'user_id')
-    )
+    token_id_to_user: dict[int, int] = {}
+    all_token_pairs: list[tuple[int, str]] = []
+    for uid, recipient in recipients.items():
+        for token_id, token_value in recipient.tokens:
+            token_id_to_user[token_id] = uid
+            all_token_pairs.append((token_id, token_value))
 
-    if not tokens:
+    if not all_token_pairs:
         return 0
 
-    # Group tokens by user
-    user_tokens: dict[int, list[tuple[int, str]]] = {}
-    for token_id, token_value, uid in tokens:
-        user_tokens.setdefault(uid, []).append((token_id, token_value))
-
-    users_reached = 0
-    all_token_pairs: list[tuple[int, str]] = []
-    for uid, pairs in user_tokens.items():
-        all_token_pairs.extend(pairs)
-
     succeeded_token_ids = _send_to_tokens_batch(
         all_token_pairs, title, body, data or {},
     )
 
     # Count users who had at least one successful delivery
-    succeeded_user_ids: set[int] = set()
-    token_id_to_user: dict[int, int] = {}
-    for token_id, _, uid in tokens:
-        token_id_to_user[token_id] = uid
-
-    for token_id in succeeded_token_ids:
-        uid = token_id_to_user.get(token_id)
-        if uid is not None:
-            succeeded_user_ids.add(uid)
-
-    return len(succeeded_user_ids)
+    return len({token_id_to_user[token_id] for token_id in succeeded_token_ids})
 
 
 def _send_to_tokens(
@@ -238,66 +215,52 @@ def _send_to_tokens_batch(
     data: dict[str, str],
 ) -> set[int]:
     """
-    Send push notifications in batches of 500 (FCM limit).
+    Send push notifications in multicast batches of 500 (FCM limit).
     Returns set of token_ids that succeeded.
-    Deactivates tokens that return UnregisteredError or SenderIdMismatchError.
+    Deactivates tokens the provider reports as unregistered or mismatched.
     """
-    try:
-        from firebase_admin import messaging  # type: ignore[import-untyped]
-    except ImportError:
-        logger.warning("firebase-admin not installed. Cannot send push notifications.")
-        return set()
-
+    client = get_push_client()
     succeeded_ids: set[int] = set()
     deactivate_ids: list[int] = []
 
-    # Process in batches of 500
-    batch_size = 500
-    for i in range(0, len(tokens), batch_size):
-        batch = tokens[i:i + batch_size]
-        messages = []
-        batch_map: list[int] = []  # Maps message index to token_id
-
-        for token_id, token_value in batch:
-            msg = messaging.Message(
-                notification=messaging.Notification(
-                    title=title,
-                    body=body,
-                ),
-                data=data,
-                token=token_value,
-            )
-            messages.append(msg)
-            batch_map.append(token_id)
-
+    for i in range(0, len(tokens), MULTICAST_BATCH_SIZE):
+        batch = tokens[i:i + MULTICAST_BATCH_SIZE]
         try:
-            response = messaging.send_each(messages)
-            for idx, send_response in enumerate(response.responses):
-                token_id = batch_map[idx]
-                if send_response.success:
-                    succeeded_ids.add(token_id)
-                elif send_response.exception is not None:
-                    exc = send_response.exception
-                    # Mark unregistered or mismatched tokens as inactive
-                    if isinstance(exc, (
-                        messaging.UnregisteredError,
-                        messaging.SenderIdMismatchError,
-                    )):
-                        deactivate_ids.append(token_id)
-                        logger.debug(
-                            "Deactivating token %d: %s",
-                            token_id,
-                            type(exc).__name__,
-                        )
+            results = client.send_multicast(
+                [token_value for _, token_value in batch], title, body, data,
+            )
         except Exception:
             logger.warning(
                 "Failed to send FCM batch (tokens %d-%d)",
                 i, i + len(batch),
             )
+            continue
+
+        for (token_id, _), result in zip(batch, results):
+            if result.success:
+                succeeded_ids.add(token_id)
+            elif result.invalid_token:
+                deactivate_ids.append(token_id)
+                logger.debug("Deactivating token %d: %s", token_id, result.error)
 
     # Bulk deactivate invalid tokens
     if deactivate_ids:
-        from users.models import DeviceToken
-        DeviceToken.objects.filter(id__in=deactivate_ids).update(is_active=False)
+        deactivate_tokens(deactivate_ids)
 
     return succeeded_ids
+
+
+def deactivate_tokens(token_ids: Iterable[int]) -> int:
+    """
+    Mark device tokens inactive in one update, drop their owners' cached
+    recipients and queue the tokens to leave their FCM topics.
+    """
+    from core.services.push_topic_service import request_token_sync
+    from users.models import DeviceToken
+
+    tokens = DeviceToken.objects.filter(id__in=list(token_ids), is_active=True)
+    owned = list(tokens.values_list('user_id', 'token'))
+    updated = tokens.update(is_active=False)
+    invalidate_recipients(*{user_id for user_id, _ in owned})
+    request_token_sync(token for _, token in owned)
+    return updated
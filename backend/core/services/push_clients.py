@@ -0,0 +1,275 @@
+"""
+Pluggable push delivery clients.
+
+settings.PUSH_CLIENT names the class used to talk to the push provider:
+FirebasePushClient in production, LocalPushClient for development and
+tests (records pushes in memory, delivers nothing). Both send one payload
+to up to MULTICAST_BATCH_SIZE device tokens per call, send one payload to
+every subscriber of a topic, and (un)subscribe up to TOPIC_BATCH_SIZE
+device tokens per call.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Protocol
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MULTICAST_BATCH_SIZE: int = 500  # FCM limit per multicast
+TOPIC_BATCH_SIZE: int = 1000  # FCM limit per topic (un)subscribe call
+
+
+@dataclass(frozen=True)
+class TokenResult:
+    """Outcome of a push to one device token."""
+    success: bool
+    invalid_token: bool = False  # unregistered or wrong sender; deactivate it
+    error: str = ''
+
+
+class PushClient(Protocol):
+    def is_available(self) -> bool:
+        """False when the provider is not configured; pushes are skipped."""
+        ...
+
+    def send_multicast(
+        self,
+        tokens: list[str],
+        title: str,
+        body: str,
+        data: dict[str, str],
+    ) -> list[TokenResult]:
+        """
+        Send one notification to ``tokens``; results are in token order.
+
+        Raises if the whole call failed (network, quota); callers retry.
+        """
+        ...
+
+    def send_to_topic(
+        self,
+        topic: str,
+        title: str,
+        body: str,
+        data: dict[str, str],
+    ) -> None:
+        """Send one notification to every subscriber of ``topic``; raises on failure."""
+        ...
+
+    def subscribe_to_topic(self, tokens: list[str], topic: str) -> list[TokenResult]:
+        """Subscribe ``tokens`` to ``topic``; results are in token order."""
+        ...
+
+    def unsubscribe_from_topic(self, tokens: list[str], topic: str) -> list[TokenResult]:
+        """Unsubscribe ``tokens`` from ``topic``; results are in token order."""
+        ...
+
+
+# Topic management errors that mean the token itself is unusable
+_FIREBASE_INVALID_TOKEN_REASONS = frozenset({
+    'registration-token-not-registered',
+    'invalid-argument',
+})
+
+
+class FirebasePushClient:
+    """Firebase Cloud Messaging via firebase-admin."""
+
+    def is_available(self) -> bool:
+        from core.services.notification_service import _ensure_firebase_initialized
+
+        return _ensure_firebase_initialized()
+
+    def send_multicast(
+        self,
+        tokens: list[str],
+        title: str,
+        body: str,
+        data: dict[str, str],
+    ) -> list[TokenResult]:
+        from firebase_admin import messaging  # type: ignore[import-untyped]
+
+        response = messaging.send_each_for_multicast(
+            messaging.MulticastMessage(
+                tokens=tokens,
+                notification=messaging.Notification(title=title, body=body),
+                data=data,
+            )
+        )
+        results: list[TokenResult] = []
+        for send_response in response.responses:
+            if send_response.success:
+                results.append(TokenResult(success=True))
+                continue
+            exc = send_response.exception
+            results.append(TokenResult(
+                success=False,
+                invalid_token=isinstance(exc, (
+                    messaging.UnregisteredError,
+                    messaging.SenderIdMismatchError,
+                )),
+                error=type(exc).__name__ if exc is not None else 'unknown',
+            ))
+        return results
+
+    def send_to_topic(
+        self,
+        topic: str,
+        title: str,
+        body: str,
+        data: dict[str, str],
+    ) -> None:
+        from firebase_admin import messaging  # type: ignore[import-untyped]
+
+        messaging.send(
+            messaging.Message(
+                topic=topic,
+                notification=messaging.Notification(title=title, body=body),
+                data=data,
+            )
+        )
+
+    def subscribe_to_topic(self, tokens: list[str], topic: str) -> list[TokenResult]:
+        from firebase_admin import messaging  # type: ignore[import-untyped]
+
+        return self._topic_results(tokens, messaging.subscribe_to_topic(tokens, topic))
+
+    def unsubscribe_from_topic(self, tokens: list[str], topic: str) -> list[TokenResult]:
+        from firebase_admin import messaging  # type: ignore[import-untyped]
+
+        return self._topic_results(tokens, messaging.unsubscribe_from_topic(tokens, topic))
+
+    @staticmethod
+    def _topic_results(tokens: list[str], response: object) -> list[TokenResult]:
+        results = [TokenResult(success=True)] * len(tokens)
+        for error in response.errors:  # type: ignore[attr-defined]
+            results[error.index] = TokenResult(
+                success=False,
+                invalid_token=error.reason in _FIREBASE_INVALID_TOKEN_REASONS,
+                error=error.reason,
+            )
+        return results
+
+
+@dataclass(frozen=True)
+class LocalPush:
+    tokens: list[str]
+    title: str
+    body: str
+    data: dict[str, str]
+
+
+@dataclass(frozen=True)
+class LocalTopicPush:
+    topic: str
+    title: str
+    body: str
+    data: dict[str, str]
+
+
+class LocalPushClient:
+    """
+    In-memory stand-in for development and tests.
+
+    Every push is recorded in ``sent`` (topic pushes in ``topic_sent``) and
+    ``subscriptions`` maps each topic to its subscribed tokens. Tokens in
+    ``invalid_tokens`` report as unregistered; while ``fail_calls`` is
+    positive each call raises ConnectionError and decrements it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.sent: list[LocalPush] = []
+        self.topic_sent: list[LocalTopicPush] = []
+        self.subscriptions: dict[str, set[str]] = {}
+        self.invalid_tokens: set[str] = set()
+        self.fail_calls = 0
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.sent.clear()
+            self.topic_sent.clear()
+            self.subscriptions.clear()
+            self.invalid_tokens.clear()
+            self.fail_calls = 0
+
+    def _maybe_fail(self) -> None:
+        if self.fail_calls > 0:
+            self.fail_calls -= 1
+            raise ConnectionError('local push client: simulated outage')
+
+    def _token_results(self, tokens: list[str]) -> list[TokenResult]:
+        return [
+            TokenResult(success=False, invalid_token=True, error='UnregisteredError')
+            if token in self.invalid_tokens else TokenResult(success=True)
+            for token in tokens
+        ]
+
+    def is_available(self) -> bool:
+        return True
+
+    def send_multicast(
+        self,
+        tokens: list[str],
+        title: str,
+        body: str,
+        data: dict[str, str],
+    ) -> list[TokenResult]:
+        with self._lock:
+            self._maybe_fail()
+            self.sent.append(LocalPush(list(tokens), title, body, dict(data)))
+        logger.debug("Local push to %d token(s): %s", len(tokens), title)
+        return self._token_results(tokens)
+
+    def send_to_topic(
+        self,
+        topic: str,
+        title: str,
+        body: str,
+        data: dict[str, str],
+    ) -> None:
+        with self._lock:
+            self._maybe_fail()
+            self.topic_sent.append(LocalTopicPush(topic, title, body, dict(data)))
+        logger.debug("Local push to topic %s: %s", topic, title)
+
+    def subscribe_to_topic(self, tokens: list[str], topic: str) -> list[TokenResult]:
+        with self._lock:
+            self._maybe_fail()
+            results = self._token_results(tokens)
+            self.subscriptions.setdefault(topic, set()).update(
+                token for token, result in zip(tokens, results) if result.success
+            )
+        return results
+
+    def unsubscribe_from_topic(self, tokens: list[str], topic: str) -> list[TokenResult]:
+        with self._lock:
+            self._maybe_fail()
+            subscribers = self.subscriptions.get(topic)
+            if subscribers is not None:
+                subscribers.difference_update(tokens)
+                if not subscribers:
+                    del self.subscriptions[topic]
+        return self._token_results(tokens)
+
+
+_clients: dict[str, PushClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_push_client() -> PushClient:
+    """The client named by settings.PUSH_CLIENT (one instance per class path)."""
+    path: str = getattr(settings, 'PUSH_CLIENT', 'core.services.push_clients.FirebasePushClient')
+    client = _clients.get(path)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(path)
+            if client is None:
+                client = _clients[path] = import_string(path)()
+    return client
@@ -0,0 +1,349 @@
+"""
+Transactional outbox for push notifications.
+
+Request code calls queue_push_notification / queue_push_to_group (or
+queue_push_to_topic for a group audience) inside the transaction that
+records the triggering event; the rows commit (or roll back) with it. The
+deliver_push_notifications worker drains the outbox with
+deliver_pending_pushes():
+
+- Claims due rows with SKIP LOCKED and pushes their next attempt out by
+  PUSH_CLAIM_LEASE, so concurrent workers never share a row and a crashed
+  worker's rows come back on their own.
+- Resolves preferences and device tokens for the whole batch with one
+  cache round trip (core.services.push_recipient_service).
+- Collapses duplicates: the same payload queued more than once for a user
+  is sent once.
+- Sends each distinct payload as multicasts of up to 500 device tokens,
+  and each topic row as one topic message.
+- Deactivates invalid tokens in one update.
+- Retries transient failures with exponential backoff, up to
+  PUSH_MAX_ATTEMPTS; pending rows older than PUSH_MAX_AGE are dropped, a
+  late "new message" push is noise.
+
+check_push_backlog() warns when due rows go unclaimed for longer than
+PUSH_BACKLOG_MAX_WAIT: no worker is running, or workers are falling behind.
+
+All functions return dataclass instances, never dicts.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.db import DatabaseError, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from core.models import PushOutbox
+from core.services.notification_service import deactivate_tokens
+from core.services.push_clients import MULTICAST_BATCH_SIZE, get_push_client
+from core.services.push_recipient_service import get_recipients
+
+logger = logging.getLogger(__name__)
+
+PUSH_CLAIM_SIZE: int = 1000
+PUSH_CLAIM_LEASE = timedelta(minutes=5)
+PUSH_MAX_ATTEMPTS: int = 5
+PUSH_RETRY_BASE = timedelta(seconds=30)
+PUSH_RETRY_MAX = timedelta(hours=1)
+PUSH_MAX_AGE = timedelta(hours=6)
+PUSH_BACKLOG_MAX_WAIT = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class PushDeliveryResult:
+    """Outcome of one outbox drain pass."""
+    claimed: int
+    sent: int
+    deduplicated: int  # extra copies of a payload already being sent to the user
+    skipped: int  # opted out, or no usable device token
+    retried: int
+    failed: int
+    tokens_pruned: int
+    expired: int
+
+
+@dataclass(frozen=True)
+class PushBacklog:
+    """Pending rows that have been due for longer than PUSH_BACKLOG_MAX_WAIT."""
+    overdue: int
+    oldest_due_at: datetime | None
+
+    @property
+    def is_stalled(self) -> bool:
+        return self.overdue > 0
+
+
+def _payload_hash(title: str, body: str, data: dict[str, str]) -> str:
+    payload = json.dumps([title, body, data], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def queue_push_to_group(
+    user_ids: Iterable[int],
+    title: str,
+    body: str,
+    data: dict[str, str] | None = None,
+    category: str | None = None,
+) -> int:
+    """
+    Write one outbox row per user in the current transaction.
+
+    ``category`` is checked against NotificationPreference at delivery
+    time. Returns the number of rows queued.
+    """
+    data = {key: str(value) for key, value in (data or {}).items()}
+    payload_hash = _payload_hash(title, body, data)
+    rows = [
+        PushOutbox(
+            user_id=user_id,
+            title=title,
+            body=body,
+            data=data,
+            category=category or '',
+            payload_hash=payload_hash,
+        )
+        for user_id in dict.fromkeys(user_ids)
+    ]
+    PushOutbox.objects.bulk_create(rows)
+    return len(rows)
+
+
+def queue_push_to_topic(
+    topic: str,
+    title: str,
+    body: str,
+    data: dict[str, str] | None = None,
+    category: str | None = None,
+) -> int:
+    """
+    Write one outbox row addressed to an FCM topic in the current transaction.
+
+    The audience is whoever is subscribed to the topic when it is sent
+    (core.services.push_topic_service); preferences were applied at
+    subscription time, ``category`` is only recorded.
+    """
+    data = {key: str(value) for key, value in (data or {}).items()}
+    PushOutbox.objects.create(
+        topic=topic,
+        title=title,
+        body=body,
+        data=data,
+        category=category or '',
+        payload_hash=_payload_hash(title, body, data),
+    )
+    return 1
+
+
+def queue_push_notification(
+    user_id: int,
+    title: str,
+    body: str,
+    data: dict[str, str] | None = None,
+    category: str | None = None,
+) -> int:
+    """Queue a push for one user; see queue_push_to_group."""
+    return queue_push_to_group([user_id], title, body, data, category)
+
+
+def _retry_at(now: datetime, attempts: int) -> datetime:
+    backoff: timedelta = PUSH_RETRY_BASE * 2 ** (attempts - 1)
+    return now + min(backoff, PUSH_RETRY_MAX)
+
+
+def _claim(now: datetime, limit: int) -> list[PushOutbox]:
+    with transaction.atomic():
+        rows = list(
+            PushOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=PushOutbox.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        if rows:
+            PushOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + PUSH_CLAIM_LEASE,
+            )
+    for row in rows:
+        row.attempts += 1
+    return rows
+
+
+def deliver_pending_pushes(*, limit: int = PUSH_CLAIM_SIZE) -> PushDeliveryResult:
+    """Claim up to ``limit`` due outbox rows and deliver them."""
+    from users.models import NotificationPreference
+
+    now = timezone.now()
+    expired = PushOutbox.objects.filter(
+        status=PushOutbox.Status.PENDING, created_at__lt=now - PUSH_MAX_AGE,
+    ).update(status=PushOutbox.Status.FAILED, last_error='expired')
+
+    client = get_push_client()
+    if not client.is_available():
+        return PushDeliveryResult(0, 0, 0, 0, 0, 0, 0, expired)
+
+    rows = _claim(now, limit)
+    if not rows:
+        return PushDeliveryResult(0, 0, 0, 0, 0, 0, 0, expired)
+
+    # Final status per row id; rows not listed here are retried
+    sent_ids: list[int] = []
+    skipped: dict[int, str] = {}
+
+    # Preferences and tokens for the whole batch: one cache round trip
+    try:
+        recipients = get_recipients(row.user_id for row in rows if row.user_id is not None)
+    except (DatabaseError, ConnectionError):
+        logger.warning("Failed to load push recipients; %d row(s) will be retried", len(rows))
+        return PushDeliveryResult(len(rows), 0, 0, 0, len(rows), 0, 0, expired)
+
+    for category in {row.category for row in rows if row.category}:
+        if category not in NotificationPreference.VALID_CATEGORIES:
+            logger.warning("Invalid notification category %r in push outbox", category)
+
+    copies: dict[int, list[int]] = defaultdict(list)  # primary id -> duplicate ids
+
+    # Topic rows: one topic message each; opted-out users are not subscribed
+    topic_primaries: dict[tuple[str, str], PushOutbox] = {}
+    for row in rows:
+        if not row.topic:
+            continue
+        primary = topic_primaries.setdefault((row.topic, row.payload_hash), row)
+        if primary is not row:
+            copies[primary.id].append(row.id)
+            continue
+        try:
+            client.send_to_topic(row.topic, row.title, row.body, row.data)
+        except Exception as exc:
+            logger.warning("Push to topic %s failed: %s", row.topic, exc)
+        else:
+            sent_ids.append(row.id)
+
+    # User rows: checked against each user's preferences and device tokens
+    user_primaries: dict[tuple[int, str], PushOutbox] = {}
+    by_payload: dict[str, list[tuple[int, PushOutbox]]] = defaultdict(list)
+    user_rows = [(row.user_id, row) for row in rows if row.user_id is not None and not row.topic]
+    for user_id, row in user_rows:
+        if not recipients[user_id].accepts(row.category):
+            skipped[row.id] = 'disabled by user'
+            continue
+        primary = user_primaries.setdefault((user_id, row.payload_hash), row)
+        if primary is not row:
+            copies[primary.id].append(row.id)
+        elif recipients[user_id].tokens:
+            by_payload[row.payload_hash].append((user_id, row))
+        else:
+            skipped[row.id] = 'no device tokens'
+
+    invalid_token_ids: set[int] = set()
+    for payload_rows in by_payload.values():
+        sample = payload_rows[0][1]
+        # A token shared by two accounts on one device gets a single push
+        owners: dict[str, list[tuple[int, PushOutbox]]] = defaultdict(list)
+        for user_id, row in payload_rows:
+            for token_id, token in recipients[user_id].tokens:
+                owners[token].append((token_id, row))
+        outcome: dict[int, set[str]] = defaultdict(set)  # row id -> {'ok', 'retry', 'invalid'}
+
+        tokens = list(owners)
+        for i in range(0, len(tokens), MULTICAST_BATCH_SIZE):
+            batch = tokens[i:i + MULTICAST_BATCH_SIZE]
+            try:
+                results = client.send_multicast(batch, sample.title, sample.body, sample.data)
+            except Exception as exc:
+                logger.warning("Push multicast of %d token(s) failed: %s", len(batch), exc)
+                for token in batch:
+                    for _, row in owners[token]:
+                        outcome[row.id].add('retry')
+                continue
+            for token, result in zip(batch, results):
+                for token_id, row in owners[token]:
+                    if result.success:
+                        outcome[row.id].add('ok')
+                    elif result.invalid_token:
+                        invalid_token_ids.add(token_id)
+                        outcome[row.id].add('invalid')
+                    else:
+                        outcome[row.id].add('retry')
+
+        for _, row in payload_rows:
+            if 'ok' in outcome[row.id]:
+                sent_ids.append(row.id)
+            elif 'retry' not in outcome[row.id]:
+                skipped[row.id] = 'invalid device tokens'
+
+    pruned = deactivate_tokens(invalid_token_ids) if invalid_token_ids else 0
+
+    # Duplicates share their primary's outcome
+    for primary_id, copy_ids in copies.items():
+        if primary_id in skipped:
+            skipped.update((copy_id, skipped[primary_id]) for copy_id in copy_ids)
+    sent_ids.extend(copy_id for primary_id in sent_ids[:] for copy_id in copies.get(primary_id, ()))
+
+    if sent_ids:
+        PushOutbox.objects.filter(id__in=sent_ids).update(
+            status=PushOutbox.Status.SENT, sent_at=timezone.now(), last_error='',
+        )
+    by_reason: dict[str, list[int]] = defaultdict(list)
+    for row_id, reason in skipped.items():
+        by_reason[reason].append(row_id)
+    for reason, row_ids in by_reason.items():
+        PushOutbox.objects.filter(id__in=row_ids).update(
+            status=PushOutbox.Status.SKIPPED, last_error=reason,
+        )
+
+    done = set(sent_ids) | set(skipped)
+    retry_by_attempts: dict[int, list[int]] = defaultdict(list)
+    failed_ids: list[int] = []
+    for row in rows:
+        if row.id in done:
+            continue
+        if row.attempts >= PUSH_MAX_ATTEMPTS:
+            failed_ids.append(row.id)
+        else:
+            retry_by_attempts[row.attempts].append(row.id)
+    for attempts, row_ids in retry_by_attempts.items():
+        PushOutbox.objects.filter(id__in=row_ids).update(
+            next_attempt_at=_retry_at(now, attempts), last_error='send failed',
+        )
+    if failed_ids:
+        PushOutbox.objects.filter(id__in=failed_ids).update(
+            status=PushOutbox.Status.FAILED, last_error='out of retries',
+        )
+
+    return PushDeliveryResult(
+        claimed=len(rows),
+        sent=len(sent_ids),
+        deduplicated=sum(len(copy_ids) for copy_ids in copies.values()),
+        skipped=len(skipped),
+        retried=sum(len(row_ids) for row_ids in retry_by_attempts.values()),
+        failed=len(failed_ids),
+        tokens_pruned=pruned,
+        expired=expired,
+    )
+
+
+def check_push_backlog(*, max_wait: timedelta = PUSH_BACKLOG_MAX_WAIT) -> PushBacklog:
+    """
+    Count pending rows that have been due for longer than ``max_wait``.
+
+    A claimed row's next attempt is pushed out by the lease, so any such row
+    has been waiting for a worker; logs a warning when there are some.
+    """
+    stats = PushOutbox.objects.filter(
+        status=PushOutbox.Status.PENDING,
+        next_attempt_at__lt=timezone.now() - max_wait,
+    ).aggregate(overdue=Count('id'), oldest=Min('next_attempt_at'))
+    backlog = PushBacklog(overdue=stats['overdue'], oldest_due_at=stats['oldest'])
+    if backlog.is_stalled:
+        logger.warning(
+            "Push outbox backlog: %d row(s) due since %s have not been claimed; "
+            "is deliver_push_notifications running?",
+            backlog.overdue, backlog.oldest_due_at.isoformat(),  # type: ignore[union-attr]
+        )
+    return backlog
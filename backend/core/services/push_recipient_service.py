@@ -0,0 +1,124 @@
+"""
+Cached resolution of who can receive a push: notification preferences and
+active device tokens per user.
+
+get_recipients() resolves any number of users with one cache get_many; only
+users missing from the cache are loaded from the database (two queries for
+the whole batch) and written back with one set_many.
+
+Each user has a version key holding a random nonce, and cached entries are
+tagged with the nonce they were loaded under. invalidate_recipients()
+writes a new nonce after the surrounding transaction commits, so an entry
+loaded from a pre-commit snapshot can never match. Version keys do not
+expire; a user whose version key was evicted gets a new nonce before the
+database load, which likewise invalidates whatever is left of their entry.
+"""
+from __future__ import annotations
+
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db import transaction
+
+_CACHE_PREFIX = 'push_recipients'
+RECIPIENT_CACHE_TTL: int = 3600  # 1 hour; invalidation is explicit, the TTL only bounds memory
+
+
+@dataclass(frozen=True)
+class PushRecipient:
+    """What the push pipeline needs to know about one user."""
+    user_id: int
+    tokens: tuple[tuple[int, str], ...]  # active (DeviceToken id, token)
+    disabled_categories: frozenset[str]
+
+    def accepts(self, category: str | None) -> bool:
+        """True if pushes of ``category`` (or uncategorized pushes) are enabled."""
+        return not category or category not in self.disabled_categories
+
+
+def _version_key(user_id: int) -> str:
+    return f'{_CACHE_PREFIX}:v:{user_id}'
+
+
+def _entry_key(user_id: int) -> str:
+    return f'{_CACHE_PREFIX}:{user_id}'
+
+
+def _new_versions(user_ids: Iterable[int]) -> dict[int, str]:
+    versions = {user_id: uuid.uuid4().hex for user_id in user_ids}
+    cache.set_many({_version_key(uid): v for uid, v in versions.items()}, timeout=None)
+    return versions
+
+
+def _load(user_ids: list[int]) -> dict[int, PushRecipient]:
+    from users.models import DeviceToken, NotificationPreference
+
+    categories = sorted(NotificationPreference.VALID_CATEGORIES)
+    disabled: dict[int, frozenset[str]] = {}
+    for row in NotificationPreference.objects.filter(user_id__in=user_ids).values(
+        'user_id', *categories,
+    ):
+        disabled[row['user_id']] = frozenset(c for c in categories if not row[c])
+
+    tokens: dict[int, list[tuple[int, str]]] = defaultdict(list)
+    for token_id, token, user_id in DeviceToken.objects.filter(
+        user_id__in=user_ids, is_active=True,
+    ).order_by('id').values_list('id', 'token', 'user_id'):
+        tokens[user_id].append((token_id, token))
+
+    return {
+        user_id: PushRecipient(
+            user_id=user_id,
+            tokens=tuple(tokens[user_id]),
+            disabled_categories=disabled.get(user_id, frozenset()),  # no row: all enabled
+        )
+        for user_id in user_ids
+    }
+
+
+def get_recipients(user_ids: Iterable[int]) -> dict[int, PushRecipient]:
+    """
+    Preferences and active tokens for each user id.
+
+    Every requested id is in the result; users without a preference row
+    have all categories enabled. Raises DatabaseError if the database is
+    needed and unavailable.
+    """
+    ids = list(dict.fromkeys(user_ids))
+    if not ids:
+        return {}
+
+    found = cache.get_many([_version_key(uid) for uid in ids] + [_entry_key(uid) for uid in ids])
+    result: dict[int, PushRecipient] = {}
+    versions: dict[int, str] = {}
+    unversioned: list[int] = []
+    for uid in ids:
+        version = found.get(_version_key(uid))
+        entry = found.get(_entry_key(uid))
+        if version is not None and entry is not None and entry[0] == version:
+            result[uid] = entry[1]
+        elif version is None:
+            unversioned.append(uid)
+        else:
+            versions[uid] = version
+
+    if unversioned:
+        versions.update(_new_versions(unversioned))
+    if versions:
+        loaded = _load(list(versions))
+        cache.set_many(
+            {_entry_key(uid): (versions[uid], recipient) for uid, recipient in loaded.items()},
+            RECIPIENT_CACHE_TTL,
+        )
+        result.update(loaded)
+    return result
+
+
+def invalidate_recipients(*user_ids: int | None) -> None:
+    """Drop cached recipients for these users once the current transaction commits."""
+    ids = {uid for uid in user_ids if uid is not None}
+    if ids:
+        transaction.on_commit(lambda: _new_versions(ids))
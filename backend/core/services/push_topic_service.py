@@ -0,0 +1,273 @@
+"""
+FCM topic subscriptions for group audiences.
+
+Group notifications (announcements, community events, space posts) are sent
+as one topic message per audience (queue_push_to_topic in
+push_outbox_service) instead of one outbox row and one multicast slot per
+member. The functions listed in settings.PUSH_TOPIC_RESOLVERS decide which
+topics a user's devices belong on, from memberships and notification
+preferences; an opted-out user is simply not subscribed, so topic sends
+need no per-user checks.
+
+Subscriptions are reconciled per device token:
+
+- Code that changes an audience calls request_topic_sync() (or
+  request_token_sync() for tokens), writing PushTopicSync rows in the same
+  transaction.
+- The deliver_push_notifications worker calls sync_topic_subscriptions()
+  before each outbox pass. It claims queued tokens with SKIP LOCKED, diffs
+  the topics wanted by each token's active owners against
+  PushTopicSubscription, and subscribes / unsubscribes in calls of up to
+  1000 tokens per topic. Since syncs run first, a topic push queued after
+  an audience change reaches the new audience.
+- Memberships that lapse with time rather than with a change (an event
+  topic after the event) are found by the functions in
+  settings.PUSH_TOPIC_SWEEPS, which the worker runs through
+  sweep_topic_subscriptions() every TOPIC_SWEEP_INTERVAL.
+
+All functions return dataclass instances, never dicts.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import PushTopicSubscription, PushTopicSync
+from core.services.push_clients import TOPIC_BATCH_SIZE, PushClient, TokenResult, get_push_client
+
+logger = logging.getLogger(__name__)
+
+TOPIC_SYNC_CLAIM_SIZE: int = 500
+TOPIC_SYNC_LEASE = timedelta(minutes=5)
+TOPIC_SYNC_RETRY = timedelta(minutes=1)
+TOPIC_SWEEP_INTERVAL = timedelta(minutes=10)
+
+TopicResolver = Callable[[list[int]], dict[int, set[str]]]
+TopicSweep = Callable[[], int]
+
+
+@dataclass(frozen=True)
+class TopicSyncResult:
+    """Outcome of one subscription sync pass."""
+    claimed: int  # device tokens
+    subscribed: int  # (token, topic) pairs added
+    unsubscribed: int  # (token, topic) pairs removed
+    retried: int  # tokens left queued after a failed call
+    tokens_pruned: int
+
+
+@lru_cache(maxsize=None)
+def _load_functions(paths: tuple[str, ...]) -> tuple[Callable[..., object], ...]:
+    return tuple(import_string(path) for path in paths)
+
+
+def topics_for_users(user_ids: Iterable[int]) -> dict[int, set[str]]:
+    """The topics each user's devices should be subscribed to."""
+    ids = list(dict.fromkeys(user_ids))
+    topics: dict[int, set[str]] = {user_id: set() for user_id in ids}
+    if not ids:
+        return topics
+    resolvers: tuple[TopicResolver, ...] = _load_functions(  # type: ignore[assignment]
+        tuple(getattr(settings, 'PUSH_TOPIC_RESOLVERS', ()))
+    )
+    for resolver in resolvers:
+        for user_id, user_topics in resolver(ids).items():
+            topics[user_id] |= user_topics
+    return topics
+
+
+def request_token_sync(tokens: Iterable[str]) -> int:
+    """
+    Queue device tokens for a subscription sync in the current transaction.
+
+    Re-requesting a queued token moves it to the front of the queue, and a
+    request made while a worker holds the token is picked up on the next
+    pass. Returns the number of tokens queued.
+    """
+    now = timezone.now()
+    rows = [
+        PushTopicSync(token=token, requested_at=now, next_attempt_at=now)
+        for token in dict.fromkeys(tokens)
+    ]
+    if rows:
+        PushTopicSync.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['token'],
+            update_fields=['requested_at', 'next_attempt_at'],
+        )
+    return len(rows)
+
+
+def request_topic_sync(*user_ids: int | None) -> int:
+    """Queue every device token of these users (active or not) for a sync."""
+    from users.models import DeviceToken
+
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return 0
+    return request_token_sync(
+        DeviceToken.objects.filter(user_id__in=ids).values_list('token', flat=True)
+    )
+
+
+def _claim(limit: int) -> list[PushTopicSync]:
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PushTopicSync.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        if rows:
+            PushTopicSync.objects.filter(id__in=[row.id for row in rows]).update(
+                next_attempt_at=now + TOPIC_SYNC_LEASE,
+            )
+    return rows
+
+
+def _desired_topics(tokens: list[str]) -> dict[str, set[str]]:
+    """Union of the topics wanted by each token's active owners."""
+    from users.models import DeviceToken
+
+    owners: dict[str, list[int]] = defaultdict(list)
+    for token, user_id in DeviceToken.objects.filter(
+        token__in=tokens, is_active=True,
+    ).values_list('token', 'user_id'):
+        owners[token].append(user_id)
+
+    by_user = topics_for_users(uid for uids in owners.values() for uid in uids)
+    return {
+        token: set().union(*(by_user[uid] for uid in owners[token]))
+        for token in tokens
+    }
+
+
+def _apply(
+    call: Callable[[list[str], str], list[TokenResult]],
+    changes: dict[str, list[str]],
+    failed: set[str],
+) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """
+    Run ``call`` per topic in batches. Returns the (token, topic) pairs that
+    took effect and those rejected for an invalid token; tokens whose call
+    failed are added to ``failed``.
+    """
+    done: list[tuple[str, str]] = []
+    invalid: list[tuple[str, str]] = []
+    for topic, topic_tokens in changes.items():
+        for i in range(0, len(topic_tokens), TOPIC_BATCH_SIZE):
+            batch = topic_tokens[i:i + TOPIC_BATCH_SIZE]
+            try:
+                results = call(batch, topic)
+            except Exception as exc:
+                logger.warning("Topic update of %d token(s) on %s failed: %s", len(batch), topic, exc)
+                failed.update(batch)
+                continue
+            for token, result in zip(batch, results):
+                if result.success:
+                    done.append((token, topic))
+                elif result.invalid_token:
+                    invalid.append((token, topic))
+                else:
+                    failed.add(token)
+    return done, invalid
+
+
+def sync_topic_subscriptions(*, limit: int = TOPIC_SYNC_CLAIM_SIZE) -> TopicSyncResult:
+    """Claim up to ``limit`` queued device tokens and reconcile their topics."""
+    from core.services.notification_service import deactivate_tokens
+    from users.models import DeviceToken
+
+    client: PushClient = get_push_client()
+    if not client.is_available():
+        return TopicSyncResult(0, 0, 0, 0, 0)
+
+    rows = _claim(limit)
+    if not rows:
+        return TopicSyncResult(0, 0, 0, 0, 0)
+
+    tokens = [row.token for row in rows]
+    desired = _desired_topics(tokens)
+    current: dict[str, set[str]] = defaultdict(set)
+    for token, topic in PushTopicSubscription.objects.filter(
+        token__in=tokens,
+    ).values_list('token', 'topic'):
+        current[token].add(topic)
+
+    to_add: dict[str, list[str]] = defaultdict(list)
+    to_remove: dict[str, list[str]] = defaultdict(list)
+    for token in tokens:
+        for topic in desired[token] - current[token]:
+            to_add[topic].append(token)
+        for topic in current[token] - desired[token]:
+            to_remove[topic].append(token)
+
+    failed: set[str] = set()
+    added, rejected = _apply(client.subscribe_to_topic, to_add, failed)
+    removed, gone = _apply(client.unsubscribe_from_topic, to_remove, failed)
+    removed += gone  # the provider has no subscriptions for an invalid token
+    invalid = {token for token, _ in rejected + gone}
+
+    with transaction.atomic():
+        PushTopicSubscription.objects.bulk_create(
+            [PushTopicSubscription(token=token, topic=topic) for token, topic in added],
+            ignore_conflicts=True,
+        )
+        if removed:
+            by_topic: dict[str, list[str]] = defaultdict(list)
+            for token, topic in removed:
+                by_topic[topic].append(token)
+            condition = Q()
+            for topic, topic_tokens in by_topic.items():
+                condition |= Q(topic=topic, token__in=topic_tokens)
+            PushTopicSubscription.objects.filter(condition).delete()
+
+        # A request that arrived after the claim changed requested_at and
+        # stays queued for the next pass
+        retry = failed - invalid
+        done = Q(pk__in=[])
+        for row in rows:
+            if row.token not in retry:
+                done |= Q(token=row.token, requested_at=row.requested_at)
+        PushTopicSync.objects.filter(done).delete()
+        if retry:
+            PushTopicSync.objects.filter(token__in=retry).update(
+                next_attempt_at=timezone.now() + TOPIC_SYNC_RETRY,
+            )
+
+    pruned = 0
+    if invalid:
+        # Queues the tokens again; the next pass clears what is left
+        pruned = deactivate_tokens(
+            DeviceToken.objects.filter(token__in=invalid).values_list('id', flat=True)
+        )
+
+    return TopicSyncResult(
+        claimed=len(rows),
+        subscribed=len(added),
+        unsubscribed=len(removed),
+        retried=len(retry),
+        tokens_pruned=pruned,
+    )
+
+
+def sweep_topic_subscriptions() -> int:
+    """
+    Queue syncs for lapsed memberships (settings.PUSH_TOPIC_SWEEPS); each
+    sweep returns the number of tokens it queued. Returns the total.
+    """
+    sweeps: tuple[TopicSweep, ...] = _load_functions(  # type: ignore[assignment]
+        tuple(getattr(settings, 'PUSH_TOPIC_SWEEPS', ()))
+    )
+    return sum(sweep() for sweep in sweeps)
@@ -0,0 +1,202 @@
+"""
+Tests for the push notification outbox.
+
+Covers:
+- Outbox rows commit and roll back with the triggering transaction
+- Multicast grouping, batch size, duplicate collapsing
+- Preferences, invalid token pruning, retry with backoff, expiry
+- deliver_push_notifications command and a queued message push
+- The backlog check flags rows no worker has claimed
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+from typing import Any
+from unittest.mock import patch
+
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import PushOutbox
+from core.services import push_outbox_service
+from core.services.push_clients import LocalPushClient, get_push_client
+from core.services.push_outbox_service import (
+    deliver_pending_pushes,
+    queue_push_notification,
+    queue_push_to_group,
+)
+from messaging.models import Conversation
+from users.models import DeviceToken, NotificationPreference, User
+
+_THROTTLE_OVERRIDE: dict[str, Any] = {
+    'DEFAULT_THROTTLE_CLASSES': [],
+    'DEFAULT_THROTTLE_RATES': {},
+}
+
+
+@override_settings(PUSH_CLIENT='core.services.push_clients.LocalPushClient')
+class _OutboxTestBase(TestCase):
+    def setUp(self) -> None:
+        client = get_push_client()
+        assert isinstance(client, LocalPushClient)
+        client.sent.clear()
+        client.invalid_tokens.clear()
+        client.fail_calls = 0
+        self.client_stub = client
+        self.users = [
+            User.objects.create_user(email=f'u{i}@example.com', password='pass123')
+            for i in range(3)
+        ]
+        for i, user in enumerate(self.users):
+            DeviceToken.objects.create(user=user, token=f'token-{i}', platform='ios')
+
+    def _statuses(self) -> list[str]:
+        return list(PushOutbox.objects.order_by('id').values_list('status', flat=True))
+
+
+class QueuePushTests(_OutboxTestBase):
+
+    def test_rows_roll_back_with_the_transaction(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                queue_push_notification(self.users[0].id, 'Hi', 'there')
+                raise RuntimeError('event failed')
+        self.assertFalse(PushOutbox.objects.exists())
+
+        self.assertEqual(queue_push_to_group([u.id for u in self.users] * 2, 'Hi', 'there'), 3)
+        self.assertEqual(PushOutbox.objects.filter(status=PushOutbox.Status.PENDING).count(), 3)
+
+
+class DeliverPendingPushesTests(_OutboxTestBase):
+
+    def test_identical_payloads_share_a_multicast(self) -> None:
+        queue_push_to_group([self.users[0].id, self.users[1].id], 'Event', 'Starts soon', {'id': 1})
+        queue_push_notification(self.users[2].id, 'Other', 'Payload')
+        # Same notification queued twice for one user
+        queue_push_notification(self.users[0].id, 'Event', 'Starts soon', {'id': '1'})
+
+        result = deliver_pending_pushes()
+
+        self.assertEqual((result.claimed, result.sent, result.deduplicated), (4, 4, 1))
+        self.assertEqual(
+            sorted((push.title, sorted(push.tokens)) for push in self.client_stub.sent),
+            [('Event', ['token-0', 'token-1']), ('Other', ['token-2'])],
+        )
+        self.assertEqual(self._statuses(), [PushOutbox.Status.SENT] * 4)
+
+    def test_tokens_are_sent_in_batches(self) -> None:
+        DeviceToken.objects.create(user=self.users[0], token='token-0b', platform='android')
+        queue_push_to_group([u.id for u in self.users], 'Hi', 'there')
+
+        with patch.object(push_outbox_service, 'MULTICAST_BATCH_SIZE', 3):
+            deliver_pending_pushes()
+
+        self.assertEqual([len(push.tokens) for push in self.client_stub.sent], [3, 1])
+
+    def test_opted_out_and_tokenless_users_are_skipped(self) -> None:
+        pref = NotificationPreference.get_or_create_for_user(self.users[0])
+        pref.new_message = False
+        pref.save()
+        DeviceToken.objects.filter(user=self.users[1]).update(is_active=False)
+
+        queue_push_to_group([u.id for u in self.users], 'Hi', 'there', category='new_message')
+        result = deliver_pending_pushes()
+
+        self.assertEqual((result.sent, result.skipped), (1, 2))
+        self.assertEqual([push.tokens for push in self.client_stub.sent], [['token-2']])
+        self.assertEqual(
+            sorted(PushOutbox.objects.values_list('last_error', flat=True)),
+            ['', 'disabled by user', 'no device tokens'],
+        )
+
+    def test_invalid_tokens_are_pruned_in_bulk(self) -> None:
+        DeviceToken.objects.create(user=self.users[0], token='token-0b', platform='android')
+        self.client_stub.invalid_tokens.update({'token-0', 'token-1'})
+
+        queue_push_to_group([self.users[0].id, self.users[1].id], 'Hi', 'there')
+        result = deliver_pending_pushes()
+
+        self.assertEqual((result.sent, result.skipped, result.tokens_pruned), (1, 1, 2))
+        self.assertEqual(
+            set(DeviceToken.objects.filter(is_active=True).values_list('token', flat=True)),
+            {'token-0b', 'token-2'},
+        )
+
+    def test_transient_failures_retry_with_backoff(self) -> None:
+        queue_push_notification(self.users[0].id, 'Hi', 'there')
+        self.client_stub.fail_calls = 1
+
+        result = deliver_pending_pushes()
+        row = PushOutbox.objects.get()
+        self.assertEqual((result.retried, row.status, row.attempts), (1, PushOutbox.Status.PENDING, 1))
+        self.assertGreater(row.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+        # Not due yet
+        self.assertEqual(deliver_pending_pushes().claimed, 0)
+
+        PushOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending_pushes().sent, 1)
+        self.assertEqual(PushOutbox.objects.get().status, PushOutbox.Status.SENT)
+
+    def test_gives_up_after_max_attempts_and_expires_old_rows(self) -> None:
+        queue_push_notification(self.users[0].id, 'Hi', 'there')
+        PushOutbox.objects.update(attempts=push_outbox_service.PUSH_MAX_ATTEMPTS - 1)
+        self.client_stub.fail_calls = 1
+
+        self.assertEqual(deliver_pending_pushes().failed, 1)
+        self.assertEqual(PushOutbox.objects.get().last_error, 'out of retries')
+
+        queue_push_notification(self.users[1].id, 'Stale', 'push')
+        PushOutbox.objects.filter(title='Stale').update(created_at=timezone.now() - timedelta(days=1))
+        result = deliver_pending_pushes()
+        self.assertEqual((result.expired, result.claimed), (1, 0))
+        self.assertEqual(self.client_stub.sent, [])
+
+
+class DeliverCommandTests(_OutboxTestBase):
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+    def test_message_push_is_queued_then_delivered(self) -> None:
+        trainer = User.objects.create_user(
+            email='trainer@example.com', password='pass123', role=User.Role.TRAINER,
+            first_name='Tess',
+        )
+        self.users[0].parent_trainer = trainer
+        self.users[0].save(update_fields=['parent_trainer'])
+        conversation = Conversation.objects.create(trainer=trainer, trainee=self.users[0])
+
+        api = APIClient()
+        api.force_authenticate(user=trainer)
+        response = api.post(
+            f'/api/messaging/conversations/{conversation.id}/send/',
+            {'content': 'Hello!'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client_stub.sent, [])
+
+        out = StringIO()
+        call_command('deliver_push_notifications', stdout=out)
+
+        self.assertIn('1 claimed: 1 sent', out.getvalue())
+        [push] = self.client_stub.sent
+        self.assertEqual((push.tokens, push.title, push.body), (['token-0'], 'New message from Tess', 'Hello!'))
+
+    def test_check_flags_rows_no_worker_claimed(self) -> None:
+        queue_push_notification(self.users[0].id, 'Hi', 'There')
+        out = StringIO()
+        call_command('deliver_push_notifications', '--check', stdout=out)
+        self.assertIn('being drained', out.getvalue())
+
+        PushOutbox.objects.update(next_attempt_at=timezone.now() - timedelta(minutes=15))
+        with self.assertLogs('core.services.push_outbox_service', 'WARNING'):
+            with self.assertRaisesMessage(CommandError, '1 push(es) overdue'):
+                call_command('deliver_push_notifications', '--check')
+        self.assertEqual(self.client_stub.sent, [])
+
+        call_command('deliver_push_notifications', stdout=StringIO())
+        self.assertFalse(push_outbox_service.check_push_backlog().is_stalled)
@@ -0,0 +1,152 @@
+"""
+Tests for cached push recipient resolution.
+
+Covers:
+- Bulk resolution of preferences and tokens, served from the cache after
+- Invalidation on preference / token changes (after commit) and eviction
+- Group sends and outbox batches use one cache round trip
+"""
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.services import push_recipient_service
+from core.services.notification_service import deactivate_tokens, send_push_to_group
+from core.services.push_clients import LocalPushClient, get_push_client
+from core.services.push_outbox_service import deliver_pending_pushes, queue_push_to_group
+from core.services.push_recipient_service import get_recipients
+from users.models import DeviceToken, NotificationPreference, User
+
+_THROTTLE_OVERRIDE: dict[str, Any] = {
+    'DEFAULT_THROTTLE_CLASSES': [],
+    'DEFAULT_THROTTLE_RATES': {},
+}
+
+
+class _RecipientTestBase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.users = [
+            User.objects.create_user(email=f'r{i}@example.com', password='pass123')
+            for i in range(4)
+        ]
+        self.tokens = [
+            DeviceToken.objects.create(user=user, token=f'tok-{i}', platform='ios')
+            for i, user in enumerate(self.users)
+        ]
+        pref = NotificationPreference.get_or_create_for_user(self.users[0])
+        pref.new_message = False
+        pref.save()
+
+    def _count_cache_calls(self) -> MagicMock:
+        spy = MagicMock(wraps=cache)
+        patcher = patch.object(push_recipient_service, 'cache', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return spy
+
+
+class GetRecipientsTests(_RecipientTestBase):
+
+    def test_resolves_in_bulk_then_serves_from_cache(self) -> None:
+        ids = [u.id for u in self.users]
+        with self.assertNumQueries(2):
+            recipients = get_recipients(ids)
+
+        self.assertEqual(set(recipients), set(ids))
+        self.assertFalse(recipients[ids[0]].accepts('new_message'))
+        self.assertTrue(recipients[ids[0]].accepts('community_event'))
+        self.assertTrue(recipients[ids[1]].accepts('new_message'))  # no preference row
+        self.assertEqual(recipients[ids[2]].tokens, ((self.tokens[2].id, 'tok-2'),))
+
+        spy = self._count_cache_calls()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_recipients(ids), recipients)
+        self.assertEqual(spy.get_many.call_count, 1)
+        self.assertEqual(spy.set_many.call_count, 0)
+
+    def test_only_missing_users_are_loaded(self) -> None:
+        get_recipients([self.users[0].id, self.users[1].id])
+
+        with self.assertNumQueries(2) as ctx:
+            get_recipients([u.id for u in self.users])
+        self.assertNotIn(f'({self.users[0].id},', ctx.captured_queries[0]['sql'])
+
+    def test_changes_invalidate_after_commit(self) -> None:
+        user = self.users[0]
+        get_recipients([user.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pref = NotificationPreference.objects.get(user=user)
+            pref.new_message = True
+            pref.save()
+            # Not yet committed: readers keep the old entry
+            self.assertFalse(get_recipients([user.id])[user.id].accepts('new_message'))
+        self.assertTrue(get_recipients([user.id])[user.id].accepts('new_message'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DeviceToken.objects.create(user=user, token='tok-0b', platform='android')
+        self.assertEqual(len(get_recipients([user.id])[user.id].tokens), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deactivate_tokens([self.tokens[0].id])
+        self.assertEqual([t for _, t in get_recipients([user.id])[user.id].tokens], ['tok-0b'])
+
+    def test_stale_entry_is_ignored_after_version_eviction(self) -> None:
+        user = self.users[1]
+        get_recipients([user.id])
+        DeviceToken.objects.filter(user=user).update(is_active=False)  # behind the cache's back
+        cache.delete(f'push_recipients:v:{user.id}')
+
+        self.assertEqual(get_recipients([user.id])[user.id].tokens, ())
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+    def test_unregistering_a_device_invalidates(self) -> None:
+        user = self.users[2]
+        get_recipients([user.id])
+        api = APIClient()
+        api.force_authenticate(user=user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api.delete('/api/users/device-token/', {'token': 'tok-2'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_recipients([user.id])[user.id].tokens, ())
+
+
+@override_settings(PUSH_CLIENT='core.services.push_clients.LocalPushClient')
+class FanOutTests(_RecipientTestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        client = get_push_client()
+        assert isinstance(client, LocalPushClient)
+        client.sent.clear()
+        client.invalid_tokens.clear()
+        client.fail_calls = 0
+        self.client_stub = client
+        get_recipients([u.id for u in self.users])  # warm
+
+    def test_group_send_uses_one_cache_round_trip(self) -> None:
+        spy = self._count_cache_calls()
+        with self.assertNumQueries(0):
+            reached = send_push_to_group(
+                [u.id for u in self.users], 'Hi', 'there', category='new_message',
+            )
+
+        self.assertEqual(reached, 3)
+        self.assertEqual(spy.get_many.call_count, 1)
+        self.assertEqual(sorted(self.client_stub.sent[0].tokens), ['tok-1', 'tok-2', 'tok-3'])
+
+    def test_outbox_batch_uses_one_cache_round_trip(self) -> None:
+        queue_push_to_group([u.id for u in self.users], 'Hi', 'there', category='new_message')
+
+        spy = self._count_cache_calls()
+        result = deliver_pending_pushes()
+
+        self.assertEqual((result.sent, result.skipped), (3, 1))
+        self.assertEqual(spy.get_many.call_count, 1)
+        self.assertEqual(spy.set_many.call_count, 0)
@@ -0,0 +1,205 @@
+"""
+Tests for FCM topic subscriptions and topic delivery.
+
+Covers:
+- Syncing subscribes / unsubscribes device tokens as audiences change
+- Shared tokens, deactivated and deleted tokens, opt-outs
+- Failed calls retry, invalid tokens are pruned, late requests stay queued
+- Topic pushes are sent once from the outbox, after pending syncs
+- Tokens registered before topics existed are queued by a migration
+"""
+from __future__ import annotations
+
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from community.models import Space, SpaceMembership
+from community.services.push_audience_service import announcements_topic, space_posts_topic
+from core.models import PushOutbox, PushTopicSubscription, PushTopicSync
+from core.services import push_topic_service
+from core.services.notification_service import deactivate_tokens
+from core.services.push_clients import LocalPushClient, get_push_client
+from core.services.push_outbox_service import deliver_pending_pushes, queue_push_to_topic
+from core.services.push_topic_service import request_token_sync, sync_topic_subscriptions
+from users.models import DeviceToken, NotificationPreference, User
+
+
+@override_settings(PUSH_CLIENT='core.services.push_clients.LocalPushClient')
+class _TopicTestBase(TestCase):
+    def setUp(self) -> None:
+        client = get_push_client()
+        assert isinstance(client, LocalPushClient)
+        client.reset()
+        self.client_stub = client
+        self.trainer = User.objects.create_user(
+            email='trainer@example.com', password='pass123', role=User.Role.TRAINER,
+        )
+        self.trainees = [
+            User.objects.create_user(
+                email=f't{i}@example.com', password='pass123', role=User.Role.TRAINEE,
+                parent_trainer=self.trainer,
+            )
+            for i in range(2)
+        ]
+        self.tokens = [
+            DeviceToken.objects.create(user=user, token=f'token-{i}', platform='ios')
+            for i, user in enumerate(self.trainees)
+        ]
+        self.space = Space.objects.create(trainer=self.trainer, name='Runners')
+        self.announcements = announcements_topic(self.trainer.id)
+        self.posts = space_posts_topic(self.space.id)
+
+    def _subscribers(self, topic: str) -> set[str]:
+        stored = set(PushTopicSubscription.objects.filter(topic=topic).values_list('token', flat=True))
+        self.assertEqual(stored, self.client_stub.subscriptions.get(topic, set()))
+        return stored
+
+
+class SyncTopicSubscriptionsTests(_TopicTestBase):
+
+    def test_audience_changes_are_synced(self) -> None:
+        result = sync_topic_subscriptions()  # announcements + events topics
+        self.assertEqual((result.claimed, result.subscribed), (2, 4))
+        self.assertEqual(self._subscribers(self.announcements), {'token-0', 'token-1'})
+        self.assertFalse(PushTopicSync.objects.exists())
+
+        membership = SpaceMembership.objects.create(space=self.space, user=self.trainees[0])
+        sync_topic_subscriptions()
+        self.assertEqual(self._subscribers(self.posts), {'token-0'})
+
+        membership.delete()
+        pref = NotificationPreference.get_or_create_for_user(self.trainees[1])
+        pref.trainer_announcement = False
+        pref.save()
+        result = sync_topic_subscriptions()
+
+        self.assertEqual((result.claimed, result.unsubscribed), (2, 2))
+        self.assertEqual(self._subscribers(self.posts), set())
+        self.assertEqual(self._subscribers(self.announcements), {'token-0'})
+
+    def test_unchanged_tokens_make_no_calls(self) -> None:
+        sync_topic_subscriptions()
+        request_token_sync(['token-0', 'token-1'])
+
+        with patch.object(self.client_stub, 'subscribe_to_topic') as subscribe:
+            result = sync_topic_subscriptions()
+        self.assertEqual((result.claimed, result.subscribed, result.unsubscribed), (2, 0, 0))
+        subscribe.assert_not_called()
+
+    def test_shared_token_keeps_topics_wanted_by_any_owner(self) -> None:
+        other_trainer = User.objects.create_user(
+            email='trainer2@example.com', password='pass123', role=User.Role.TRAINER,
+        )
+        sibling = User.objects.create_user(
+            email='sib@example.com', password='pass123', role=User.Role.TRAINEE,
+            parent_trainer=other_trainer,
+        )
+        DeviceToken.objects.create(user=sibling, token='token-0', platform='ios')
+        sync_topic_subscriptions()
+        self.assertEqual(self._subscribers(announcements_topic(other_trainer.id)), {'token-0'})
+
+        sibling.parent_trainer = None
+        sibling.save()
+        sync_topic_subscriptions()
+
+        self.assertEqual(self._subscribers(announcements_topic(other_trainer.id)), set())
+        self.assertEqual(self._subscribers(self.announcements), {'token-0', 'token-1'})
+
+    def test_unregistered_and_deleted_tokens_leave_their_topics(self) -> None:
+        sync_topic_subscriptions()
+
+        deactivate_tokens([self.tokens[0].id])
+        self.tokens[1].delete()
+        result = sync_topic_subscriptions()
+
+        self.assertEqual((result.claimed, result.unsubscribed), (2, 4))
+        self.assertEqual(self._subscribers(self.announcements), set())
+
+    def test_failed_calls_are_retried(self) -> None:
+        self.client_stub.fail_calls = 2
+
+        result = sync_topic_subscriptions()
+        self.assertEqual((result.subscribed, result.retried), (0, 2))
+        self.assertEqual(sync_topic_subscriptions().claimed, 0)  # backing off
+
+        PushTopicSync.objects.update(next_attempt_at=PushTopicSync.objects.get(token='token-0').requested_at)
+        self.assertEqual(sync_topic_subscriptions().subscribed, 4)
+        self.assertEqual(self._subscribers(self.announcements), {'token-0', 'token-1'})
+
+    def test_invalid_tokens_are_pruned(self) -> None:
+        self.client_stub.invalid_tokens.add('token-0')
+
+        result = sync_topic_subscriptions()
+
+        self.assertEqual((result.subscribed, result.tokens_pruned), (2, 1))
+        self.tokens[0].refresh_from_db()
+        self.assertFalse(self.tokens[0].is_active)
+        self.assertEqual(self._subscribers(self.announcements), {'token-1'})
+
+    def test_request_during_a_sync_stays_queued(self) -> None:
+        real_desired = push_topic_service._desired_topics
+
+        def desired_then_rerequest(tokens: list[str]) -> dict[str, set[str]]:
+            desired = real_desired(tokens)
+            request_token_sync(['token-0'])
+            return desired
+
+        with patch.object(push_topic_service, '_desired_topics', desired_then_rerequest):
+            sync_topic_subscriptions()
+
+        self.assertEqual(list(PushTopicSync.objects.values_list('token', flat=True)), ['token-0'])
+
+
+class TopicDeliveryTests(_TopicTestBase):
+
+    def test_topic_push_is_sent_once(self) -> None:
+        queue_push_to_topic(self.announcements, 'News', 'Read it', {'id': 3}, category='trainer_announcement')
+        queue_push_to_topic(self.announcements, 'News', 'Read it', {'id': '3'})
+
+        result = deliver_pending_pushes()
+
+        self.assertEqual((result.claimed, result.sent, result.deduplicated), (2, 2, 1))
+        [push] = self.client_stub.topic_sent
+        self.assertEqual((push.topic, push.title, push.data), (self.announcements, 'News', {'id': '3'}))
+        self.assertEqual(self.client_stub.sent, [])
+
+    def test_failed_topic_push_is_retried(self) -> None:
+        queue_push_to_topic(self.announcements, 'News', 'Read it')
+        self.client_stub.fail_calls = 1
+
+        self.assertEqual(deliver_pending_pushes().retried, 1)
+        self.assertEqual(PushOutbox.objects.get().status, PushOutbox.Status.PENDING)
+
+    def test_command_syncs_before_delivering(self) -> None:
+        queue_push_to_topic(self.announcements, 'News', 'Read it')
+        out = StringIO()
+
+        with patch.object(self.client_stub, 'send_to_topic', wraps=self.client_stub.send_to_topic) as send:
+            send.side_effect = lambda topic, *args: self.assertEqual(
+                self.client_stub.subscriptions[topic], {'token-0', 'token-1'},
+            )
+            call_command('deliver_push_notifications', stdout=out)
+
+        send.assert_called_once()
+        self.assertIn('2 device token(s) synced: 4 topic subscription(s) added', out.getvalue())
+        self.assertIn('1 claimed: 1 sent', out.getvalue())
+
+
+class BackfillMigrationTests(_TopicTestBase):
+
+    def test_active_tokens_are_queued(self) -> None:
+        deactivate_tokens([self.tokens[1].id])
+        PushTopicSync.objects.all().delete()
+        migration = import_module('core.migrations.0003_backfill_push_topic_syncs')
+
+        migration.queue_existing_tokens(apps, None)
+        migration.queue_existing_tokens(apps, None)
+
+        self.assertEqual(list(PushTopicSync.objects.values_list('token', flat=True)), ['token-0'])
+        sync_topic_subscriptions()
+        self.assertEqual(self._subscribers(self.announcements), {'token-0'})
@@ -3,7 +3,7 @@ Admin site registration for messaging models.
 """
 from django.contrib import admin
 
-from .models import Conversation, Message
+from .models import Conversation, Message, UnreadCounter
 
 
 @admin.register(Conversation)
@@ -26,3 +26,9 @@ class MessageAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
     @admin.display(description='Content')
     def short_content(self, obj: Message) -> str:
         return obj.content[:80] if obj.content else ''
+
+
+@admin.register(UnreadCounter)
+class UnreadCounterAdmin(admin.ModelAdmin):  # type: ignore[type-arg]
+    list_display = ('id', 'conversation', 'user', 'unread_count')
+    raw_id_fields = ('conversation', 'user')
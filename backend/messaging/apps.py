@@ -8,3 +8,6 @@ class MessagingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'messaging'
     verbose_name = 'Messaging'
+
+    def ready(self) -> None:
+        from messaging import signals  # noqa: F401
@@ -4,6 +4,12 @@ WebSocket consumer for real-time direct messaging.
 Each conversation has its own channel group: messaging_conversation_{id}.
 JWT authentication is performed via query parameter (token=...).
 Supports: new messages, typing indicators, read receipts.
+
+Every event except typing carries a per-conversation ``seq``. A client that
+reconnects with ``since=<last seq>`` (or sends a ``resume`` frame) is sent
+the events it missed from a short buffer, then ``resumed``. If the buffer
+no longer covers the gap it gets ``resync_required`` and should catch up
+over REST (GET .../messages/?after=<newest message id>).
 """
 from __future__ import annotations
 
@@ -19,9 +25,11 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
     """
     WebSocket consumer for a single conversation.
 
-    Connect:  ws://host/ws/messaging/<conversation_id>/?token=<JWT>
-    Sends:    new_message, typing_indicator, read_receipt events.
-    Receives: typing (from client to broadcast to other party).
+    Connect:  ws://host/ws/messaging/<conversation_id>/?token=<JWT>[&since=<seq>]
+    Sends:    new_message, typing_indicator, read_receipt events;
+              resumed / resync_required after a resume.
+    Receives: typing (from client to broadcast to other party),
+              resume (replay events after a sequence).
     """
 
     group_name: str = ''
@@ -57,6 +65,11 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
             user.id, self.conversation_id,
         )
 
+        # Joined the group first, so nothing broadcast from here on is missed
+        since = self._query_param('since')
+        if since is not None:
+            await self._resume(since)
+
     async def disconnect(self, code: int) -> None:
         """Leave the conversation group on disconnect."""
         if self.group_name:
@@ -72,12 +85,16 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
         Supported types:
         - ping: heartbeat
         - typing: broadcast typing indicator to other party
+        - resume: replay buffered events after ``seq``
         """
         msg_type = content.get('type')
 
         if msg_type == 'ping':
             await self.send_json({'type': 'pong'})
 
+        elif msg_type == 'resume':
+            await self._resume(content.get('seq'))
+
         elif msg_type == 'typing':
             # Broadcast typing indicator to the group (other party).
             # Coerce is_typing to a strict bool to prevent injection of
@@ -102,6 +119,7 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
         await self.send_json({
             'type': 'new_message',
             'message': event['message'],
+            'seq': event.get('seq'),
         })
 
     async def chat_typing(self, event: dict[str, Any]) -> None:
@@ -120,6 +138,7 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
             'type': 'read_receipt',
             'reader_id': event['reader_id'],
             'read_at': event['read_at'],
+            'seq': event.get('seq'),
         })
 
     async def chat_message_edited(self, event: dict[str, Any]) -> None:
@@ -129,6 +148,7 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
             'message_id': event['message_id'],
             'content': event['content'],
             'edited_at': event['edited_at'],
+            'seq': event.get('seq'),
         })
 
     async def chat_message_deleted(self, event: dict[str, Any]) -> None:
@@ -136,22 +156,52 @@ class DirectMessageConsumer(AsyncJsonWebsocketConsumer):
         await self.send_json({
             'type': 'message_deleted',
             'message_id': event['message_id'],
+            'seq': event.get('seq'),
         })
 
+    # ------------------------------------------------------------------
+    # Resume
+    # ------------------------------------------------------------------
+
+    async def _resume(self, since: Any) -> None:
+        """Replay events after ``since``, or ask the client to resync."""
+        from asgiref.sync import sync_to_async
+
+        from messaging.services.event_buffer_service import events_since
+
+        try:
+            seq = int(since)
+        except (TypeError, ValueError):
+            await self.send_json({'type': 'error', 'error': 'seq must be an integer.'})
+            return
+
+        replay = await sync_to_async(events_since)(self.conversation_id, seq)
+        if not replay.complete:
+            await self.send_json({'type': 'resync_required', 'seq': replay.seq})
+            return
+
+        # Replayed through the same handlers as live events. An event that
+        # arrived live while replaying may be sent twice; clients dedupe by seq.
+        for event in replay.events:
+            await self.dispatch(event)
+        await self.send_json({'type': 'resumed', 'seq': replay.seq})
+
+    def _query_param(self, name: str) -> str | None:
+        from urllib.parse import parse_qs
+
+        query_string = self.scope.get('query_string', b'').decode('utf-8')
+        values = parse_qs(query_string).get(name, [])
+        return values[0] if values else None
+
     # ------------------------------------------------------------------
     # Auth helpers
     # ------------------------------------------------------------------
 
     async def _authenticate(self) -> Any:
         """Authenticate user from JWT token in query params."""
-        from urllib.parse import parse_qs
-
         from channels.db import database_sync_to_async  # type: ignore[import-untyped]
 
-        query_string = self.scope.get('query_string', b'').decode('utf-8')
-        parsed = parse_qs(query_string)
-        token_values = parsed.get('token', [])
-        token = token_values[0] if token_values else None
+        token = self._query_param('token')
         if not token:
             return None
 
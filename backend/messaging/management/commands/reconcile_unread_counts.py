@@ -0,0 +1,38 @@
+"""
+Management command to rebuild per-participant unread message counters.
+
+Run once after deploying the counter table, and any time the counters may
+have drifted (e.g. after bulk edits to Message.is_read that bypass
+messaging_service):
+    python manage.py reconcile_unread_counts
+    python manage.py reconcile_unread_counts --conversation-id=42
+"""
+from __future__ import annotations
+
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+from messaging.services.unread_counter_service import reconcile_unread_counters
+
+
+class Command(BaseCommand):
+    help = "Recount UnreadCounter rows from unread messages and fix any that drifted."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--conversation-id",
+            type=int,
+            action="append",
+            default=None,
+            help="Only reconcile this conversation (repeatable).",
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        result = reconcile_unread_counters(options["conversation_id"])  # type: ignore[arg-type]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {result.conversations_checked} conversation(s): "
+                f"{result.counters_fixed} unread counter(s) fixed."
+            )
+        )
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.db import migrations, models
+
+TRIGRAM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.indexes.OpClass(
+        django.db.models.functions.text.Upper('content'), name='gin_trgm_ops',
+    ),
+    name='messages_content_trgm_gin',
+)
+
+
+def _trigram_available(schema_editor) -> bool:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def add_trigram_index(apps, schema_editor):
+    # Substring search still works without pg_trgm, just without the index
+    if not _trigram_available(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(apps.get_model('messaging', 'Message'), TRIGRAM_INDEX)
+
+
+def remove_trigram_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX IF EXISTS "{TRIGRAM_INDEX.name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_add_edited_at_is_deleted_to_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('content', config='english'), help_text='Full-text search document, maintained by Postgres from content.', output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='messages_search_vector_gin'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='message', index=TRIGRAM_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_trigram_index, remove_trigram_index),
+            ],
+        ),
+    ]
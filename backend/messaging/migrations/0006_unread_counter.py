@@ -0,0 +1,60 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counters(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+    UnreadCounter = apps.get_model('messaging', 'UnreadCounter')
+
+    unread_by_sender: dict[int, dict[int, int]] = {}
+    for row in (
+        Message.objects.filter(is_read=False)
+        .values('conversation_id', 'sender_id')
+        .annotate(n=Count('id'))
+    ):
+        unread_by_sender.setdefault(row['conversation_id'], {})[row['sender_id']] = row['n']
+
+    counters = []
+    for conversation_id, trainer_id, trainee_id in (
+        Conversation.objects.values_list('id', 'trainer_id', 'trainee_id').iterator()
+    ):
+        by_sender = unread_by_sender.get(conversation_id, {})
+        for user_id in (trainer_id, trainee_id):
+            if user_id is None:
+                continue
+            counters.append(UnreadCounter(
+                conversation_id=conversation_id,
+                user_id=user_id,
+                unread_count=sum(n for sender_id, n in by_sender.items() if sender_id != user_id),
+            ))
+    UnreadCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0005_message_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='messaging.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'messaging_unread_counters',
+                'constraints': [models.UniqueConstraint(fields=('conversation', 'user'), name='unique_unread_counter_per_participant')],
+            },
+        ),
+        migrations.RunPython(backfill_unread_counters, migrations.RunPython.noop),
+    ]
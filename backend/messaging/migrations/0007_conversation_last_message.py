@@ -0,0 +1,99 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_last_message(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+
+    newest = (
+        Message.objects.filter(conversation=OuterRef('pk'))
+        .order_by('-created_at', '-id')
+        .values('id')[:1]
+    )
+    last_ids = dict(
+        Conversation.objects.annotate(newest_id=Subquery(newest))
+        .filter(newest_id__isnull=False)
+        .values_list('id', 'newest_id')
+    )
+    messages = Message.objects.in_bulk(list(last_ids.values()))
+
+    conversations = []
+    for conversation in Conversation.objects.filter(id__in=list(last_ids)):
+        message = messages[last_ids[conversation.id]]
+        conversation.last_message_id = message.id
+        conversation.last_message_at = message.created_at
+        conversation.last_message_preview = message.content[:100]
+        conversation.last_message_sender_id = message.sender_id
+        conversation.last_message_has_image = bool(message.image)
+        conversation.last_message_is_deleted = message.is_deleted
+        conversations.append(conversation)
+    Conversation.objects.bulk_update(
+        conversations,
+        [
+            'last_message', 'last_message_at', 'last_message_preview',
+            'last_message_sender', 'last_message_has_image', 'last_message_is_deleted',
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_unread_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='messaging_c_trainer_3c2776_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='messaging_c_trainee_2db0b7_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='conversation',
+            name='messaging_c_trainer_5898e0_idx',
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_has_image',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['trainer', 'is_archived', '-last_message_at', '-id'], name='conversations_trainer_inbox'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['trainee', 'is_archived', '-last_message_at', '-id'], name='conversations_trainee_inbox'),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
@@ -6,7 +6,13 @@ from __future__ import annotations
 import os
 import uuid
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
+
+# Text search configuration for message content (stemming, stop words)
+SEARCH_CONFIG = 'english'
 
 
 def _message_image_path(instance: object, filename: str) -> str:
@@ -36,6 +42,25 @@ class Conversation(models.Model):
         limit_choices_to={'role': 'TRAINEE'},
     )
     last_message_at = models.DateTimeField(null=True, blank=True)
+    # Denormalized from the newest message by messaging.signals so the
+    # inbox never has to look at Message rows.
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    last_message_preview = models.CharField(max_length=100, blank=True, default='')
+    last_message_sender = models.ForeignKey(
+        'users.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    last_message_has_image = models.BooleanField(default=False)
+    last_message_is_deleted = models.BooleanField(default=False)
     is_archived = models.BooleanField(
         default=False,
         help_text='Set to True when trainee is removed. Messages preserved for audit.',
@@ -52,9 +77,15 @@ class Conversation(models.Model):
             ),
         ]
         indexes = [
-            models.Index(fields=['trainer', '-last_message_at']),
-            models.Index(fields=['trainee', '-last_message_at']),
-            models.Index(fields=['trainer', 'is_archived']),
+            # Inbox order (see get_conversations_for_user), one index scan per page
+            models.Index(
+                fields=['trainer', 'is_archived', '-last_message_at', '-id'],
+                name='conversations_trainer_inbox',
+            ),
+            models.Index(
+                fields=['trainee', 'is_archived', '-last_message_at', '-id'],
+                name='conversations_trainee_inbox',
+            ),
         ]
         ordering = ['-last_message_at']
 
@@ -66,6 +97,13 @@ class Conversation(models.Model):
         )
 
 
+class MessageManager(models.Manager['Message']):
+    """Leaves the search document out of ordinary message loads."""
+
+    def get_queryset(self) -> models.QuerySet[Message]:
+        return super().get_queryset().defer('search_vector')
+
+
 class Message(models.Model):
     """
     A single message within a conversation.
@@ -103,13 +141,30 @@ class Message(models.Model):
         help_text='Soft-delete flag. Content and image cleared when set.',
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('content', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        help_text='Full-text search document, maintained by Postgres from content.',
+    )
+
+    objects = MessageManager()
 
     class Meta:
         db_table = 'messaging_messages'
         indexes = [
             models.Index(fields=['conversation', 'created_at']),
+            # Id cursors in message history
+            models.Index(fields=['conversation', 'id'], name='messages_conversation_id_idx'),
             models.Index(fields=['conversation', 'is_read']),
             models.Index(fields=['sender']),
+            GinIndex(fields=['search_vector'], name='messages_search_vector_gin'),
+            # Serves icontains (UPPER(content) LIKE UPPER('%q%')) for partial
+            # words. Needs pg_trgm; migration 0005 skips it where unavailable.
+            GinIndex(
+                OpClass(Upper('content'), name='gin_trgm_ops'),
+                name='messages_content_trgm_gin',
+            ),
         ]
         ordering = ['created_at']
 
@@ -123,3 +178,36 @@ class Message(models.Model):
         else:
             preview = ''
         return f"Message({self.sender.email}: {preview})"
+
+
+class UnreadCounter(models.Model):
+    """
+    Number of unread messages in one conversation for one participant.
+
+    Kept in step with Message.is_read by messaging_service on send and
+    mark-read, so unread badges never count Message rows. Rebuild with
+    `python manage.py reconcile_unread_counts` if it drifts.
+    """
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='unread_counters',
+    )
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='unread_counters',
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'messaging_unread_counters'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['conversation', 'user'],
+                name='unique_unread_counter_per_participant',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"UnreadCounter(conversation={self.conversation_id}, user={self.user_id}: {self.unread_count})"
@@ -108,6 +108,8 @@ class SearchMessageResultSerializer(serializers.Serializer):  # type: ignore[typ
     other_participant_id = serializers.IntegerField(allow_null=True)
     other_participant_first_name = serializers.CharField()
     other_participant_last_name = serializers.CharField()
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
 
 
 class ConversationParticipantSerializer(serializers.Serializer):  # type: ignore[type-arg]
@@ -130,40 +132,37 @@ class ConversationListSerializer(serializers.ModelSerializer[Conversation]):
     trainer = ConversationParticipantSerializer(read_only=True)
     trainee = ConversationParticipantSerializer(read_only=True)
     last_message_preview = serializers.SerializerMethodField()
+    last_message_sender_id = serializers.IntegerField(read_only=True, allow_null=True)
     unread_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
         fields = [
             'id', 'trainer', 'trainee', 'last_message_at',
-            'last_message_preview', 'unread_count', 'is_archived',
+            'last_message_preview', 'last_message_sender_id', 'unread_count', 'is_archived',
             'created_at',
         ]
         read_only_fields = [
             'id', 'trainer', 'trainee', 'last_message_at',
-            'last_message_preview', 'unread_count', 'is_archived',
+            'last_message_preview', 'last_message_sender_id', 'unread_count', 'is_archived',
             'created_at',
         ]
 
     def get_last_message_preview(self, obj: Conversation) -> str | None:
         """Return the last message content truncated to 100 chars.
 
-        Uses the ``annotated_last_message_preview`` annotation added by
-        ``get_conversations_for_user()`` to avoid N+1 queries.
-        Falls back to "Sent a photo" when the last message has an image
-        but no text content, or "This message was deleted" when the last
-        message is soft-deleted.
+        Reads the denormalized ``last_message_*`` fields, so no Message
+        rows are queried. Falls back to "Sent a photo" when the last message
+        has an image but no text content, or "This message was deleted"
+        when the last message is soft-deleted.
         """
-        is_deleted = getattr(obj, 'annotated_last_message_is_deleted', False)
-        if is_deleted:
+        if obj.last_message_id is None:
+            return None
+        if obj.last_message_is_deleted:
             return 'This message was deleted'
-
-        preview = getattr(obj, 'annotated_last_message_preview', None)
-        if not preview:
-            has_image = getattr(obj, 'annotated_last_message_has_image', False)
-            if has_image:
-                return 'Sent a photo'
-        return preview
+        if not obj.last_message_preview and obj.last_message_has_image:
+            return 'Sent a photo'
+        return obj.last_message_preview
 
     def get_unread_count(self, obj: Conversation) -> int:
         """Return unread message count for the requesting user.
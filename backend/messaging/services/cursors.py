@@ -0,0 +1,47 @@
+"""
+Opaque keyset pagination cursors shared by the messaging list endpoints.
+
+A cursor is the URL-safe base64 of a compact JSON array holding the sort
+key of the last row a client has seen. Callers validate the decoded values.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode JSON-serializable key values; datetimes are stored as ISO 8601."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list[Any]:
+    """
+    Decode a cursor made by encode_cursor() with ``size`` values.
+
+    Raises:
+        ValueError: If the cursor is malformed or has the wrong length.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, binascii.Error):
+        raise ValueError('Invalid cursor.') from None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor.')
+    return values
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    """Parse a datetime key from a decoded cursor. Raises ValueError if invalid."""
+    if not isinstance(value, str):
+        raise ValueError('Invalid cursor.')
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError('Invalid cursor.') from None
@@ -0,0 +1,87 @@
+"""
+Short replay buffer of conversation websocket events.
+
+Every conversation event broadcast to a channel group (new message, edit,
+delete, read receipt) gets a per-conversation sequence number and is kept
+in the cache (Redis in production) for EVENT_BUFFER_TTL seconds. A client
+that reconnects with the last sequence it saw is sent the events it missed
+instead of reloading the conversation. Typing indicators are ephemeral and
+never buffered.
+
+The sequence counter itself never expires. If it is evicted it restarts,
+and clients resuming from a higher sequence are told to resync.
+
+All functions return dataclass instances, never dicts.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from django.core.cache import cache
+
+_CACHE_PREFIX = 'messaging_events'
+EVENT_BUFFER_TTL: int = 300  # 5 minutes — long enough to ride out a flaky mobile connection
+EVENT_BUFFER_SIZE: int = 200  # a wider gap is cheaper to resync over REST than to replay
+
+
+@dataclass(frozen=True)
+class EventReplay:
+    """Events after a client's last seen sequence, oldest first."""
+    events: list[dict[str, Any]]
+    seq: int
+    complete: bool  # False when the gap is not fully buffered; the client must resync
+
+
+def _seq_key(conversation_id: int) -> str:
+    return f'{_CACHE_PREFIX}:seq:{conversation_id}'
+
+
+def _event_key(conversation_id: int, seq: int) -> str:
+    return f'{_CACHE_PREFIX}:{conversation_id}:{seq}'
+
+
+def _next_seq(conversation_id: int) -> int:
+    try:
+        return int(cache.incr(_seq_key(conversation_id)))
+    except ValueError:
+        # Key missing (first event or evicted)
+        if cache.add(_seq_key(conversation_id), 1, timeout=None):
+            return 1
+        return int(cache.incr(_seq_key(conversation_id)))
+
+
+def current_seq(conversation_id: int) -> int:
+    """Sequence of the conversation's latest buffered event (0 if none)."""
+    return int(cache.get(_seq_key(conversation_id), 0))
+
+
+def record_event(conversation_id: int, event: dict[str, Any]) -> dict[str, Any]:
+    """
+    Assign the next sequence number to a channel-layer event and buffer it.
+
+    Returns the event with its ``seq`` set, ready for group_send.
+    """
+    seq = _next_seq(conversation_id)
+    sequenced = {**event, 'seq': seq}
+    cache.set(_event_key(conversation_id, seq), sequenced, EVENT_BUFFER_TTL)
+    return sequenced
+
+
+def events_since(conversation_id: int, seq: int) -> EventReplay:
+    """
+    Buffered events with a sequence greater than ``seq``.
+
+    ``complete`` is False if any of them has expired, the gap is wider than
+    EVENT_BUFFER_SIZE, or ``seq`` is ahead of the counter (it was reset).
+    """
+    latest = current_seq(conversation_id)
+    if seq > latest or latest - seq > EVENT_BUFFER_SIZE:
+        return EventReplay(events=[], seq=latest, complete=False)
+    if seq == latest:
+        return EventReplay(events=[], seq=latest, complete=True)
+
+    keys = [_event_key(conversation_id, s) for s in range(seq + 1, latest + 1)]
+    found = cache.get_many(keys)
+    events = [found[key] for key in keys if key in found]
+    return EventReplay(events=events, seq=latest, complete=len(events) == len(keys))
@@ -6,6 +6,7 @@ All functions return dataclass instances, never dicts.
 from __future__ import annotations
 
 import logging
+from collections.abc import Hashable
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any
@@ -14,17 +15,30 @@ from datetime import timedelta
 
 from django.core.files.uploadedfile import UploadedFile
 from django.db import transaction
-from django.db.models import BooleanField, Count, OuterRef, Q, QuerySet, Subquery, Value
-from django.db.models.expressions import Case, When
-from django.db.models.functions import Left
+from django.db.models import IntegerField, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from messaging.models import Conversation, Message
+from core import broadcast_dispatcher
+from messaging.models import Conversation, Message, UnreadCounter
+from messaging.services.cursors import decode_cursor, encode_cursor, parse_cursor_datetime
+from messaging.services.event_buffer_service import current_seq, record_event
+from messaging.services.unread_counter_service import (
+    create_counters,
+    decrement_unread,
+    get_total_unread,
+    increment_unread,
+    invalidate_total_unread,
+)
 from users.models import User
 
 # Configurable edit window: messages can only be edited within this time.
 EDIT_WINDOW = timedelta(minutes=15)
 
+CONVERSATION_PAGE_SIZE = 50
+MESSAGE_PAGE_SIZE = 20
+MAX_MESSAGE_PAGE_SIZE = 100
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,6 +72,21 @@ class UnreadCountResult:
     unread_count: int
 
 
+@dataclass(frozen=True)
+class ConversationPage:
+    """One keyset page of a user's inbox."""
+    conversations: list[Conversation]
+    next_cursor: str | None
+
+
+@dataclass(frozen=True)
+class MessageHistoryPage:
+    """Messages on one side of an id cursor, plus the conversation's event sequence."""
+    messages: list[Message]
+    has_more: bool
+    seq: int
+
+
 @dataclass(frozen=True)
 class EditMessageResult:
     """Result of editing a message."""
@@ -102,11 +131,15 @@ def get_or_create_conversation(
         trainee=trainee,
         defaults={'is_archived': False},
     )
+    if created:
+        create_counters(conversation)
 
     # Un-archive if it was previously archived (trainee re-assigned)
     if not created and conversation.is_archived:
         conversation.is_archived = False
         conversation.save(update_fields=['is_archived', 'updated_at'])
+        # Its unread messages count towards the badges again
+        invalidate_total_unread(conversation.trainer_id, conversation.trainee_id)
 
     return conversation, created
 
@@ -155,9 +188,17 @@ def send_message(
             image=image,
         )
 
-        # Update conversation timestamp
+        # messaging.signals has already moved the conversation's
+        # last_message_* fields to this message
         conversation.last_message_at = message.created_at
-        conversation.save(update_fields=['last_message_at', 'updated_at'])
+
+        recipient_id = (
+            conversation.trainee_id
+            if sender.id == conversation.trainer_id
+            else conversation.trainer_id
+        )
+        if recipient_id is not None:
+            increment_unread(conversation.id, recipient_id)
 
     image_url: str | None = message.image.url if message.image else None
 
@@ -187,15 +228,17 @@ def mark_conversation_read(
         raise ValueError('You are not a participant in this conversation.')
 
     now = timezone.now()
-    updated_count = Message.objects.filter(
-        conversation=conversation,
-        is_read=False,
-    ).exclude(
-        sender=user,
-    ).update(
-        is_read=True,
-        read_at=now,
-    )
+    with transaction.atomic():
+        updated_count = Message.objects.filter(
+            conversation=conversation,
+            is_read=False,
+        ).exclude(
+            sender=user,
+        ).update(
+            is_read=True,
+            read_at=now,
+        )
+        decrement_unread(conversation.id, user.id, updated_count)
 
     return MarkReadResult(
         conversation_id=conversation.id,
@@ -208,30 +251,14 @@ def get_unread_count(user: User) -> UnreadCountResult:
     """
     Get the total number of unread messages across all conversations for a user.
 
-    Only counts messages from the OTHER participant.
-    Uses a single query by filtering on conversation ownership directly.
+    Only counts messages from the OTHER participant in non-archived
+    conversations. Served from the user's cached total of their unread
+    counters, so it never counts Message rows.
     """
-    if user.is_trainer():
-        conversation_filter = Q(
-            conversation__trainer=user,
-            conversation__is_archived=False,
-        )
-    elif user.is_trainee():
-        conversation_filter = Q(
-            conversation__trainee=user,
-            conversation__is_archived=False,
-        )
-    else:
+    if not (user.is_trainer() or user.is_trainee()):
         return UnreadCountResult(unread_count=0)
 
-    unread = Message.objects.filter(
-        conversation_filter,
-        is_read=False,
-    ).exclude(
-        sender=user,
-    ).count()
-
-    return UnreadCountResult(unread_count=unread)
+    return UnreadCountResult(unread_count=get_total_unread(user.id))
 
 
 def get_conversations_for_user(user: User) -> QuerySet[Conversation]:
@@ -242,9 +269,10 @@ def get_conversations_for_user(user: User) -> QuerySet[Conversation]:
     Trainees see conversations with their trainer.
     Always excludes archived unless specifically requested.
 
-    The queryset is annotated with:
-    - annotated_last_message_preview: last message content (truncated to 100 chars)
-    - annotated_unread_count: count of unread messages from the other party
+    Ordered by last activity (conversations without messages first), which
+    the inbox indexes serve directly. The last message preview comes from the
+    denormalized last_message_* fields; the queryset is annotated with:
+    - annotated_unread_count: the user's unread counter for the conversation
     """
     if user.is_trainer():
         base_qs = Conversation.objects.filter(trainer=user, is_archived=False)
@@ -253,64 +281,65 @@ def get_conversations_for_user(user: User) -> QuerySet[Conversation]:
     else:
         return Conversation.objects.none()
 
-    # Subquery: get the content of the most recent message per conversation
-    last_message_subquery = (
-        Message.objects.filter(conversation=OuterRef('pk'))
-        .order_by('-created_at')
-        .values('content')[:1]
-    )
-
-    # Subquery: get the image path of the most recent message per conversation
-    last_message_image_subquery = (
-        Message.objects.filter(conversation=OuterRef('pk'))
-        .order_by('-created_at')
-        .values('image')[:1]
-    )
-
-    # Subquery: check if the most recent message is soft-deleted
-    last_message_is_deleted_subquery = (
-        Message.objects.filter(conversation=OuterRef('pk'))
-        .order_by('-created_at')
-        .values('is_deleted')[:1]
+    unread_subquery = (
+        UnreadCounter.objects.filter(conversation=OuterRef('pk'), user=user)
+        .values('unread_count')[:1]
     )
 
     return (
         base_qs
         .select_related('trainer', 'trainee')
         .annotate(
-            annotated_last_message_preview=Left(
-                Subquery(last_message_subquery),
-                100,
+            annotated_unread_count=Coalesce(
+                Subquery(unread_subquery),
+                Value(0),
+                output_field=IntegerField(),
             ),
-            _last_message_image=Subquery(last_message_image_subquery),
-            _last_message_is_deleted=Subquery(last_message_is_deleted_subquery),
         )
-        .annotate(
-            annotated_last_message_has_image=Case(
-                When(
-                    condition=~Q(_last_message_image='') & Q(_last_message_image__isnull=False),
-                    then=Value(True),
-                ),
-                default=Value(False),
-                output_field=BooleanField(),
-            ),
-            annotated_last_message_is_deleted=Case(
-                When(
-                    _last_message_is_deleted=True,
-                    then=Value(True),
-                ),
-                default=Value(False),
-                output_field=BooleanField(),
-            ),
-            annotated_unread_count=Count(
-                'messages',
-                filter=Q(messages__is_read=False) & ~Q(messages__sender=user),
-            ),
-        )
-        .order_by('-last_message_at')
+        .order_by('-last_message_at', '-id')
     )
 
 
+def get_conversation_page(
+    user: User,
+    *,
+    cursor: str | None = None,
+    limit: int = CONVERSATION_PAGE_SIZE,
+) -> ConversationPage:
+    """
+    One page of the user's inbox, continuing after ``cursor``.
+
+    The cursor holds the (last_message_at, id) of the last conversation on
+    the previous page, so every page is a single index range scan.
+    Raises ValueError if the cursor is invalid.
+    """
+    conversations = get_conversations_for_user(user)
+
+    if cursor:
+        last_message_at, last_id = decode_cursor(cursor, 2)
+        if not isinstance(last_id, int):
+            raise ValueError('Invalid cursor.')
+        if last_message_at is None:
+            # Still inside the leading block of conversations with no messages
+            conversations = conversations.filter(
+                Q(last_message_at__isnull=True, id__lt=last_id)
+                | Q(last_message_at__isnull=False)
+            )
+        else:
+            after = parse_cursor_datetime(last_message_at)
+            conversations = conversations.filter(
+                Q(last_message_at__lt=after) | Q(last_message_at=after, id__lt=last_id)
+            )
+
+    rows = list(conversations[:limit + 1])
+    next_cursor: str | None = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].last_message_at, rows[-1].id)
+
+    return ConversationPage(conversations=rows, next_cursor=next_cursor)
+
+
 def get_messages_for_conversation(
     user: User,
     conversation: Conversation,
@@ -330,16 +359,62 @@ def get_messages_for_conversation(
     )
 
 
+def get_message_history(
+    user: User,
+    conversation: Conversation,
+    *,
+    before: int | None = None,
+    after: int | None = None,
+    limit: int = MESSAGE_PAGE_SIZE,
+) -> MessageHistoryPage:
+    """
+    Get messages around an id cursor with row-level security.
+
+    - ``after``: messages newer than this id, oldest first. This is the
+      catch-up call for a client that was offline; pass the newest id it has.
+    - ``before`` (or neither): messages older than this id (or the latest
+      ones), newest first, for scrolling back through history.
+
+    ``seq`` is the conversation's websocket event sequence, read before the
+    messages, so a client that resumes its websocket from it misses nothing
+    (it may see some messages twice and should dedupe by id).
+
+    Raises ValueError if user is not a participant or both cursors are given.
+    """
+    if before is not None and after is not None:
+        raise ValueError('Pass either before or after, not both.')
+    messages = get_messages_for_conversation(user, conversation)
+    limit = max(1, min(limit, MAX_MESSAGE_PAGE_SIZE))
+    seq = current_seq(conversation.id)
+
+    if after is not None:
+        messages = messages.filter(id__gt=after).order_by('id')
+    else:
+        messages = messages.order_by('-id')
+        if before is not None:
+            messages = messages.filter(id__lt=before)
+
+    rows = list(messages[:limit + 1])
+    return MessageHistoryPage(
+        messages=rows[:limit],
+        has_more=len(rows) > limit,
+        seq=seq,
+    )
+
+
 def archive_conversations_for_trainee(trainee: User) -> int:
     """
     Archive all conversations for a trainee (called when trainee is removed).
 
     Returns the number of conversations archived.
     """
-    return Conversation.objects.filter(
-        trainee=trainee,
-        is_archived=False,
-    ).update(is_archived=True)
+    with transaction.atomic():
+        conversations = Conversation.objects.filter(trainee=trainee, is_archived=False)
+        trainer_ids = list(conversations.values_list('trainer_id', flat=True))
+        archived = conversations.update(is_archived=True)
+        # Archived conversations drop out of both participants' badge totals
+        invalidate_total_unread(trainee.id, *trainer_ids)
+    return archived
 
 
 def send_message_to_trainee(
@@ -500,34 +575,41 @@ def delete_message(
 # WebSocket broadcast helpers
 # ---------------------------------------------------------------------------
 
+def _broadcast(
+    conversation_id: int,
+    event: dict[str, Any],
+    *,
+    coalesce_key: Hashable | None = None,
+) -> None:
+    """
+    Queue an event for the conversation's WebSocket group.
+
+    Sending happens on the broadcast dispatcher's thread after commit. The
+    sequence number is assigned there too, just before the send, so events
+    replaced by a newer one (coalesced) never take a sequence number and
+    replay order matches delivery order.
+    """
+    broadcast_dispatcher.publish(
+        f'messaging_conversation_{conversation_id}',
+        event,
+        coalesce_key=coalesce_key,
+        prepare=lambda queued: record_event(conversation_id, queued),
+    )
+
+
 def broadcast_new_message(
     conversation_id: int,
     message_data: dict[str, Any],
 ) -> None:
     """Broadcast a new message to the conversation's WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'messaging_conversation_{conversation_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'chat.new_message',
-                'message': message_data,
-                'timestamp': timezone.now().isoformat(),
-            },
-        )
-    except (ConnectionError, TimeoutError, OSError) as exc:
-        logger.warning(
-            "Failed to broadcast message to WebSocket for conversation %d: %s",
-            conversation_id,
-            exc,
-        )
+    _broadcast(
+        conversation_id,
+        {
+            'type': 'chat.new_message',
+            'message': dict(message_data),
+            'timestamp': timezone.now().isoformat(),
+        },
+    )
 
 
 def broadcast_read_receipt(
@@ -536,29 +618,16 @@ def broadcast_read_receipt(
     read_at: str,
 ) -> None:
     """Broadcast a read receipt to the conversation's WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'messaging_conversation_{conversation_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'chat.read_receipt',
-                'reader_id': reader_id,
-                'read_at': read_at,
-            },
-        )
-    except (ConnectionError, TimeoutError, OSError) as exc:
-        logger.warning(
-            "Failed to broadcast read receipt for conversation %d: %s",
-            conversation_id,
-            exc,
-        )
+    _broadcast(
+        conversation_id,
+        {
+            'type': 'chat.read_receipt',
+            'reader_id': reader_id,
+            'read_at': read_at,
+        },
+        # Only the reader's latest read position matters
+        coalesce_key=('read_receipt', reader_id),
+    )
 
 
 def broadcast_message_edited(
@@ -568,30 +637,15 @@ def broadcast_message_edited(
     edited_at: str,
 ) -> None:
     """Broadcast a message-edited event to the conversation's WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'messaging_conversation_{conversation_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'chat.message_edited',
-                'message_id': message_id,
-                'content': new_content,
-                'edited_at': edited_at,
-            },
-        )
-    except (ConnectionError, TimeoutError, OSError) as exc:
-        logger.warning(
-            "Failed to broadcast message-edited for conversation %d: %s",
-            conversation_id,
-            exc,
-        )
+    _broadcast(
+        conversation_id,
+        {
+            'type': 'chat.message_edited',
+            'message_id': message_id,
+            'content': new_content,
+            'edited_at': edited_at,
+        },
+    )
 
 
 def broadcast_message_deleted(
@@ -599,28 +653,13 @@ def broadcast_message_deleted(
     message_id: int,
 ) -> None:
     """Broadcast a message-deleted event to the conversation's WebSocket group."""
-    try:
-        from channels.layers import get_channel_layer
-        from asgiref.sync import async_to_sync
-
-        channel_layer = get_channel_layer()
-        if channel_layer is None:
-            return
-
-        group_name = f'messaging_conversation_{conversation_id}'
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                'type': 'chat.message_deleted',
-                'message_id': message_id,
-            },
-        )
-    except (ConnectionError, TimeoutError, OSError) as exc:
-        logger.warning(
-            "Failed to broadcast message-deleted for conversation %d: %s",
-            conversation_id,
-            exc,
-        )
+    _broadcast(
+        conversation_id,
+        {
+            'type': 'chat.message_deleted',
+            'message_id': message_id,
+        },
+    )
 
 
 def send_message_push_notification(
@@ -630,38 +669,36 @@ def send_message_push_notification(
     conversation_id: int,
     has_image: bool = False,
 ) -> None:
-    """Send push notification for a new message."""
-    try:
-        from core.services.notification_service import send_push_notification
+    """
+    Queue a push notification for a new message.
 
-        if content:
-            preview = content[:100] if len(content) > 100 else content
-        elif has_image:
-            preview = 'Sent a photo'
-        else:
-            preview = 'New message'
-
-        sender_name = f'{sender.first_name} {sender.last_name}'.strip()
-        if not sender_name:
-            sender_name = sender.email
-
-        send_push_notification(
-            user_id=recipient_id,
-            title=f'New message from {sender_name}',
-            body=preview,
-            data={
-                'type': 'direct_message',
-                'conversation_id': str(conversation_id),
-                'sender_id': str(sender.id),
-            },
-            category='new_message',
-        )
-    except (ConnectionError, TimeoutError, OSError) as exc:
-        logger.warning(
-            "Failed to send message push notification to user %d: %s",
-            recipient_id,
-            exc,
-        )
+    Call inside the transaction that saved the message: the outbox row
+    commits or rolls back with it.
+    """
+    from core.services.push_outbox_service import queue_push_notification
+
+    if content:
+        preview = content[:100] if len(content) > 100 else content
+    elif has_image:
+        preview = 'Sent a photo'
+    else:
+        preview = 'New message'
+
+    sender_name = f'{sender.first_name} {sender.last_name}'.strip()
+    if not sender_name:
+        sender_name = sender.email
+
+    queue_push_notification(
+        user_id=recipient_id,
+        title=f'New message from {sender_name}',
+        body=preview,
+        data={
+            'type': 'direct_message',
+            'conversation_id': str(conversation_id),
+            'sender_id': str(sender.id),
+        },
+        category='new_message',
+    )
 
 
 def is_impersonating(request_auth: Any) -> bool:
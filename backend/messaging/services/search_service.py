@@ -1,20 +1,58 @@
 """
 Service for searching messages across conversations.
 
+A message matches when either:
+- its full-text document (Message.search_vector, a stored generated column
+  with a GIN index) contains every query word as a stemmed prefix; or
+- its content contains the query as a substring, served by a pg_trgm GIN
+  index, so partial words and punctuation ("100%") still match.
+
+Every hit carries a relevance rank and an HTML-escaped snippet with the
+matches wrapped in <mark>.
+
+Two pagination modes:
+- search_messages() returns numbered pages with a total count.
+- search_messages_keyset() returns opaque cursors over (created_at, id) or
+  (rank, id). Every page costs the same however far back the user goes.
+
 All functions return dataclass instances, never dicts.
 """
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from datetime import datetime
+from enum import Enum
+from html import escape
+from typing import Any
 
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import F, FloatField, Q, QuerySet, Value
+from django.db.models.functions import Cast
 
-from messaging.models import Conversation, Message
+from messaging.models import SEARCH_CONFIG, Conversation, Message
+from messaging.services.cursors import decode_cursor, encode_cursor, parse_cursor_datetime
 from users.models import User
 
 PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+SNIPPET_MIN_WORDS = 10
+SNIPPET_MAX_WORDS = 30
+SNIPPET_CONTEXT_CHARS = 80
+
+# Control characters ts_headline wraps matches in; replaced with <mark>
+# after the snippet is escaped
+_MARK_START = '\x02'
+_MARK_STOP = '\x03'
+_WORD = re.compile(r'\w+')
+
+
+class SearchOrder(str, Enum):
+    """Result order for keyset search."""
+    RECENT = 'recent'
+    RELEVANCE = 'relevance'
 
 
 @dataclass(frozen=True)
@@ -31,6 +69,8 @@ class SearchMessageItem:
     other_participant_id: int | None
     other_participant_first_name: str
     other_participant_last_name: str
+    snippet: str
+    rank: float
 
 
 @dataclass(frozen=True)
@@ -44,6 +84,14 @@ class SearchMessagesResult:
     num_pages: int
 
 
+@dataclass(frozen=True)
+class SearchMessagesPage:
+    """One keyset page of search results."""
+    results: list[SearchMessageItem]
+    next_cursor: str | None
+    order: SearchOrder
+
+
 def search_messages(
     user: User,
     query: str,
@@ -54,42 +102,162 @@ def search_messages(
 
     Args:
         user: The authenticated user performing the search.
-        query: The search string (case-insensitive substring match).
+        query: The search string (words or a case-insensitive substring).
         page: Page number (1-indexed).
 
     Returns:
-        SearchMessagesResult with paginated matching messages.
+        SearchMessagesResult with paginated matching messages, most recent first.
 
     Raises:
         ValueError: If query is empty or too short.
     """
+    stripped_query = _validate_query(query)
+    messages, text_query = _matching_messages(user, stripped_query)
+
+    paginator = Paginator(
+        _with_detail(messages, text_query).order_by('-created_at', '-id'),
+        PAGE_SIZE,
+    )
+    # Clamp page to valid range
+    page_number = max(1, min(page, paginator.num_pages or 1))
+    page_obj = paginator.get_page(page_number)
+
+    return SearchMessagesResult(
+        results=[_to_item(msg, user, stripped_query) for msg in page_obj],
+        count=paginator.count,
+        has_next=page_obj.has_next(),
+        has_previous=page_obj.has_previous(),
+        page=page_number,
+        num_pages=paginator.num_pages,
+    )
+
+
+def search_messages_keyset(
+    user: User,
+    query: str,
+    *,
+    cursor: str | None = None,
+    order: SearchOrder = SearchOrder.RECENT,
+    limit: int = PAGE_SIZE,
+) -> SearchMessagesPage:
+    """
+    Search messages with keyset pagination.
+
+    Pass the returned ``next_cursor`` back to get the following page; it is
+    None on the last page. The cursor is bound to the order it was issued for.
+
+    Raises:
+        ValueError: If query is empty or too short, or the cursor is invalid.
+    """
+    stripped_query = _validate_query(query)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    messages, text_query = _matching_messages(user, stripped_query)
+
+    if order == SearchOrder.RELEVANCE:
+        ordering = ('-rank', '-id')
+    else:
+        ordering = ('-created_at', '-id')
+
+    if cursor:
+        key, last_id = _decode_search_cursor(cursor, order)
+        if order == SearchOrder.RELEVANCE:
+            messages = messages.filter(Q(rank__lt=key) | Q(rank=key, id__lt=last_id))
+        else:
+            messages = messages.filter(Q(created_at__lt=key) | Q(created_at=key, id__lt=last_id))
+
+    rows = list(_with_detail(messages, text_query).order_by(*ordering)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor: str | None = None
+    if has_more:
+        last = rows[-1]
+        key = getattr(last, 'rank') if order == SearchOrder.RELEVANCE else last.created_at
+        next_cursor = encode_cursor(order.value, key, last.id)
+
+    return SearchMessagesPage(
+        results=[_to_item(msg, user, stripped_query) for msg in rows],
+        next_cursor=next_cursor,
+        order=order,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Query building
+# ---------------------------------------------------------------------------
+
+def _validate_query(query: str) -> str:
     stripped_query = query.strip()
     if not stripped_query:
         raise ValueError('Search query is required.')
     if len(stripped_query) < 2:
         raise ValueError('Search query must be at least 2 characters.')
+    return stripped_query
 
-    # Determine which conversations this user participates in.
+
+def _conversation_filter(user: User) -> Q:
     # Admin users can only search via impersonation (which sets request.user
     # to the trainer). An admin hitting this endpoint directly sees nothing.
     if user.is_trainer():
-        conversation_filter = Q(conversation__trainer=user)
-    elif user.is_trainee():
-        conversation_filter = Q(conversation__trainee=user)
-    else:
-        raise ValueError('Only trainers and trainees can search messages.')
+        return Q(conversation__trainer=user)
+    if user.is_trainee():
+        return Q(conversation__trainee=user)
+    raise ValueError('Only trainers and trainees can search messages.')
+
+
+def _text_query(stripped_query: str) -> SearchQuery | None:
+    """Every word of the query as a stemmed prefix term, or None if it has no words."""
+    words = _WORD.findall(stripped_query.lower())
+    if not words:
+        return None
+    # Words are \w+ only, so the raw tsquery syntax cannot be injected
+    return SearchQuery(
+        ' & '.join(f'{word}:*' for word in words),
+        search_type='raw',
+        config=SEARCH_CONFIG,
+    )
+
+
+def _matching_messages(
+    user: User,
+    stripped_query: str,
+) -> tuple[QuerySet[Message], SearchQuery | None]:
+    """Visible, non-deleted messages matching the query, annotated with ``rank``."""
+    text_query = _text_query(stripped_query)
+    match = Q(content__icontains=stripped_query)
+    rank: Any = Value(0.0, output_field=FloatField())
+    if text_query is not None:
+        match |= Q(search_vector=text_query)
+        # ts_rank is a float4, whose text form does not round-trip; as a
+        # double the cursor key compares equal to the row it came from
+        rank = Cast(SearchRank(F('search_vector'), text_query), FloatField())
 
-    # NOTE: icontains with a leading wildcard (%query%) triggers a full
-    # sequential scan and cannot use B-tree indexes. This is acceptable at
-    # current scale (<100k messages). For future scaling, consider adding a
-    # GIN trigram index: CREATE INDEX ... USING gin(content gin_trgm_ops).
     messages = (
         Message.objects.filter(
-            conversation_filter,
-            content__icontains=stripped_query,
+            _conversation_filter(user),
+            match,
             is_deleted=False,
             conversation__is_archived=False,
         )
+        .annotate(rank=rank)
+    )
+    return messages, text_query
+
+
+def _with_detail(messages: QuerySet[Message], text_query: SearchQuery | None) -> QuerySet[Message]:
+    """Add the related rows and snippet needed to build result items."""
+    if text_query is not None:
+        messages = messages.annotate(headline=SearchHeadline(
+            'content',
+            text_query,
+            config=SEARCH_CONFIG,
+            start_sel=_MARK_START,
+            stop_sel=_MARK_STOP,
+            min_words=SNIPPET_MIN_WORDS,
+            max_words=SNIPPET_MAX_WORDS,
+        ))
+    return (
+        messages
         .select_related(
             'sender',
             'conversation',
@@ -105,56 +273,84 @@ def search_messages(
             'conversation__trainee__id', 'conversation__trainee__first_name',
             'conversation__trainee__last_name',
         )
-        .order_by('-created_at')
     )
 
-    paginator = Paginator(messages, PAGE_SIZE)
-    # Clamp page to valid range
-    page_number = max(1, min(page, paginator.num_pages or 1))
-    page_obj = paginator.get_page(page_number)
 
-    results: list[SearchMessageItem] = []
-    for msg in page_obj:
-        conversation: Conversation = msg.conversation
+# ---------------------------------------------------------------------------
+# Cursors
+# ---------------------------------------------------------------------------
 
-        # Determine the "other" participant relative to the searching user
-        if user.id == conversation.trainer_id:
-            other = conversation.trainee
-        else:
-            other = conversation.trainer
-
-        other_id: int | None = other.id if other else None
-        other_first = other.first_name if other else ''
-        other_last = other.last_name if other else '[removed]'
-
-        image_url: str | None = None
-        if msg.image and msg.image.name:
-            try:
-                image_url = msg.image.url
-            except ValueError:
-                pass
-
-        results.append(
-            SearchMessageItem(
-                message_id=msg.id,
-                conversation_id=conversation.id,
-                sender_id=msg.sender_id,
-                sender_first_name=msg.sender.first_name,
-                sender_last_name=msg.sender.last_name,
-                content=msg.content,
-                image_url=image_url,
-                created_at=msg.created_at,
-                other_participant_id=other_id,
-                other_participant_first_name=other_first,
-                other_participant_last_name=other_last,
-            )
-        )
+def _decode_search_cursor(cursor: str, order: SearchOrder) -> tuple[float | datetime, int]:
+    try:
+        cursor_order, key, last_id = decode_cursor(cursor, 3)
+        if cursor_order != order.value or not isinstance(last_id, int):
+            raise ValueError
+        if order == SearchOrder.RELEVANCE:
+            return float(key), last_id
+        return parse_cursor_datetime(key), last_id
+    except (ValueError, TypeError):
+        raise ValueError('Invalid search cursor.') from None
 
-    return SearchMessagesResult(
-        results=results,
-        count=paginator.count,
-        has_next=page_obj.has_next(),
-        has_previous=page_obj.has_previous(),
-        page=page_number,
-        num_pages=paginator.num_pages,
+
+# ---------------------------------------------------------------------------
+# Result items
+# ---------------------------------------------------------------------------
+
+def _snippet(msg: Message, stripped_query: str) -> str:
+    """Escaped excerpt of the message with matches wrapped in <mark>."""
+    headline: str = getattr(msg, 'headline', '') or ''
+    if _MARK_START in headline:
+        return escape(headline).replace(_MARK_START, '<mark>').replace(_MARK_STOP, '</mark>')
+
+    # Substring-only match (partial word or punctuation): mark the first occurrence
+    content = msg.content
+    start = content.lower().find(stripped_query.lower())
+    if start < 0:
+        return escape(content[:SNIPPET_CONTEXT_CHARS * 2])
+    end = start + len(stripped_query)
+    left = max(0, start - SNIPPET_CONTEXT_CHARS)
+    right = min(len(content), end + SNIPPET_CONTEXT_CHARS)
+    return (
+        ('…' if left else '')
+        + escape(content[left:start])
+        + f'<mark>{escape(content[start:end])}</mark>'
+        + escape(content[end:right])
+        + ('…' if right < len(content) else '')
+    )
+
+
+def _to_item(msg: Message, user: User, stripped_query: str) -> SearchMessageItem:
+    conversation: Conversation = msg.conversation
+
+    # Determine the "other" participant relative to the searching user
+    if user.id == conversation.trainer_id:
+        other = conversation.trainee
+    else:
+        other = conversation.trainer
+
+    other_id: int | None = other.id if other else None
+    other_first = other.first_name if other else ''
+    other_last = other.last_name if other else '[removed]'
+
+    image_url: str | None = None
+    if msg.image and msg.image.name:
+        try:
+            image_url = msg.image.url
+        except ValueError:
+            pass
+
+    return SearchMessageItem(
+        message_id=msg.id,
+        conversation_id=conversation.id,
+        sender_id=msg.sender_id,
+        sender_first_name=msg.sender.first_name,
+        sender_last_name=msg.sender.last_name,
+        content=msg.content,
+        image_url=image_url,
+        created_at=msg.created_at,
+        other_participant_id=other_id,
+        other_participant_first_name=other_first,
+        other_participant_last_name=other_last,
+        snippet=_snippet(msg, stripped_query),
+        rank=float(getattr(msg, 'rank', 0.0)),
     )
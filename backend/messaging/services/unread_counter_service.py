@@ -0,0 +1,252 @@
+"""
+Service for per-participant unread message counters.
+
+Each (conversation, participant) pair has one UnreadCounter row. Sending a
+message increments the recipient's row and marking a conversation read
+decrements the reader's row by the number of messages it marked, both with
+F() updates inside the caller's transaction, so concurrent sends and reads
+never lose an update.
+
+A user's total across non-archived conversations is cached under a
+versioned key. The version is bumped after commit whenever one of the
+user's counters or conversations changes, so a reader never caches a
+pre-commit total under the current version.
+
+All functions return dataclass instances, never dicts.
+"""
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+
+from messaging.models import Conversation, Message, UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+_CACHE_PREFIX = 'messaging_unread'
+TOTAL_CACHE_TTL: int = 600  # 10 minutes — bounds staleness for writes that bypass this module
+RECONCILE_CHUNK_SIZE: int = 500
+
+
+@dataclass(frozen=True)
+class ReconcileUnreadResult:
+    """Outcome of rebuilding unread counters from Message rows."""
+    conversations_checked: int
+    counters_fixed: int
+
+
+# ---------------------------------------------------------------------------
+# Cached totals
+# ---------------------------------------------------------------------------
+
+def _version_key(user_id: int) -> str:
+    return f'{_CACHE_PREFIX}:version:{user_id}'
+
+
+def _total_key(user_id: int, version: int) -> str:
+    return f'{_CACHE_PREFIX}:total:{user_id}:v{version}'
+
+
+def _get_version(user_id: int) -> int:
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # add() is a no-op if a concurrent writer created the key first.
+        cache.add(_version_key(user_id), 1, timeout=None)
+        version = cache.get(_version_key(user_id), 1)
+    return int(version)
+
+
+def _bump_version(user_id: int) -> None:
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # Key missing (evicted or never read) — any new value invalidates.
+        if not cache.add(_version_key(user_id), 2, timeout=None):
+            cache.incr(_version_key(user_id))
+
+
+def invalidate_total_unread(*user_ids: int | None) -> None:
+    """Invalidate the cached unread totals of these users after the current transaction commits."""
+    for user_id in {uid for uid in user_ids if uid is not None}:
+        transaction.on_commit(partial(_bump_version, user_id))
+
+
+def get_total_unread(user_id: int) -> int:
+    """
+    Unread messages for a user across their non-archived conversations.
+
+    A cache hit costs two cache reads; a miss sums one counter row per
+    conversation.
+    """
+    key = _total_key(user_id, _get_version(user_id))
+    total = cache.get(key)
+    if total is None:
+        total = UnreadCounter.objects.filter(
+            user_id=user_id,
+            conversation__is_archived=False,
+        ).aggregate(total=Sum('unread_count'))['total'] or 0
+        cache.set(key, total, TOTAL_CACHE_TTL)
+    return int(total)
+
+
+# ---------------------------------------------------------------------------
+# Counter updates
+# ---------------------------------------------------------------------------
+
+def _count_unread(conversation_id: int, user_id: int) -> int:
+    return (
+        Message.objects.filter(conversation_id=conversation_id, is_read=False)
+        .exclude(sender_id=user_id)
+        .count()
+    )
+
+
+def create_counters(conversation: Conversation) -> None:
+    """Create zeroed counters for both participants of a new conversation."""
+    UnreadCounter.objects.bulk_create(
+        [
+            UnreadCounter(conversation=conversation, user_id=user_id)
+            for user_id in (conversation.trainer_id, conversation.trainee_id)
+            if user_id is not None
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def increment_unread(conversation_id: int, user_id: int) -> None:
+    """
+    Count one more unread message for ``user_id``.
+
+    Call inside the transaction that creates the message. A missing counter
+    row (conversation created before counters existed) is created from a
+    recount, which already includes the new message.
+    """
+    updated = UnreadCounter.objects.filter(
+        conversation_id=conversation_id,
+        user_id=user_id,
+    ).update(unread_count=F('unread_count') + 1)
+    if not updated:
+        counter, created = UnreadCounter.objects.get_or_create(
+            conversation_id=conversation_id,
+            user_id=user_id,
+            defaults={'unread_count': _count_unread(conversation_id, user_id)},
+        )
+        if not created:
+            UnreadCounter.objects.filter(pk=counter.pk).update(unread_count=F('unread_count') + 1)
+    invalidate_total_unread(user_id)
+
+
+def decrement_unread(conversation_id: int, user_id: int, count: int) -> None:
+    """
+    Count ``count`` fewer unread messages for ``user_id``.
+
+    Call inside the transaction that marks the messages read, with the
+    number of rows that update changed. Never goes below zero.
+    """
+    if count <= 0:
+        return
+    UnreadCounter.objects.filter(
+        conversation_id=conversation_id,
+        user_id=user_id,
+    ).update(unread_count=Greatest(F('unread_count') - count, 0))
+    invalidate_total_unread(user_id)
+
+
+# ---------------------------------------------------------------------------
+# Reconciliation
+# ---------------------------------------------------------------------------
+
+def reconcile_unread_counters(
+    conversation_ids: Iterable[int] | None = None,
+) -> ReconcileUnreadResult:
+    """
+    Rebuild unread counters from Message rows.
+
+    Works in chunks of conversations. Each chunk locks its counter rows
+    before recounting, so a send or mark-read running at the same time is
+    applied on top of the corrected value rather than lost. Counters of
+    users who are no longer participants are removed.
+    """
+    conversations = Conversation.objects.order_by('id')
+    if conversation_ids is not None:
+        conversations = conversations.filter(id__in=list(conversation_ids))
+
+    checked = 0
+    fixed = 0
+    chunk: list[tuple[int, int, int | None]] = []
+    for row in conversations.values_list('id', 'trainer_id', 'trainee_id').iterator():
+        chunk.append(row)
+        if len(chunk) >= RECONCILE_CHUNK_SIZE:
+            fixed += _reconcile_chunk(chunk)
+            checked += len(chunk)
+            chunk = []
+    if chunk:
+        fixed += _reconcile_chunk(chunk)
+        checked += len(chunk)
+
+    return ReconcileUnreadResult(conversations_checked=checked, counters_fixed=fixed)
+
+
+def _reconcile_chunk(chunk: list[tuple[int, int, int | None]]) -> int:
+    conversation_ids = [conversation_id for conversation_id, _, _ in chunk]
+
+    with transaction.atomic():
+        existing = {
+            (counter.conversation_id, counter.user_id): counter
+            for counter in UnreadCounter.objects.select_for_update().filter(
+                conversation_id__in=conversation_ids,
+            )
+        }
+
+        unread_by_sender: dict[int, dict[int, int]] = {}
+        for row in (
+            Message.objects.filter(conversation_id__in=conversation_ids, is_read=False)
+            .values('conversation_id', 'sender_id')
+            .annotate(n=Count('id'))
+        ):
+            unread_by_sender.setdefault(row['conversation_id'], {})[row['sender_id']] = row['n']
+
+        to_create: list[UnreadCounter] = []
+        to_update: list[UnreadCounter] = []
+        for conversation_id, trainer_id, trainee_id in chunk:
+            by_sender = unread_by_sender.get(conversation_id, {})
+            for user_id in (trainer_id, trainee_id):
+                if user_id is None:
+                    continue
+                expected = sum(n for sender_id, n in by_sender.items() if sender_id != user_id)
+                counter = existing.pop((conversation_id, user_id), None)
+                if counter is None:
+                    to_create.append(UnreadCounter(
+                        conversation_id=conversation_id,
+                        user_id=user_id,
+                        unread_count=expected,
+                    ))
+                elif counter.unread_count != expected:
+                    counter.unread_count = expected
+                    to_update.append(counter)
+
+        # Whatever is left belongs to users no longer in the conversation
+        stale = list(existing.values())
+        if stale:
+            UnreadCounter.objects.filter(pk__in=[counter.pk for counter in stale]).delete()
+        # A send may create a missing row from its own recount meanwhile
+        UnreadCounter.objects.bulk_create(to_create, ignore_conflicts=True)
+        UnreadCounter.objects.bulk_update(to_update, ['unread_count'])
+
+        changed = to_create + to_update + stale
+        invalidate_total_unread(*(counter.user_id for counter in changed))
+
+    if changed:
+        logger.info(
+            "Reconciled %d unread counter(s) across %d conversation(s)",
+            len(changed),
+            len(chunk),
+        )
+    return len(changed)
@@ -0,0 +1,55 @@
+"""
+Signal handlers for the messaging app.
+
+Keeps Conversation's denormalized last_message_* fields in step with the
+newest message. Bulk operations (``QuerySet.update``, ``bulk_create``) do
+not fire these signals; the inbox shows stale previews for conversations
+they touch until that conversation's next message.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from messaging.models import Conversation, Message
+
+# Message fields the denormalized preview is built from
+_PREVIEW_FIELDS = frozenset({'content', 'image', 'is_deleted'})
+
+
+@receiver(post_save, sender=Message)
+def on_message_saved(
+    sender: type[Message], instance: Message, created: bool, update_fields: Any = None, **kwargs: Any
+) -> None:
+    preview = {
+        'last_message_preview': instance.content[:100],
+        'last_message_has_image': bool(instance.image),
+        'last_message_is_deleted': instance.is_deleted,
+    }
+
+    if created:
+        # Conditional on id so a slower concurrent send cannot move the
+        # pointer back to an older message
+        Conversation.objects.filter(
+            Q(last_message__isnull=True) | Q(last_message_id__lt=instance.id),
+            pk=instance.conversation_id,
+        ).update(
+            last_message=instance,
+            last_message_at=instance.created_at,
+            last_message_sender_id=instance.sender_id,
+            updated_at=timezone.now(),
+            **preview,
+        )
+        return
+
+    if update_fields is not None and not _PREVIEW_FIELDS & set(update_fields):
+        return
+    # Edits and deletes only matter if this is still the newest message
+    Conversation.objects.filter(
+        pk=instance.conversation_id,
+        last_message_id=instance.id,
+    ).update(**preview)
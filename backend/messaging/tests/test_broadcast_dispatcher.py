@@ -0,0 +1,166 @@
+"""
+Tests for the background broadcast dispatcher (core.broadcast_dispatcher).
+
+Covers:
+- Events are queued only after commit and sent off the request thread
+- Coalescing of read receipts and reaction counts; per-group ordering
+- Prepare hooks run on the dispatcher thread, not on the event loop
+- Dropping when the queue is full, send failures, metrics
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from community.views import _broadcast_reaction_update
+from core import broadcast_dispatcher
+from messaging.services.event_buffer_service import events_since
+from messaging.services.messaging_service import (
+    broadcast_message_deleted,
+    broadcast_read_receipt,
+)
+
+
+class _RecordingLayer:
+    def __init__(self, fail_groups: tuple[str, ...] = ()) -> None:
+        self.sent: list[tuple[str, dict[str, Any]]] = []
+        self.threads: set[str] = set()
+        self.fail_groups = fail_groups
+
+    async def group_send(self, group: str, event: dict[str, Any]) -> None:
+        self.threads.add(threading.current_thread().name)
+        if group in self.fail_groups:
+            raise ConnectionError('redis down')
+        self.sent.append((group, event))
+
+
+class _DispatcherTestMixin:
+    def _use_layer(self, layer: _RecordingLayer) -> None:
+        patcher = patch('channels.layers.get_channel_layer', return_value=layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)  # type: ignore[attr-defined]
+
+    def _wide_window(self) -> None:
+        # Long enough that every publish in a test lands in one batch
+        patcher = patch.object(broadcast_dispatcher, 'BROADCAST_WINDOW_MS', 200)
+        patcher.start()
+        self.addCleanup(patcher.stop)  # type: ignore[attr-defined]
+
+
+class BroadcastDispatcherTests(_DispatcherTestMixin, SimpleTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        broadcast_dispatcher.flush()
+        broadcast_dispatcher.reset_broadcast_metrics()
+        self.layer = _RecordingLayer()
+        self._use_layer(self.layer)
+
+    def test_sends_from_background_thread(self) -> None:
+        broadcast_dispatcher.publish('group_a', {'type': 'x', 'n': 1})
+
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual(self.layer.sent, [('group_a', {'type': 'x', 'n': 1})])
+        self.assertEqual(self.layer.threads, {'broadcast-dispatcher'})
+
+        stats = broadcast_dispatcher.get_broadcast_metrics()
+        self.assertEqual((stats.published, stats.sent, stats.queue_depth), (1, 1, 0))
+        self.assertGreaterEqual(stats.max_latency_ms, 0)
+
+    def test_coalesced_event_keeps_first_place_ahead_of_later_events(self) -> None:
+        self._wide_window()
+        broadcast_read_receipt(9, reader_id=1, read_at='t1')
+        broadcast_message_deleted(9, message_id=50)
+        broadcast_read_receipt(9, reader_id=1, read_at='t2')
+        broadcast_read_receipt(9, reader_id=2, read_at='t3')
+
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual(
+            [(e['type'], e.get('read_at'), e['seq']) for _, e in self.layer.sent],
+            [
+                ('chat.read_receipt', 't2', 1),  # latest receipt, first receipt's place
+                ('chat.message_deleted', None, 2),
+                ('chat.read_receipt', 't3', 3),
+            ],
+        )
+        # Replaced events never took a sequence number
+        self.assertEqual(events_since(9, 0).seq, 3)
+
+        stats = broadcast_dispatcher.get_broadcast_metrics()
+        self.assertEqual((stats.published, stats.coalesced, stats.sent), (4, 1, 3))
+        self.assertEqual(stats.batches, 1)
+
+    def test_prepare_runs_outside_the_event_loop(self) -> None:
+        loop_running: list[bool] = []
+
+        def prepare(event: dict[str, Any]) -> dict[str, Any]:
+            try:
+                asyncio.get_running_loop()
+                loop_running.append(True)
+            except RuntimeError:
+                loop_running.append(False)
+            return {**event, 'seq': len(loop_running)}
+
+        broadcast_dispatcher.publish('group_a', {'type': 'x'}, prepare=prepare)
+
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual(loop_running, [False])
+        self.assertEqual(self.layer.sent, [('group_a', {'type': 'x', 'seq': 1})])
+
+    def test_reaction_bursts_send_latest_counts(self) -> None:
+        self._wide_window()
+        for fire in range(1, 6):
+            _broadcast_reaction_update(3, post_id=7, reactions={'fire': fire})
+        _broadcast_reaction_update(3, post_id=8, reactions={'fire': 1})
+
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual(
+            [(e['post_id'], e['reactions']) for _, e in self.layer.sent],
+            [(7, {'fire': 5}), (8, {'fire': 1})],
+        )
+
+    def test_drops_when_queue_is_full(self) -> None:
+        self._wide_window()
+        with patch.object(broadcast_dispatcher, 'BROADCAST_MAX_QUEUE', 2):
+            broadcast_dispatcher.publish('group_a', {'type': 'y', 'n': 'first'}, coalesce_key='k')
+            for n in range(4):
+                broadcast_dispatcher.publish('group_a', {'type': 'x', 'n': n})
+            # Replacing a queued event is still allowed when the queue is full
+            broadcast_dispatcher.publish('group_a', {'type': 'y', 'n': 'last'}, coalesce_key='k')
+            self.assertTrue(broadcast_dispatcher.flush())
+
+        self.assertEqual([e['n'] for _, e in self.layer.sent], ['last', 0])
+        stats = broadcast_dispatcher.get_broadcast_metrics()
+        self.assertEqual((stats.dropped, stats.coalesced, stats.max_queue_depth), (3, 1, 2))
+
+    def test_failed_group_does_not_block_others(self) -> None:
+        self._wide_window()
+        self.layer.fail_groups = ('group_down',)
+        broadcast_dispatcher.publish('group_down', {'type': 'x'})
+        broadcast_dispatcher.publish('group_up', {'type': 'x'})
+
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual([group for group, _ in self.layer.sent], ['group_up'])
+        stats = broadcast_dispatcher.get_broadcast_metrics()
+        self.assertEqual((stats.sent, stats.failed), (1, 1))
+
+
+class BroadcastAfterCommitTests(_DispatcherTestMixin, TestCase):
+    def setUp(self) -> None:
+        broadcast_dispatcher.flush()
+        broadcast_dispatcher.reset_broadcast_metrics()
+        self.layer = _RecordingLayer()
+        self._use_layer(self.layer)
+
+    def test_queued_only_on_commit(self) -> None:
+        with self.captureOnCommitCallbacks() as callbacks:
+            broadcast_dispatcher.publish('group_a', {'type': 'x'})
+        self.assertEqual(broadcast_dispatcher.get_broadcast_metrics().published, 0)
+
+        callbacks[0]()
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual(len(self.layer.sent), 1)
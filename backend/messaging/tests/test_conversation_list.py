@@ -0,0 +1,149 @@
+"""
+Tests for the denormalized conversation inbox.
+
+Covers:
+- last_message_* fields maintained on send, edit and delete
+- Inbox query reads no Message rows
+- Keyset pagination of the inbox (service and view)
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from messaging.models import Conversation, Message
+from messaging.services.messaging_service import (
+    delete_message,
+    edit_message,
+    get_conversation_page,
+    get_conversations_for_user,
+    get_or_create_conversation,
+    send_message,
+)
+from users.models import User
+
+_THROTTLE_OVERRIDE: dict[str, Any] = {
+    'DEFAULT_THROTTLE_CLASSES': [],
+    'DEFAULT_THROTTLE_RATES': {},
+}
+
+
+def _create_user(email: str, role: str, trainer: User | None = None) -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=role,
+        parent_trainer=trainer,
+    )
+
+
+class LastMessageDenormalizationTests(TestCase):
+    def setUp(self) -> None:
+        self.trainer = _create_user('trainer@test.com', User.Role.TRAINER)
+        self.trainee = _create_user('trainee@test.com', User.Role.TRAINEE, self.trainer)
+        self.conversation, _ = get_or_create_conversation(self.trainer, self.trainee)
+
+    def _reload(self) -> Conversation:
+        return Conversation.objects.get(pk=self.conversation.pk)
+
+    def test_send_moves_last_message(self) -> None:
+        send_message(self.trainer, self.conversation, 'First')
+        result = send_message(self.trainee, self.conversation, 'x' * 150)
+
+        conversation = self._reload()
+        self.assertEqual(conversation.last_message_id, result.message_id)
+        self.assertEqual(conversation.last_message_at, result.created_at)
+        self.assertEqual(conversation.last_message_preview, 'x' * 100)
+        self.assertEqual(conversation.last_message_sender_id, self.trainee.id)
+        self.assertFalse(conversation.last_message_has_image)
+
+    def test_edit_updates_preview_of_last_message_only(self) -> None:
+        first = send_message(self.trainer, self.conversation, 'First')
+        last = send_message(self.trainer, self.conversation, 'Second')
+
+        edit_message(self.trainer, self.conversation, first.message_id, 'First, edited')
+        self.assertEqual(self._reload().last_message_preview, 'Second')
+
+        edit_message(self.trainer, self.conversation, last.message_id, 'Second, edited')
+        self.assertEqual(self._reload().last_message_preview, 'Second, edited')
+
+    def test_delete_marks_last_message_deleted(self) -> None:
+        result = send_message(self.trainer, self.conversation, 'Oops')
+
+        delete_message(self.trainer, self.conversation, result.message_id)
+
+        conversation = self._reload()
+        self.assertTrue(conversation.last_message_is_deleted)
+        self.assertEqual(conversation.last_message_preview, '')
+
+    def test_older_message_cannot_become_last(self) -> None:
+        older = send_message(self.trainer, self.conversation, 'Older')
+        newer = send_message(self.trainer, self.conversation, 'Newer')
+
+        # A slow insert that commits after a newer message has the lower id
+        Message.objects.filter(pk=older.message_id).delete()
+        Message.objects.create(
+            id=older.message_id, conversation=self.conversation, sender=self.trainee, content='Late',
+        )
+
+        conversation = self._reload()
+        self.assertEqual(conversation.last_message_id, newer.message_id)
+        self.assertEqual(conversation.last_message_preview, 'Newer')
+
+    def test_inbox_query_does_not_read_messages(self) -> None:
+        send_message(self.trainer, self.conversation, 'Hello')
+
+        with self.assertNumQueries(1) as ctx:
+            [conversation] = list(get_conversations_for_user(self.trainer))
+        self.assertNotIn('messaging_messages', ctx.captured_queries[0]['sql'])
+        self.assertEqual(conversation.last_message_preview, 'Hello')
+
+
+class ConversationKeysetTests(TestCase):
+    def setUp(self) -> None:
+        self.trainer = _create_user('trainer@test.com', User.Role.TRAINER)
+        now = timezone.now()
+        self.conversations: list[Conversation] = []
+        for i in range(7):
+            trainee = _create_user(f'trainee{i}@test.com', User.Role.TRAINEE, self.trainer)
+            conversation, _ = get_or_create_conversation(self.trainer, trainee)
+            if i < 5:
+                # Two conversations share a timestamp; two have no messages
+                conversation.last_message_at = now - timedelta(minutes=min(i, 3))
+                conversation.save(update_fields=['last_message_at'])
+            self.conversations.append(conversation)
+        self.client = APIClient()
+
+    def test_pages_walk_inbox_in_order(self) -> None:
+        expected = [c.id for c in get_conversations_for_user(self.trainer)]
+        seen: list[int] = []
+        cursor: str | None = None
+        while True:
+            page = get_conversation_page(self.trainer, cursor=cursor, limit=2)
+            seen.extend(c.id for c in page.conversations)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 7)
+        # Conversations without messages come first, as in the page-number list
+        self.assertEqual(set(seen[:2]), {self.conversations[5].id, self.conversations[6].id})
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+    def test_view_cursor_mode(self) -> None:
+        self.client.force_authenticate(user=self.trainer)
+
+        response = self.client.get('/api/messaging/conversations/?cursor=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next_cursor'])
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get('/api/messaging/conversations/?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,204 @@
+"""
+Tests for id-cursor message history and websocket resume.
+
+Covers:
+- Event buffer: sequencing, replay, gaps the buffer cannot cover
+- get_message_history in both directions, and the cursor mode of the view
+- Broadcasts are sequenced and buffered
+- DirectMessageConsumer replays missed events on resume
+"""
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter  # type: ignore[import-untyped]
+from channels.testing import WebsocketCommunicator  # type: ignore[import-untyped]
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import broadcast_dispatcher
+from messaging.models import Conversation, Message
+from messaging.routing import websocket_urlpatterns
+from messaging.services import event_buffer_service
+from messaging.services.event_buffer_service import current_seq, events_since, record_event
+from messaging.services.messaging_service import (
+    broadcast_message_deleted,
+    broadcast_read_receipt,
+    get_message_history,
+)
+from users.models import User
+
+_THROTTLE_OVERRIDE: dict[str, Any] = {
+    'DEFAULT_THROTTLE_CLASSES': [],
+    'DEFAULT_THROTTLE_RATES': {},
+}
+
+
+def _deleted(message_id: int) -> dict[str, Any]:
+    return {'type': 'chat.message_deleted', 'message_id': message_id}
+
+
+class EventBufferTests(SimpleTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_replays_events_after_seq(self) -> None:
+        for message_id in (10, 11, 12):
+            record_event(7, _deleted(message_id))
+
+        replay = events_since(7, 1)
+        self.assertTrue(replay.complete)
+        self.assertEqual(replay.seq, 3)
+        self.assertEqual([e['message_id'] for e in replay.events], [11, 12])
+        self.assertEqual([e['seq'] for e in replay.events], [2, 3])
+
+        self.assertEqual(events_since(7, 3).events, [])
+        self.assertTrue(events_since(7, 3).complete)
+
+    def test_conversations_have_separate_sequences(self) -> None:
+        record_event(1, _deleted(1))
+        self.assertEqual(record_event(2, _deleted(2))['seq'], 1)
+        self.assertEqual(current_seq(1), 1)
+
+    def test_gaps_the_buffer_cannot_cover_need_resync(self) -> None:
+        for message_id in range(5):
+            record_event(7, _deleted(message_id))
+
+        with patch.object(event_buffer_service, 'EVENT_BUFFER_SIZE', 3):
+            self.assertFalse(events_since(7, 1).complete)
+
+        cache.delete('messaging_events:7:4')  # expired
+        self.assertFalse(events_since(7, 2).complete)
+
+        # Counter was reset (evicted) behind the client's back
+        self.assertFalse(events_since(7, 9).complete)
+
+    def test_broadcasts_are_sequenced_and_buffered(self) -> None:
+        broadcast_read_receipt(5, reader_id=3, read_at='2026-10-19T12:00:00+00:00')
+        broadcast_message_deleted(5, message_id=99)
+        self.assertTrue(broadcast_dispatcher.flush())
+
+        replay = events_since(5, 0)
+        self.assertEqual(
+            [(e['type'], e['seq']) for e in replay.events],
+            [('chat.read_receipt', 1), ('chat.message_deleted', 2)],
+        )
+
+
+class MessageHistoryTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='trainer@test.com', password='testpass123', role=User.Role.TRAINER,
+        )
+        self.trainee = User.objects.create_user(
+            email='trainee@test.com', password='testpass123', role=User.Role.TRAINEE,
+            parent_trainer=self.trainer,
+        )
+        self.conversation = Conversation.objects.create(trainer=self.trainer, trainee=self.trainee)
+        self.ids = [
+            Message.objects.create(
+                conversation=self.conversation, sender=self.trainer, content=f'm{i}',
+            ).id
+            for i in range(5)
+        ]
+        self.client = APIClient()
+
+    def test_pages_back_and_catches_up(self) -> None:
+        latest = get_message_history(self.trainer, self.conversation, limit=2)
+        self.assertEqual([m.id for m in latest.messages], self.ids[:-3:-1])
+        self.assertTrue(latest.has_more)
+
+        older = get_message_history(self.trainer, self.conversation, before=self.ids[3], limit=5)
+        self.assertEqual([m.id for m in older.messages], self.ids[2::-1])
+        self.assertFalse(older.has_more)
+
+        newer = get_message_history(self.trainer, self.conversation, after=self.ids[1])
+        self.assertEqual([m.id for m in newer.messages], self.ids[2:])
+
+    def test_reports_event_seq_and_rejects_both_cursors(self) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            broadcast_message_deleted(self.conversation.id, self.ids[0])
+        self.assertTrue(broadcast_dispatcher.flush())
+        self.assertEqual(get_message_history(self.trainer, self.conversation).seq, 1)
+
+        with self.assertRaises(ValueError):
+            get_message_history(self.trainer, self.conversation, before=1, after=1)
+
+    @override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+    def test_view_cursor_mode(self) -> None:
+        self.client.force_authenticate(user=self.trainee)
+        url = f'/api/messaging/conversations/{self.conversation.id}/messages/'
+
+        response = self.client.get(f'{url}?after={self.ids[2]}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([m['id'] for m in response.data['results']], self.ids[3:])
+        self.assertEqual(response.data['seq'], 0)
+        self.assertFalse(response.data['has_more'])
+
+        response = self.client.get(f'{url}?before=&limit=1')
+        self.assertEqual([m['id'] for m in response.data['results']], [self.ids[-1]])
+        self.assertTrue(response.data['has_more'])
+
+        response = self.client.get(f'{url}?before=abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@patch(
+    'messaging.consumers.DirectMessageConsumer._check_conversation_access',
+    AsyncMock(return_value=True),
+)
+@patch(
+    'messaging.consumers.DirectMessageConsumer._authenticate',
+    AsyncMock(return_value=SimpleNamespace(id=1)),
+)
+class ConsumerResumeTests(SimpleTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.application = URLRouter(websocket_urlpatterns)
+
+    async def _connect(self, query: str) -> WebsocketCommunicator:
+        communicator = WebsocketCommunicator(self.application, f'/ws/messaging/4/?{query}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def test_resume_on_connect_replays_missed_events(self) -> None:
+        for message_id in (20, 21, 22):
+            broadcast_message_deleted(4, message_id)
+        self.assertTrue(broadcast_dispatcher.flush())
+
+        async def run() -> list[dict[str, Any]]:
+            communicator = await self._connect('token=t&since=1')
+            frames = [await communicator.receive_json_from() for _ in range(3)]
+            await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(run)()
+        self.assertEqual(
+            frames,
+            [
+                {'type': 'message_deleted', 'message_id': 21, 'seq': 2},
+                {'type': 'message_deleted', 'message_id': 22, 'seq': 3},
+                {'type': 'resumed', 'seq': 3},
+            ],
+        )
+
+    def test_resume_frame_asks_for_resync_when_buffer_is_short(self) -> None:
+        broadcast_message_deleted(4, 30)
+        self.assertTrue(broadcast_dispatcher.flush())
+        cache.delete('messaging_events:4:1')
+
+        async def run() -> dict[str, Any]:
+            communicator = await self._connect('token=t')
+            await communicator.send_json_to({'type': 'resume', 'seq': 0})
+            frame = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return frame
+
+        self.assertEqual(async_to_sync(run)(), {'type': 'resync_required', 'seq': 1})
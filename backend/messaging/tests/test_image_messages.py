@@ -8,10 +8,11 @@ backward compatibility with text-only messages.
 from __future__ import annotations
 
 import io
+import tempfile
 from unittest.mock import patch
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 
@@ -23,6 +24,9 @@ from messaging.services.messaging_service import (
 from users.models import User
 
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
 def _create_test_image(
     name: str = 'test.jpg',
     content_type: str = 'image/jpeg',
@@ -52,6 +56,7 @@ def _create_oversized_image(name: str = 'big.jpg') -> SimpleUploadedFile:
     return _create_test_image(name=name, size=size)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class SendMessageWithImageTests(TestCase):
     """Tests for POST /api/messaging/conversations/<id>/send/ with images."""
 
@@ -217,6 +222,7 @@ class SendMessageWithImageTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class StartConversationWithImageTests(TestCase):
     """Tests for POST /api/messaging/conversations/start/ with images."""
 
@@ -305,6 +311,7 @@ class StartConversationWithImageTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class ConversationListImagePreviewTests(TestCase):
     """Tests for conversation list preview with image messages."""
 
@@ -375,6 +382,7 @@ class ConversationListImagePreviewTests(TestCase):
         self.assertEqual(conversations[0]['last_message_preview'], 'Check this form!')
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PushNotificationImageTests(TestCase):
     """Tests for push notification body with image messages."""
 
@@ -424,6 +432,7 @@ class PushNotificationImageTests(TestCase):
         self.assertFalse(has_image)
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class MessageServiceImageTests(TestCase):
     """Tests for the messaging service layer with image support."""
 
@@ -506,8 +515,9 @@ class MessageServiceImageTests(TestCase):
         self.assertIn('message_images/', result.image_url or '')
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class AnnotationLastMessageImageTests(TestCase):
-    """Tests for the annotated_last_message_has_image annotation."""
+    """Tests for the denormalized Conversation.last_message_has_image field."""
 
     def setUp(self) -> None:
         self.trainer = User.objects.create_user(
@@ -541,7 +551,7 @@ class AnnotationLastMessageImageTests(TestCase):
         conversations = get_conversations_for_user(self.trainer)
         conv = conversations.first()
         self.assertIsNotNone(conv)
-        self.assertTrue(getattr(conv, 'annotated_last_message_has_image', False))
+        self.assertTrue(conv.last_message_has_image)  # type: ignore[union-attr]
 
     def test_annotation_false_when_last_message_text_only(self) -> None:
         """Annotation should be False when last message has no image."""
@@ -556,7 +566,7 @@ class AnnotationLastMessageImageTests(TestCase):
         conversations = get_conversations_for_user(self.trainer)
         conv = conversations.first()
         self.assertIsNotNone(conv)
-        self.assertFalse(getattr(conv, 'annotated_last_message_has_image', True))
+        self.assertFalse(conv.last_message_has_image)  # type: ignore[union-attr]
 
     def test_annotation_checks_last_message_not_any(self) -> None:
         """Annotation should check the LAST message, not any message."""
@@ -581,16 +591,17 @@ class AnnotationLastMessageImageTests(TestCase):
         conv = conversations.first()
         self.assertIsNotNone(conv)
         # Should be False because the LAST message is text-only
-        self.assertFalse(getattr(conv, 'annotated_last_message_has_image', True))
+        self.assertFalse(conv.last_message_has_image)  # type: ignore[union-attr]
 
     def test_annotation_false_when_no_messages(self) -> None:
         """Annotation should be False when conversation has no messages."""
         conversations = get_conversations_for_user(self.trainer)
         conv = conversations.first()
         self.assertIsNotNone(conv)
-        self.assertFalse(getattr(conv, 'annotated_last_message_has_image', True))
+        self.assertFalse(conv.last_message_has_image)  # type: ignore[union-attr]
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class MessageModelImageTests(TestCase):
     """Tests for the Message model image field."""
 
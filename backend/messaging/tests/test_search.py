@@ -451,6 +451,7 @@ class SearchViewTests(_SearchTestBase):
             'content', 'image_url', 'created_at',
             'other_participant_id',
             'other_participant_first_name', 'other_participant_last_name',
+            'snippet', 'rank',
         }
         self.assertEqual(set(result.keys()), expected_fields)
 
@@ -0,0 +1,118 @@
+"""
+Tests for full-text message search: stemming, ranking, snippets and
+keyset pagination.
+"""
+from __future__ import annotations
+
+from django.test import override_settings
+from rest_framework import status
+
+from messaging.models import Message
+from messaging.services.search_service import (
+    SearchOrder,
+    search_messages,
+    search_messages_keyset,
+)
+from messaging.tests.test_search import SEARCH_URL, _THROTTLE_OVERRIDE, _SearchTestBase
+
+
+class FullTextMatchTests(_SearchTestBase):
+    def test_matches_other_word_forms(self) -> None:
+        msg = Message.objects.create(
+            conversation=self.conversation,
+            sender=self.trainee,
+            content='My legs were burning after those squats',
+        )
+        result = search_messages(self.trainer, 'squatting')
+        self.assertEqual([item.message_id for item in result.results], [msg.id])
+
+    def test_words_need_not_be_adjacent(self) -> None:
+        result = search_messages(self.trainer, 'finished today')
+        self.assertEqual([item.message_id for item in result.results], [self.msg2.id])
+
+    def test_snippet_marks_matches_and_escapes_html(self) -> None:
+        Message.objects.create(
+            conversation=self.conversation,
+            sender=self.trainee,
+            content='<b>Deadlift</b> day went well & felt easy',
+        )
+        [item] = search_messages(self.trainer, 'deadlift').results
+        self.assertIn('<mark>Deadlift</mark>', item.snippet)
+        self.assertIn('&amp;', item.snippet)
+        self.assertNotIn('<b>', item.snippet)
+        self.assertGreater(item.rank, 0)
+
+    def test_substring_snippet_marks_partial_word(self) -> None:
+        [item] = search_messages(self.trainer, 'inishe').results
+        self.assertEqual(item.snippet, 'Great! F<mark>inishe</mark>d the workout today.')
+
+
+class KeysetPaginationTests(_SearchTestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        for i in range(7):
+            Message.objects.create(
+                conversation=self.conversation,
+                sender=self.trainer,
+                content=f'Workout plan item {i}' + ' workout' * (i % 3),
+            )
+
+    def _walk(self, order: SearchOrder) -> list[int]:
+        seen: list[int] = []
+        cursor: str | None = None
+        while True:
+            page = search_messages_keyset(self.trainer, 'workout', cursor=cursor, order=order, limit=3)
+            self.assertLessEqual(len(page.results), 3)
+            seen.extend(item.message_id for item in page.results)
+            if page.next_cursor is None:
+                return seen
+            cursor = page.next_cursor
+
+    def test_recent_order_walks_every_match_once(self) -> None:
+        expected = list(
+            Message.objects.filter(conversation=self.conversation)
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(self._walk(SearchOrder.RECENT), expected)
+
+    def test_relevance_order_walks_every_match_once(self) -> None:
+        seen = self._walk(SearchOrder.RELEVANCE)
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), Message.objects.filter(conversation=self.conversation).count())
+
+        first = search_messages_keyset(self.trainer, 'workout', order=SearchOrder.RELEVANCE).results
+        ranks = [item.rank for item in first]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        self.assertIn('workout workout', first[0].content)
+
+    def test_cursor_is_bound_to_its_order(self) -> None:
+        page = search_messages_keyset(self.trainer, 'workout', limit=3)
+        assert page.next_cursor is not None
+        with self.assertRaisesMessage(ValueError, 'Invalid search cursor.'):
+            search_messages_keyset(
+                self.trainer, 'workout', cursor=page.next_cursor, order=SearchOrder.RELEVANCE,
+            )
+        with self.assertRaisesMessage(ValueError, 'Invalid search cursor.'):
+            search_messages_keyset(self.trainer, 'workout', cursor='not-a-cursor')
+
+
+@override_settings(REST_FRAMEWORK=_THROTTLE_OVERRIDE)
+class KeysetViewTests(_SearchTestBase):
+    def test_empty_cursor_returns_first_keyset_page(self) -> None:
+        self.client.force_authenticate(user=self.trainer)
+        response = self.client.get(f'{SEARCH_URL}?q=workout&cursor=&order=relevance')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['order'], 'relevance')
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(
+            {item['message_id'] for item in data['results']}, {self.msg1.id, self.msg2.id},
+        )
+        self.assertNotIn('count', data)
+
+    def test_invalid_cursor_or_order_returns_400(self) -> None:
+        self.client.force_authenticate(user=self.trainer)
+        for params in ('q=workout&cursor=garbage', 'q=workout&cursor=&order=oldest'):
+            response = self.client.get(f'{SEARCH_URL}?{params}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
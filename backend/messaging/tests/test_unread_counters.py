@@ -0,0 +1,165 @@
+"""
+Tests for denormalized per-participant unread counters.
+
+Covers:
+- Counters maintained by send / mark-read
+- Cached badge totals, invalidated after commit; archived conversations excluded
+- Conversation list unread annotation
+- reconcile_unread_counts command
+"""
+from __future__ import annotations
+
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from messaging.models import Conversation, Message, UnreadCounter
+from messaging.services.messaging_service import (
+    archive_conversations_for_trainee,
+    get_conversations_for_user,
+    get_or_create_conversation,
+    get_unread_count,
+    mark_conversation_read,
+    send_message,
+)
+from users.models import User
+
+
+def _create_user(email: str, role: str, trainer: User | None = None) -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=role,
+        parent_trainer=trainer,
+    )
+
+
+class _UnreadTestBase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = _create_user('trainer@test.com', User.Role.TRAINER)
+        self.trainee = _create_user('trainee@test.com', User.Role.TRAINEE, self.trainer)
+        self.other_trainee = _create_user('other@test.com', User.Role.TRAINEE, self.trainer)
+        self.conversation, _ = get_or_create_conversation(self.trainer, self.trainee)
+        self.other_conversation, _ = get_or_create_conversation(self.trainer, self.other_trainee)
+
+    def _send(self, sender: User, conversation: Conversation, content: str = 'hi') -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            send_message(sender, conversation, content)
+
+    def _counter(self, conversation: Conversation, user: User) -> int:
+        return UnreadCounter.objects.get(conversation=conversation, user=user).unread_count
+
+
+class UnreadCounterMaintenanceTests(_UnreadTestBase):
+
+    def test_new_conversation_has_zeroed_counters(self) -> None:
+        self.assertEqual(self._counter(self.conversation, self.trainer), 0)
+        self.assertEqual(self._counter(self.conversation, self.trainee), 0)
+
+    def test_send_counts_for_recipient_only(self) -> None:
+        self._send(self.trainee, self.conversation)
+        self._send(self.trainee, self.conversation)
+        self._send(self.trainer, self.conversation)
+
+        self.assertEqual(self._counter(self.conversation, self.trainer), 2)
+        self.assertEqual(self._counter(self.conversation, self.trainee), 1)
+
+    def test_mark_read_subtracts_marked_messages(self) -> None:
+        self._send(self.trainee, self.conversation)
+        self._send(self.trainee, self.conversation)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = mark_conversation_read(self.trainer, self.conversation)
+
+        self.assertEqual(result.messages_marked, 2)
+        self.assertEqual(self._counter(self.conversation, self.trainer), 0)
+
+    def test_missing_counter_is_recounted_on_send(self) -> None:
+        Message.objects.create(conversation=self.conversation, sender=self.trainee, content='old')
+        UnreadCounter.objects.filter(conversation=self.conversation).delete()
+
+        self._send(self.trainee, self.conversation)
+
+        self.assertEqual(self._counter(self.conversation, self.trainer), 2)
+
+
+class UnreadTotalTests(_UnreadTestBase):
+
+    def test_total_spans_conversations_and_is_cached(self) -> None:
+        self._send(self.trainee, self.conversation)
+        self._send(self.other_trainee, self.other_conversation)
+        self._send(self.other_trainee, self.other_conversation)
+
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.trainer).unread_count, 3)
+
+    def test_total_refreshes_after_send_and_read(self) -> None:
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 0)
+
+        self._send(self.trainee, self.conversation)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_conversation_read(self.trainer, self.conversation)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 0)
+
+    def test_archived_conversations_are_excluded(self) -> None:
+        self._send(self.trainee, self.conversation)
+        self._send(self.other_trainee, self.other_conversation)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_conversations_for_trainee(self.trainee)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 1)
+        self.assertEqual(get_unread_count(self.trainee).unread_count, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_or_create_conversation(self.trainer, self.trainee)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 2)
+
+    def test_conversation_list_uses_counters(self) -> None:
+        self._send(self.trainee, self.conversation)
+        self._send(self.trainee, self.conversation)
+
+        unread = {
+            conversation.id: conversation.annotated_unread_count
+            for conversation in get_conversations_for_user(self.trainer)
+        }
+        self.assertEqual(unread, {self.conversation.id: 2, self.other_conversation.id: 0})
+
+
+class ReconcileUnreadCountsCommandTests(_UnreadTestBase):
+
+    def test_fixes_drifted_and_missing_counters(self) -> None:
+        self._send(self.trainee, self.conversation)
+        self._send(self.other_trainee, self.other_conversation)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 2)
+
+        # Drift: rows marked read behind the service's back, a counter lost
+        Message.objects.filter(conversation=self.conversation).update(is_read=True)
+        UnreadCounter.objects.filter(conversation=self.other_conversation, user=self.trainer).delete()
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_unread_counts', stdout=out)
+
+        self.assertIn('Checked 2 conversation(s): 2 unread counter(s) fixed.', out.getvalue())
+        self.assertEqual(self._counter(self.conversation, self.trainer), 0)
+        self.assertEqual(self._counter(self.other_conversation, self.trainer), 1)
+        self.assertEqual(get_unread_count(self.trainer).unread_count, 1)
+
+    def test_drops_counters_of_removed_participants(self) -> None:
+        self._send(self.trainer, self.conversation)
+        Conversation.objects.filter(pk=self.conversation.pk).update(trainee=None)
+
+        call_command(
+            'reconcile_unread_counts', '--conversation-id', str(self.conversation.id), stdout=StringIO(),
+        )
+
+        self.assertFalse(
+            UnreadCounter.objects.filter(conversation=self.conversation, user=self.trainee).exists()
+        )
@@ -13,6 +13,7 @@ import logging
 from typing import cast
 
 from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from rest_framework import status, views
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import JSONParser, MultiPartParser
@@ -39,7 +40,9 @@ from .services.messaging_service import (
     broadcast_read_receipt,
     delete_message,
     edit_message,
+    get_conversation_page,
     get_conversations_for_user,
+    get_message_history,
     get_messages_for_conversation,
     get_unread_count,
     is_impersonating,
@@ -48,7 +51,11 @@ from .services.messaging_service import (
     send_message_push_notification,
     send_message_to_trainee,
 )
-from .services.search_service import search_messages
+from .services.search_service import (
+    SearchOrder,
+    search_messages,
+    search_messages_keyset,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -89,7 +96,10 @@ class ConversationPagination(PageNumberPagination):
 class ConversationListView(views.APIView):
     """
     GET /api/messaging/conversations/
-    List all conversations for the authenticated user.
+    GET /api/messaging/conversations/?cursor=<cursor>
+    List all conversations for the authenticated user, most recent activity first.
+    Passing ``cursor`` (empty for the first page) switches to keyset
+    pagination, which returns ``next_cursor`` instead of page counts.
     Row-level security: trainers see their trainees' conversations,
     trainees see their own conversation.
     """
@@ -97,6 +107,10 @@ class ConversationListView(views.APIView):
 
     def get(self, request: Request) -> Response:
         user = cast(User, request.user)
+
+        if 'cursor' in request.query_params:
+            return self._get_keyset(request, user)
+
         conversations = get_conversations_for_user(user)
 
         paginator = ConversationPagination()
@@ -112,11 +126,36 @@ class ConversationListView(views.APIView):
             return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
+    def _get_keyset(self, request: Request, user: User) -> Response:
+        try:
+            page = get_conversation_page(
+                user,
+                cursor=request.query_params.get('cursor') or None,
+            )
+        except ValueError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = ConversationListSerializer(
+            page.conversations,
+            many=True,
+            context={'request': request},
+        )
+        return Response({
+            'next_cursor': page.next_cursor,
+            'results': serializer.data,
+        })
+
 
 class SearchMessagesView(views.APIView):
     """
     GET /api/messaging/search/?q=<query>&page=<page>
+    GET /api/messaging/search/?q=<query>&cursor=<cursor>&order=recent|relevance
     Search messages across all conversations for the authenticated user.
+    Passing ``cursor`` (empty for the first page) switches to keyset
+    pagination, which returns ``next_cursor`` instead of page counts.
     Row-level security: users only see messages in their own conversations.
     """
     permission_classes = [IsAuthenticated]
@@ -129,6 +168,9 @@ class SearchMessagesView(views.APIView):
         # Pass raw query to service — it handles stripping and validation
         query = request.query_params.get('q', '')
 
+        if 'cursor' in request.query_params:
+            return self._get_keyset(request, user, query)
+
         page_param = request.query_params.get('page', '1')
         try:
             page = max(1, int(page_param))
@@ -153,11 +195,38 @@ class SearchMessagesView(views.APIView):
             'results': serializer.data,
         })
 
+    def _get_keyset(self, request: Request, user: User, query: str) -> Response:
+        try:
+            order = SearchOrder(request.query_params.get('order', SearchOrder.RECENT.value))
+            page = search_messages_keyset(
+                user=user,
+                query=query,
+                cursor=request.query_params.get('cursor') or None,
+                order=order,
+            )
+        except ValueError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = SearchMessageResultSerializer(page.results, many=True)
+        return Response({
+            'order': page.order.value,
+            'next_cursor': page.next_cursor,
+            'results': serializer.data,
+        })
+
 
 class ConversationDetailView(views.APIView):
     """
     GET /api/messaging/conversations/<id>/messages/
+    GET /api/messaging/conversations/<id>/messages/?before=<message_id>
+    GET /api/messaging/conversations/<id>/messages/?after=<message_id>
     Get paginated messages for a specific conversation.
+    ``before`` (empty for the latest) pages back through history by message
+    id; ``after`` returns what a reconnecting client missed, oldest first.
+    Both return ``has_more`` and the websocket ``seq`` to resume from.
     Row-level security enforced.
     """
     permission_classes = [IsAuthenticated]
@@ -182,6 +251,9 @@ class ConversationDetailView(views.APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        if 'before' in request.query_params or 'after' in request.query_params:
+            return self._get_cursor_page(request, user, conversation)
+
         try:
             messages = get_messages_for_conversation(user, conversation)
         except ValueError as exc:
@@ -202,6 +274,43 @@ class ConversationDetailView(views.APIView):
             return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
+    def _get_cursor_page(
+        self,
+        request: Request,
+        user: User,
+        conversation: Conversation,
+    ) -> Response:
+        try:
+            cursors = {
+                name: int(request.query_params[name])
+                for name in ('before', 'after', 'limit')
+                if request.query_params.get(name)
+            }
+        except ValueError:
+            return Response(
+                {'error': 'before, after and limit must be integers.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            page = get_message_history(user, conversation, **cursors)
+        except ValueError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = MessageSerializer(
+            page.messages,
+            many=True,
+            context={'request': request},
+        )
+        return Response({
+            'results': serializer.data,
+            'has_more': page.has_more,
+            'seq': page.seq,
+        })
+
 
 # ---------------------------------------------------------------------------
 # Send message endpoints
@@ -268,12 +377,26 @@ class SendMessageView(views.APIView):
             )
 
         try:
-            result = send_message(
-                sender=user,
-                conversation=conversation,
-                content=content,
-                image=image_file,
-            )
+            # The push is queued in the message's transaction
+            with transaction.atomic():
+                result = send_message(
+                    sender=user,
+                    conversation=conversation,
+                    content=content,
+                    image=image_file,
+                )
+                recipient_id = (
+                    conversation.trainee_id
+                    if user.id == conversation.trainer_id
+                    else conversation.trainer_id
+                )
+                send_message_push_notification(
+                    recipient_id=recipient_id,
+                    sender=user,
+                    content=result.content,
+                    conversation_id=conversation.id,
+                    has_image=image_file is not None,
+                )
         except ValueError as exc:
             return Response(
                 {'error': str(exc)},
@@ -287,20 +410,6 @@ class SendMessageView(views.APIView):
         # Broadcast via WebSocket (fire-and-forget)
         broadcast_new_message(conversation.id, response_serializer.data)
 
-        # Send push notification to recipient
-        recipient_id = (
-            conversation.trainee_id
-            if user.id == conversation.trainer_id
-            else conversation.trainer_id
-        )
-        send_message_push_notification(
-            recipient_id=recipient_id,
-            sender=user,
-            content=result.content,
-            conversation_id=conversation.id,
-            has_image=image_file is not None,
-        )
-
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -353,12 +462,21 @@ class StartConversationView(views.APIView):
             )
 
         try:
-            result = send_message_to_trainee(
-                trainer=user,
-                trainee_id=serializer.validated_data['trainee_id'],
-                content=content,
-                image=image_file,
-            )
+            # The push is queued in the message's transaction
+            with transaction.atomic():
+                result = send_message_to_trainee(
+                    trainer=user,
+                    trainee_id=serializer.validated_data['trainee_id'],
+                    content=content,
+                    image=image_file,
+                )
+                send_message_push_notification(
+                    recipient_id=serializer.validated_data['trainee_id'],
+                    sender=user,
+                    content=result.content,
+                    conversation_id=result.conversation_id,
+                    has_image=image_file is not None,
+                )
         except ValueError as exc:
             return Response(
                 {'error': str(exc)},
@@ -372,16 +490,6 @@ class StartConversationView(views.APIView):
         # Broadcast via WebSocket
         broadcast_new_message(result.conversation_id, response_serializer.data)
 
-        # Send push notification
-        conversation = Conversation.objects.get(id=result.conversation_id)
-        send_message_push_notification(
-            recipient_id=conversation.trainee_id,
-            sender=user,
-            content=result.content,
-            conversation_id=result.conversation_id,
-            has_image=image_file is not None,
-        )
-
         return Response(
             {
                 'conversation_id': result.conversation_id,
@@ -8,26 +8,31 @@ from __future__ import annotations
 
 import json
 import os
+from collections.abc import Iterator
 from typing import TYPE_CHECKING, Any, Optional, Union, cast
 from decimal import Decimal
-from datetime import timedelta
 
-from django.utils import timezone
 from django.contrib.auth import get_user_model
 
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    BaseMessageChunk,
+    HumanMessage,
+    SystemMessage,
+)
 from langchain_core.language_models.chat_models import BaseChatModel
-from pydantic import SecretStr
 
-from .ai_config import AIProvider, AIModelConfig, get_ai_config, get_api_key
+from . import llm_gateway
+from .ai_config import AIModelConfig, get_ai_config, get_api_key
+from .llm_gateway import LLMLane, LLMStream
+from trainer.services.ai_context_service import (
+    build_prompt_context,
+    get_roster_snapshot,
+    get_trainee_snapshot,
+)
 from users.models import User
 
-_ENV_VAR_FOR_PROVIDER: dict[AIProvider, str] = {
-    AIProvider.OPENAI: "OPENAI_API_KEY",
-    AIProvider.ANTHROPIC: "ANTHROPIC_API_KEY",
-    AIProvider.GOOGLE: "GOOGLE_API_KEY",
-}
-
 
 class DecimalEncoder(json.JSONEncoder):
     """JSON encoder that handles Decimal types."""
@@ -39,196 +44,41 @@ class DecimalEncoder(json.JSONEncoder):
 
 def get_chat_model(config: AIModelConfig) -> BaseChatModel:
     """
-    Get a LangChain chat model based on configuration.
-
-    Args:
-        config: AI model configuration
+    Get the shared LangChain chat model for a configuration.
 
-    Returns:
-        A LangChain chat model instance
+    Prefer llm_gateway.invoke()/stream(), which add concurrency limits,
+    circuit breaking and provider fallback around the call.
 
     Raises:
         ValueError: If the API key for the configured provider is missing.
     """
-    api_key = get_api_key(config.provider)
-    if not api_key:
-        raise ValueError(
-            f"API key for {config.provider.value} is not configured. "
-            f"Set the {_ENV_VAR_FOR_PROVIDER[config.provider]} environment variable."
-        )
-
-    if config.provider == AIProvider.OPENAI:
-        from langchain_openai import ChatOpenAI
-        return ChatOpenAI(
-            model=config.model_name,
-            temperature=config.temperature,
-            api_key=SecretStr(api_key),
-        )
-
-    elif config.provider == AIProvider.ANTHROPIC:
-        from langchain_anthropic import ChatAnthropic
-        # Note: Using kwargs dict to work around type stub limitations
-        # The actual API accepts model, max_tokens, etc. but type stubs don't reflect this
-        anthropic_kwargs: dict[str, Any] = {
-            "model": config.model_name,
-            "temperature": config.temperature,
-            "max_tokens": config.max_tokens,
-            "api_key": SecretStr(api_key),
-        }
-        return ChatAnthropic(**anthropic_kwargs)
-
-    elif config.provider == AIProvider.GOOGLE:
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        return ChatGoogleGenerativeAI(
-            model=config.model_name,
-            temperature=config.temperature,
-            max_output_tokens=config.max_tokens,
-            google_api_key=api_key,
-        )
-
-    else:
-        raise ValueError(f"Unsupported AI provider: {config.provider}")
+    return llm_gateway.get_client(config)
 
 
 class TraineeContextBuilder:
-    """Builds context about trainees for AI chat."""
+    """Builds context about trainees for AI chat from cached snapshots."""
 
     def __init__(self, trainer: User) -> None:
         self.trainer = trainer
 
     def get_trainee_list(self) -> list[dict[str, Any]]:
-        """Get list of all trainees with basic info."""
-        trainees = User.objects.filter(
-            parent_trainer=self.trainer,
-            role=User.Role.TRAINEE,
-            is_active=True
-        )
-
-        return [
-            {
-                "id": t.id,
-                "email": t.email,
-                "name": f"{t.first_name} {t.last_name}".strip() or t.email,
-                "joined": str(t.date_joined.date()) if t.date_joined else None,
-            }
-            for t in trainees
-        ]
+        """Get list of all active trainees with basic info."""
+        return list(get_roster_snapshot(self.trainer)["trainees"])
 
     def get_trainee_summary(self, trainee_id: int) -> dict[str, Any]:
         """Get comprehensive summary for a specific trainee."""
-        try:
-            trainee = User.objects.get(
-                id=trainee_id,
-                parent_trainer=self.trainer,
-                role=User.Role.TRAINEE
-            )
-        except User.DoesNotExist:
+        summary = get_trainee_snapshot(self.trainer, trainee_id)
+        if summary is None:
             return {"error": f"Trainee {trainee_id} not found"}
-
-        summary = {
-            "trainee_id": trainee.id,
-            "email": trainee.email,
-            "name": f"{trainee.first_name} {trainee.last_name}".strip() or trainee.email,
-            "is_active": trainee.is_active,
-        }
-
-        # Get profile
-        try:
-            profile = trainee.profile
-            summary["profile"] = {
-                "sex": profile.sex,
-                "age": profile.age,
-                "height_cm": profile.height_cm,
-                "weight_kg": float(profile.weight_kg) if profile.weight_kg else None,
-                "activity_level": profile.activity_level,
-                "goal": profile.goal,
-                "diet_type": profile.diet_type,
-                "meals_per_day": profile.meals_per_day,
-            }
-        except Exception:
-            summary["profile"] = None
-
-        # Get nutrition goals
-        try:
-            goal = trainee.nutrition_goal
-            summary["nutrition_goals"] = {
-                "protein": goal.protein_goal,
-                "carbs": goal.carbs_goal,
-                "fat": goal.fat_goal,
-                "calories": goal.calories_goal,
-            }
-        except Exception:
-            summary["nutrition_goals"] = None
-
-        # Get recent daily logs (last 7 days)
-        try:
-            logs = trainee.daily_logs.order_by('-date')[:7]
-            summary["recent_logs"] = [
-                {
-                    "date": str(log.date),
-                    "nutrition": log.nutrition_data.get("totals", {}) if log.nutrition_data else {},
-                    "workout_exercises": len(log.workout_data.get("exercises", [])) if log.workout_data else 0,
-                    "steps": log.steps,
-                    "sleep_hours": float(log.sleep_hours) if log.sleep_hours else None,
-                }
-                for log in logs
-            ]
-        except Exception:
-            summary["recent_logs"] = []
-
-        # Get weight trend
-        try:
-            checkins = trainee.weight_checkins.order_by('-date')[:14]
-            if checkins:
-                weights = [(str(c.date), float(c.weight_kg)) for c in checkins]
-                summary["weight_checkins"] = weights
-                if len(weights) >= 2:
-                    summary["weight_change"] = round(weights[0][1] - weights[-1][1], 2)
-        except Exception:
-            summary["weight_checkins"] = []
-
-        # Get current program
-        try:
-            program = trainee.programs.filter(is_active=True).first()
-            if program:
-                summary["current_program"] = {
-                    "name": program.name,
-                    "start_date": str(program.start_date) if program.start_date else None,
-                    "end_date": str(program.end_date) if program.end_date else None,
-                }
-        except Exception:
-            summary["current_program"] = None
-
         return summary
 
     def get_trainer_context(self) -> dict[str, Any]:
         """Get trainer's overall context."""
-        trainees = User.objects.filter(
-            parent_trainer=self.trainer,
-            role=User.Role.TRAINEE
-        )
+        return dict(get_roster_snapshot(self.trainer)["overview"])
 
-        today = timezone.now().date()
-
-        # Count active trainees
-        active_count = trainees.filter(is_active=True).count()
-
-        # Get trainees needing attention (no activity in 3+ days)
-        from trainer.models import TraineeActivitySummary
-        three_days_ago = today - timedelta(days=3)
-
-        inactive_ids = []
-        for trainee in trainees.filter(is_active=True):
-            latest = trainee.activity_summaries.order_by('-date').first()
-            if not latest or latest.date < three_days_ago:
-                inactive_ids.append(trainee.id)
-
-        return {
-            "total_trainees": trainees.count(),
-            "active_trainees": active_count,
-            "trainees_needing_attention": len(inactive_ids),
-            "today": str(today),
-        }
+    def build_prompt_context(self, trainee_id: Optional[int] = None) -> str:
+        """Render the context block sent with a chat message, within the token budget."""
+        return build_prompt_context(self.trainer, trainee_id)
 
 
 class AIChat:
@@ -259,32 +109,70 @@ Remember: You are assisting the trainer, not directly communicating with trainee
         self.trainer = trainer
         self.context_builder = TraineeContextBuilder(trainer)
         self.config = config or get_ai_config()
+        # Shared client; raises ValueError up front if the provider has no API key
         self.llm = get_chat_model(self.config)
 
     def _build_context_message(self, trainee_id: Optional[int] = None) -> str:
         """Build context message with trainer and trainee data."""
-        context_parts = []
+        return self.context_builder.build_prompt_context(trainee_id)
+
+    def _build_messages(
+        self,
+        message: str,
+        conversation_history: Optional[list[dict[str, str]]],
+        trainee_id: Optional[int],
+        history_summary: str = "",
+    ) -> list[BaseMessage]:
+        """Build the prompt: system prompt, prior turns, then the message with context."""
+        # Build context
+        context = self._build_context_message(trainee_id)
 
-        # Add trainer overview
-        trainer_ctx = self.context_builder.get_trainer_context()
-        context_parts.append(f"## Trainer Overview\n{json.dumps(trainer_ctx, indent=2, cls=DecimalEncoder)}")
+        # Build messages list; earlier turns that were summarized ride on the system prompt
+        system_prompt = self.SYSTEM_PROMPT
+        if history_summary:
+            system_prompt += f"\n\nSummary of the earlier conversation in this thread:\n{history_summary}"
+        messages: list[BaseMessage] = [SystemMessage(content=system_prompt)]
+
+        # Add conversation history
+        for msg in conversation_history or []:
+            if msg["role"] == "user":
+                messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                messages.append(AIMessage(content=msg["content"]))
+
+        # Add current message with context
+        user_message = f"""<context>
+{context}
+</context>
 
-        # Add trainee list
-        trainees = self.context_builder.get_trainee_list()
-        context_parts.append(f"## Your Trainees ({len(trainees)} total)\n{json.dumps(trainees, indent=2, cls=DecimalEncoder)}")
+{message}"""
 
-        # If specific trainee requested, add their detailed summary
-        if trainee_id:
-            trainee_summary = self.context_builder.get_trainee_summary(trainee_id)
-            context_parts.append(f"## Detailed Context for Trainee ID {trainee_id}\n{json.dumps(trainee_summary, indent=2, cls=DecimalEncoder)}")
+        messages.append(HumanMessage(content=user_message))
+        return messages
 
-        return "\n\n".join(context_parts)
+    @staticmethod
+    def _extract_usage(response: BaseMessage) -> Optional[dict[str, int]]:
+        """Extract token usage from a response (or aggregated stream chunk) if available."""
+        usage_metadata = getattr(response, 'usage_metadata', None)
+        if usage_metadata:
+            return {
+                "input_tokens": usage_metadata.get("input_tokens", 0),
+                "output_tokens": usage_metadata.get("output_tokens", 0),
+            }
+        meta = getattr(response, 'response_metadata', None) or {}
+        if 'usage' in meta:
+            return {
+                "input_tokens": meta['usage'].get('prompt_tokens', 0),
+                "output_tokens": meta['usage'].get('completion_tokens', 0),
+            }
+        return None
 
     def chat(
         self,
         message: str,
         conversation_history: Optional[list[dict[str, str]]] = None,
         trainee_id: Optional[int] = None,
+        history_summary: str = "",
     ) -> dict[str, Any]:
         """
         Send a chat message and get a response.
@@ -293,60 +181,24 @@ Remember: You are assisting the trainer, not directly communicating with trainee
             message: The user's message
             conversation_history: Previous messages in the conversation
             trainee_id: Optional specific trainee to focus on
+            history_summary: Summary of turns older than conversation_history
 
         Returns:
             dict with 'response', 'trainee_context_used', 'provider', 'model'
         """
-        if conversation_history is None:
-            conversation_history = []
+        messages = self._build_messages(message, conversation_history, trainee_id, history_summary)
 
-        # Build context
-        context = self._build_context_message(trainee_id)
-
-        # Build messages list
-        messages: list[BaseMessage] = [SystemMessage(content=self.SYSTEM_PROMPT)]
-
-        # Add conversation history
-        for msg in conversation_history:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            elif msg["role"] == "assistant":
-                messages.append(AIMessage(content=msg["content"]))
-
-        # Add current message with context
-        user_message = f"""<context>
-{context}
-</context>
-
-{message}"""
-
-        messages.append(HumanMessage(content=user_message))
-
-        # Call LLM
+        # Call LLM through the gateway (may be served by a fallback provider)
         try:
-            response = self.llm.invoke(messages)
-
-            # Extract token usage if available
-            usage = None
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                usage = {
-                    "input_tokens": response.usage_metadata.get("input_tokens", 0),
-                    "output_tokens": response.usage_metadata.get("output_tokens", 0),
-                }
-            elif hasattr(response, 'response_metadata'):
-                meta = response.response_metadata
-                if 'usage' in meta:
-                    usage = {
-                        "input_tokens": meta['usage'].get('prompt_tokens', 0),
-                        "output_tokens": meta['usage'].get('completion_tokens', 0),
-                    }
+            result = llm_gateway.invoke(messages, config=self.config, lane=LLMLane.INTERACTIVE)
+            response = result.message
 
             return {
                 "response": response.content,
                 "trainee_context_used": trainee_id,
-                "provider": self.config.provider.value,
-                "model": self.config.model_name,
-                "usage": usage,
+                "provider": result.provider.value,
+                "model": result.model_name,
+                "usage": self._extract_usage(response),
             }
 
         except Exception as e:
@@ -357,6 +209,54 @@ Remember: You are assisting the trainer, not directly communicating with trainee
                 "model": self.config.model_name,
             }
 
+    def stream(
+        self,
+        message: str,
+        conversation_history: Optional[list[dict[str, str]]] = None,
+        trainee_id: Optional[int] = None,
+        history_summary: str = "",
+    ) -> ChatStream:
+        """
+        Start a chat completion whose text arrives incrementally.
+
+        Iterate the returned ChatStream for text deltas; once exhausted its
+        ``usage`` holds token usage if the provider reported any. Provider
+        errors propagate from iteration.
+        """
+        messages = self._build_messages(message, conversation_history, trainee_id, history_summary)
+        return ChatStream(llm_gateway.stream(messages, config=self.config, lane=LLMLane.INTERACTIVE))
+
+
+class ChatStream:
+    """Iterator of text deltas from a streaming LLM call, collecting usage as it goes."""
+
+    def __init__(self, chunks: LLMStream) -> None:
+        self._chunks = chunks
+        self._aggregate: Optional[BaseMessageChunk] = None
+        self.usage: Optional[dict[str, int]] = None
+
+    @property
+    def provider(self) -> str:
+        """Provider serving the stream (a fallback if the configured one is down)."""
+        return self._chunks.provider.value
+
+    @property
+    def model_name(self) -> str:
+        return self._chunks.model_name
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            self._aggregate = chunk if self._aggregate is None else self._aggregate + chunk
+            text = chunk.content if isinstance(chunk.content, str) else chunk.text()
+            if text:
+                yield text
+        if self._aggregate is not None:
+            self.usage = AIChat._extract_usage(self._aggregate)
+
+    def close(self) -> None:
+        """Stop generation early (e.g. on cancellation), releasing the connection."""
+        self._chunks.close()
+
 
 def get_ai_chat(trainer: User, config: Optional[AIModelConfig] = None) -> AIChat:
     """Factory function to get AI chat instance for a trainer."""
@@ -3,9 +3,12 @@ Views for persistent AI chat threads.
 """
 from __future__ import annotations
 
+import json
 import logging
+from collections.abc import Iterator
 from typing import cast
 
+from django.http import StreamingHttpResponse
 from rest_framework import status, views
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
@@ -13,6 +16,7 @@ from rest_framework.response import Response
 
 from core.permissions import IsTrainer
 from trainer.ai_chat_serializers import (
+    AIChatMessageSerializer,
     AIChatThreadDetailSerializer,
     AIChatThreadListSerializer,
     CreateThreadSerializer,
@@ -22,12 +26,16 @@ from trainer.ai_chat_serializers import (
 )
 from trainer.models import AIChatMessage
 from trainer.services.ai_chat_service import (
+    AIChatStreamSession,
+    SendAIMessageResult,
     create_thread,
     delete_thread,
     get_thread_with_messages,
     get_threads_for_trainer,
     rename_thread,
+    request_stream_cancel,
     send_message_to_thread,
+    start_streamed_message,
 )
 from users.models import User
 
@@ -178,3 +186,92 @@ class AIChatThreadSendView(views.APIView):
         })
 
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+
+def _sse(event: str, data: object) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _result_payload(result: SendAIMessageResult) -> dict[str, object]:
+    return SendMessageResponseSerializer({
+        'user_message': result.user_message,
+        'assistant_message': result.assistant_message,
+        'thread_title': result.thread_title,
+        'suggested_followup': result.suggested_followup,
+    }).data
+
+
+def _sse_stream(session: AIChatStreamSession) -> Iterator[str]:
+    """Translate stream events into SSE frames."""
+    for event in session.events():
+        if event.kind == 'user_message':
+            yield _sse('user_message', AIChatMessageSerializer(event.data).data)
+        elif event.kind == 'token':
+            yield _sse('token', {'text': event.data})
+        elif event.kind in ('done', 'cancelled'):
+            payload = _result_payload(event.data) if event.data is not None else None
+            yield _sse(event.kind, payload)
+        else:
+            yield _sse('error', {'error': event.data})
+
+
+class AIChatThreadStreamView(views.APIView):
+    """
+    POST: Send a message to a thread and stream the AI response as
+    Server-Sent Events.
+
+    Events: user_message, then token ({"text": ...}) as text arrives, then
+    one of done / cancelled (same shape as the send endpoint's response,
+    or null if cancelled before any text) / error.
+    """
+    permission_classes = [IsAuthenticated, IsTrainer]
+
+    def post(self, request: Request, thread_id: int) -> StreamingHttpResponse | Response:
+        trainer = cast(User, request.user)
+        serializer = SendMessageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            session = start_streamed_message(
+                trainer=trainer,
+                thread_id=thread_id,
+                content=serializer.validated_data['message'],
+                trainee_id=serializer.validated_data.get('trainee_id'),
+            )
+        except ValueError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(
+            _sse_stream(session),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class AIChatThreadCancelView(views.APIView):
+    """
+    POST: Stop the response currently streaming into a thread.
+
+    Text generated so far is kept as the assistant message.
+    """
+    permission_classes = [IsAuthenticated, IsTrainer]
+
+    def post(self, request: Request, thread_id: int) -> Response:
+        trainer = cast(User, request.user)
+
+        try:
+            request_stream_cancel(trainer, thread_id)
+        except ValueError as exc:
+            return Response(
+                {'error': str(exc)},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        return Response(status=status.HTTP_202_ACCEPTED)
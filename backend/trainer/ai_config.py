@@ -6,7 +6,7 @@ Supports multiple LLM providers via LangChain.
 import os
 from enum import Enum
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 
 class AIProvider(str, Enum):
@@ -14,6 +14,7 @@ class AIProvider(str, Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     GOOGLE = "google"
+    FAKE = "fake"  # scripted local model for tests (trainer.llm_fake)
 
 
 @dataclass
@@ -23,6 +24,8 @@ class AIModelConfig:
     model_name: str
     temperature: float = 0.7
     max_tokens: int = 2048
+    # Token budget for prior conversation (summary + recent turns) in a chat prompt
+    history_token_budget: int = 8000
 
 
 # Default model configurations for each provider
@@ -32,21 +35,32 @@ MODEL_CONFIGS = {
         model_name="gpt-4o",
         temperature=0.7,
         max_tokens=4096,
+        history_token_budget=16000,
     ),
     AIProvider.ANTHROPIC: AIModelConfig(
         provider=AIProvider.ANTHROPIC,
         model_name="claude-sonnet-4-6",
         temperature=0.7,
         max_tokens=4096,
+        history_token_budget=24000,
     ),
     AIProvider.GOOGLE: AIModelConfig(
         provider=AIProvider.GOOGLE,
         model_name="gemini-2.0-flash",
         temperature=0.7,
         max_tokens=4096,
+        history_token_budget=24000,
     ),
 }
 
+# Not listed in MODEL_CONFIGS so it is never offered as a real provider
+FAKE_MODEL_CONFIG = AIModelConfig(
+    provider=AIProvider.FAKE,
+    model_name="scripted",
+    temperature=0.0,
+    max_tokens=4096,
+)
+
 
 def get_ai_config() -> AIModelConfig:
     """Get AI configuration from environment variables."""
@@ -59,39 +73,34 @@ def get_ai_config() -> AIModelConfig:
         provider = AIProvider.ANTHROPIC
 
     # Get base config for provider
-    config = MODEL_CONFIGS.get(provider, MODEL_CONFIGS[AIProvider.ANTHROPIC])
+    if provider == AIProvider.FAKE:
+        config = FAKE_MODEL_CONFIG
+    else:
+        config = MODEL_CONFIGS.get(provider, MODEL_CONFIGS[AIProvider.ANTHROPIC])
 
     # Allow overrides from environment
     model_name = os.getenv("AI_MODEL_NAME")
     if model_name:
-        config = AIModelConfig(
-            provider=config.provider,
-            model_name=model_name,
-            temperature=config.temperature,
-            max_tokens=config.max_tokens,
-        )
+        config = replace(config, model_name=model_name)
 
     temperature = os.getenv("AI_TEMPERATURE")
     if temperature:
         try:
-            config = AIModelConfig(
-                provider=config.provider,
-                model_name=config.model_name,
-                temperature=float(temperature),
-                max_tokens=config.max_tokens,
-            )
+            config = replace(config, temperature=float(temperature))
         except ValueError:
             pass
 
     max_tokens = os.getenv("AI_MAX_TOKENS")
     if max_tokens:
         try:
-            config = AIModelConfig(
-                provider=config.provider,
-                model_name=config.model_name,
-                temperature=config.temperature,
-                max_tokens=int(max_tokens),
-            )
+            config = replace(config, max_tokens=int(max_tokens))
+        except ValueError:
+            pass
+
+    history_budget = os.getenv("AI_HISTORY_TOKEN_BUDGET")
+    if history_budget:
+        try:
+            config = replace(config, history_token_budget=int(history_budget))
         except ValueError:
             pass
 
@@ -108,6 +117,10 @@ def get_builder_config() -> AIModelConfig:
     3. OpenAI GPT-4o-mini (if OPENAI_API_KEY set) — fast, ~3-8s
     4. Falls back to general AI config (claude/gpt-4o) — slowest, ~15-30s
     """
+    # The scripted fake provider replaces every model when selected
+    if os.getenv("AI_PROVIDER", "").lower() == AIProvider.FAKE.value:
+        return FAKE_MODEL_CONFIG
+
     # Check for explicit builder config
     builder_provider = os.getenv("AI_BUILDER_PROVIDER")
     builder_model = os.getenv("AI_BUILDER_MODEL")
@@ -152,5 +165,7 @@ def get_api_key(provider: AIProvider) -> Optional[str]:
         AIProvider.ANTHROPIC: "ANTHROPIC_API_KEY",
         AIProvider.GOOGLE: "GOOGLE_API_KEY",
     }
+    if provider == AIProvider.FAKE:
+        return "fake"
     env_var = key_map.get(provider)
     return os.getenv(env_var) if env_var else None
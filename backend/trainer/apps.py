@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TrainerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trainer'
+
+    def ready(self) -> None:
+        from trainer import signals  # noqa: F401
@@ -15,7 +15,7 @@ from __future__ import annotations
 
 from dataclasses import asdict
 
-from django.http import HttpResponse
+from django.http.response import HttpResponseBase
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
@@ -23,11 +23,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core.permissions import IsTrainer
+from trainer.export_views import export_response
 from trainer.services.audit_export_service import (
-    export_decision_logs_csv,
-    export_trainee_nutrition_csv,
-    export_trainee_progress_csv,
-    export_trainee_workout_csv,
+    decision_logs_export,
+    trainee_nutrition_export,
+    trainee_progress_export,
+    trainee_workout_export,
 )
 from trainer.services.audit_service import (
     get_audit_summary,
@@ -44,14 +45,6 @@ def _parse_int(request: Request, param: str, default: int) -> int:
         return default
 
 
-def _csv_response(content: str, filename: str) -> HttpResponse:
-    """Build an HttpResponse for a CSV file download."""
-    response = HttpResponse(content, content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    response['Cache-Control'] = 'no-store'
-    return response
-
-
 # ---------------------------------------------------------------------------
 # Audit endpoints
 # ---------------------------------------------------------------------------
@@ -104,10 +97,9 @@ class DecisionLogExportView(APIView):
 
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request) -> HttpResponse:
+    def get(self, request: Request) -> HttpResponseBase:
         days = _parse_int(request, 'days', 30)
-        result = export_decision_logs_csv(request.user, days)
-        return _csv_response(result.content, result.filename)
+        return export_response(request, decision_logs_export(request.user, days))
 
 
 class TraineeWorkoutExportView(APIView):
@@ -115,16 +107,16 @@ class TraineeWorkoutExportView(APIView):
 
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request, trainee_id: int) -> HttpResponse | Response:
+    def get(self, request: Request, trainee_id: int) -> HttpResponseBase:
         days = _parse_int(request, 'days', 90)
         try:
-            result = export_trainee_workout_csv(request.user, trainee_id, days)
+            spec = trainee_workout_export(request.user, trainee_id, days)
         except ValueError as e:
             return Response(
                 {'detail': str(e)},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        return _csv_response(result.content, result.filename)
+        return export_response(request, spec)
 
 
 class TraineeNutritionExportView(APIView):
@@ -132,16 +124,16 @@ class TraineeNutritionExportView(APIView):
 
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request, trainee_id: int) -> HttpResponse | Response:
+    def get(self, request: Request, trainee_id: int) -> HttpResponseBase:
         days = _parse_int(request, 'days', 90)
         try:
-            result = export_trainee_nutrition_csv(request.user, trainee_id, days)
+            spec = trainee_nutrition_export(request.user, trainee_id, days)
         except ValueError as e:
             return Response(
                 {'detail': str(e)},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        return _csv_response(result.content, result.filename)
+        return export_response(request, spec)
 
 
 class TraineeProgressExportView(APIView):
@@ -149,13 +141,13 @@ class TraineeProgressExportView(APIView):
 
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request, trainee_id: int) -> HttpResponse | Response:
+    def get(self, request: Request, trainee_id: int) -> HttpResponseBase:
         days = _parse_int(request, 'days', 180)
         try:
-            result = export_trainee_progress_csv(request.user, trainee_id, days)
+            spec = trainee_progress_export(request.user, trainee_id, days)
         except ValueError as e:
             return Response(
                 {'detail': str(e)},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        return _csv_response(result.content, result.filename)
+        return export_response(request, spec)
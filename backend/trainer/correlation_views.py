@@ -45,6 +45,10 @@ class CorrelationOverviewView(APIView):
             'correlations': [asdict(c) for c in overview.correlations],
             'insights': [asdict(i) for i in overview.insights],
             'cohort_comparisons': [asdict(cc) for cc in overview.cohort_comparisons],
+            'correlation_matrix': (
+                asdict(overview.correlation_matrix)
+                if overview.correlation_matrix is not None else None
+            ),
         }, status=status.HTTP_200_OK)
 
 
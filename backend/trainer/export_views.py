@@ -1,31 +1,76 @@
 """
 Views for CSV data exports from the trainer dashboard.
 Separated from views.py to keep file sizes manageable.
+
+Exports stream straight to the client. Exports above
+EXPORT_BACKGROUND_ROW_THRESHOLD rows instead start a background job and
+return 202 with a status URL; the finished file is served by
+ExportJobDownloadView.
 """
 from __future__ import annotations
 
+import os
+import tempfile
 from typing import cast
 
-from django.http import HttpResponse
-from rest_framework import views
+from django.core.files.storage import default_storage
+from django.http import FileResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.urls import reverse
+from rest_framework import status, views
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
+from rest_framework.response import Response
 
 from core.permissions import IsTrainer
 from users.models import User
 
+from .services.columnar_export_service import PARQUET_DATASETS
+from .services.export_job_service import (
+    BackgroundExport,
+    get_export_job,
+    should_run_in_background,
+    start_export_job,
+)
 from .services.export_service import (
-    export_payments_csv,
-    export_subscribers_csv,
-    export_trainees_csv,
+    CsvExportSpec,
+    payments_export,
+    subscribers_export,
+    trainees_export,
 )
 from .utils import parse_days_param
 
 
-def _csv_response(content: str, filename: str) -> HttpResponse:
-    """Build an HttpResponse for a CSV file download."""
-    response = HttpResponse(content, content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+PARQUET_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _job_started_response(
+    request: Request,
+    spec: BackgroundExport,
+    estimated_rows: int,
+) -> Response:
+    """Start ``spec`` as a background job and point the client at its status."""
+    trainer = cast(User, request.user)
+    job_id = start_export_job(trainer.pk, spec, estimated_rows)
+    return Response(
+        {
+            "job_id": job_id,
+            "status": "pending",
+            "estimated_rows": estimated_rows,
+            "status_url": reverse("export-job-status", args=[job_id]),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+def export_response(request: Request, spec: CsvExportSpec) -> HttpResponseBase:
+    """Stream ``spec`` as a CSV download, or start a background job if it is large."""
+    estimated_rows = spec.estimate_rows()
+    if should_run_in_background(estimated_rows):
+        return _job_started_response(request, spec, estimated_rows)
+
+    response = StreamingHttpResponse(spec.iter_text(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{spec.filename}"'
     response["Cache-Control"] = "no-store"
     return response
 
@@ -37,11 +82,10 @@ class PaymentExportView(views.APIView):
     """
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request) -> HttpResponse:
+    def get(self, request: Request) -> HttpResponseBase:
         trainer = cast(User, request.user)
         days = parse_days_param(request)
-        result = export_payments_csv(trainer, days)
-        return _csv_response(result.content, result.filename)
+        return export_response(request, payments_export(trainer, days))
 
 
 class SubscriberExportView(views.APIView):
@@ -51,10 +95,9 @@ class SubscriberExportView(views.APIView):
     """
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request) -> HttpResponse:
+    def get(self, request: Request) -> HttpResponseBase:
         trainer = cast(User, request.user)
-        result = export_subscribers_csv(trainer)
-        return _csv_response(result.content, result.filename)
+        return export_response(request, subscribers_export(trainer))
 
 
 class TraineeExportView(views.APIView):
@@ -63,7 +106,110 @@ class TraineeExportView(views.APIView):
     """
     permission_classes = [IsAuthenticated, IsTrainer]
 
-    def get(self, request: Request) -> HttpResponse:
+    def get(self, request: Request) -> HttpResponseBase:
         trainer = cast(User, request.user)
-        result = export_trainees_csv(trainer)
-        return _csv_response(result.content, result.filename)
+        return export_response(request, trainees_export(trainer))
+
+
+class ParquetExportView(views.APIView):
+    """
+    GET: Download trainee training/nutrition data as Parquet.
+    Datasets: lift-sets, daily-logs, meal-entries.
+    Query params: ?days=90 (range 1-365), ?trainee_id= (default: whole roster)
+    """
+    permission_classes = [IsAuthenticated, IsTrainer]
+
+    def get(self, request: Request, dataset: str) -> HttpResponseBase:
+        trainer = cast(User, request.user)
+        build_export = PARQUET_DATASETS.get(dataset)
+        if build_export is None:
+            return Response(
+                {"detail": f"Unknown dataset. Choose from: {', '.join(PARQUET_DATASETS)}."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        raw_trainee_id = request.query_params.get("trainee_id")
+        try:
+            trainee_id = int(raw_trainee_id) if raw_trainee_id else None
+            spec = build_export(trainer, parse_days_param(request, default=90), trainee_id)
+        except ValueError:
+            return Response(
+                {"detail": "Trainee not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        estimated_rows = spec.estimate_rows()
+        if should_run_in_background(estimated_rows):
+            return _job_started_response(request, spec, estimated_rows)
+
+        # Parquet's footer is written last, so small files are built before sending
+        buffer = tempfile.SpooledTemporaryFile(max_size=PARQUET_SPOOL_MAX_BYTES)
+        spec.write(buffer, lambda _count: None)
+        buffer.seek(0)
+        response = FileResponse(
+            buffer,
+            content_type=spec.content_type,
+            as_attachment=True,
+            filename=spec.filename,
+        )
+        response["Cache-Control"] = "no-store"
+        return response
+
+
+class ExportJobStatusView(views.APIView):
+    """
+    GET: Progress of a background export job.
+    Includes download_url once the job has completed.
+    """
+    permission_classes = [IsAuthenticated, IsTrainer]
+
+    def get(self, request: Request, job_id: str) -> Response:
+        trainer = cast(User, request.user)
+        job = get_export_job(str(job_id), trainer.pk)
+        if job is None:
+            return Response(
+                {"detail": "Export job not found or expired."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        data: dict[str, object] = {
+            "job_id": str(job_id),
+            "status": job.status,
+            "filename": job.filename,
+            "rows_written": job.rows_written,
+            "estimated_rows": job.estimated_rows,
+            "progress_pct": job.progress_pct,
+        }
+        if job.status == "completed":
+            data["download_url"] = reverse("export-job-download", args=[job_id])
+        elif job.status == "failed":
+            data["error"] = job.error or "Unknown error"
+        return Response(data)
+
+
+class ExportJobDownloadView(views.APIView):
+    """
+    GET: Download the file written by a completed export job.
+    Gzipped CSVs are sent gzip-encoded so clients receive the plain CSV.
+    """
+    permission_classes = [IsAuthenticated, IsTrainer]
+
+    def get(self, request: Request, job_id: str) -> HttpResponseBase:
+        trainer = cast(User, request.user)
+        job = get_export_job(str(job_id), trainer.pk)
+        if job is None or job.status != "completed" or not job.storage_path:
+            return Response(
+                {"detail": "Export is not ready."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response = FileResponse(
+            default_storage.open(job.storage_path, "rb"),
+            content_type=job.content_type,
+            as_attachment=True,
+            filename=os.path.basename(job.filename),
+        )
+        if job.content_encoding:
+            response["Content-Encoding"] = job.content_encoding
+        response["Cache-Control"] = "no-store"
+        return response
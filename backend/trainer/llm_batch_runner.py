@@ -0,0 +1,189 @@
+"""
+Concurrent runner for bulk LLM work (library classification and similar).
+
+run_llm_batches() sends many independent batches through the LLM gateway
+at once and yields each (batch, result) as it finishes:
+
+- At most ``concurrency`` calls are in flight.
+- Two token buckets pace the calls: one on requests per minute and one on
+  estimated tokens per minute, so a run stays under provider quotas
+  instead of finding them via 429s.
+- A rate-limit response (HTTP 429, or the gateway having no free slot)
+  pauses both buckets and retries the batch. Any other error is yielded
+  as the batch's result.
+
+The event loop runs in its own thread and only makes LLM calls. Results
+are consumed on the caller's thread, so callers can use the ORM freely
+while the batches run. Closing the iterator early (Ctrl-C, an exception)
+stops new batches from starting.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import Generic, TypeVar, Union
+
+from .llm_gateway import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
+
+B = TypeVar('B')
+R = TypeVar('R')
+
+LLM_BATCH_RPM: int = int(os.getenv('LLM_BATCH_RPM', '60'))
+LLM_BATCH_TPM: int = int(os.getenv('LLM_BATCH_TPM', '200000'))
+MAX_RATE_LIMIT_RETRIES: int = 3
+DEFAULT_RATE_LIMIT_PAUSE_SECONDS: float = 20.0
+GATEWAY_BUSY_PAUSE_SECONDS: float = 5.0
+
+
+@dataclass(frozen=True)
+class BatchLimits:
+    """Parallelism and pacing for one run."""
+    concurrency: int = 4
+    requests_per_minute: int = LLM_BATCH_RPM
+    tokens_per_minute: int = LLM_BATCH_TPM
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``per_minute`` / 60 per second."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = max(1.0, float(per_minute))
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float) -> None:
+        """Wait until ``amount`` tokens are available, then take them."""
+        amount = min(max(amount, 0.0), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out nothing for ``seconds`` (the provider asked us to back off)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _rate_limit_pause(exc: Exception) -> float | None:
+    """Seconds to back off if ``exc`` means "slow down", else None."""
+    if isinstance(exc, LLMUnavailableError):
+        return GATEWAY_BUSY_PAUSE_SECONDS
+    response = getattr(exc, 'response', None)
+    status_code = getattr(exc, 'status_code', None) or getattr(response, 'status_code', None)
+    if status_code != 429:
+        return None
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after', DEFAULT_RATE_LIMIT_PAUSE_SECONDS))
+    except (TypeError, ValueError):
+        return DEFAULT_RATE_LIMIT_PAUSE_SECONDS
+
+
+@dataclass(frozen=True)
+class _Crashed:
+    error: BaseException
+
+
+_DONE = object()
+
+Outcome = Union[R, Exception]
+
+
+class _Run(Generic[B, R]):
+    def __init__(
+        self,
+        call: Callable[[B], R],
+        estimate_tokens: Callable[[B], int],
+        limits: BatchLimits,
+        emit: Callable[[tuple[B, Outcome[R]]], None],
+        stop: threading.Event,
+    ) -> None:
+        self.call = call
+        self.estimate_tokens = estimate_tokens
+        self.limits = limits
+        self.emit = emit
+        self.stop = stop
+
+    async def run(self, batches: Sequence[B]) -> None:
+        self.slots = asyncio.Semaphore(max(1, self.limits.concurrency))
+        self.requests = TokenBucket(self.limits.requests_per_minute)
+        self.tokens = TokenBucket(self.limits.tokens_per_minute)
+        await asyncio.gather(*(self._one(batch) for batch in batches))
+
+    async def _one(self, batch: B) -> None:
+        async with self.slots:
+            for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+                if self.stop.is_set():
+                    return
+                await self.requests.acquire(1)
+                await self.tokens.acquire(self.estimate_tokens(batch))
+                try:
+                    result = await asyncio.to_thread(self.call, batch)
+                except Exception as exc:
+                    pause = _rate_limit_pause(exc)
+                    if pause is None or attempt == MAX_RATE_LIMIT_RETRIES:
+                        self.emit((batch, exc))
+                        return
+                    logger.warning("LLM batch rate limited (%s); pausing %.0fs.", exc, pause)
+                    self.requests.pause(pause)
+                    self.tokens.pause(pause)
+                    continue
+                self.emit((batch, result))
+                return
+
+
+def run_llm_batches(
+    batches: Sequence[B],
+    call: Callable[[B], R],
+    *,
+    estimate_tokens: Callable[[B], int],
+    limits: BatchLimits = BatchLimits(),
+) -> Iterator[tuple[B, Outcome[R]]]:
+    """
+    Run ``call`` on every batch concurrently; yield (batch, result or error).
+
+    Results arrive in completion order. ``call`` runs in worker threads and
+    must not use the ORM.
+    """
+    results: queue.Queue[object] = queue.Queue()
+    stop = threading.Event()
+
+    def worker() -> None:
+        try:
+            asyncio.run(_Run(call, estimate_tokens, limits, results.put, stop).run(batches))
+        except BaseException as exc:  # surfaced on the caller's thread
+            results.put(_Crashed(exc))
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=worker, name='llm-batch-runner', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Crashed):
+                raise item.error
+            yield item  # type: ignore[misc]
+    finally:
+        stop.set()
@@ -0,0 +1,131 @@
+"""
+Scripted local LLM provider (AI_PROVIDER=fake).
+
+Used in tests and for offline development. Every call through the gateway
+takes the next queued reply; queued exceptions are raised instead.
+Streaming splits a reply on whitespace. With nothing queued, the model
+returns DEFAULT_REPLY. Prompts are recorded for assertions.
+
+    with scripted_llm("First reply", ConnectionError("down")) as llm:
+        ...
+        llm.prompts  # list of message lists, one per call
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional, Union
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_REPLY = "This is a scripted reply from the fake AI provider."
+
+Reply = Union[str, Exception]
+
+_lock = threading.Lock()
+_replies: deque[Reply] = deque()
+_prompts: list[list[BaseMessage]] = []
+
+
+def _next_reply(messages: list[BaseMessage]) -> str:
+    with _lock:
+        _prompts.append(list(messages))
+        reply = _replies.popleft() if _replies else DEFAULT_REPLY
+    if isinstance(reply, Exception):
+        raise reply
+    return reply
+
+
+def _usage(messages: list[BaseMessage], reply: str) -> dict[str, int]:
+    input_tokens = sum(len(str(m.content)) for m in messages) // 4
+    output_tokens = len(reply) // 4
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+    }
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replays the queued script."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = _next_reply(messages)
+        message = AIMessage(content=reply, usage_metadata=_usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        reply = _next_reply(messages)
+        for token in re.split(r"(\s)", reply):
+            if token:
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=_usage(messages, reply),  # type: ignore[arg-type]
+        ))
+
+
+class ScriptedLLM:
+    """Handle returned by scripted_llm()."""
+
+    def queue(self, *replies: Reply) -> None:
+        with _lock:
+            _replies.extend(replies)
+
+    @property
+    def prompts(self) -> list[list[BaseMessage]]:
+        with _lock:
+            return list(_prompts)
+
+    @property
+    def remaining(self) -> int:
+        with _lock:
+            return len(_replies)
+
+
+@contextmanager
+def scripted_llm(*replies: Reply) -> Iterator[ScriptedLLM]:
+    """Route every AI call to the fake provider and queue ``replies``."""
+    from .llm_gateway import reset_gateway_state
+
+    with _lock:
+        _replies.clear()
+        _prompts.clear()
+    reset_gateway_state()
+    handle = ScriptedLLM()
+    handle.queue(*replies)
+    previous_provider = os.environ.get("AI_PROVIDER")
+    os.environ["AI_PROVIDER"] = "fake"
+    try:
+        yield handle
+    finally:
+        if previous_provider is None:
+            os.environ.pop("AI_PROVIDER", None)
+        else:
+            os.environ["AI_PROVIDER"] = previous_provider
+        with _lock:
+            _replies.clear()
+            _prompts.clear()
+        reset_gateway_state()
@@ -0,0 +1,614 @@
+"""
+Shared gateway for LLM calls.
+
+Every LangChain model call (AI chat, thread summaries, program builder and
+generator, exercise classification) goes through invoke() or stream():
+
+- Clients are cached per provider, model and settings, so connection pools
+  are reused instead of a new client per request.
+- Each provider has a concurrency cap. Calls run in one of two lanes:
+  INTERACTIVE (a trainer is waiting) and BATCH (background or bulk work).
+  BATCH calls use at most LLM_BATCH_MAX_CONCURRENCY slots and always yield
+  to waiting INTERACTIVE calls. A call that cannot get a slot within its
+  lane's wait limit fails fast with LLMUnavailableError instead of queueing
+  behind a slow provider.
+- A circuit breaker per provider opens after LLM_BREAKER_FAILURES
+  consecutive failures. While it is open, calls go to the next configured
+  provider (LLM_FALLBACK_PROVIDERS). After LLM_BREAKER_COOLDOWN_SECONDS, one
+  probe call is let through to test recovery.
+- Latency and token usage are recorded per provider, model and lane (see
+  get_llm_metrics()).
+
+Limits, breakers and metrics are per process.
+
+Set AI_PROVIDER=fake to use the scripted local model in trainer.llm_fake.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Optional, cast
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, BaseMessageChunk
+from pydantic import SecretStr
+
+from .ai_config import MODEL_CONFIGS, AIModelConfig, AIProvider, get_api_key
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+LLM_MAX_CONCURRENCY: int = _env_int("LLM_MAX_CONCURRENCY", 16)
+LLM_BATCH_MAX_CONCURRENCY: int = _env_int("LLM_BATCH_MAX_CONCURRENCY", 4)
+LLM_REQUEST_TIMEOUT_SECONDS: int = _env_int("LLM_REQUEST_TIMEOUT_SECONDS", 60)
+LLM_MAX_RETRIES: int = _env_int("LLM_MAX_RETRIES", 2)
+LLM_BREAKER_FAILURES: int = _env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_COOLDOWN_SECONDS: int = _env_int("LLM_BREAKER_COOLDOWN_SECONDS", 30)
+
+_ENV_VAR_FOR_PROVIDER: dict[AIProvider, str] = {
+    AIProvider.OPENAI: "OPENAI_API_KEY",
+    AIProvider.ANTHROPIC: "ANTHROPIC_API_KEY",
+    AIProvider.GOOGLE: "GOOGLE_API_KEY",
+    AIProvider.FAKE: "AI_PROVIDER",
+}
+
+
+class LLMLane(str, Enum):
+    """Priority class of a call."""
+    INTERACTIVE = "interactive"  # a user is waiting on the reply
+    BATCH = "batch"  # background summaries, bulk classification
+
+
+# Longest a call waits for a concurrency slot before failing
+LANE_WAIT_SECONDS: dict[LLMLane, float] = {
+    LLMLane.INTERACTIVE: 10.0,
+    LLMLane.BATCH: 120.0,
+}
+
+
+class LLMUnavailableError(RuntimeError):
+    """No configured provider can take the call right now."""
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+def get_client(
+    config: AIModelConfig,
+    timeout: Optional[float] = None,
+    *,
+    retries: bool = True,
+) -> BaseChatModel:
+    """
+    Return the shared LangChain chat model for ``config``.
+
+    With ``retries`` off, the client makes a single attempt per call
+    instead of retrying LLM_MAX_RETRIES times.
+
+    Raises:
+        ValueError: If the API key for the configured provider is missing.
+    """
+    api_key = get_api_key(config.provider)
+    if not api_key:
+        raise ValueError(
+            f"API key for {config.provider.value} is not configured. "
+            f"Set the {_ENV_VAR_FOR_PROVIDER[config.provider]} environment variable."
+        )
+    return _cached_client(
+        config.provider,
+        config.model_name,
+        config.temperature,
+        config.max_tokens,
+        float(timeout or LLM_REQUEST_TIMEOUT_SECONDS),
+        LLM_MAX_RETRIES if retries else 0,
+        api_key,
+    )
+
+
+@lru_cache(maxsize=64)
+def _cached_client(
+    provider: AIProvider,
+    model_name: str,
+    temperature: float,
+    max_tokens: int,
+    timeout: float,
+    max_retries: int,
+    api_key: str,
+) -> BaseChatModel:
+    if provider == AIProvider.OPENAI:
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model=model_name,
+            temperature=temperature,
+            api_key=SecretStr(api_key),
+            timeout=timeout,
+            max_retries=max_retries,
+        )
+
+    elif provider == AIProvider.ANTHROPIC:
+        from langchain_anthropic import ChatAnthropic
+        # Note: Using kwargs dict to work around type stub limitations
+        # The actual API accepts model, max_tokens, etc. but type stubs don't reflect this
+        anthropic_kwargs: dict[str, Any] = {
+            "model": model_name,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "api_key": SecretStr(api_key),
+            "default_request_timeout": timeout,
+            "max_retries": max_retries,
+        }
+        return ChatAnthropic(**anthropic_kwargs)
+
+    elif provider == AIProvider.GOOGLE:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model_name,
+            temperature=temperature,
+            max_output_tokens=max_tokens,
+            google_api_key=api_key,
+            timeout=timeout,
+            max_retries=max_retries,
+        )
+
+    elif provider == AIProvider.FAKE:
+        from .llm_fake import ScriptedChatModel
+        return ScriptedChatModel()
+
+    else:
+        raise ValueError(f"Unsupported AI provider: {provider}")
+
+
+# ---------------------------------------------------------------------------
+# Concurrency limits and circuit breaking
+# ---------------------------------------------------------------------------
+
+class ConcurrencyLimiter:
+    """Caps in-flight calls to one provider, letting INTERACTIVE calls go first."""
+
+    def __init__(self, limit: int, batch_limit: int) -> None:
+        self.limit = max(1, limit)
+        self.batch_limit = max(1, min(batch_limit, self.limit))
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._batch_in_use = 0
+        self._interactive_waiting = 0
+
+    def _blocked(self, lane: LLMLane) -> bool:
+        if self._in_use >= self.limit:
+            return True
+        if lane == LLMLane.BATCH:
+            return self._interactive_waiting > 0 or self._batch_in_use >= self.batch_limit
+        return False
+
+    @contextmanager
+    def slot(self, lane: LLMLane, wait_seconds: float) -> Iterator[None]:
+        deadline = time.monotonic() + wait_seconds
+        with self._cond:
+            if lane == LLMLane.INTERACTIVE:
+                self._interactive_waiting += 1
+            try:
+                while self._blocked(lane):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LLMUnavailableError("LLM provider is at capacity.")
+                    self._cond.wait(remaining)
+            finally:
+                if lane == LLMLane.INTERACTIVE:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()  # waiting BATCH calls may proceed
+            self._in_use += 1
+            if lane == LLMLane.BATCH:
+                self._batch_in_use += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use -= 1
+                if lane == LLMLane.BATCH:
+                    self._batch_in_use -= 1
+                self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0  # when opened, or when the current probe started
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            # Open past its cooldown, or a probe that never reported back
+            if time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = self.HALF_OPEN  # this caller is the probe
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+_state_lock = threading.Lock()
+_limiters: dict[AIProvider, ConcurrencyLimiter] = {}
+_breakers: dict[AIProvider, CircuitBreaker] = {}
+
+
+def _limiter(provider: AIProvider) -> ConcurrencyLimiter:
+    with _state_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ConcurrencyLimiter(LLM_MAX_CONCURRENCY, LLM_BATCH_MAX_CONCURRENCY)
+        return _limiters[provider]
+
+
+def _breaker(provider: AIProvider) -> CircuitBreaker:
+    with _state_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_SECONDS)
+        return _breakers[provider]
+
+
+def reset_gateway_state() -> None:
+    """Forget limiter, breaker and metrics state (tests, or after a config change)."""
+    with _state_lock:
+        _limiters.clear()
+        _breakers.clear()
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _counts_against_provider(exc: Exception) -> bool:
+    """Client errors (bad request, auth) are not provider outages."""
+    status_code = getattr(exc, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500:
+        return status_code in (408, 409, 429)
+    return True
+
+
+def _fallback_order(primary: AIProvider) -> list[AIProvider]:
+    """Providers to try after ``primary``, per LLM_FALLBACK_PROVIDERS."""
+    if primary == AIProvider.FAKE:
+        return []
+    configured = os.getenv("LLM_FALLBACK_PROVIDERS", "anthropic,openai,google")
+    order: list[AIProvider] = []
+    for name in configured.split(","):
+        try:
+            provider = AIProvider(name.strip().lower())
+        except ValueError:
+            continue
+        if provider not in (primary, AIProvider.FAKE) and provider not in order and get_api_key(provider):
+            order.append(provider)
+    return order
+
+
+def _candidates(config: AIModelConfig, fallback: bool) -> list[AIModelConfig]:
+    candidates = [config]
+    if fallback:
+        for provider in _fallback_order(config.provider):
+            candidates.append(replace(
+                config,
+                provider=provider,
+                model_name=MODEL_CONFIGS[provider].model_name,
+            ))
+    return candidates
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+@dataclass
+class LLMCallStats:
+    """Running totals for one provider, model and lane."""
+    provider: str
+    model_name: str
+    lane: str
+    calls: int = 0
+    failures: int = 0
+    rejected: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return round(self.total_latency_ms / self.calls, 1) if self.calls else 0.0
+
+
+_metrics_lock = threading.Lock()
+_metrics: dict[tuple[str, str, str], LLMCallStats] = {}
+
+
+def _record(
+    config: AIModelConfig,
+    lane: LLMLane,
+    *,
+    latency_ms: float | None = None,
+    usage: Optional[dict[str, Any]] = None,
+    failed: bool = False,
+    rejected: bool = False,
+) -> None:
+    key = (config.provider.value, config.model_name, lane.value)
+    with _metrics_lock:
+        stats = _metrics.get(key)
+        if stats is None:
+            stats = _metrics[key] = LLMCallStats(*key)
+        if rejected:
+            stats.rejected += 1
+            return
+        stats.calls += 1
+        if failed:
+            stats.failures += 1
+        if latency_ms is not None:
+            stats.total_latency_ms += latency_ms
+            stats.max_latency_ms = max(stats.max_latency_ms, latency_ms)
+        if usage:
+            stats.input_tokens += int(usage.get("input_tokens") or 0)
+            stats.output_tokens += int(usage.get("output_tokens") or 0)
+    logger.info(
+        "llm_call provider=%s model=%s lane=%s failed=%s latency_ms=%.0f input_tokens=%s output_tokens=%s",
+        *key, failed, latency_ms or 0,
+        (usage or {}).get("input_tokens"), (usage or {}).get("output_tokens"),
+    )
+
+
+def get_llm_metrics() -> list[LLMCallStats]:
+    """Snapshot of call statistics since process start (or the last reset)."""
+    with _metrics_lock:
+        return [replace(stats) for stats in _metrics.values()]
+
+
+# ---------------------------------------------------------------------------
+# Calls
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class LLMResponse:
+    """A completed call and the provider that served it."""
+    message: BaseMessage
+    provider: AIProvider
+    model_name: str
+    latency_ms: float
+
+
+def invoke(
+    messages: list[BaseMessage],
+    *,
+    config: AIModelConfig,
+    lane: LLMLane = LLMLane.INTERACTIVE,
+    timeout: Optional[float] = None,
+    fallback: bool = True,
+    deadline_seconds: Optional[float] = None,
+) -> LLMResponse:
+    """
+    Run a chat completion, falling back to other providers on outage.
+
+    ``timeout`` bounds each request, which the client retries up to
+    LLM_MAX_RETRIES times, per provider tried. ``deadline_seconds`` bounds
+    the whole call instead: slot waits, attempts and fallbacks share it,
+    client retries are off, and each attempt gets only the time left.
+
+    Raises:
+        LLMUnavailableError: If no provider can take the call in time.
+        Exception: The provider's own error if the last candidate failed.
+    """
+    deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+    last_error: Optional[Exception] = None
+    for candidate in _candidates(config, fallback):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        breaker = _breaker(candidate.provider)
+        if not breaker.allow():
+            continue
+        try:
+            client = get_client(candidate, timeout, retries=deadline is None)
+        except ValueError as exc:
+            last_error = exc
+            continue
+        wait_seconds = LANE_WAIT_SECONDS[lane]
+        if deadline is not None:
+            wait_seconds = min(wait_seconds, deadline - time.monotonic())
+        try:
+            with _limiter(candidate.provider).slot(lane, wait_seconds):
+                if deadline is not None:
+                    client = get_client(candidate, _time_left(deadline, timeout), retries=False)
+                started = time.monotonic()
+                try:
+                    message = client.invoke(messages)
+                except Exception as exc:
+                    latency_ms = (time.monotonic() - started) * 1000
+                    _record(candidate, lane, latency_ms=latency_ms, failed=True)
+                    if not _counts_against_provider(exc):
+                        breaker.record_success()
+                        raise
+                    breaker.record_failure()
+                    logger.warning("LLM call to %s failed: %s", candidate.provider.value, exc)
+                    last_error = exc
+                    continue
+        except LLMUnavailableError as exc:
+            _record(candidate, lane, rejected=True)
+            last_error = exc
+            continue
+
+        latency_ms = (time.monotonic() - started) * 1000
+        breaker.record_success()
+        _record(candidate, lane, latency_ms=latency_ms, usage=getattr(message, "usage_metadata", None))
+        return LLMResponse(
+            message=message,
+            provider=candidate.provider,
+            model_name=candidate.model_name,
+            latency_ms=latency_ms,
+        )
+
+    if last_error is not None and not isinstance(last_error, LLMUnavailableError):
+        raise last_error
+    raise LLMUnavailableError("No AI provider is available right now.") from last_error
+
+
+def _time_left(deadline: float, timeout: Optional[float]) -> float:
+    """Request timeout for an attempt under ``deadline``, in whole seconds
+    so clients stay cached."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise LLMUnavailableError("LLM call deadline passed.")
+    return float(min(math.ceil(remaining), timeout or math.inf))
+
+
+class LLMStream:
+    """
+    Iterator of chunks from a streamed completion.
+
+    ``provider`` and ``model_name`` name whichever candidate is serving the
+    stream. Falling back to another provider only happens before the first
+    chunk has arrived. Once text has been sent to the caller, an error
+    propagates to it.
+    """
+
+    def __init__(
+        self,
+        messages: list[BaseMessage],
+        config: AIModelConfig,
+        lane: LLMLane,
+        timeout: Optional[float],
+        fallback: bool,
+    ) -> None:
+        self.provider = config.provider
+        self.model_name = config.model_name
+        self._chunks: Generator[BaseMessageChunk, None, None] = self._run(
+            messages, config, lane, timeout, fallback,
+        )
+
+    def __iter__(self) -> Iterator[BaseMessageChunk]:
+        return self._chunks
+
+    def __next__(self) -> BaseMessageChunk:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        self._chunks.close()
+
+    def _run(
+        self,
+        messages: list[BaseMessage],
+        config: AIModelConfig,
+        lane: LLMLane,
+        timeout: Optional[float],
+        fallback: bool,
+    ) -> Generator[BaseMessageChunk, None, None]:
+        last_error: Optional[Exception] = None
+        for candidate in _candidates(config, fallback):
+            breaker = _breaker(candidate.provider)
+            if not breaker.allow():
+                continue
+            try:
+                client = get_client(candidate, timeout)
+            except ValueError as exc:
+                last_error = exc
+                continue
+
+            self.provider = candidate.provider
+            self.model_name = candidate.model_name
+            started_any = False
+            aggregate: Optional[BaseMessageChunk] = None
+            try:
+                with _limiter(candidate.provider).slot(lane, LANE_WAIT_SECONDS[lane]):
+                    started = time.monotonic()
+                    # BaseChatModel.stream is a generator, though annotated as Iterator
+                    chunks = cast(Generator[BaseMessageChunk, None, None], client.stream(messages))
+                    try:
+                        for chunk in chunks:
+                            started_any = True
+                            aggregate = chunk if aggregate is None else aggregate + chunk
+                            yield chunk
+                    except GeneratorExit:
+                        # Caller stopped early; release the provider connection
+                        chunks.close()
+                        breaker.record_success()
+                        _record(
+                            candidate, lane,
+                            latency_ms=(time.monotonic() - started) * 1000,
+                            usage=getattr(aggregate, "usage_metadata", None),
+                        )
+                        raise
+                    except Exception as exc:
+                        _record(candidate, lane, latency_ms=(time.monotonic() - started) * 1000, failed=True)
+                        if not _counts_against_provider(exc):
+                            breaker.record_success()
+                            raise
+                        breaker.record_failure()
+                        if started_any:
+                            raise
+                        logger.warning("LLM stream from %s failed: %s", candidate.provider.value, exc)
+                        last_error = exc
+                        continue
+            except LLMUnavailableError as exc:
+                _record(candidate, lane, rejected=True)
+                last_error = exc
+                continue
+
+            breaker.record_success()
+            _record(
+                candidate, lane,
+                latency_ms=(time.monotonic() - started) * 1000,
+                usage=getattr(aggregate, "usage_metadata", None),
+            )
+            return
+
+        if last_error is not None and not isinstance(last_error, LLMUnavailableError):
+            raise last_error
+        raise LLMUnavailableError("No AI provider is available right now.") from last_error
+
+
+def stream(
+    messages: list[BaseMessage],
+    *,
+    config: AIModelConfig,
+    lane: LLMLane = LLMLane.INTERACTIVE,
+    timeout: Optional[float] = None,
+    fallback: bool = True,
+) -> LLMStream:
+    """Start a streamed chat completion. Errors surface while iterating."""
+    return LLMStream(messages, config, lane, timeout, fallback)
@@ -3,24 +3,109 @@ Management command to compute retention analytics and send churn alerts.
 
 Intended to run daily via cron:
     python manage.py compute_retention
-    python manage.py compute_retention --days=14
+    python manage.py compute_retention --days=14 --workers=8 --shard-size=50
+
+Trainers are split into shards processed by a pool of worker processes.
+Each shard's snapshot writes commit in one transaction, and only trainees
+whose activity changed since their snapshot for today are re-scored, so an
+interrupted run resumes where it stopped when started again.
+
+Alerts are driven by today's stored snapshots, not by what this run
+re-scored: every critical/high snapshot not yet alerted on is alerted and
+stamped, including ones written earlier in the day by a dashboard refresh.
 """
 from __future__ import annotations
 
 import logging
+import os
+import time
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 
+import django
 from django.core.management.base import BaseCommand
+from django.db import connections, transaction
 
-from trainer.services.retention_analytics_service import get_retention_analytics
-from trainer.services.retention_notification_service import (
-    create_churn_alerts,
-    send_re_engagement_pushes,
-)
+from trainer.services.retention_analytics_service import refresh_stale_retention_snapshots
+from trainer.services.retention_notification_service import alert_at_risk_snapshots
 from users.models import User
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SHARD_SIZE: int = 50
+
+
+@dataclass
+class ShardStats:
+    trainers_processed: int = 0
+    trainees_rescored: int = 0
+    trainees_unchanged: int = 0
+    alerts: int = 0
+    pushes: int = 0
+    failures: int = 0
+
+    def add(self, other: ShardStats) -> None:
+        self.trainers_processed += other.trainers_processed
+        self.trainees_rescored += other.trainees_rescored
+        self.trainees_unchanged += other.trainees_unchanged
+        self.alerts += other.alerts
+        self.pushes += other.pushes
+        self.failures += other.failures
+
+
+def _init_worker() -> None:
+    """Pool initializer: make sure Django is configured in the child process."""
+    django.setup()
+
+
+def _process_shard(trainer_ids: list[int], days: int) -> ShardStats:
+    """
+    Refresh snapshots for one shard of trainers, then send their alerts.
+
+    Snapshot writes for the whole shard commit together; a failing trainer
+    is rolled back to its savepoint without losing the rest of the shard.
+    Notifications go out only after the commit.
+    """
+    stats = ShardStats()
+    refreshed: list[User] = []
+
+    trainers = User.objects.filter(id__in=trainer_ids).order_by('id')
+    with transaction.atomic():
+        for trainer in trainers:
+            try:
+                with transaction.atomic():
+                    result = refresh_stale_retention_snapshots(trainer, days)
+            except Exception:
+                logger.exception(
+                    "Failed to compute retention for trainer %s",
+                    trainer.email,
+                )
+                stats.failures += 1
+                continue
+
+            if not result.rescored and result.unchanged_count == 0:
+                continue
+            stats.trainers_processed += 1
+            stats.trainees_rescored += len(result.rescored)
+            stats.trainees_unchanged += result.unchanged_count
+            refreshed.append(trainer)
+
+    for trainer in refreshed:
+        try:
+            alerted = alert_at_risk_snapshots(trainer, days)
+        except Exception:
+            logger.exception(
+                "Failed to send churn alerts for trainer %s",
+                trainer.email,
+            )
+            stats.failures += 1
+            continue
+        stats.alerts += alerted.alerts
+        stats.pushes += alerted.pushes
+
+    return stats
+
 
 class Command(BaseCommand):
     help = "Compute trainee retention scores and send churn alert notifications."
@@ -32,52 +117,87 @@ class Command(BaseCommand):
             default=14,
             help="Lookback window in days (default: 14).",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help="Worker processes; 1 runs in-process (default: min(4, CPUs)).",
+        )
+        parser.add_argument(
+            "--shard-size",
+            type=int,
+            default=DEFAULT_SHARD_SIZE,
+            help=f"Trainers per shard / transaction (default: {DEFAULT_SHARD_SIZE}).",
+        )
 
     def handle(self, *args: object, **options: object) -> None:
         days: int = int(options["days"])  # type: ignore[arg-type]
         days = max(3, min(days, 365))
-
-        trainers = User.objects.filter(
-            role=User.Role.TRAINER,
-            is_active=True,
+        workers = max(1, int(options["workers"]))  # type: ignore[arg-type]
+        shard_size = max(1, int(options["shard_size"]))  # type: ignore[arg-type]
+        verbosity = int(options.get("verbosity", 1))  # type: ignore[arg-type]
+
+        trainer_ids = list(
+            User.objects.filter(
+                role=User.Role.TRAINER,
+                is_active=True,
+            ).order_by("id").values_list("id", flat=True)
         )
-
-        total_alerts = 0
-        total_pushes = 0
-        trainers_processed = 0
-
-        for trainer in trainers.iterator():
-            try:
-                result = get_retention_analytics(trainer, days)
-                if result.summary.total_trainees == 0:
-                    continue
-
-                trainers_processed += 1
-
-                at_risk = [
-                    t for t in result.trainees
-                    if t.risk_tier in ("critical", "high")
-                ]
-                critical = [
-                    t for t in result.trainees
-                    if t.risk_tier == "critical"
-                ]
-
-                alerts = create_churn_alerts(trainer, at_risk)
-                pushes = send_re_engagement_pushes(trainer, critical)
-                total_alerts += alerts
-                total_pushes += pushes
-            except Exception:
-                logger.exception(
-                    "Failed to compute retention for trainer %s",
-                    trainer.email,
+        shards = [
+            trainer_ids[i:i + shard_size]
+            for i in range(0, len(trainer_ids), shard_size)
+        ]
+
+        totals = ShardStats()
+        failed_shards = 0
+        started = time.monotonic()
+
+        def record(shard_number: int, stats: ShardStats) -> None:
+            totals.add(stats)
+            if verbosity >= 2:
+                self.stdout.write(
+                    f"Shard {shard_number}/{len(shards)}: "
+                    f"{stats.trainees_rescored} re-scored, "
+                    f"{stats.trainees_unchanged} unchanged"
                 )
-                continue
+
+        if workers == 1 or len(shards) <= 1:
+            for number, shard in enumerate(shards, start=1):
+                record(number, _process_shard(shard, days))
+        else:
+            # Children must open their own connections, not share the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(shards)),
+                initializer=_init_worker,
+            ) as pool:
+                futures = [pool.submit(_process_shard, shard, days) for shard in shards]
+                for number, future in enumerate(as_completed(futures), start=1):
+                    try:
+                        record(number, future.result())
+                    except Exception:
+                        logger.exception("Retention shard failed")
+                        failed_shards += 1
+
+        elapsed = time.monotonic() - started
+        scored = totals.trainees_rescored + totals.trainees_unchanged
+        rate = scored / elapsed if elapsed > 0 else 0.0
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Processed {trainers_processed} trainer(s): "
-                f"{total_alerts} alert(s) created, "
-                f"{total_pushes} push(es) queued."
+                f"Processed {totals.trainers_processed} trainer(s) in "
+                f"{len(shards)} shard(s) with {workers} worker(s) in {elapsed:.1f}s "
+                f"({rate:.0f} trainee(s)/s): "
+                f"{totals.trainees_rescored} re-scored, "
+                f"{totals.trainees_unchanged} unchanged, "
+                f"{totals.alerts} alert(s) created, "
+                f"{totals.pushes} push(es) queued."
             )
         )
+        if totals.failures or failed_shards:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{totals.failures} trainer(s) and {failed_shards} shard(s) failed; "
+                    "re-run to resume."
+                )
+            )
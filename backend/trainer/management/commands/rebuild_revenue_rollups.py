@@ -0,0 +1,57 @@
+"""
+Management command to (re)build the per-trainer revenue rollups.
+
+Run once after deploying the rollup tables, and any time the rollups may
+have drifted (e.g. after bulk payment imports that bypass model signals):
+    python manage.py rebuild_revenue_rollups
+    python manage.py rebuild_revenue_rollups --trainer-id=42
+"""
+from __future__ import annotations
+
+import logging
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+from trainer.services.revenue_rollup_service import rebuild_revenue_rollup
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Rebuild TrainerDailyRevenue / TrainerMonthlyRevenue rows from payments and subscriptions."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--trainer-id",
+            type=int,
+            default=None,
+            help="Only rebuild the rollups for this trainer.",
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        trainers = User.objects.filter(role=User.Role.TRAINER)
+        if options["trainer_id"] is not None:
+            trainers = trainers.filter(id=options["trainer_id"])
+
+        trainers_processed = 0
+        rows_written = 0
+
+        for trainer_id in trainers.values_list("id", flat=True).iterator():
+            try:
+                rows_written += rebuild_revenue_rollup(trainer_id)
+                trainers_processed += 1
+            except Exception:
+                logger.exception(
+                    "Failed to rebuild revenue rollups for trainer %s",
+                    trainer_id,
+                )
+                continue
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt revenue rollups for {trainers_processed} trainer(s): "
+                f"{rows_written} daily row(s) written."
+            )
+        )
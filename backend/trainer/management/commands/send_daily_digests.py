@@ -0,0 +1,61 @@
+"""
+Management command to generate and deliver trainers' daily digests.
+
+Intended to run hourly via cron; each run handles the trainers whose
+digest delivery hour is the current hour in their time zone:
+    python manage.py send_daily_digests
+    python manage.py send_daily_digests --workers=8 --batch-size=2000
+"""
+from __future__ import annotations
+
+import logging
+import time
+from argparse import ArgumentParser
+
+from django.core.management.base import BaseCommand
+
+from trainer.services.daily_digest_service import (
+    DIGEST_BATCH_SIZE,
+    generate_due_digests,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Generate and deliver daily digests for trainers due this hour."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Threads rendering digest summaries (default: 4).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DIGEST_BATCH_SIZE,
+            help=f"Trainers per metrics query / insert (default: {DIGEST_BATCH_SIZE}).",
+        )
+
+    def handle(self, *args: object, **options: object) -> None:
+        workers = max(1, int(options["workers"]))  # type: ignore[arg-type]
+        batch_size = max(1, int(options["batch_size"]))  # type: ignore[arg-type]
+
+        started = time.monotonic()
+        result = generate_due_digests(workers=workers, batch_size=batch_size)
+        elapsed = time.monotonic() - started
+        rate = result.trainers_due / elapsed if elapsed > 0 else 0.0
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result.trainers_due} trainer(s) due, processed in {elapsed:.1f}s "
+                f"({rate:.0f} trainer(s)/s): "
+                f"{result.digests_created} digest(s) created, "
+                f"{result.already_existing} already existed, "
+                f"{result.in_app_notifications} in-app notification(s), "
+                f"{result.pushes_sent} push(es), "
+                f"{result.emails_sent} email(s) sent."
+            )
+        )
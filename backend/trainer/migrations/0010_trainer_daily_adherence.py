@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0009_daily_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerDailyAdherence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('trainee_count', models.PositiveIntegerField(default=0, help_text='Active trainees with an activity summary on this date')),
+                ('food_logged', models.PositiveIntegerField(default=0)),
+                ('workout_logged', models.PositiveIntegerField(default=0)),
+                ('protein_hit', models.PositiveIntegerField(default=0)),
+                ('calorie_hit', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('trainer', models.ForeignKey(limit_choices_to={'role': 'TRAINER'}, on_delete=django.db.models.deletion.CASCADE, related_name='daily_adherence', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trainer_daily_adherence',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('trainer', 'date'), name='unique_adherence_per_trainer_per_date')],
+            },
+        ),
+    ]
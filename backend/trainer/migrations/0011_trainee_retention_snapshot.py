@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0010_trainer_daily_adherence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraineeRetentionSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('period_days', models.PositiveSmallIntegerField(help_text='Lookback window the scores were computed over')),
+                ('engagement_score', models.FloatField()),
+                ('churn_risk_score', models.FloatField()),
+                ('risk_tier', models.CharField(choices=[('critical', 'Critical'), ('high', 'High'), ('medium', 'Medium'), ('low', 'Low')], max_length=10)),
+                ('days_since_last_activity', models.PositiveIntegerField(blank=True, null=True)),
+                ('workout_consistency', models.FloatField(default=0)),
+                ('nutrition_consistency', models.FloatField(default=0)),
+                ('last_active_date', models.DateField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('trainee', models.ForeignKey(limit_choices_to={'role': 'TRAINEE'}, on_delete=django.db.models.deletion.CASCADE, related_name='retention_scores', to=settings.AUTH_USER_MODEL)),
+                ('trainer', models.ForeignKey(limit_choices_to={'role': 'TRAINER'}, on_delete=django.db.models.deletion.CASCADE, related_name='retention_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trainee_retention_snapshots',
+                'ordering': ['-snapshot_date', '-churn_risk_score'],
+                'indexes': [models.Index(fields=['trainer', 'snapshot_date', 'period_days', '-churn_risk_score'], name='retention_snap_risk_idx'), models.Index(fields=['trainer', 'snapshot_date', 'period_days', 'risk_tier'], name='retention_snap_tier_idx')],
+                'constraints': [models.UniqueConstraint(fields=('trainee', 'snapshot_date', 'period_days'), name='unique_retention_snapshot_per_trainee_day_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0011_trainee_retention_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerDailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('gross', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Succeeded or later-refunded payments, by paid date', max_digits=12)),
+                ('refunds', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('net', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('new_subscribers', models.PositiveIntegerField(default=0)),
+                ('churned_subscribers', models.PositiveIntegerField(default=0)),
+                ('mrr_delta', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Change in MRR; MRR at a period end is the running sum', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('trainer', models.ForeignKey(limit_choices_to={'role': 'TRAINER'}, on_delete=django.db.models.deletion.CASCADE, related_name='daily_revenue', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trainer_daily_revenue',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('trainer', 'date'), name='unique_revenue_per_trainer_per_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrainerMonthlyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('gross', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Succeeded or later-refunded payments, by paid date', max_digits=12)),
+                ('refunds', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('net', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('new_subscribers', models.PositiveIntegerField(default=0)),
+                ('churned_subscribers', models.PositiveIntegerField(default=0)),
+                ('mrr_delta', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Change in MRR; MRR at a period end is the running sum', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('trainer', models.ForeignKey(limit_choices_to={'role': 'TRAINER'}, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_revenue', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trainer_monthly_revenue',
+                'ordering': ['month'],
+                'constraints': [models.UniqueConstraint(fields=('trainer', 'month'), name='unique_revenue_per_trainer_per_month')],
+            },
+        ),
+    ]
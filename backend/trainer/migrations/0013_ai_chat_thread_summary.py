@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0012_trainer_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aichatthread',
+            name='history_summary',
+            field=models.TextField(blank=True, default='', help_text='Rolling summary of messages older than the verbatim window'),
+        ),
+        migrations.AddField(
+            model_name='aichatthread',
+            name='summary_through_message_id',
+            field=models.BigIntegerField(blank=True, help_text='Messages with id up to this one are covered by history_summary', null=True),
+        ),
+    ]
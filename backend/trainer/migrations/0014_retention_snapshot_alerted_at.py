@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0013_ai_chat_thread_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='traineeretentionsnapshot',
+            name='alerted_at',
+            field=models.DateTimeField(blank=True, help_text='When churn alerts were sent for this snapshot (at most once a day)', null=True),
+        ),
+    ]
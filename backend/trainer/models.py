@@ -8,6 +8,7 @@ import re
 import secrets
 import uuid
 from datetime import timedelta
+from decimal import Decimal
 from typing import Any, Optional
 
 from django.core.exceptions import ValidationError
@@ -202,6 +203,215 @@ class TraineeActivitySummary(models.Model):
         return f"{self.trainee.email} - {self.date}"
 
 
+class TrainerDailyAdherence(models.Model):
+    """
+    Per-trainer daily rollup of TraineeActivitySummary compliance flags.
+
+    Counts only summaries of the trainer's active trainees. Maintained
+    incrementally by trainer.signals on every summary write, and rebuilt
+    wholesale when a trainee joins, leaves or is (de)activated.
+    """
+    trainer = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='daily_adherence',
+        limit_choices_to={'role': 'TRAINER'}
+    )
+    date = models.DateField()
+
+    trainee_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Active trainees with an activity summary on this date"
+    )
+    food_logged = models.PositiveIntegerField(default=0)
+    workout_logged = models.PositiveIntegerField(default=0)
+    protein_hit = models.PositiveIntegerField(default=0)
+    calorie_hit = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'trainer_daily_adherence'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trainer', 'date'],
+                name='unique_adherence_per_trainer_per_date',
+            ),
+        ]
+        ordering = ['date']
+
+    def __str__(self) -> str:
+        return f"{self.trainer.email} - {self.date} ({self.trainee_count})"
+
+
+class TrainerDailyRevenue(models.Model):
+    """
+    Per-trainer daily revenue rollup of TraineePayment / TraineeSubscription.
+
+    Payments count on their paid date (refunds on the original paid date),
+    subscriber and MRR changes on the day they happen. Maintained
+    incrementally by trainer.signals; see TrainerMonthlyRevenue for the
+    month-level copy.
+    """
+    trainer = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='daily_revenue',
+        limit_choices_to={'role': 'TRAINER'}
+    )
+    date = models.DateField()
+
+    gross = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Succeeded or later-refunded payments, by paid date"
+    )
+    refunds = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    net = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    new_subscribers = models.PositiveIntegerField(default=0)
+    churned_subscribers = models.PositiveIntegerField(default=0)
+    mrr_delta = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Change in MRR; MRR at a period end is the running sum"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'trainer_daily_revenue'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trainer', 'date'],
+                name='unique_revenue_per_trainer_per_date',
+            ),
+        ]
+        ordering = ['date']
+
+    def __str__(self) -> str:
+        return f"{self.trainer.email} - {self.date} (net {self.net})"
+
+
+class TrainerMonthlyRevenue(models.Model):
+    """
+    Per-trainer monthly revenue rollup; same counters as TrainerDailyRevenue
+    summed per calendar month, so multi-year charts are one indexed read.
+    """
+    trainer = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='monthly_revenue',
+        limit_choices_to={'role': 'TRAINER'}
+    )
+    month = models.DateField(help_text="First day of the month")
+
+    gross = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Succeeded or later-refunded payments, by paid date"
+    )
+    refunds = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    net = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    new_subscribers = models.PositiveIntegerField(default=0)
+    churned_subscribers = models.PositiveIntegerField(default=0)
+    mrr_delta = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Change in MRR; MRR at a period end is the running sum"
+    )
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'trainer_monthly_revenue'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trainer', 'month'],
+                name='unique_revenue_per_trainer_per_month',
+            ),
+        ]
+        ordering = ['month']
+
+    def __str__(self) -> str:
+        return f"{self.trainer.email} - {self.month} (net {self.net})"
+
+
+class TraineeRetentionSnapshot(models.Model):
+    """
+    Persisted engagement / churn-risk score for a trainee on a given day.
+
+    One row per (trainee, snapshot_date, period_days); re-scoring on the same
+    day overwrites the row (but keeps ``alerted_at``), older days are kept
+    as history. Serves the paginated at-risk list without rescoring the
+    whole roster per request.
+    """
+
+    class RiskTier(models.TextChoices):
+        CRITICAL = 'critical', 'Critical'
+        HIGH = 'high', 'High'
+        MEDIUM = 'medium', 'Medium'
+        LOW = 'low', 'Low'
+
+    trainer = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='retention_snapshots',
+        limit_choices_to={'role': 'TRAINER'}
+    )
+    trainee = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='retention_scores',
+        limit_choices_to={'role': 'TRAINEE'}
+    )
+    snapshot_date = models.DateField()
+    period_days = models.PositiveSmallIntegerField(
+        help_text="Lookback window the scores were computed over"
+    )
+
+    engagement_score = models.FloatField()
+    churn_risk_score = models.FloatField()
+    risk_tier = models.CharField(max_length=10, choices=RiskTier.choices)
+    days_since_last_activity = models.PositiveIntegerField(null=True, blank=True)
+    workout_consistency = models.FloatField(default=0)
+    nutrition_consistency = models.FloatField(default=0)
+    last_active_date = models.DateField(null=True, blank=True)
+
+    computed_at = models.DateTimeField()
+    alerted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When churn alerts were sent for this snapshot (at most once a day)",
+    )
+
+    class Meta:
+        db_table = 'trainee_retention_snapshots'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trainee', 'snapshot_date', 'period_days'],
+                name='unique_retention_snapshot_per_trainee_day_period',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['trainer', 'snapshot_date', 'period_days', '-churn_risk_score'],
+                name='retention_snap_risk_idx',
+            ),
+            models.Index(
+                fields=['trainer', 'snapshot_date', 'period_days', 'risk_tier'],
+                name='retention_snap_tier_idx',
+            ),
+        ]
+        ordering = ['-snapshot_date', '-churn_risk_score']
+
+    def __str__(self) -> str:
+        return f"{self.trainee.email} - {self.snapshot_date} ({self.risk_tier})"
+
+
 class TrainerNotification(models.Model):
     """
     In-app notifications for trainers.
@@ -416,6 +626,16 @@ class AIChatThread(models.Model):
     )
     title = models.CharField(max_length=200, default='New conversation')
     last_message_at = models.DateTimeField(null=True, blank=True)
+    history_summary = models.TextField(
+        blank=True,
+        default='',
+        help_text="Rolling summary of messages older than the verbatim window",
+    )
+    summary_through_message_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Messages with id up to this one are covered by history_summary",
+    )
     is_deleted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,181 @@
+"""
+Service for maintaining and reading the per-trainer daily adherence rollup.
+
+TrainerDailyAdherence holds one row per (trainer, date) with the number of
+active-trainee activity summaries and how many of them logged food, logged a
+workout, hit protein and hit calories. Rows are adjusted incrementally with
+atomic F() deltas as summaries are written (see trainer.signals), so the
+adherence views read O(days) rows regardless of roster size.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import TYPE_CHECKING, Any
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, QuerySet, Subquery, Sum
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+
+from trainer.models import TraineeActivitySummary, TrainerDailyAdherence
+
+if TYPE_CHECKING:
+    from users.models import User
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS: tuple[str, ...] = (
+    'trainee_count',
+    'food_logged',
+    'workout_logged',
+    'protein_hit',
+    'calorie_hit',
+)
+
+
+def summary_counts(
+    *,
+    logged_food: bool,
+    logged_workout: bool,
+    hit_protein_goal: bool,
+    hit_calorie_goal: bool,
+) -> dict[str, int]:
+    """Contribution of a single activity summary to its rollup row."""
+    return {
+        'trainee_count': 1,
+        'food_logged': int(logged_food),
+        'workout_logged': int(logged_workout),
+        'protein_hit': int(hit_protein_goal),
+        'calorie_hit': int(hit_calorie_goal),
+    }
+
+
+def apply_adherence_delta(trainer_id: int, day: date, delta: dict[str, int]) -> None:
+    """
+    Atomically add ``delta`` to the rollup row for (trainer, day).
+
+    The row is created on first use; concurrent writers serialize on the
+    row lock taken by the UPDATE, so no increment is lost. Counters are
+    floored at zero so a missing backfill can never violate the
+    PositiveIntegerField check constraint.
+    """
+    changes = {name: value for name, value in delta.items() if value}
+    if not changes:
+        return
+
+    TrainerDailyAdherence.objects.bulk_create(
+        [TrainerDailyAdherence(trainer_id=trainer_id, date=day)],
+        ignore_conflicts=True,
+    )
+    TrainerDailyAdherence.objects.filter(trainer_id=trainer_id, date=day).update(
+        updated_at=timezone.now(),
+        **{name: Greatest(F(name) + value, 0) for name, value in changes.items()},
+    )
+
+
+# Summary flag behind each counter other than trainee_count
+_FLAG_FIELDS: dict[str, str] = {
+    'food_logged': 'logged_food',
+    'workout_logged': 'logged_workout',
+    'protein_hit': 'hit_protein_goal',
+    'calorie_hit': 'hit_calorie_goal',
+}
+
+
+def apply_trainee_membership(trainer_id: int, trainee_id: int, sign: int) -> int:
+    """
+    Add (``sign=1``) or remove (``sign=-1``) all of a trainee's activity
+    summaries to / from a trainer's rollup.
+
+    Used when roster membership changes (a trainee joins, leaves or is
+    deactivated). Like apply_adherence_delta it adjusts rows with atomic
+    F() deltas, in two queries however long the trainee's history is.
+
+    Returns:
+        Number of rollup rows adjusted.
+    """
+    summaries = TraineeActivitySummary.objects.filter(trainee_id=trainee_id)
+    days = list(summaries.values_list('date', flat=True))
+    if not days:
+        return 0
+
+    TrainerDailyAdherence.objects.bulk_create(
+        [TrainerDailyAdherence(trainer_id=trainer_id, date=day) for day in days],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+    same_day = summaries.filter(date=OuterRef('date'))
+    flags = {
+        counter: Subquery(same_day.values(value=Cast(flag, IntegerField()))[:1])
+        for counter, flag in _FLAG_FIELDS.items()
+    }
+    return TrainerDailyAdherence.objects.filter(trainer_id=trainer_id, date__in=days).update(
+        updated_at=timezone.now(),
+        trainee_count=Greatest(F('trainee_count') + sign, 0),
+        **{
+            counter: Greatest(F(counter) + sign * value, 0)
+            for counter, value in flags.items()
+        },
+    )
+
+
+def rebuild_adherence_rollup(trainer_id: int) -> int:
+    """
+    Recompute every rollup row for a trainer from activity summaries.
+
+    Used by the ``rebuild_adherence_rollups`` command to backfill or repair
+    rows written outside the signals (bulk operations).
+
+    Returns:
+        Number of rollup rows written.
+    """
+    from users.models import User
+
+    daily = (
+        TraineeActivitySummary.objects.filter(
+            trainee__parent_trainer_id=trainer_id,
+            trainee__role=User.Role.TRAINEE,
+            trainee__is_active=True,
+        )
+        .values('date')
+        .annotate(
+            trainee_count=Count('id'),
+            food_logged=Count('id', filter=Q(logged_food=True)),
+            workout_logged=Count('id', filter=Q(logged_workout=True)),
+            protein_hit=Count('id', filter=Q(hit_protein_goal=True)),
+            calorie_hit=Count('id', filter=Q(hit_calorie_goal=True)),
+        )
+        .order_by('date')
+    )
+    rows = [TrainerDailyAdherence(trainer_id=trainer_id, **row) for row in daily]
+
+    with transaction.atomic():
+        TrainerDailyAdherence.objects.filter(trainer_id=trainer_id).delete()
+        TrainerDailyAdherence.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def _rollup_window(trainer: User, start_date: date) -> QuerySet[TrainerDailyAdherence]:
+    return TrainerDailyAdherence.objects.filter(
+        trainer=trainer,
+        date__gte=start_date,
+        trainee_count__gt=0,
+    )
+
+
+def get_adherence_totals(trainer: User, start_date: date) -> dict[str, int]:
+    """Sum each rollup counter over ``date >= start_date`` in one query."""
+    agg: dict[str, Any] = _rollup_window(trainer, start_date).aggregate(
+        **{name: Sum(name) for name in COUNTER_FIELDS}
+    )
+    return {name: agg[name] or 0 for name in COUNTER_FIELDS}
+
+
+def get_adherence_trend(trainer: User, start_date: date) -> list[dict[str, Any]]:
+    """Return rollup rows (date + counters) from ``start_date``, ascending."""
+    return list(
+        _rollup_window(trainer, start_date)
+        .values('date', *COUNTER_FIELDS)
+        .order_by('date')
+    )
@@ -0,0 +1,181 @@
+"""
+Conversation memory for AI chat threads.
+
+A thread's prompt carries a stored rolling summary
+(AIChatThread.history_summary) plus every message after the summary
+boundary as-is, keeping the newest that fit the token budget, so nothing
+falls between the two even when a fold is running late.
+
+Once SUMMARIZE_BATCH_MESSAGES messages beyond the last VERBATIM_MESSAGES
+are unsummarized, a background thread asks the model to fold the older
+ones into the existing summary and moves the boundary forward
+(summary_through_message_id), which keeps the unsummarized tail short.
+Updates are compare-and-set on the old boundary, so two overlapping runs
+cannot both apply.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from trainer import llm_gateway
+from trainer.ai_config import get_ai_config
+from trainer.llm_gateway import LLMLane
+from trainer.models import AIChatMessage, AIChatThread
+from trainer.services.ai_context_service import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+VERBATIM_MESSAGES: int = 12  # last 6 exchanges
+SUMMARIZE_BATCH_MESSAGES: int = 10
+MAX_FOLD_MESSAGES: int = 60  # bounds one summarization prompt
+SUMMARY_MAX_CHARS: int = 4000
+
+_LOCK_PREFIX = 'ai_chat_summary_lock'
+_LOCK_TIMEOUT = 120  # seconds
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a fitness trainer and their AI assistant.
+
+Update the existing summary with the new messages. Keep facts that later turns may depend on: trainees discussed by name, numbers, decisions, suggestions the trainer accepted or rejected, and open questions. Drop greetings and repetition.
+
+Reply with the updated summary only, in under 250 words."""
+
+
+@dataclass(frozen=True)
+class ConversationMemory:
+    """What a new turn sends to the model as prior conversation."""
+    summary: str
+    messages: list[dict[str, str]]
+    needs_summary: bool
+
+
+def _unsummarized(thread: AIChatThread) -> QuerySet[AIChatMessage]:
+    messages = AIChatMessage.objects.filter(thread=thread)
+    if thread.summary_through_message_id is not None:
+        messages = messages.filter(id__gt=thread.summary_through_message_id)
+    return messages
+
+
+def load_memory(thread: AIChatThread, token_budget: int) -> ConversationMemory:
+    """
+    Load the summary and recent messages for a new turn within ``token_budget``.
+
+    Reads unsummarized messages newest-first until the budget is spent, so
+    turns a lagging fold has not reached yet are still sent while they fit.
+    A fold is due once a full page (VERBATIM_MESSAGES +
+    SUMMARIZE_BATCH_MESSAGES) is unsummarized. Messages are dropped
+    oldest-first; the history always starts with a user message.
+    """
+    page_size = VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES
+    unsummarized = _unsummarized(thread).order_by('-created_at', '-id').values('role', 'content')
+
+    summary = thread.history_summary
+    remaining = token_budget - (estimate_tokens(summary) if summary else 0)
+    recent: list[dict[str, str]] = []
+    seen = 0
+    for msg in unsummarized.iterator(chunk_size=page_size):
+        seen += 1
+        remaining -= estimate_tokens(msg['content'])
+        if remaining < 0:
+            break
+        recent.append({'role': msg['role'], 'content': msg['content']})
+    recent.reverse()
+
+    needs_summary = seen >= page_size or (
+        remaining < 0 and unsummarized[page_size - 1:page_size].exists()
+    )
+
+    while recent and recent[0]['role'] != AIChatMessage.Role.USER:
+        recent.pop(0)
+
+    return ConversationMemory(summary=summary, messages=recent, needs_summary=needs_summary)
+
+
+def update_thread_summary(thread_id: int) -> bool:
+    """
+    Fold messages older than the verbatim window into the thread's summary.
+
+    Returns True if the summary was updated. Runs at most once at a time
+    per thread; a concurrent call returns False immediately.
+    """
+    lock_key = f'{_LOCK_PREFIX}:{thread_id}'
+    if not cache.add(lock_key, 1, timeout=_LOCK_TIMEOUT):
+        return False
+    try:
+        return _fold_older_messages(thread_id)
+    finally:
+        cache.delete(lock_key)
+
+
+def _fold_older_messages(thread_id: int) -> bool:
+    thread = AIChatThread.objects.filter(id=thread_id).first()
+    if thread is None:
+        return False
+
+    unsummarized = _unsummarized(thread)
+    oldest_kept = (
+        unsummarized.order_by('-created_at', '-id')
+        .values_list('id', flat=True)[VERBATIM_MESSAGES - 1:VERBATIM_MESSAGES]
+        .first()
+    )
+    if oldest_kept is None:
+        return False
+    to_fold = list(
+        unsummarized.filter(id__lt=oldest_kept)
+        .order_by('created_at', 'id')
+        .values('id', 'role', 'content')[:MAX_FOLD_MESSAGES]
+    )
+    if not to_fold:
+        return False
+
+    transcript = "\n\n".join(f"[{m['role']}] {m['content']}" for m in to_fold)
+    response = llm_gateway.invoke(
+        [
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=(
+                f"<summary>\n{thread.history_summary or '(none yet)'}\n</summary>\n\n"
+                f"<new_messages>\n{transcript}\n</new_messages>"
+            )),
+        ],
+        config=get_ai_config(),
+        lane=LLMLane.BATCH,
+    ).message
+    content = response.content if isinstance(response.content, str) else response.text()
+    summary = content.strip()[:SUMMARY_MAX_CHARS]
+    if not summary:
+        return False
+
+    updated = AIChatThread.objects.filter(
+        id=thread_id,
+        summary_through_message_id=thread.summary_through_message_id,
+    ).update(
+        history_summary=summary,
+        summary_through_message_id=to_fold[-1]['id'],
+    )
+    return updated == 1
+
+
+def schedule_summary_update(thread_id: int) -> None:
+    """Update the thread's summary in a background thread."""
+    thread = threading.Thread(
+        target=_run_summary_update,
+        args=(thread_id,),
+        daemon=True,
+    )
+    thread.start()
+
+
+def _run_summary_update(thread_id: int) -> None:
+    from django.db import connection
+
+    try:
+        update_thread_summary(thread_id)
+    except Exception:
+        logger.exception("Summarizing AI chat thread %s failed.", thread_id)
+    finally:
+        connection.close()
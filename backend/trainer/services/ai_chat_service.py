@@ -7,16 +7,20 @@ from __future__ import annotations
 
 import logging
 import re
+import time
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Count, QuerySet
-from django.utils import timezone
 
-from trainer.ai_chat import AIChat
+from trainer.ai_chat import AIChat, ChatStream
+from trainer.ai_config import get_ai_config
 from trainer.models import AIChatMessage, AIChatThread
+from trainer.services.ai_chat_memory_service import load_memory, schedule_summary_update
 from users.models import User
 
 logger = logging.getLogger(__name__)
@@ -167,22 +171,40 @@ def get_thread_with_messages(
     return thread
 
 
-def send_message_to_thread(
+@dataclass(frozen=True)
+class _PreparedSend:
+    """State carried from the user-message write to the assistant-message write."""
+    thread: AIChatThread
+    content: str
+    conversation_history: list[dict[str, str]]
+    history_summary: str
+    needs_summary: bool
+    trainee_id: int | None
+    user_message: AIChatMessage
+
+
+def _message_data(message: AIChatMessage) -> AIChatMessageData:
+    return AIChatMessageData(
+        id=message.id,
+        role=message.role,
+        content=message.content,
+        provider=message.provider,
+        model_name=message.model_name,
+        created_at=message.created_at,
+    )
+
+
+def _prepare_send(
     trainer: User,
     thread_id: int,
     content: str,
-    trainee_id: Optional[int] = None,
-) -> SendAIMessageResult:
+    trainee_id: Optional[int],
+) -> _PreparedSend:
     """
-    Send a user message and get an AI response in a thread.
+    Validate the message, load conversation memory, and persist the user message.
 
-    1. Load full history from DB
-    2. Persist user message
-    3. Call AIChat.chat() with history
-    4. Persist assistant message
-    5. Auto-generate title from first user message
-
-    Uses trainee_id param if provided, otherwise falls back to thread's trainee_context.
+    The insert commits on its own so no transaction stays open while the
+    model generates. Raises ValueError for invalid input or unknown threads.
     """
     stripped = content.strip()
     if not stripped:
@@ -200,50 +222,46 @@ def send_message_to_thread(
     except AIChatThread.DoesNotExist:
         raise ValueError('Thread not found.')
 
-    # Determine which trainee to use for context
-    effective_trainee_id = trainee_id or thread.trainee_context_id
+    # Recent turns verbatim plus the rolling summary of older ones
+    memory = load_memory(thread, get_ai_config().history_token_budget)
 
-    # Load existing conversation history
-    existing_messages = list(
-        AIChatMessage.objects.filter(thread=thread)
-        .order_by('created_at')
-        .values('role', 'content')
+    user_msg = AIChatMessage.objects.create(
+        thread=thread,
+        role=AIChatMessage.Role.USER,
+        content=stripped,
     )
 
-    conversation_history = [
-        {'role': msg['role'], 'content': msg['content']}
-        for msg in existing_messages
-    ]
-
-    now = timezone.now()
+    return _PreparedSend(
+        thread=thread,
+        content=stripped,
+        conversation_history=memory.messages,
+        history_summary=memory.summary,
+        needs_summary=memory.needs_summary,
+        # Use trainee_id param if provided, otherwise the thread's trainee_context
+        trainee_id=trainee_id or thread.trainee_context_id,
+        user_message=user_msg,
+    )
 
-    with transaction.atomic():
-        # Persist user message
-        user_msg = AIChatMessage.objects.create(
-            thread=thread,
-            role=AIChatMessage.Role.USER,
-            content=stripped,
-        )
 
-        # Call AI — append instruction so the model includes a follow-up suggestion
-        ai_chat = AIChat(trainer)
-        result = ai_chat.chat(
-            message=stripped + FOLLOWUP_INSTRUCTION,
-            conversation_history=conversation_history,
-            trainee_id=effective_trainee_id,
-        )
+def _discard_user_message(prepared: _PreparedSend) -> None:
+    """Remove an unanswered user message so a retry does not duplicate it."""
+    AIChatMessage.objects.filter(pk=prepared.user_message.pk).delete()
 
-        if result.get('error') and not result.get('response'):
-            raise RuntimeError(f"AI service error: {result['error']}")
 
-        raw_response: str = result.get('response', '')
-        provider: str = result.get('provider', '')
-        model_name: str = result.get('model', '')
-        usage = result.get('usage')
+def _finish_send(
+    prepared: _PreparedSend,
+    raw_response: str,
+    provider: str,
+    model_name: str,
+    usage: dict[str, Any] | None,
+) -> SendAIMessageResult:
+    """Persist the assistant message and update the thread in one short transaction."""
+    thread = prepared.thread
 
-        # Extract the follow-up suggestion before persisting
-        response_content, suggested_followup = _extract_followup(raw_response)
+    # Extract the follow-up suggestion before persisting
+    response_content, suggested_followup = _extract_followup(raw_response)
 
+    with transaction.atomic():
         # Persist assistant message (clean content, without the tag)
         assistant_msg = AIChatMessage.objects.create(
             thread=thread,
@@ -260,36 +278,275 @@ def send_message_to_thread(
 
         # Auto-title from first user message
         if thread.title == 'New conversation':
-            auto_title = stripped[:MAX_TITLE_LENGTH]
-            if len(stripped) > MAX_TITLE_LENGTH:
+            auto_title = prepared.content[:MAX_TITLE_LENGTH]
+            if len(prepared.content) > MAX_TITLE_LENGTH:
                 auto_title = auto_title[:MAX_TITLE_LENGTH - 3] + '...'
             thread.title = auto_title
             update_fields.append('title')
 
         thread.save(update_fields=update_fields)
 
+    if prepared.needs_summary:
+        schedule_summary_update(thread.id)
+
     return SendAIMessageResult(
-        user_message=AIChatMessageData(
-            id=user_msg.id,
-            role=user_msg.role,
-            content=user_msg.content,
-            provider=user_msg.provider,
-            model_name=user_msg.model_name,
-            created_at=user_msg.created_at,
-        ),
-        assistant_message=AIChatMessageData(
-            id=assistant_msg.id,
-            role=assistant_msg.role,
-            content=assistant_msg.content,
-            provider=assistant_msg.provider,
-            model_name=assistant_msg.model_name,
-            created_at=assistant_msg.created_at,
-        ),
+        user_message=_message_data(prepared.user_message),
+        assistant_message=_message_data(assistant_msg),
         thread_title=thread.title,
         suggested_followup=suggested_followup,
     )
 
 
+def send_message_to_thread(
+    trainer: User,
+    thread_id: int,
+    content: str,
+    trainee_id: Optional[int] = None,
+) -> SendAIMessageResult:
+    """
+    Send a user message and get an AI response in a thread.
+
+    1. Load recent turns and the thread summary, persist the user message
+    2. Call AIChat.chat() with that memory, outside any transaction
+    3. Persist assistant message
+    4. Auto-generate title from first user message
+    5. Fold older turns into the summary in the background when due
+
+    If the AI call fails or raises, the user message is removed again.
+    Uses trainee_id param if provided, otherwise falls back to thread's trainee_context.
+    """
+    prepared = _prepare_send(trainer, thread_id, content, trainee_id)
+
+    # Call AI — append instruction so the model includes a follow-up suggestion
+    try:
+        ai_chat = AIChat(trainer)
+        result = ai_chat.chat(
+            message=prepared.content + FOLLOWUP_INSTRUCTION,
+            conversation_history=prepared.conversation_history,
+            trainee_id=prepared.trainee_id,
+            history_summary=prepared.history_summary,
+        )
+    except Exception:
+        _discard_user_message(prepared)
+        raise
+
+    if result.get('error') and not result.get('response'):
+        _discard_user_message(prepared)
+        raise RuntimeError(f"AI service error: {result['error']}")
+
+    return _finish_send(
+        prepared,
+        raw_response=result.get('response', ''),
+        provider=result.get('provider', ''),
+        model_name=result.get('model', ''),
+        usage=result.get('usage'),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+_CANCEL_CACHE_PREFIX = 'ai_chat_cancel'
+_CANCEL_TIMEOUT = 300  # 5 minutes
+CANCEL_POLL_INTERVAL_SECONDS = 0.5
+
+FOLLOWUP_OPEN_TAG = '<suggested_followup>'
+
+
+@dataclass(frozen=True)
+class AIChatStreamEvent:
+    """One event of a streamed reply.
+
+    kinds:
+    - user_message: data is AIChatMessageData (the persisted user message)
+    - token: data is the next chunk of visible text (str)
+    - done: data is SendAIMessageResult; its assistant content is authoritative
+    - cancelled: data is SendAIMessageResult for a partial reply, or None
+    - error: data is a client-safe message (str)
+    """
+    kind: str
+    data: Any
+
+
+class _FollowupFilter:
+    """Hides the trailing <suggested_followup> tag from streamed text."""
+
+    def __init__(self) -> None:
+        self._pending = ''
+        self._in_tag = False
+
+    def feed(self, text: str) -> str:
+        if self._in_tag:
+            return ''
+        self._pending += text
+        index = self._pending.find(FOLLOWUP_OPEN_TAG)
+        if index != -1:
+            self._in_tag = True
+            visible, self._pending = self._pending[:index], ''
+            return visible
+        # Hold back a suffix that could still become the opening tag
+        for keep in range(min(len(FOLLOWUP_OPEN_TAG) - 1, len(self._pending)), 0, -1):
+            if FOLLOWUP_OPEN_TAG.startswith(self._pending[-keep:]):
+                visible, self._pending = self._pending[:-keep], self._pending[-keep:]
+                return visible
+        visible, self._pending = self._pending, ''
+        return visible
+
+    def flush(self) -> str:
+        visible = '' if self._in_tag else self._pending
+        self._pending = ''
+        return visible
+
+
+def _cancel_key(thread_id: int) -> str:
+    return f'{_CANCEL_CACHE_PREFIX}:{thread_id}'
+
+
+def request_stream_cancel(trainer: User, thread_id: int) -> None:
+    """
+    Ask the reply currently streaming into a thread to stop.
+
+    Raises ValueError if thread not found.
+    """
+    if not AIChatThread.objects.filter(
+        id=thread_id,
+        trainer=trainer,
+        is_deleted=False,
+    ).exists():
+        raise ValueError('Thread not found.')
+    cache.set(_cancel_key(thread_id), True, timeout=_CANCEL_TIMEOUT)
+
+
+class AIChatStreamSession:
+    """
+    A user message that has been persisted and whose reply is streamed.
+
+    Created by start_streamed_message(); iterate ``events()`` to run the
+    model. No transaction is open while tokens arrive. When the reply ends
+    the assistant message is written in one short transaction. A cancelled
+    reply (via request_stream_cancel() or the client disconnecting) keeps
+    whatever text had arrived, marked ``usage_metadata.cancelled``; if
+    nothing had arrived, or the model failed, the user message is removed
+    as in send_message_to_thread().
+    """
+
+    def __init__(self, trainer: User, prepared: _PreparedSend) -> None:
+        self._trainer = trainer
+        self._prepared = prepared
+        self._cancel_checked_at = 0.0
+
+    @property
+    def user_message(self) -> AIChatMessageData:
+        return _message_data(self._prepared.user_message)
+
+    def _cancel_requested(self) -> bool:
+        now = time.monotonic()
+        if now - self._cancel_checked_at < CANCEL_POLL_INTERVAL_SECONDS:
+            return False
+        self._cancel_checked_at = now
+        return bool(cache.get(_cancel_key(self._prepared.thread.id)))
+
+    def _settle(
+        self,
+        parts: list[str],
+        stream: ChatStream | None,
+        ai_chat: AIChat,
+        cancelled: bool,
+    ) -> SendAIMessageResult | None:
+        raw_response = ''.join(parts)
+        if cancelled and not raw_response.strip():
+            _discard_user_message(self._prepared)
+            return None
+        usage: dict[str, Any] | None = stream.usage if stream is not None else None
+        if cancelled:
+            usage = {**(usage or {}), 'cancelled': True}
+        return _finish_send(
+            self._prepared,
+            raw_response=raw_response,
+            provider=stream.provider if stream is not None else ai_chat.config.provider.value,
+            model_name=stream.model_name if stream is not None else ai_chat.config.model_name,
+            usage=usage,
+        )
+
+    def events(self) -> Iterator[AIChatStreamEvent]:
+        prepared = self._prepared
+        cache.delete(_cancel_key(prepared.thread.id))
+
+        parts: list[str] = []
+        visible_filter = _FollowupFilter()
+        stream: ChatStream | None = None
+        cancelled = False
+        try:
+            yield AIChatStreamEvent('user_message', self.user_message)
+            ai_chat = AIChat(self._trainer)
+            stream = ai_chat.stream(
+                message=prepared.content + FOLLOWUP_INSTRUCTION,
+                conversation_history=prepared.conversation_history,
+                trainee_id=prepared.trainee_id,
+                history_summary=prepared.history_summary,
+            )
+            for text in stream:
+                parts.append(text)
+                visible = visible_filter.feed(text)
+                if visible:
+                    yield AIChatStreamEvent('token', visible)
+                if self._cancel_requested():
+                    cancelled = True
+                    break
+        except GeneratorExit:
+            # Client went away mid-stream: keep what was generated
+            if stream is None:
+                _discard_user_message(prepared)
+            else:
+                stream.close()
+                self._settle(parts, stream, ai_chat, cancelled=True)
+            raise
+        except Exception:
+            logger.exception(
+                "AI chat stream failed for trainer %s thread %s",
+                self._trainer.id, prepared.thread.id,
+            )
+            if stream is not None:
+                stream.close()
+            _discard_user_message(prepared)
+            yield AIChatStreamEvent(
+                'error', 'AI service is temporarily unavailable. Please try again.',
+            )
+            return
+
+        if cancelled:
+            stream.close()
+            cache.delete(_cancel_key(prepared.thread.id))
+            yield AIChatStreamEvent(
+                'cancelled', self._settle(parts, stream, ai_chat, cancelled=True),
+            )
+            return
+
+        tail = visible_filter.flush()
+        if tail:
+            yield AIChatStreamEvent('token', tail)
+        yield AIChatStreamEvent(
+            'done', self._settle(parts, stream, ai_chat, cancelled=False),
+        )
+
+
+def start_streamed_message(
+    trainer: User,
+    thread_id: int,
+    content: str,
+    trainee_id: Optional[int] = None,
+) -> AIChatStreamSession:
+    """
+    Persist a user message and return a session that streams the reply.
+
+    Validation happens here, so callers can reject bad input (ValueError)
+    before starting a streaming response.
+    """
+    prepared = _prepare_send(trainer, thread_id, content, trainee_id)
+    return AIChatStreamSession(trainer, prepared)
+
+
 def rename_thread(
     trainer: User,
     thread_id: int,
@@ -0,0 +1,339 @@
+"""
+Service for building the trainee and roster context sent with AI chat messages.
+
+Snapshots are assembled with a fixed number of queries however large the
+roster is: one aggregate query for the roster, and one query plus three
+prefetches for a trainee's detail. Each snapshot is cached as JSON-ready
+data under a versioned key. Versions are bumped after commit when a
+relevant row is written (see trainer.signals), so a chat turn never
+rebuilds context that has not changed and never sees context older than
+the last committed write.
+
+build_prompt_context() renders the snapshots into the prompt and trims
+them to a token budget: the trainee detail first loses its oldest daily
+logs and check-ins, then the roster list is shortened, keeping the
+trainees who need attention.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from users.models import User
+
+logger = logging.getLogger(__name__)
+
+_CACHE_PREFIX = 'ai_context'
+CONTEXT_CACHE_TTL: int = 600  # 10 minutes — bounds staleness for un-signalled writes
+CONTEXT_TOKEN_BUDGET: int = 6000
+CHARS_PER_TOKEN: int = 4  # rough estimate, good enough for budgeting
+
+ATTENTION_AFTER_DAYS: int = 3
+RECENT_LOG_DAYS: int = 7
+RECENT_CHECKIN_COUNT: int = 14
+
+
+# ---------------------------------------------------------------------------
+# Versioned cache keys
+# ---------------------------------------------------------------------------
+
+def _roster_version_key(trainer_id: int) -> str:
+    return f'{_CACHE_PREFIX}:version:roster:{trainer_id}'
+
+
+def _trainee_version_key(trainee_id: int) -> str:
+    return f'{_CACHE_PREFIX}:version:trainee:{trainee_id}'
+
+
+def _get_version(version_key: str) -> int:
+    version = cache.get(version_key)
+    if version is None:
+        # add() is a no-op if a concurrent writer created the key first.
+        cache.add(version_key, 1, timeout=None)
+        version = cache.get(version_key, 1)
+    return int(version)
+
+
+def _bump_version(version_key: str) -> None:
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # Key missing (evicted or never read) — any new value invalidates.
+        if not cache.add(version_key, 2, timeout=None):
+            cache.incr(version_key)
+
+
+def invalidate_roster_context(trainer_id: int | None) -> None:
+    """Invalidate a trainer's cached roster context after the current transaction commits."""
+    if trainer_id is None:
+        return
+    transaction.on_commit(lambda: _bump_version(_roster_version_key(trainer_id)))
+
+
+def invalidate_trainee_context(trainee_id: int | None) -> None:
+    """Invalidate a trainee's cached detail context after the current transaction commits."""
+    if trainee_id is None:
+        return
+    transaction.on_commit(lambda: _bump_version(_trainee_version_key(trainee_id)))
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+def _display_name(first_name: str, last_name: str, email: str) -> str:
+    return f"{first_name} {last_name}".strip() or email
+
+
+def _compute_roster(trainer_id: int, today: date) -> dict[str, Any]:
+    from users.models import User
+
+    attention_cutoff = today - timedelta(days=ATTENTION_AFTER_DAYS)
+    rows = (
+        User.objects.filter(parent_trainer_id=trainer_id, role=User.Role.TRAINEE)
+        .annotate(last_activity=Max('activity_summaries__date'))
+        .values('id', 'email', 'first_name', 'last_name', 'date_joined', 'is_active', 'last_activity')
+        .order_by('id')
+    )
+
+    trainees: list[dict[str, Any]] = []
+    total = 0
+    for row in rows:
+        total += 1
+        if not row['is_active']:
+            continue
+        last_activity: date | None = row['last_activity']
+        trainees.append({
+            "id": row['id'],
+            "email": row['email'],
+            "name": _display_name(row['first_name'], row['last_name'], row['email']),
+            "joined": str(row['date_joined'].date()) if row['date_joined'] else None,
+            "needs_attention": last_activity is None or last_activity < attention_cutoff,
+        })
+
+    return {
+        "overview": {
+            "total_trainees": total,
+            "active_trainees": len(trainees),
+            "trainees_needing_attention": sum(1 for t in trainees if t["needs_attention"]),
+            "today": str(today),
+        },
+        "trainees": trainees,
+    }
+
+
+def get_roster_snapshot(trainer: User) -> dict[str, Any]:
+    """
+    Trainer overview and active trainee list, served from cache when fresh.
+
+    Returns ``{"overview": {...}, "trainees": [...]}``.
+    """
+    today = timezone.now().date()
+    key = f'{_CACHE_PREFIX}:roster:{trainer.id}:v{_get_version(_roster_version_key(trainer.id))}:{today}'
+    cached: dict[str, Any] | None = cache.get(key)
+    if cached is not None:
+        return cached
+
+    snapshot = _compute_roster(trainer.id, today)
+    cache.set(key, snapshot, timeout=CONTEXT_CACHE_TTL)
+    return snapshot
+
+
+def _compute_trainee(trainer_id: int, trainee_id: int) -> dict[str, Any] | None:
+    from users.models import User
+    from workouts.models import DailyLog, Program, WeightCheckIn
+
+    trainee = (
+        User.objects.filter(id=trainee_id, parent_trainer_id=trainer_id, role=User.Role.TRAINEE)
+        .select_related('profile', 'nutrition_goal')
+        .prefetch_related(
+            Prefetch(
+                'daily_logs',
+                queryset=DailyLog.objects.order_by('-date')[:RECENT_LOG_DAYS],
+                to_attr='recent_logs',
+            ),
+            Prefetch(
+                'weight_checkins',
+                queryset=WeightCheckIn.objects.order_by('-date')[:RECENT_CHECKIN_COUNT],
+                to_attr='recent_checkins',
+            ),
+            Prefetch(
+                'programs',
+                queryset=Program.objects.filter(is_active=True).order_by('pk')[:1],
+                to_attr='active_programs',
+            ),
+        )
+        .first()
+    )
+    if trainee is None:
+        return None
+
+    summary: dict[str, Any] = {
+        "trainee_id": trainee.id,
+        "email": trainee.email,
+        "name": _display_name(trainee.first_name, trainee.last_name, trainee.email),
+        "is_active": trainee.is_active,
+    }
+
+    try:
+        profile = trainee.profile
+        summary["profile"] = {
+            "sex": profile.sex,
+            "age": profile.age,
+            "height_cm": profile.height_cm,
+            "weight_kg": float(profile.weight_kg) if profile.weight_kg else None,
+            "activity_level": profile.activity_level,
+            "goal": profile.goal,
+            "diet_type": profile.diet_type,
+            "meals_per_day": profile.meals_per_day,
+        }
+    except ObjectDoesNotExist:
+        summary["profile"] = None
+
+    try:
+        goal = trainee.nutrition_goal
+        summary["nutrition_goals"] = {
+            "protein": goal.protein_goal,
+            "carbs": goal.carbs_goal,
+            "fat": goal.fat_goal,
+            "calories": goal.calories_goal,
+        }
+    except ObjectDoesNotExist:
+        summary["nutrition_goals"] = None
+
+    summary["recent_logs"] = [
+        {
+            "date": str(log.date),
+            "nutrition": log.nutrition_data.get("totals", {}) if log.nutrition_data else {},
+            "workout_exercises": len(log.workout_data.get("exercises", [])) if log.workout_data else 0,
+            "steps": log.steps,
+            "sleep_hours": float(log.sleep_hours) if log.sleep_hours else None,
+        }
+        for log in trainee.recent_logs
+    ]
+
+    weights = [(str(c.date), float(c.weight_kg)) for c in trainee.recent_checkins]
+    summary["weight_checkins"] = weights
+    if len(weights) >= 2:
+        summary["weight_change"] = round(weights[0][1] - weights[-1][1], 2)
+
+    if trainee.active_programs:
+        program = trainee.active_programs[0]
+        summary["current_program"] = {
+            "name": program.name,
+            "start_date": str(program.start_date) if program.start_date else None,
+            "end_date": str(program.end_date) if program.end_date else None,
+        }
+
+    return summary
+
+
+def get_trainee_snapshot(trainer: User, trainee_id: int) -> dict[str, Any] | None:
+    """
+    Detailed context for one of the trainer's trainees, served from cache when fresh.
+
+    Returns None if the trainee does not exist or is not on this trainer's roster.
+    """
+    version = _get_version(_trainee_version_key(trainee_id))
+    key = f'{_CACHE_PREFIX}:trainee:{trainer.id}:{trainee_id}:v{version}'
+    cached: dict[str, Any] | None = cache.get(key)
+    if cached is not None:
+        return cached
+
+    snapshot = _compute_trainee(trainer.id, trainee_id)
+    if snapshot is not None:
+        cache.set(key, snapshot, timeout=CONTEXT_CACHE_TTL)
+    return snapshot
+
+
+# ---------------------------------------------------------------------------
+# Prompt rendering
+# ---------------------------------------------------------------------------
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _section(title: str, payload: Any) -> str:
+    return f"## {title}\n{json.dumps(payload, indent=2)}"
+
+
+def _trimmed_trainee(summary: dict[str, Any], max_tokens: int) -> str:
+    """Render trainee detail, dropping the oldest logs and check-ins until it fits."""
+    title = f"Detailed Context for Trainee ID {summary['trainee_id']}"
+    trimmed = dict(summary)
+    text = _section(title, trimmed)
+    while estimate_tokens(text) > max_tokens:
+        if len(trimmed.get("recent_logs", [])) > 1:
+            trimmed["recent_logs"] = trimmed["recent_logs"][:-1]
+        elif len(trimmed.get("weight_checkins", [])) > 2:
+            trimmed["weight_checkins"] = trimmed["weight_checkins"][:-1]
+        else:
+            break
+        text = _section(title, trimmed)
+    return text
+
+
+def _trimmed_roster(trainees: list[dict[str, Any]], max_tokens: int) -> str:
+    """Render the trainee list, keeping attention-first entries until it fits."""
+    ordered = sorted(trainees, key=lambda t: not t["needs_attention"])
+    title = f"Your Trainees ({len(trainees)} total)"
+    text = _section(title, ordered)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # Binary search for the longest prefix that fits.
+    low, high = 0, len(ordered)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(_section(title, ordered[:mid])) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    omitted = len(ordered) - low
+    return (
+        f"{_section(title, ordered[:low])}\n"
+        f"({omitted} more trainees omitted; ask about a trainee by name for details.)"
+    )
+
+
+def build_prompt_context(
+    trainer: User,
+    trainee_id: int | None = None,
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """
+    Render the context block for a chat message within ``token_budget``.
+
+    The trainer overview is always included. The selected trainee's detail
+    takes priority over the roster list, which gets whatever budget remains.
+    """
+    roster = get_roster_snapshot(trainer)
+    overview = _section("Trainer Overview", roster["overview"])
+    remaining = token_budget - estimate_tokens(overview)
+
+    detail = ''
+    if trainee_id:
+        summary = get_trainee_snapshot(trainer, trainee_id)
+        if summary is None:
+            detail = _section(
+                f"Detailed Context for Trainee ID {trainee_id}",
+                {"error": f"Trainee {trainee_id} not found"},
+            )
+        else:
+            detail = _trimmed_trainee(summary, remaining)
+        remaining -= estimate_tokens(detail)
+
+    parts = [overview, _trimmed_roster(roster["trainees"], max(remaining, 0))]
+    if detail:
+        parts.append(detail)
+    return "\n\n".join(parts)
@@ -9,9 +9,8 @@ CSV exports for:
 """
 from __future__ import annotations
 
-import csv
-import io
 import re
+from collections.abc import Iterator
 from datetime import timedelta
 from typing import TYPE_CHECKING, Any
 
@@ -19,7 +18,14 @@ from django.db.models import Q
 from django.utils import timezone
 
 from trainer.models import TraineeActivitySummary
-from trainer.services.export_service import CsvExportResult, _format_date, _safe_str, _sanitize_csv_value
+from trainer.services.export_service import (
+    EXPORT_CHUNK_SIZE,
+    CsvExportResult,
+    CsvExportSpec,
+    _format_date,
+    _safe_str,
+    _sanitize_csv_value,
+)
 from users.models import User
 from workouts.models import DecisionLog, LiftMax, LiftSetLog, WeightCheckIn
 
@@ -42,6 +48,14 @@ def export_decision_logs_csv(
     days: int = 30,
 ) -> CsvExportResult:
     """Export DecisionLog entries visible to this trainer as CSV."""
+    return decision_logs_export(trainer, days).render()
+
+
+def decision_logs_export(
+    trainer: User,
+    days: int = 30,
+) -> CsvExportSpec:
+    """Describe the decision log export (see export_decision_logs_csv)."""
     days = max(1, min(365, days))
     start_date = timezone.now() - timedelta(days=days)
 
@@ -58,33 +72,29 @@ def export_decision_logs_csv(
         .order_by('-timestamp')
     )
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(DECISION_LOG_HEADERS)
-
-    row_count = 0
-    for log in logs:
-        is_reverted = (
-            log.undo_snapshot is not None
-            and log.undo_snapshot.is_reverted
-        )
-        writer.writerow([
-            _format_date(log.timestamp),
-            _safe_str(log.actor_type),
-            _sanitize_csv_value(log.actor.email if log.actor else 'system'),
-            _safe_str(log.decision_type),
-            _safe_str(_summarize_json(log.context)),
-            _safe_str(_summarize_json(log.final_choice)),
-            _safe_str(', '.join(log.reason_codes or [])),
-            'Yes' if is_reverted else 'No',
-        ])
-        row_count += 1
+    def rows() -> Iterator[list[Any]]:
+        for log in logs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            is_reverted = (
+                log.undo_snapshot is not None
+                and log.undo_snapshot.is_reverted
+            )
+            yield [
+                _format_date(log.timestamp),
+                _safe_str(log.actor_type),
+                _sanitize_csv_value(log.actor.email if log.actor else 'system'),
+                _safe_str(log.decision_type),
+                _safe_str(_summarize_json(log.context)),
+                _safe_str(_summarize_json(log.final_choice)),
+                _safe_str(', '.join(log.reason_codes or [])),
+                'Yes' if is_reverted else 'No',
+            ]
 
     today = timezone.now().strftime('%Y-%m-%d')
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f'decision_logs_{today}.csv',
-        row_count=row_count,
+        headers=DECISION_LOG_HEADERS,
+        rows=rows,
+        estimate_rows=logs.count,
     )
 
 
@@ -104,6 +114,15 @@ def export_trainee_workout_csv(
     days: int = 90,
 ) -> CsvExportResult:
     """Export a trainee's workout history as CSV."""
+    return trainee_workout_export(trainer, trainee_id, days).render()
+
+
+def trainee_workout_export(
+    trainer: User,
+    trainee_id: int,
+    days: int = 90,
+) -> CsvExportSpec:
+    """Describe a trainee's workout history export. Raises ValueError if not found."""
     days = max(1, min(365, days))
     trainee = _get_trainee_or_raise(trainer, trainee_id)
     start_date = timezone.now().date() - timedelta(days=days)
@@ -117,34 +136,30 @@ def export_trainee_workout_csv(
         .order_by('-session_date', 'exercise__name', 'set_number')
     )
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(WORKOUT_HISTORY_HEADERS)
-
-    row_count = 0
-    for log in logs:
-        canonical = float(log.canonical_external_load_value or 0)
-        reps = log.completed_reps or 0
-        workload = round(canonical * reps, 1)
-        writer.writerow([
-            str(log.session_date),
-            _sanitize_csv_value(log.exercise.name),
-            log.set_number,
-            str(log.entered_load_value),
-            log.entered_load_unit,
-            reps,
-            str(log.rpe) if log.rpe else '',
-            f'{canonical:.1f}',
-            f'{workload:.1f}',
-        ])
-        row_count += 1
+    def rows() -> Iterator[list[Any]]:
+        for log in logs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            canonical = float(log.canonical_external_load_value or 0)
+            reps = log.completed_reps or 0
+            workload = round(canonical * reps, 1)
+            yield [
+                str(log.session_date),
+                _sanitize_csv_value(log.exercise.name),
+                log.set_number,
+                str(log.entered_load_value),
+                log.entered_load_unit,
+                reps,
+                str(log.rpe) if log.rpe else '',
+                f'{canonical:.1f}',
+                f'{workload:.1f}',
+            ]
 
     today = timezone.now().strftime('%Y-%m-%d')
     trainee_name = _safe_trainee_name(trainee)
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f'workout_history_{trainee_name}_{today}.csv',
-        row_count=row_count,
+        headers=WORKOUT_HISTORY_HEADERS,
+        rows=rows,
+        estimate_rows=logs.count,
     )
 
 
@@ -166,6 +181,15 @@ def export_trainee_nutrition_csv(
     days: int = 90,
 ) -> CsvExportResult:
     """Export a trainee's nutrition/activity history as CSV."""
+    return trainee_nutrition_export(trainer, trainee_id, days).render()
+
+
+def trainee_nutrition_export(
+    trainer: User,
+    trainee_id: int,
+    days: int = 90,
+) -> CsvExportSpec:
+    """Describe a trainee's nutrition history export. Raises ValueError if not found."""
     days = max(1, min(365, days))
     trainee = _get_trainee_or_raise(trainer, trainee_id)
     start_date = timezone.now().date() - timedelta(days=days)
@@ -178,34 +202,30 @@ def export_trainee_nutrition_csv(
         .order_by('-date')
     )
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(NUTRITION_HISTORY_HEADERS)
-
-    row_count = 0
-    for s in summaries:
-        writer.writerow([
-            str(s.date),
-            'Yes' if s.logged_food else 'No',
-            'Yes' if s.logged_workout else 'No',
-            s.calories_consumed,
-            s.protein_consumed,
-            s.carbs_consumed,
-            s.fat_consumed,
-            'Yes' if s.hit_protein_goal else 'No',
-            'Yes' if s.hit_calorie_goal else 'No',
-            s.sleep_hours,
-            s.steps,
-            s.total_volume,
-        ])
-        row_count += 1
+    def rows() -> Iterator[list[Any]]:
+        for s in summaries.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [
+                str(s.date),
+                'Yes' if s.logged_food else 'No',
+                'Yes' if s.logged_workout else 'No',
+                s.calories_consumed,
+                s.protein_consumed,
+                s.carbs_consumed,
+                s.fat_consumed,
+                'Yes' if s.hit_protein_goal else 'No',
+                'Yes' if s.hit_calorie_goal else 'No',
+                s.sleep_hours,
+                s.steps,
+                s.total_volume,
+            ]
 
     today = timezone.now().strftime('%Y-%m-%d')
     trainee_name = _safe_trainee_name(trainee)
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f'nutrition_history_{trainee_name}_{today}.csv',
-        row_count=row_count,
+        headers=NUTRITION_HISTORY_HEADERS,
+        rows=rows,
+        estimate_rows=summaries.count,
     )
 
 
@@ -224,16 +244,24 @@ def export_trainee_progress_csv(
     days: int = 180,
 ) -> CsvExportResult:
     """Export a trainee's progress data: weight check-ins + e1RM history."""
+    return trainee_progress_export(trainer, trainee_id, days).render()
+
+
+def trainee_progress_export(
+    trainer: User,
+    trainee_id: int,
+    days: int = 180,
+) -> CsvExportSpec:
+    """
+    Describe a trainee's progress export. Raises ValueError if not found.
+
+    e1RM entries live in a JSON history per lift, so the row estimate
+    counts check-ins and tracked lifts rather than individual entries.
+    """
     days = max(1, min(365, days))
     trainee = _get_trainee_or_raise(trainer, trainee_id)
     start_date = timezone.now().date() - timedelta(days=days)
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(PROGRESS_HEADERS)
-
-    row_count = 0
-
     # Weight check-ins
     checkins = (
         WeightCheckIn.objects.filter(
@@ -242,44 +270,46 @@ def export_trainee_progress_csv(
         )
         .order_by('-date')
     )
-    for wc in checkins:
-        writer.writerow([
-            str(wc.date),
-            'Weight Check-in',
-            '',
-            str(wc.weight_kg),
-            'kg',
-            _sanitize_csv_value(wc.notes) if wc.notes else '',
-        ])
-        row_count += 1
 
     # e1RM history from LiftMax
     lift_maxes = (
         LiftMax.objects.filter(trainee=trainee)
         .select_related('exercise')
     )
-    start_str = str(start_date)
-    for lm in lift_maxes:
-        history = lm.e1rm_history or []
-        for entry in history:
-            entry_date = entry.get('date', '')
-            if entry_date and entry_date >= start_str:
-                writer.writerow([
-                    entry_date,
-                    'e1RM',
-                    _sanitize_csv_value(lm.exercise.name),
-                    entry.get('value', ''),
-                    'kg',
-                    '',
-                ])
-                row_count += 1
+
+    def rows() -> Iterator[list[Any]]:
+        for wc in checkins.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [
+                str(wc.date),
+                'Weight Check-in',
+                '',
+                str(wc.weight_kg),
+                'kg',
+                _sanitize_csv_value(wc.notes) if wc.notes else '',
+            ]
+
+        start_str = str(start_date)
+        for lm in lift_maxes.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            history = lm.e1rm_history or []
+            for entry in history:
+                entry_date = entry.get('date', '')
+                if entry_date and entry_date >= start_str:
+                    yield [
+                        entry_date,
+                        'e1RM',
+                        _sanitize_csv_value(lm.exercise.name),
+                        entry.get('value', ''),
+                        'kg',
+                        '',
+                    ]
 
     today = timezone.now().strftime('%Y-%m-%d')
     trainee_name = _safe_trainee_name(trainee)
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f'progress_{trainee_name}_{today}.csv',
-        row_count=row_count,
+        headers=PROGRESS_HEADERS,
+        rows=rows,
+        estimate_rows=lambda: checkins.count() + lift_maxes.count(),
     )
 
 
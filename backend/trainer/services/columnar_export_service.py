@@ -0,0 +1,260 @@
+"""
+Columnar (Parquet) exports of trainee training and nutrition data.
+
+Companion to export_service for analysis workloads: months of LiftSetLog,
+DailyLog and MealLogEntry rows for one trainee or a trainer's whole roster.
+Columns are typed (dates, decimals, nullable integers), repeated strings
+such as exercise and food names are dictionary-encoded, and files are
+zstd-compressed.
+
+Rows are read from a server-side cursor and written one row group at a
+time, so memory is bounded by PARQUET_ROW_GROUP_SIZE regardless of the
+export's size. Like CSV exports, large ones run as background jobs (see
+export_job_service).
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import IO, Any, ClassVar
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db.models import F, QuerySet, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from trainer.services.audit_export_service import _safe_trainee_name
+from users.models import User
+from workouts.models import DailyLog, LiftSetLog, MealLogEntry
+
+PARQUET_ROW_GROUP_SIZE: int = 50_000
+MAX_PARQUET_DAYS: int = 365
+PARQUET_COMPRESSION: str = 'zstd'
+
+_NAME = pa.dictionary(pa.int32(), pa.string())
+
+
+@dataclass(frozen=True)
+class _Column:
+    """One output column: its Arrow type and the ``values()`` lookup it reads."""
+    name: str
+    type: pa.DataType
+    source: str
+    convert: Callable[[Any], Any] | None = None
+
+
+def _to_float(value: Any) -> float | None:
+    """Coerce a JSON number (or numeric string) to float; anything else is null."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+LIFT_SET_COLUMNS: tuple[_Column, ...] = (
+    _Column('trainee_id', pa.int64(), 'trainee_id'),
+    _Column('session_date', pa.date32(), 'session_date'),
+    _Column('exercise_id', pa.int64(), 'exercise_id'),
+    _Column('exercise', _NAME, 'exercise__name'),
+    _Column('set_number', pa.int32(), 'set_number'),
+    _Column('set_type', _NAME, 'set_type'),
+    _Column('entered_load_value', pa.decimal128(8, 2), 'entered_load_value'),
+    _Column('entered_load_unit', _NAME, 'entered_load_unit'),
+    _Column('load_entry_mode', _NAME, 'load_entry_mode'),
+    _Column('canonical_load_value', pa.decimal128(8, 2), 'canonical_external_load_value'),
+    _Column('canonical_load_unit', _NAME, 'canonical_external_load_unit'),
+    _Column('completed_reps', pa.int32(), 'completed_reps'),
+    _Column('completed_time_seconds', pa.int32(), 'completed_time_seconds'),
+    _Column('completed_distance_meters', pa.decimal128(8, 2), 'completed_distance_meters'),
+    _Column('rpe', pa.decimal128(3, 1), 'rpe'),
+    _Column('standardization_pass', pa.bool_(), 'standardization_pass'),
+    _Column('workload_eligible', pa.bool_(), 'workload_eligible'),
+    _Column('set_workload_value', pa.decimal128(12, 2), 'set_workload_value'),
+    _Column('set_workload_unit', _NAME, 'set_workload_unit'),
+)
+
+DAILY_LOG_COLUMNS: tuple[_Column, ...] = (
+    _Column('trainee_id', pa.int64(), 'trainee_id'),
+    _Column('date', pa.date32(), 'date'),
+    _Column('calories', pa.float64(), 'nutrition_data__totals__calories', _to_float),
+    _Column('protein', pa.float64(), 'nutrition_data__totals__protein', _to_float),
+    _Column('carbs', pa.float64(), 'nutrition_data__totals__carbs', _to_float),
+    _Column('fat', pa.float64(), 'nutrition_data__totals__fat', _to_float),
+    _Column('steps', pa.int32(), 'steps'),
+    _Column('sleep_hours', pa.float32(), 'sleep_hours'),
+    _Column('resting_heart_rate', pa.int32(), 'resting_heart_rate'),
+    _Column('recovery_score', pa.int16(), 'recovery_score'),
+)
+
+MEAL_ENTRY_COLUMNS: tuple[_Column, ...] = (
+    _Column('trainee_id', pa.int64(), 'meal_log__trainee_id'),
+    _Column('date', pa.date32(), 'meal_log__date'),
+    _Column('meal_number', pa.int8(), 'meal_log__meal_number'),
+    _Column('meal_name', _NAME, 'meal_log__meal_name'),
+    _Column('food_item_id', pa.int64(), 'food_item_id'),
+    _Column('food', _NAME, 'food_name'),
+    _Column('quantity', pa.float64(), 'quantity'),
+    _Column('serving_unit', _NAME, 'serving_unit'),
+    _Column('calories', pa.int32(), 'calories'),
+    _Column('protein', pa.float64(), 'protein'),
+    _Column('carbs', pa.float64(), 'carbs'),
+    _Column('fat', pa.float64(), 'fat'),
+    _Column('fat_mode', _NAME, 'fat_mode'),
+    _Column('logged_at', pa.timestamp('us', tz='UTC'), 'created_at'),
+)
+
+
+@dataclass(frozen=True)
+class ParquetExportSpec:
+    """A Parquet export that has not been written yet."""
+    filename: str
+    columns: tuple[_Column, ...]
+    queryset: QuerySet[Any]
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE
+
+    content_type: ClassVar[str] = 'application/vnd.apache.parquet'
+    content_encoding: ClassVar[str | None] = None
+
+    @property
+    def schema(self) -> pa.Schema:
+        return pa.schema([pa.field(c.name, c.type) for c in self.columns])
+
+    def estimate_rows(self) -> int:
+        return self.queryset.count()
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """Yield record batches of up to ``row_group_size`` rows from a server-side cursor."""
+        rows = self.queryset.values_list(
+            *(c.source for c in self.columns),
+        ).iterator(chunk_size=self.row_group_size)
+
+        chunk: list[tuple[Any, ...]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.row_group_size:
+                yield self._to_batch(chunk)
+                chunk = []
+        if chunk:
+            yield self._to_batch(chunk)
+
+    def write(self, fileobj: IO[bytes], on_rows: Callable[[int], None]) -> None:
+        """Write the export as zstd-compressed Parquet, one row group per batch."""
+        with pq.ParquetWriter(
+            fileobj,
+            self.schema,
+            compression=PARQUET_COMPRESSION,
+        ) as writer:
+            for batch in self.iter_batches():
+                writer.write_batch(batch, row_group_size=self.row_group_size)
+                on_rows(batch.num_rows)
+
+    def _to_batch(self, chunk: list[tuple[Any, ...]]) -> pa.RecordBatch:
+        arrays = []
+        for index, column in enumerate(self.columns):
+            values = [row[index] for row in chunk]
+            if column.convert is not None:
+                values = [column.convert(v) for v in values]
+            arrays.append(pa.array(values, type=column.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+# ---------------------------------------------------------------------------
+# Datasets
+# ---------------------------------------------------------------------------
+
+def lift_sets_export(
+    trainer: User,
+    days: int = 90,
+    trainee_id: int | None = None,
+) -> ParquetExportSpec:
+    """Every logged set for one trainee, or the trainer's whole roster."""
+    trainees, label = _resolve_trainees(trainer, trainee_id)
+    queryset = LiftSetLog.objects.filter(
+        trainee__in=trainees,
+        session_date__gte=_start_date(days),
+    ).order_by('trainee_id', 'session_date', 'exercise_id', 'set_number')
+    return ParquetExportSpec(
+        filename=_filename('lift_sets', label),
+        columns=LIFT_SET_COLUMNS,
+        queryset=queryset,
+    )
+
+
+def daily_logs_export(
+    trainer: User,
+    days: int = 90,
+    trainee_id: int | None = None,
+) -> ParquetExportSpec:
+    """Daily nutrition totals and recovery metrics."""
+    trainees, label = _resolve_trainees(trainer, trainee_id)
+    queryset = DailyLog.objects.filter(
+        trainee__in=trainees,
+        date__gte=_start_date(days),
+    ).order_by('trainee_id', 'date')
+    return ParquetExportSpec(
+        filename=_filename('daily_logs', label),
+        columns=DAILY_LOG_COLUMNS,
+        queryset=queryset,
+    )
+
+
+def meal_entries_export(
+    trainer: User,
+    days: int = 90,
+    trainee_id: int | None = None,
+) -> ParquetExportSpec:
+    """Individual food entries with their meal and computed macros."""
+    trainees, label = _resolve_trainees(trainer, trainee_id)
+    queryset = (
+        MealLogEntry.objects.filter(
+            meal_log__trainee__in=trainees,
+            meal_log__date__gte=_start_date(days),
+        )
+        .annotate(food_name=Coalesce(F('food_item__name'), NullIf(F('custom_name'), Value(''))))
+        .order_by('meal_log__trainee_id', 'meal_log__date', 'meal_log__meal_number', 'created_at')
+    )
+    return ParquetExportSpec(
+        filename=_filename('meal_entries', label),
+        columns=MEAL_ENTRY_COLUMNS,
+        queryset=queryset,
+    )
+
+
+PARQUET_DATASETS: dict[str, Callable[..., ParquetExportSpec]] = {
+    'lift-sets': lift_sets_export,
+    'daily-logs': daily_logs_export,
+    'meal-entries': meal_entries_export,
+}
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _resolve_trainees(
+    trainer: User,
+    trainee_id: int | None,
+) -> tuple[QuerySet[User, int], str]:
+    """Trainees in scope and a filename label. Raises ValueError for a foreign trainee."""
+    trainees = User.objects.filter(parent_trainer=trainer, role='TRAINEE')
+    if trainee_id is None:
+        return trainees.values_list('id', flat=True), 'roster'
+
+    trainee = trainees.filter(pk=trainee_id).first()
+    if trainee is None:
+        raise ValueError('Trainee not found.')
+    return trainees.filter(pk=trainee_id).values_list('id', flat=True), _safe_trainee_name(trainee)
+
+
+def _start_date(days: int) -> date:
+    days = max(1, min(MAX_PARQUET_DAYS, days))
+    return timezone.now().date() - timedelta(days=days)
+
+
+def _filename(dataset: str, label: str) -> str:
+    today = timezone.now().strftime('%Y-%m-%d')
+    return f'{dataset}_{label}_{today}.parquet'
@@ -8,9 +8,16 @@ Computes cross-metric correlations and pattern detection for trainers:
 - Workout consistency ↔ nutrition logging
 - Exercise-specific progression patterns
 - Cohort analysis (high vs low adherence)
+
+Per-trainee metrics for a window are laid out once as a (trainee x metric)
+NumPy matrix, from which the full correlation matrix, p-values and cohort
+splits are computed without per-trainee loops. The matrix is cached per
+trainer, roster and window, so cohort drill-downs with a different
+threshold do not touch the database.
 """
 from __future__ import annotations
 
+import hashlib
 import math
 from collections import defaultdict
 from dataclasses import dataclass, field
@@ -18,6 +25,8 @@ from datetime import date, timedelta
 from decimal import Decimal
 from typing import Any
 
+import numpy as np
+from django.core.cache import cache
 from django.db.models import Avg, Count, F, Q, Sum
 from django.db.models.functions import TruncWeek
 from django.utils import timezone
@@ -26,6 +35,36 @@ from trainer.models import TraineeActivitySummary
 from users.models import User
 from workouts.models import LiftMax, LiftSetLog, WeightCheckIn
 
+_CACHE_PREFIX = 'correlation_matrix'
+MATRIX_CACHE_TTL: int = 300  # 5 minutes
+
+# Columns of the per-trainee metric matrix.
+MATRIX_COLUMNS: tuple[str, ...] = (
+    'total_days',
+    'food_logging_pct',
+    'workout_logging_pct',
+    'protein_adherence_pct',
+    'calorie_adherence_pct',
+    'activity_adherence_pct',
+    'avg_sleep_hours',
+    'avg_daily_volume',
+    'avg_weekly_volume',
+    'weekly_volume_total',
+    'strength_weeks',
+)
+_COL = {name: i for i, name in enumerate(MATRIX_COLUMNS)}
+
+# Metrics included in the full correlation matrix.
+CORRELATION_METRICS: tuple[str, ...] = (
+    'food_logging_pct',
+    'workout_logging_pct',
+    'protein_adherence_pct',
+    'calorie_adherence_pct',
+    'avg_sleep_hours',
+    'avg_daily_volume',
+    'avg_weekly_volume',
+)
+
 
 # ---------------------------------------------------------------------------
 # Dataclasses
@@ -39,6 +78,7 @@ class CorrelationPoint:
     correlation: float  # Pearson r: -1 to 1
     sample_size: int
     interpretation: str  # "strong_positive", "moderate_positive", "weak", etc.
+    p_value: float  # two-sided, H0: r == 0
 
 
 @dataclass(frozen=True)
@@ -76,6 +116,15 @@ class ExerciseProgression:
     trend: str  # "gaining", "plateau", "declining"
 
 
+@dataclass(frozen=True)
+class CorrelationMatrix:
+    """Pairwise Pearson r and p-values between CORRELATION_METRICS."""
+    metrics: list[str]
+    coefficients: list[list[float]]
+    p_values: list[list[float]]
+    sample_size: int
+
+
 @dataclass(frozen=True)
 class CorrelationOverview:
     """Full correlation analytics for a trainer."""
@@ -83,6 +132,15 @@ class CorrelationOverview:
     correlations: list[CorrelationPoint]
     insights: list[TraineeInsight]
     cohort_comparisons: list[CohortComparison]
+    correlation_matrix: CorrelationMatrix | None = None
+
+
+@dataclass(frozen=True)
+class _MetricMatrix:
+    """Per-trainee metrics for one window (rows follow ``trainee_ids``)."""
+    trainee_ids: np.ndarray  # (n,) int64, sorted
+    values: np.ndarray  # (n, len(MATRIX_COLUMNS)) float64
+    sleep_next_volume: np.ndarray  # (m, 2): sleep_hours, next summary's volume
 
 
 @dataclass(frozen=True)
@@ -130,23 +188,26 @@ def get_correlation_overview(
     # Gather data
     summaries = _get_activity_summaries(trainee_ids, start_date)
     strength_data = _get_strength_data(trainee_ids, start_date)
+    matrix = _get_metric_matrix(
+        trainer.pk, trainee_ids, days, start_date,
+        summaries=summaries, strength_data=strength_data,
+    )
 
     # Compute correlations
-    correlations = _compute_correlations(summaries, strength_data, trainee_ids)
+    correlations = _compute_correlations(matrix)
 
     # Generate insights
     insights = _generate_insights(summaries, strength_data, trainee_ids, trainees)
 
     # Cohort comparison
-    cohort_comparisons = _compute_cohort_comparisons(
-        summaries, strength_data, trainee_ids,
-    )
+    cohort_comparisons = _compute_cohort_comparisons(matrix)
 
     return CorrelationOverview(
         period_days=days,
         correlations=correlations,
         insights=insights,
         cohort_comparisons=cohort_comparisons,
+        correlation_matrix=_compute_correlation_matrix(matrix),
     )
 
 
@@ -220,12 +281,8 @@ def get_cohort_analysis(
     if not trainee_ids:
         return []
 
-    summaries = _get_activity_summaries(trainee_ids, start_date)
-    strength_data = _get_strength_data(trainee_ids, start_date)
-
-    return _compute_cohort_comparisons(
-        summaries, strength_data, trainee_ids, threshold=threshold,
-    )
+    matrix = _get_metric_matrix(trainer.pk, trainee_ids, days, start_date)
+    return _compute_cohort_comparisons(matrix, threshold=threshold)
 
 
 # ---------------------------------------------------------------------------
@@ -289,27 +346,191 @@ def _get_strength_data(
     return dict(result)
 
 
+def _build_metric_matrix(
+    trainee_ids: list[int],
+    summaries: dict[int, list[dict[str, Any]]],
+    strength_data: dict[int, list[dict[str, Any]]],
+) -> _MetricMatrix:
+    """Lay out per-trainee window metrics as one (trainee x metric) matrix."""
+    ids = np.asarray(sorted(trainee_ids), dtype=np.int64)
+    n = len(ids)
+
+    # Summary rows stay ordered by (trainee, date) for the next-day pairs
+    rows = [row for tid in ids.tolist() for row in summaries.get(tid, ())]
+    m = len(rows)
+    idx = np.searchsorted(ids, np.fromiter((r['trainee_id'] for r in rows), np.int64, m))
+
+    def column(name: str, dtype: type = np.float64) -> np.ndarray:
+        return np.fromiter((r[name] or 0 for r in rows), dtype, m)
+
+    def per_trainee(weights: np.ndarray) -> np.ndarray:
+        return np.bincount(idx, weights=weights.astype(np.float64), minlength=n)
+
+    food = column('logged_food', bool)
+    workout = column('logged_workout', bool)
+    sleep = column('sleep_hours')
+    volume = column('total_volume')
+
+    total_days = np.bincount(idx, minlength=n).astype(np.float64)
+    safe_days = np.maximum(total_days, 1.0)
+
+    def pct(mask: np.ndarray) -> np.ndarray:
+        return per_trainee(mask) / safe_days * 100.0
+
+    def mean_of_positive(values: np.ndarray) -> np.ndarray:
+        count = per_trainee(values > 0)
+        return np.where(count > 0, per_trainee(values) / np.maximum(count, 1.0), 0.0)
+
+    week_rows = [
+        (tid, week['total_volume'])
+        for tid in ids.tolist()
+        for week in strength_data.get(tid, ())
+    ]
+    w = len(week_rows)
+    week_idx = np.searchsorted(ids, np.fromiter((r[0] for r in week_rows), np.int64, w))
+    week_volume = np.fromiter((r[1] for r in week_rows), np.float64, w)
+    weekly_total = np.bincount(week_idx, weights=week_volume, minlength=n)
+    weeks = np.bincount(week_idx, minlength=n).astype(np.float64)
+
+    values = np.column_stack([
+        total_days,
+        pct(food),
+        pct(workout),
+        pct(column('hit_protein_goal', bool)),
+        pct(column('hit_calorie_goal', bool)),
+        pct(food | workout),
+        mean_of_positive(sleep),
+        mean_of_positive(volume),
+        np.where(weeks > 0, weekly_total / np.maximum(weeks, 1.0), 0.0),
+        weekly_total,
+        weeks,
+    ]) if n else np.zeros((0, len(MATRIX_COLUMNS)))
+
+    # Sleep on one logged day vs volume on the trainee's next logged day
+    next_mask = (idx[:-1] == idx[1:]) & (sleep[:-1] > 0) & (volume[1:] > 0)
+    sleep_next_volume = np.column_stack([sleep[:-1][next_mask], volume[1:][next_mask]])
+
+    return _MetricMatrix(
+        trainee_ids=ids,
+        values=values,
+        sleep_next_volume=sleep_next_volume,
+    )
+
+
+def _matrix_cache_key(
+    trainer_id: int,
+    trainee_ids: list[int],
+    days: int,
+    start_date: date,
+) -> str:
+    roster = hashlib.blake2b(
+        ','.join(map(str, sorted(trainee_ids))).encode(), digest_size=8,
+    ).hexdigest()
+    return f'{_CACHE_PREFIX}:{trainer_id}:{days}:{start_date.isoformat()}:{roster}'
+
+
+def _get_metric_matrix(
+    trainer_id: int,
+    trainee_ids: list[int],
+    days: int,
+    start_date: date,
+    *,
+    summaries: dict[int, list[dict[str, Any]]] | None = None,
+    strength_data: dict[int, list[dict[str, Any]]] | None = None,
+) -> _MetricMatrix:
+    """
+    Return the cached metric matrix for this trainer, roster and window.
+
+    On a miss the matrix is built from ``summaries`` / ``strength_data`` if
+    the caller already fetched them, otherwise they are queried here.
+    """
+    key = _matrix_cache_key(trainer_id, trainee_ids, days, start_date)
+    matrix: _MetricMatrix | None = cache.get(key)
+    if matrix is not None:
+        return matrix
+
+    if summaries is None:
+        summaries = _get_activity_summaries(trainee_ids, start_date)
+    if strength_data is None:
+        strength_data = _get_strength_data(trainee_ids, start_date)
+    matrix = _build_metric_matrix(trainee_ids, summaries, strength_data)
+    cache.set(key, matrix, timeout=MATRIX_CACHE_TTL)
+    return matrix
+
+
 # ---------------------------------------------------------------------------
 # Correlation computation
 # ---------------------------------------------------------------------------
 
-def _pearson_r(xs: list[float], ys: list[float]) -> float:
-    """Compute Pearson correlation coefficient. Returns 0 if insufficient data."""
-    n = len(xs)
-    if n < 3 or n != len(ys):
-        return 0.0
+def _correlation_coefficients(samples: np.ndarray) -> np.ndarray:
+    """
+    Pearson r between every pair of columns of an (n x k) sample matrix.
 
-    mean_x = sum(xs) / n
-    mean_y = sum(ys) / n
+    Pairs involving a constant column get r = 0.
+    """
+    centered = samples - samples.mean(axis=0)
+    cov = centered.T @ centered
+    std = np.sqrt(np.diag(cov))
+    denom = np.outer(std, std)
+    r = np.divide(cov, denom, out=np.zeros_like(cov), where=denom > 0)
+    return np.clip(r, -1.0, 1.0)
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 201):
+        m2 = 2 * m
+        for num in (
+            m * (b - m) * x / ((a - 1.0 + m2) * (a + m2)),
+            -(a + m) * (a + b + m) * x / ((a + m2) * (a + 1.0 + m2)),
+        ):
+            d = 1.0 + num * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + num / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 3e-14:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(
+        math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+        + a * math.log(x) + b * math.log1p(-x)
+    )
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
 
-    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
-    std_x = math.sqrt(sum((x - mean_x) ** 2 for x in xs))
-    std_y = math.sqrt(sum((y - mean_y) ** 2 for y in ys))
 
-    if std_x == 0 or std_y == 0:
+def _p_value(r: float, n: int) -> float:
+    """Two-sided p-value for Pearson r on n samples (Student's t, n - 2 df)."""
+    if n < 3:
+        return 1.0
+    if abs(r) >= 1.0:
         return 0.0
+    df = n - 2
+    # P(|T| > t) with t^2 = r^2 df / (1 - r^2) reduces to I_{1-r^2}(df/2, 1/2)
+    return _betainc(df / 2.0, 0.5, 1.0 - r * r)
+
 
-    return cov / (std_x * std_y)
+def _pearson_r(xs: list[float], ys: list[float]) -> float:
+    """Compute Pearson correlation coefficient. Returns 0 if insufficient data."""
+    n = len(xs)
+    if n < 3 or n != len(ys):
+        return 0.0
+    return float(_correlation_coefficients(np.column_stack([xs, ys]))[0, 1])
 
 
 def _interpret_r(r: float) -> str:
@@ -324,104 +545,73 @@ def _interpret_r(r: float) -> str:
     return "weak"
 
 
-def _compute_correlations(
-    summaries: dict[int, list[dict[str, Any]]],
-    strength_data: dict[int, list[dict[str, Any]]],
-    trainee_ids: list[int],
-) -> list[CorrelationPoint]:
-    """Compute cross-metric correlations across all trainees."""
-    results: list[CorrelationPoint] = []
+def _correlation_point(
+    metric_a: str,
+    metric_b: str,
+    r: float,
+    sample_size: int,
+) -> CorrelationPoint:
+    return CorrelationPoint(
+        metric_a=metric_a,
+        metric_b=metric_b,
+        correlation=round(r, 3),
+        sample_size=sample_size,
+        interpretation=_interpret_r(r),
+        p_value=round(_p_value(r, sample_size), 4),
+    )
 
-    # 1. Protein adherence ↔ weekly volume
-    protein_rates: list[float] = []
-    volume_avgs: list[float] = []
-    for tid in trainee_ids:
-        days = summaries.get(tid, [])
-        if not days:
-            continue
-        protein_rate = sum(1 for d in days if d.get('hit_protein_goal')) / len(days) * 100
-        weeks = strength_data.get(tid, [])
-        if weeks:
-            avg_vol = sum(w['total_volume'] for w in weeks) / len(weeks)
-        else:
-            avg_vol = 0
-        protein_rates.append(protein_rate)
-        volume_avgs.append(avg_vol)
-
-    if len(protein_rates) >= 3:
-        r = _pearson_r(protein_rates, volume_avgs)
-        results.append(CorrelationPoint(
-            metric_a='protein_adherence_pct',
-            metric_b='avg_weekly_volume',
-            correlation=round(r, 3),
-            sample_size=len(protein_rates),
-            interpretation=_interpret_r(r),
-        ))
 
-    # 2. Calorie adherence ↔ workout consistency
-    cal_rates: list[float] = []
-    workout_rates: list[float] = []
-    for tid in trainee_ids:
-        days = summaries.get(tid, [])
-        if not days:
-            continue
-        cal_rate = sum(1 for d in days if d.get('hit_calorie_goal')) / len(days) * 100
-        wo_rate = sum(1 for d in days if d.get('logged_workout')) / len(days) * 100
-        cal_rates.append(cal_rate)
-        workout_rates.append(wo_rate)
-
-    if len(cal_rates) >= 3:
-        r = _pearson_r(cal_rates, workout_rates)
-        results.append(CorrelationPoint(
-            metric_a='calorie_adherence_pct',
-            metric_b='workout_consistency_pct',
-            correlation=round(r, 3),
-            sample_size=len(cal_rates),
-            interpretation=_interpret_r(r),
-        ))
+def _compute_correlation_matrix(matrix: _MetricMatrix) -> CorrelationMatrix | None:
+    """Full correlation / p-value matrix over trainees with logged days."""
+    active = matrix.values[matrix.values[:, _COL['total_days']] > 0]
+    n = len(active)
+    if n < 3:
+        return None
+
+    cols = [_COL[name] for name in CORRELATION_METRICS]
+    r = _correlation_coefficients(active[:, cols])
+    p = [[_p_value(float(v), n) for v in row] for row in r.tolist()]
+    return CorrelationMatrix(
+        metrics=list(CORRELATION_METRICS),
+        coefficients=[[round(v, 3) for v in row] for row in r.tolist()],
+        p_values=[[round(v, 4) for v in row] for row in p],
+        sample_size=n,
+    )
+
+
+def _compute_correlations(matrix: _MetricMatrix) -> list[CorrelationPoint]:
+    """Compute the headline cross-metric correlations across all trainees."""
+    results: list[CorrelationPoint] = []
+    active = matrix.values[matrix.values[:, _COL['total_days']] > 0]
+    n = len(active)
+
+    # Trainee-level pairs: (metric_a, matrix column, metric_b, matrix column)
+    pairs = [
+        # 1. Protein adherence ↔ weekly volume
+        ('protein_adherence_pct', 'protein_adherence_pct', 'avg_weekly_volume', 'avg_weekly_volume'),
+        # 2. Calorie adherence ↔ workout consistency
+        ('calorie_adherence_pct', 'calorie_adherence_pct', 'workout_consistency_pct', 'workout_logging_pct'),
+    ]
+    if n >= 3:
+        r = _correlation_coefficients(active)
+        for metric_a, col_a, metric_b, col_b in pairs:
+            results.append(_correlation_point(
+                metric_a, metric_b, float(r[_COL[col_a], _COL[col_b]]), n,
+            ))
 
     # 3. Sleep ↔ next-day volume
-    sleep_vals: list[float] = []
-    next_vol_vals: list[float] = []
-    for tid in trainee_ids:
-        days = summaries.get(tid, [])
-        for i in range(len(days) - 1):
-            sleep = days[i].get('sleep_hours')
-            next_vol = days[i + 1].get('total_volume')
-            if sleep and next_vol:
-                sleep_vals.append(float(sleep))
-                next_vol_vals.append(float(next_vol))
-
-    if len(sleep_vals) >= 5:
-        r = _pearson_r(sleep_vals, next_vol_vals)
-        results.append(CorrelationPoint(
-            metric_a='sleep_hours',
-            metric_b='next_day_volume',
-            correlation=round(r, 3),
-            sample_size=len(sleep_vals),
-            interpretation=_interpret_r(r),
+    sleep_pairs = matrix.sleep_next_volume
+    if len(sleep_pairs) >= 5:
+        r_sleep = float(_correlation_coefficients(sleep_pairs)[0, 1])
+        results.append(_correlation_point(
+            'sleep_hours', 'next_day_volume', r_sleep, len(sleep_pairs),
         ))
 
     # 4. Nutrition logging ↔ workout logging
-    food_rates: list[float] = []
-    wo_log_rates: list[float] = []
-    for tid in trainee_ids:
-        days = summaries.get(tid, [])
-        if not days:
-            continue
-        food_rate = sum(1 for d in days if d.get('logged_food')) / len(days) * 100
-        wo_rate = sum(1 for d in days if d.get('logged_workout')) / len(days) * 100
-        food_rates.append(food_rate)
-        wo_log_rates.append(wo_rate)
-
-    if len(food_rates) >= 3:
-        r = _pearson_r(food_rates, wo_log_rates)
-        results.append(CorrelationPoint(
-            metric_a='food_logging_pct',
-            metric_b='workout_logging_pct',
-            correlation=round(r, 3),
-            sample_size=len(food_rates),
-            interpretation=_interpret_r(r),
+    if n >= 3:
+        results.append(_correlation_point(
+            'food_logging_pct', 'workout_logging_pct',
+            float(r[_COL['food_logging_pct'], _COL['workout_logging_pct']]), n,
         ))
 
     return results
@@ -446,8 +636,6 @@ def _generate_insights(
         if not trainee:
             continue
         name = trainee.get_full_name() or trainee.email
-        days = summaries.get(tid, [])
-        weeks = strength_data.get(tid, [])
 
         trainee_insights = _generate_trainee_insights(tid, name, summaries, strength_data)
         insights.extend(trainee_insights)
@@ -570,106 +758,56 @@ def _generate_trainee_insights(
 # ---------------------------------------------------------------------------
 
 def _compute_cohort_comparisons(
-    summaries: dict[int, list[dict[str, Any]]],
-    strength_data: dict[int, list[dict[str, Any]]],
-    trainee_ids: list[int],
+    matrix: _MetricMatrix,
     threshold: float = 70.0,
 ) -> list[CohortComparison]:
     """Compare high vs low adherence cohorts."""
-    high_ids: list[int] = []
-    low_ids: list[int] = []
+    values = matrix.values
+    has_days = values[:, _COL['total_days']] > 0
+    is_high = values[:, _COL['activity_adherence_pct']] >= threshold
+    high = values[has_days & is_high]
+    low = values[has_days & ~is_high]
 
-    for tid in trainee_ids:
-        days = summaries.get(tid, [])
-        if not days:
-            continue
-        adherence = sum(
-            1 for d in days
-            if d.get('logged_food') or d.get('logged_workout')
-        ) / len(days) * 100
-        if adherence >= threshold:
-            high_ids.append(tid)
-        else:
-            low_ids.append(tid)
-
-    if not high_ids or not low_ids:
+    if not len(high) or not len(low):
         return []
 
-    comparisons: list[CohortComparison] = []
-
-    # Compare weekly volume
-    def _avg_weekly_volume(ids: list[int]) -> float:
-        total = 0.0
-        count = 0
-        for tid in ids:
-            weeks = strength_data.get(tid, [])
-            for w in weeks:
-                total += w['total_volume']
-                count += 1
-        return total / count if count > 0 else 0
-
-    high_vol = _avg_weekly_volume(high_ids)
-    low_vol = _avg_weekly_volume(low_ids)
+    def _avg_weekly_volume(cohort: np.ndarray) -> float:
+        weeks = cohort[:, _COL['strength_weeks']].sum()
+        return float(cohort[:, _COL['weekly_volume_total']].sum() / weeks) if weeks > 0 else 0.0
+
+    def _mean(cohort: np.ndarray, column: str) -> float:
+        return float(cohort[:, _COL[column]].mean())
+
+    high_vol = _avg_weekly_volume(high)
+    low_vol = _avg_weekly_volume(low)
     diff = ((high_vol - low_vol) / low_vol * 100) if low_vol > 0 else 0
 
-    comparisons.append(CohortComparison(
-        metric='avg_weekly_volume',
-        high_adherence_avg=round(high_vol, 1),
-        low_adherence_avg=round(low_vol, 1),
-        difference_pct=round(diff, 1),
-        high_count=len(high_ids),
-        low_count=len(low_ids),
-    ))
-
-    # Compare protein hit rate
-    def _avg_protein_rate(ids: list[int]) -> float:
-        total = 0.0
-        count = 0
-        for tid in ids:
-            days = summaries.get(tid, [])
-            if days:
-                rate = sum(1 for d in days if d.get('hit_protein_goal')) / len(days)
-                total += rate
-                count += 1
-        return (total / count * 100) if count > 0 else 0
-
-    high_protein = _avg_protein_rate(high_ids)
-    low_protein = _avg_protein_rate(low_ids)
-    diff_p = high_protein - low_protein
-
-    comparisons.append(CohortComparison(
-        metric='protein_adherence_pct',
-        high_adherence_avg=round(high_protein, 1),
-        low_adherence_avg=round(low_protein, 1),
-        difference_pct=round(diff_p, 1),
-        high_count=len(high_ids),
-        low_count=len(low_ids),
-    ))
-
-    # Compare workout consistency
-    def _avg_workout_rate(ids: list[int]) -> float:
-        total = 0.0
-        count = 0
-        for tid in ids:
-            days = summaries.get(tid, [])
-            if days:
-                rate = sum(1 for d in days if d.get('logged_workout')) / len(days)
-                total += rate
-                count += 1
-        return (total / count * 100) if count > 0 else 0
-
-    high_wo = _avg_workout_rate(high_ids)
-    low_wo = _avg_workout_rate(low_ids)
-    diff_w = high_wo - low_wo
-
-    comparisons.append(CohortComparison(
-        metric='workout_consistency_pct',
-        high_adherence_avg=round(high_wo, 1),
-        low_adherence_avg=round(low_wo, 1),
-        difference_pct=round(diff_w, 1),
-        high_count=len(high_ids),
-        low_count=len(low_ids),
-    ))
+    comparisons: list[CohortComparison] = [
+        CohortComparison(
+            metric='avg_weekly_volume',
+            high_adherence_avg=round(high_vol, 1),
+            low_adherence_avg=round(low_vol, 1),
+            difference_pct=round(diff, 1),
+            high_count=len(high),
+            low_count=len(low),
+        ),
+    ]
+
+    # Rate metrics: difference is in percentage points
+    for metric, column in (
+        ('protein_adherence_pct', 'protein_adherence_pct'),
+        ('workout_consistency_pct', 'workout_logging_pct'),
+    ):
+        high_avg = _mean(high, column)
+        low_avg = _mean(low, column)
+        comparisons.append(CohortComparison(
+            metric=metric,
+            high_adherence_avg=round(high_avg, 1),
+            low_adherence_avg=round(low_avg, 1),
+            difference_pct=round(high_avg - low_avg, 1),
+            high_count=len(high),
+            low_count=len(low),
+        ))
 
     return comparisons
 
@@ -9,11 +9,15 @@ from __future__ import annotations
 
 import datetime
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from django.conf import settings
+from django.core.mail import send_mass_mail
 from django.db import transaction
-from django.db.models import Avg, Count, Q, Sum
+from django.db.models import Avg, Count, F, Q, Sum
 from django.utils import timezone
 
 from trainer.models import (
@@ -97,7 +101,9 @@ def generate_daily_digest(
     metrics = _gather_metrics(trainer, target_date)
 
     # Generate narrative
-    summary_text = _generate_summary_text(trainer, target_date, metrics)
+    summary_text = _generate_summary_text(
+        trainer.get_full_name() or trainer.email, target_date, metrics,
+    )
 
     # Persist
     digest = DailyDigest.objects.create(
@@ -173,52 +179,378 @@ def mark_digest_read(digest_id: str) -> None:
 
 
 # ---------------------------------------------------------------------------
-# Metrics gathering
+# Batch generation
 # ---------------------------------------------------------------------------
 
-def _gather_metrics(
-    trainer: User,
+DIGEST_BATCH_SIZE: int = 1000
+
+
+@dataclass(frozen=True)
+class DueTrainer:
+    """A trainer whose digest is due, with the delivery settings it needs."""
+    trainer_id: int
+    name: str
+    email: str
+    delivery_method: str
+
+
+@dataclass(frozen=True)
+class DigestBatchResult:
+    """Outcome of one batch digest run."""
+    trainers_due: int
+    digests_created: int
+    already_existing: int
+    in_app_notifications: int
+    pushes_sent: int
+    emails_sent: int
+
+
+def find_due_trainers(
+    now: datetime.datetime | None = None,
+) -> dict[datetime.date, list[DueTrainer]]:
+    """
+    Find trainers whose digest delivery hour is the current local hour.
+
+    Trainers are bucketed by time zone: one query lists the distinct zones in
+    use, and one query fetches every trainer whose zone is currently at its
+    delivery hour. Trainers without a preference row use the model defaults.
+    Each bucket digests the trainer's previous local day, so the result is
+    keyed by the date to summarize.
+    """
+    now = now or timezone.now()
+    default_tz = DigestPreference._meta.get_field('timezone').get_default()
+    default_hour = DigestPreference._meta.get_field('delivery_hour').get_default()
+
+    zones = set(
+        DigestPreference.objects.values_list('timezone', flat=True).distinct()
+    )
+    zones.add(default_tz)
+
+    due = Q(pk__in=[])
+    date_by_zone: dict[str, datetime.date] = {}
+    for zone in zones:
+        try:
+            local = now.astimezone(ZoneInfo(zone))
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning("Skipping digests for unknown time zone %r", zone)
+            continue
+        date_by_zone[zone] = local.date() - datetime.timedelta(days=1)
+        due |= Q(
+            digest_preference__timezone=zone,
+            digest_preference__delivery_hour=local.hour,
+        )
+        if zone == default_tz and local.hour == default_hour:
+            due |= Q(digest_preference__isnull=True)
+
+    rows = (
+        User.objects.filter(role=User.Role.TRAINER, is_active=True)
+        .filter(due)
+        .filter(
+            Q(digest_preference__isnull=True)
+            | (
+                Q(digest_preference__is_active=True)
+                & ~Q(digest_preference__delivery_method=DigestPreference.DeliveryMethod.DISABLED)
+            )
+        )
+        .values(
+            'id', 'email', 'first_name', 'last_name',
+            'digest_preference__timezone', 'digest_preference__delivery_method',
+        )
+        .order_by('id')
+    )
+
+    buckets: dict[datetime.date, list[DueTrainer]] = {}
+    for row in rows:
+        zone = row['digest_preference__timezone'] or default_tz
+        full_name = f"{row['first_name']} {row['last_name']}".strip()
+        buckets.setdefault(date_by_zone[zone], []).append(DueTrainer(
+            trainer_id=row['id'],
+            name=full_name or row['email'],
+            email=row['email'],
+            delivery_method=(
+                row['digest_preference__delivery_method']
+                or DigestPreference.DeliveryMethod.IN_APP
+            ),
+        ))
+    return buckets
+
+
+def generate_due_digests(
+    *,
+    now: datetime.datetime | None = None,
+    workers: int = 4,
+    batch_size: int = DIGEST_BATCH_SIZE,
+) -> DigestBatchResult:
+    """Generate and deliver every digest due at ``now`` (see find_due_trainers)."""
+    totals: dict[str, int] = {}
+    for target_date, trainers in find_due_trainers(now).items():
+        for start in range(0, len(trainers), batch_size):
+            result = generate_digest_batch(
+                trainers=trainers[start:start + batch_size],
+                target_date=target_date,
+                workers=workers,
+            )
+            for name, value in vars(result).items():
+                totals[name] = totals.get(name, 0) + value
+    return DigestBatchResult(**{
+        name: totals.get(name, 0)
+        for name in DigestBatchResult.__dataclass_fields__
+    })
+
+
+def generate_digest_batch(
+    *,
+    trainers: list[DueTrainer],
     target_date: datetime.date,
-) -> DigestMetrics:
-    """Aggregate trainee activity for the target date."""
-    from workouts.models import PainEvent, SessionFeedback
+    workers: int = 4,
+) -> DigestBatchResult:
+    """
+    Generate, persist and deliver digests for a batch of trainers.
 
-    trainees = User.objects.filter(
-        parent_trainer=trainer,
-        role='TRAINEE',
+    Metrics come from grouped queries over the whole batch, summaries are
+    rendered on a thread pool (room for the narrative step to become an AI
+    call), digests are written with one bulk insert, and notifications go
+    out in bulk per channel. Trainers that already have a digest for the
+    date, including ones created concurrently, are left alone.
+    """
+    existing = set(
+        DailyDigest.objects.filter(
+            trainer_id__in=[t.trainer_id for t in trainers],
+            date=target_date,
+        ).values_list('trainer_id', flat=True)
     )
-    total_trainees = trainees.count()
+    pending = [t for t in trainers if t.trainer_id not in existing]
+    if not pending:
+        return DigestBatchResult(
+            trainers_due=len(trainers), digests_created=0,
+            already_existing=len(existing), in_app_notifications=0,
+            pushes_sent=0, emails_sent=0,
+        )
 
-    # Activity summaries for the day
-    summaries = TraineeActivitySummary.objects.filter(
-        trainee__in=trainees,
-        date=target_date,
+    counts = _gather_counts([t.trainer_id for t in pending], target_date)
+    metrics = [_metrics_from_counts(counts[t.trainer_id]) for t in pending]
+
+    def render(item: tuple[DueTrainer, DigestMetrics]) -> str:
+        return _generate_summary_text(item[0].name, target_date, item[1])
+
+    items = list(zip(pending, metrics))
+    if workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            texts = list(pool.map(render, items))
+    else:
+        texts = [render(item) for item in items]
+
+    digests = [
+        DailyDigest(
+            trainer_id=trainer.trainer_id,
+            date=target_date,
+            total_trainees=m.total_trainees,
+            active_trainees=m.active_trainees,
+            workouts_completed=m.workouts_completed,
+            workouts_missed=m.workouts_missed,
+            pain_reports=m.pain_reports,
+            avg_compliance_pct=m.avg_compliance_pct,
+            summary_text=text,
+            highlights=m.highlights,
+            concerns=m.concerns,
+            action_items=m.action_items,
+        )
+        for (trainer, m), text in zip(items, texts)
+    ]
+    DailyDigest.objects.bulk_create(digests, ignore_conflicts=True)
+
+    # Rows that lost a race with an on-demand digest were skipped
+    created_ids = set(
+        DailyDigest.objects.filter(
+            pk__in=[d.pk for d in digests],
+        ).values_list('pk', flat=True)
     )
+    created = [
+        (trainer, digest)
+        for (trainer, _), digest in zip(items, digests)
+        if digest.pk in created_ids
+    ]
 
-    agg = summaries.aggregate(
-        total_workouts=Sum('workouts_completed'),
-        total_logged_food=Count('id', filter=Q(logged_food=True)),
-        total_logged_workout=Count('id', filter=Q(logged_workout=True)),
-        total_hit_protein=Count('id', filter=Q(hit_protein_goal=True)),
-        total_hit_calorie=Count('id', filter=Q(hit_calorie_goal=True)),
+    in_app, pushes, emails = _deliver_digests(
+        created,
+        target_date,
+        {trainer.trainer_id: text for (trainer, _), text in zip(items, texts)},
+    )
+    DailyDigest.objects.filter(pk__in=created_ids).update(delivered_at=timezone.now())
+
+    return DigestBatchResult(
+        trainers_due=len(trainers),
+        digests_created=len(created),
+        already_existing=len(trainers) - len(created),
+        in_app_notifications=in_app,
+        pushes_sent=pushes,
+        emails_sent=emails,
     )
 
-    active_trainees = summaries.values('trainee').distinct().count()
-    workouts_completed = agg['total_workouts'] or 0
 
-    # Missed = trainees who didn't log a workout (approximation)
-    workouts_missed = max(0, total_trainees - (agg['total_logged_workout'] or 0))
+def _deliver_digests(
+    created: list[tuple[DueTrainer, DailyDigest]],
+    target_date: datetime.date,
+    texts: dict[int, str],
+) -> tuple[int, int, int]:
+    """
+    Notify trainers that their digest is ready, batched per channel.
+
+    In-app trainers get a TrainerNotification (one bulk insert) and a push
+    (one grouped send, the message is identical across the batch); email
+    trainers share one SMTP connection. Never raises.
+
+    Returns:
+        (in-app notifications created, pushes delivered, emails sent).
+    """
+    from core.services.notification_service import send_push_to_group
+
+    Method = DigestPreference.DeliveryMethod
+    in_app = [
+        (t, d) for t, d in created if t.delivery_method in (Method.IN_APP, Method.BOTH)
+    ]
+    by_email = [
+        t for t, _ in created if t.delivery_method in (Method.EMAIL, Method.BOTH)
+    ]
+    title = "Your daily digest is ready"
+    body = f"See how your trainees did on {target_date.strftime('%A, %B %d')}."
+
+    notified = pushed = emailed = 0
+    if in_app:
+        try:
+            notified = len(TrainerNotification.objects.bulk_create([
+                TrainerNotification(
+                    trainer_id=trainer.trainer_id,
+                    notification_type=TrainerNotification.NotificationType.GENERAL,
+                    title=title,
+                    message=body,
+                    data={'digest_id': str(digest.pk), 'date': str(target_date)},
+                )
+                for trainer, digest in in_app
+            ]))
+        except Exception:
+            logger.exception("Failed to create digest notifications for %s", target_date)
+        pushed = send_push_to_group(
+            [trainer.trainer_id for trainer, _ in in_app],
+            title,
+            body,
+            data={'type': 'daily_digest', 'date': str(target_date)},
+        )
+
+    if by_email:
+        try:
+            emailed = send_mass_mail(
+                [
+                    (title, texts[t.trainer_id], settings.DEFAULT_FROM_EMAIL, [t.email])
+                    for t in by_email
+                ],
+                fail_silently=False,
+            )
+        except Exception:
+            logger.exception("Failed to send digest emails for %s", target_date)
+
+    return notified, pushed, emailed
+
+
+# ---------------------------------------------------------------------------
+# Metrics gathering
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _DigestCounts:
+    """Raw per-trainer counts a digest's metrics are derived from."""
+    total_trainees: int = 0
+    active_trainees: int = 0
+    workouts_completed: int = 0
+    logged_workout: int = 0
+    hit_protein: int = 0
+    hit_calorie: int = 0
+    pain_reports: int = 0
+    recovery_concerns: int = 0
+
+
+def _gather_counts(
+    trainer_ids: list[int],
+    target_date: datetime.date,
+) -> dict[int, _DigestCounts]:
+    """
+    Count trainee activity on ``target_date`` for many trainers at once.
 
-    # Pain reports today
-    pain_count = PainEvent.objects.filter(
-        trainee__in=trainees,
-        created_at__date=target_date,
-    ).count()
+    Four grouped queries regardless of how many trainers are passed; trainers
+    without trainees still get a zeroed entry.
+    """
+    from workouts.models import PainEvent, SessionFeedback
+
+    counts = {trainer_id: _DigestCounts() for trainer_id in trainer_ids}
+    if not trainer_ids:
+        return counts
+
+    for roster_row in (
+        User.objects.filter(parent_trainer_id__in=trainer_ids, role='TRAINEE')
+        .values('parent_trainer_id')
+        .annotate(n=Count('id'))
+    ):
+        counts[roster_row['parent_trainer_id']].total_trainees = roster_row['n']
+
+    for activity_row in (
+        TraineeActivitySummary.objects.filter(
+            trainee__parent_trainer_id__in=trainer_ids,
+            trainee__role='TRAINEE',
+            date=target_date,
+        )
+        .values(trainer_id=F('trainee__parent_trainer_id'))
+        .annotate(
+            active=Count('trainee', distinct=True),
+            workouts=Sum('workouts_completed'),
+            logged_workout=Count('id', filter=Q(logged_workout=True)),
+            hit_protein=Count('id', filter=Q(hit_protein_goal=True)),
+            hit_calorie=Count('id', filter=Q(hit_calorie_goal=True)),
+        )
+    ):
+        entry = counts[activity_row['trainer_id']]
+        entry.active_trainees = activity_row['active']
+        entry.workouts_completed = activity_row['workouts'] or 0
+        entry.logged_workout = activity_row['logged_workout']
+        entry.hit_protein = activity_row['hit_protein']
+        entry.hit_calorie = activity_row['hit_calorie']
+
+    for pain_row in (
+        PainEvent.objects.filter(
+            trainee__parent_trainer_id__in=trainer_ids,
+            trainee__role='TRAINEE',
+            created_at__date=target_date,
+        )
+        .values(trainer_id=F('trainee__parent_trainer_id'))
+        .annotate(n=Count('id'))
+    ):
+        counts[pain_row['trainer_id']].pain_reports = pain_row['n']
+
+    for feedback_row in (
+        SessionFeedback.objects.filter(
+            trainee__parent_trainer_id__in=trainer_ids,
+            trainee__role='TRAINEE',
+            created_at__date=target_date,
+            recovery_concern=True,
+        )
+        .values(trainer_id=F('trainee__parent_trainer_id'))
+        .annotate(n=Count('id'))
+    ):
+        counts[feedback_row['trainer_id']].recovery_concerns = feedback_row['n']
+
+    return counts
+
+
+def _metrics_from_counts(counts: _DigestCounts) -> DigestMetrics:
+    """Derive a digest's metrics, highlights, concerns and actions from counts."""
+    total_trainees = counts.total_trainees
+    workouts_completed = counts.workouts_completed
+
+    # Missed = trainees who didn't log a workout (approximation)
+    workouts_missed = max(0, total_trainees - counts.logged_workout)
 
     # Compliance: % of trainees who hit their calorie goal
     if total_trainees > 0:
-        compliance_count = agg['total_hit_calorie'] or 0
-        avg_compliance = (compliance_count / total_trainees) * 100
+        avg_compliance = (counts.hit_calorie / total_trainees) * 100
     else:
         avg_compliance = 0.0
 
@@ -226,9 +558,8 @@ def _gather_metrics(
     highlights: list[str] = []
     if workouts_completed > 0:
         highlights.append(f"{workouts_completed} workout(s) completed")
-    protein_hits = agg['total_hit_protein'] or 0
-    if protein_hits > 0:
-        highlights.append(f"{protein_hits} trainee(s) hit protein goal")
+    if counts.hit_protein > 0:
+        highlights.append(f"{counts.hit_protein} trainee(s) hit protein goal")
 
     # Build concerns
     concerns: list[str] = []
@@ -236,33 +567,26 @@ def _gather_metrics(
         concerns.append(
             f"{workouts_missed} trainee(s) did not log a workout"
         )
-    if pain_count > 0:
-        concerns.append(f"{pain_count} pain report(s) filed")
-
-    # Recovery concerns from feedback
-    recovery_count = SessionFeedback.objects.filter(
-        trainee__in=trainees,
-        created_at__date=target_date,
-        recovery_concern=True,
-    ).count()
-    if recovery_count > 0:
-        concerns.append(f"{recovery_count} recovery concern(s) flagged")
+    if counts.pain_reports > 0:
+        concerns.append(f"{counts.pain_reports} pain report(s) filed")
+    if counts.recovery_concerns > 0:
+        concerns.append(f"{counts.recovery_concerns} recovery concern(s) flagged")
 
     # Action items
     action_items: list[str] = []
-    if pain_count > 0:
+    if counts.pain_reports > 0:
         action_items.append("Review pain reports and consider program adjustments")
     if workouts_missed > total_trainees // 2:
         action_items.append("Check in with trainees who missed workouts")
-    if recovery_count > 0:
+    if counts.recovery_concerns > 0:
         action_items.append("Follow up on recovery concerns")
 
     return DigestMetrics(
         total_trainees=total_trainees,
-        active_trainees=active_trainees,
+        active_trainees=counts.active_trainees,
         workouts_completed=workouts_completed,
         workouts_missed=workouts_missed,
-        pain_reports=pain_count,
+        pain_reports=counts.pain_reports,
         avg_compliance_pct=round(avg_compliance, 1),
         highlights=highlights,
         concerns=concerns,
@@ -270,9 +594,18 @@ def _gather_metrics(
     )
 
 
-def _generate_summary_text(
+def _gather_metrics(
     trainer: User,
     target_date: datetime.date,
+) -> DigestMetrics:
+    """Aggregate trainee activity for the target date."""
+    counts = _gather_counts([trainer.pk], target_date)
+    return _metrics_from_counts(counts[trainer.pk])
+
+
+def _generate_summary_text(
+    trainer_name: str,
+    target_date: datetime.date,
     metrics: DigestMetrics,
 ) -> str:
     """Generate a human-readable summary from metrics.
@@ -280,7 +613,6 @@ def _generate_summary_text(
     This is a deterministic summary. AI-powered narrative generation
     can be plugged in later by replacing this function.
     """
-    trainer_name = trainer.get_full_name() or trainer.email
     date_str = target_date.strftime('%A, %B %d')
 
     parts: list[str] = [
@@ -0,0 +1,160 @@
+"""
+Service for computing and caching trainer dashboard statistics.
+
+All roster and activity counters are computed with a single
+conditional-aggregation query over the trainer's trainees, joined to their
+activity summaries for the last 7 days only. The result is cached per
+trainer under a versioned key; the version is bumped (after commit) whenever
+a relevant row is written, so readers never see stats older than the last
+committed write.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, FilteredRelation, Q
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from users.models import User
+
+logger = logging.getLogger(__name__)
+
+_CACHE_PREFIX = 'trainer_stats'
+STATS_CACHE_TTL: int = 300  # 5 minutes — bounds staleness for un-signalled writes
+ADHERENCE_WINDOW_DAYS: int = 7
+
+
+@dataclass(frozen=True)
+class TrainerDashboardStats:
+    total_trainees: int
+    active_trainees: int
+    trainees_logged_today: int
+    trainees_on_track: int
+    avg_adherence_rate: float
+    subscription_tier: str
+    max_trainees: int
+    trainees_pending_onboarding: int
+
+
+def _version_key(trainer_id: int) -> str:
+    return f'{_CACHE_PREFIX}:version:{trainer_id}'
+
+
+def _stats_key(trainer_id: int, version: int, today: date) -> str:
+    return f'{_CACHE_PREFIX}:{trainer_id}:v{version}:{today.isoformat()}'
+
+
+def _get_version(trainer_id: int) -> int:
+    version = cache.get(_version_key(trainer_id))
+    if version is None:
+        # add() is a no-op if a concurrent writer created the key first.
+        cache.add(_version_key(trainer_id), 1, timeout=None)
+        version = cache.get(_version_key(trainer_id), 1)
+    return int(version)
+
+
+def _bump_version(trainer_id: int) -> None:
+    try:
+        cache.incr(_version_key(trainer_id))
+    except ValueError:
+        # Key missing (evicted or never read) — any new value invalidates.
+        if not cache.add(_version_key(trainer_id), 2, timeout=None):
+            cache.incr(_version_key(trainer_id))
+
+
+def invalidate_trainer_stats(trainer_id: int | None) -> None:
+    """
+    Invalidate the cached dashboard stats for a trainer.
+
+    The version bump runs after the surrounding transaction commits so a
+    reader can never cache a pre-commit snapshot under the new version.
+    """
+    if trainer_id is None:
+        return
+    transaction.on_commit(lambda: _bump_version(trainer_id))
+
+
+def _compute_stats(trainer: User, today: date) -> TrainerDashboardStats:
+    from users.models import User
+
+    week_ago = today - timedelta(days=ADHERENCE_WINDOW_DAYS)
+    recent_logged = Q(recent__logged_food=True) | Q(recent__logged_workout=True)
+
+    # One query: trainees LEFT JOIN their last-7-day summaries. Trainee-level
+    # counters use DISTINCT ids because the join fans out per summary row.
+    agg: dict[str, Any] = (
+        User.objects.filter(parent_trainer=trainer, role=User.Role.TRAINEE)
+        .annotate(
+            recent=FilteredRelation(
+                'activity_summaries',
+                condition=Q(activity_summaries__date__gte=week_ago),
+            ),
+        )
+        .aggregate(
+            total_trainees=Count('id', distinct=True),
+            active_trainees=Count('id', distinct=True, filter=Q(is_active=True)),
+            pending_onboarding=Count(
+                'id',
+                distinct=True,
+                filter=Q(profile__isnull=True) | Q(profile__onboarding_completed=False),
+            ),
+            logged_today=Count(
+                'id',
+                distinct=True,
+                filter=Q(recent__date=today) & recent_logged,
+            ),
+            on_track=Count('id', distinct=True, filter=Q(recent__hit_protein_goal=True)),
+            total_summaries=Count('recent__id'),
+            hit_goals=Count('recent__id', filter=Q(recent__hit_protein_goal=True)),
+        )
+    )
+
+    total_summaries: int = agg['total_summaries']
+    avg_adherence = (
+        agg['hit_goals'] / total_summaries * 100 if total_summaries > 0 else 0
+    )
+
+    try:
+        subscription = trainer.subscription
+        tier = subscription.tier
+        max_trainees = subscription.get_max_trainees()
+    except Exception:
+        tier = 'NONE'
+        max_trainees = 0
+
+    return TrainerDashboardStats(
+        total_trainees=agg['total_trainees'],
+        active_trainees=agg['active_trainees'],
+        trainees_logged_today=agg['logged_today'],
+        trainees_on_track=agg['on_track'],
+        avg_adherence_rate=round(avg_adherence, 1),
+        subscription_tier=str(tier),
+        max_trainees=int(max_trainees) if max_trainees != float('inf') else -1,
+        trainees_pending_onboarding=agg['pending_onboarding'],
+    )
+
+
+def get_trainer_dashboard_stats(trainer: User) -> dict[str, Any]:
+    """
+    Return dashboard statistics for a trainer, served from cache when fresh.
+
+    The version is read *before* computing so that a write committing during
+    the computation bumps the version past the key we populate, and the
+    (possibly stale) result is never served.
+    """
+    today = timezone.now().date()
+    key = _stats_key(trainer.id, _get_version(trainer.id), today)
+
+    cached: dict[str, Any] | None = cache.get(key)
+    if cached is not None:
+        return cached
+
+    stats = asdict(_compute_stats(trainer, today))
+    cache.set(key, stats, timeout=STATS_CACHE_TTL)
+    return stats
@@ -0,0 +1,146 @@
+"""
+Background export jobs — for exports too large to produce in a request.
+
+Flow:
+  1. An export view finds the export is above EXPORT_BACKGROUND_ROW_THRESHOLD
+     rows and calls start_export_job() -> returns job_id immediately
+  2. A background thread streams the export's rows into a file (gzipped
+     CSV or Parquet), reporting progress to the cache, then saves the file
+     to storage
+  3. GET export/jobs/<job_id>/ reports status; once completed,
+     GET export/jobs/<job_id>/download/ serves the file
+"""
+from __future__ import annotations
+
+import logging
+import tempfile
+import threading
+import uuid
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import IO, Protocol
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BACKGROUND_ROW_THRESHOLD: int = 10_000
+
+_CACHE_PREFIX = 'export_job'
+_CACHE_TIMEOUT = 60 * 60 * 24  # 24 hours
+_PROGRESS_EVERY_ROWS = 5000
+
+
+class BackgroundExport(Protocol):
+    """What an export must provide to run as a job (CsvExportSpec, ParquetExportSpec)."""
+    @property
+    def filename(self) -> str: ...
+
+    @property
+    def content_type(self) -> str: ...
+
+    @property
+    def content_encoding(self) -> str | None: ...
+
+    def write(self, fileobj: IO[bytes], on_rows: Callable[[int], None]) -> None: ...
+
+
+@dataclass
+class ExportJobStatus:
+    """Serializable status object stored in cache."""
+    status: str  # pending, running, completed, failed
+    trainer_id: int
+    filename: str
+    estimated_rows: int
+    content_type: str
+    content_encoding: str | None = None
+    rows_written: int = 0
+    storage_path: str | None = None
+    error: str | None = None
+
+    @property
+    def progress_pct(self) -> float:
+        if self.status == 'completed':
+            return 100.0
+        if self.estimated_rows <= 0:
+            return 0.0
+        return round(min(99.0, self.rows_written / self.estimated_rows * 100), 1)
+
+
+def should_run_in_background(estimated_rows: int) -> bool:
+    """Whether an export of this size should become a background job."""
+    return estimated_rows > EXPORT_BACKGROUND_ROW_THRESHOLD
+
+
+def start_export_job(trainer_id: int, spec: BackgroundExport, estimated_rows: int) -> str:
+    """Start writing ``spec`` in a background thread. Returns job_id immediately."""
+    job_id = str(uuid.uuid4())
+    _save_status(job_id, ExportJobStatus(
+        status='pending',
+        trainer_id=trainer_id,
+        filename=spec.filename,
+        estimated_rows=estimated_rows,
+        content_type=spec.content_type,
+        content_encoding=spec.content_encoding,
+    ))
+
+    thread = threading.Thread(
+        target=_run_export_job,
+        args=(job_id, trainer_id, spec),
+        daemon=True,
+    )
+    thread.start()
+    return job_id
+
+
+def get_export_job(job_id: str, trainer_id: int) -> ExportJobStatus | None:
+    """Read a job's status. Returns None if missing, expired, or not this trainer's."""
+    data = cache.get(f'{_CACHE_PREFIX}:{job_id}')
+    if data is None or data['trainer_id'] != trainer_id:
+        return None
+    return ExportJobStatus(**data)
+
+
+def _save_status(job_id: str, job: ExportJobStatus) -> None:
+    cache.set(f'{_CACHE_PREFIX}:{job_id}', asdict(job), timeout=_CACHE_TIMEOUT)
+
+
+def _run_export_job(job_id: str, trainer_id: int, spec: BackgroundExport) -> None:
+    """Background thread: stream the export into a file in storage."""
+    from django.db import connection
+
+    job = get_export_job(job_id, trainer_id)
+    if job is None:
+        return
+    job.status = 'running'
+    _save_status(job_id, job)
+
+    try:
+        def on_rows(count: int) -> None:
+            before = job.rows_written // _PROGRESS_EVERY_ROWS
+            job.rows_written += count
+            if job.rows_written // _PROGRESS_EVERY_ROWS != before:
+                _save_status(job_id, job)
+
+        suffix = '.gz' if spec.content_encoding == 'gzip' else ''
+        with tempfile.TemporaryFile() as raw:
+            spec.write(raw, on_rows)
+            raw.seek(0)
+            job.storage_path = default_storage.save(
+                f'exports/{trainer_id}/{job_id}/{spec.filename}{suffix}',
+                File(raw),
+            )
+
+        job.status = 'completed'
+        _save_status(job_id, job)
+        logger.info("Export job %s completed (%d rows).", job_id, job.rows_written)
+
+    except Exception as e:
+        logger.exception("Export job %s failed.", job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        _save_status(job_id, job)
+    finally:
+        connection.close()
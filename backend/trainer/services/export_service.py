@@ -1,15 +1,22 @@
 """
 Service for generating CSV exports of trainer data:
 payments, subscribers, and trainees.
+
+Each export is described by a CsvExportSpec whose rows are produced lazily
+from server-side cursors, so an export can be streamed to the client (or
+written to a file by a background job) without holding it in memory.
+``render()`` still builds the whole document for small, in-process uses.
 """
 from __future__ import annotations
 
 import csv
+import gzip
 import io
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import TYPE_CHECKING
+from typing import IO, TYPE_CHECKING, Any, ClassVar
 
 from django.db.models import Max, Prefetch
 from django.utils import timezone
@@ -26,6 +33,76 @@ class CsvExportResult:
     row_count: int
 
 
+EXPORT_CHUNK_SIZE: int = 2000
+STREAM_ROWS_PER_CHUNK: int = 500
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: ``write`` returns the line instead of storing it."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+@dataclass(frozen=True)
+class CsvExportSpec:
+    """
+    A CSV export that has not been produced yet.
+
+    ``rows`` is called once per rendering and yields data rows (headers
+    excluded); ``estimate_rows`` is a cheap COUNT used to decide whether the
+    export should run in the background.
+    """
+    filename: str
+    headers: list[str]
+    rows: Callable[[], Iterable[list[Any]]]
+    estimate_rows: Callable[[], int]
+
+    content_type: ClassVar[str] = "text/csv"
+    content_encoding: ClassVar[str | None] = "gzip"
+
+    def iter_text(self, rows_per_chunk: int = STREAM_ROWS_PER_CHUNK) -> Iterator[str]:
+        """Yield the CSV document in chunks of ``rows_per_chunk`` lines."""
+        writer = csv.writer(_Echo())
+        lines: list[str] = [writer.writerow(self.headers)]
+        for row in self.rows():
+            lines.append(writer.writerow(row))
+            if len(lines) >= rows_per_chunk:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    def write(self, fileobj: IO[bytes], on_rows: Callable[[int], None]) -> None:
+        """Write the CSV gzip-compressed to ``fileobj``, reporting each row written."""
+        with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+            text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(self.headers)
+            for row in self.rows():
+                writer.writerow(row)
+                on_rows(1)
+            text.flush()
+            text.detach()
+
+    def render(self) -> CsvExportResult:
+        """Build the whole CSV document in memory."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.headers)
+
+        row_count = 0
+        for row in self.rows():
+            writer.writerow(row)
+            row_count += 1
+
+        return CsvExportResult(
+            content=buffer.getvalue(),
+            filename=self.filename,
+            row_count=row_count,
+        )
+
+
 PAYMENT_HEADERS = [
     "Date", "Trainee", "Email", "Type", "Amount",
     "Currency", "Status", "Description",
@@ -101,6 +178,11 @@ def export_payments_csv(trainer: User, days: int) -> CsvExportResult:
     Returns:
         CsvExportResult with CSV content, filename, and row count.
     """
+    return payments_export(trainer, days).render()
+
+
+def payments_export(trainer: User, days: int) -> CsvExportSpec:
+    """Describe the payments export for a trainer (see export_payments_csv)."""
     from subscriptions.models import TraineePayment
 
     start_date = timezone.now() - timedelta(days=days)
@@ -113,32 +195,28 @@ def export_payments_csv(trainer: User, days: int) -> CsvExportResult:
         .order_by("-created_at")
     )
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(PAYMENT_HEADERS)
-
-    row_count = 0
-    for payment in payments:
-        trainee = payment.trainee
-        name = f"{trainee.first_name} {trainee.last_name}".strip()
-        date_val = payment.paid_at if payment.paid_at else payment.created_at
-        writer.writerow([
-            _format_date(date_val),
-            _sanitize_csv_value(name or trainee.email),
-            _sanitize_csv_value(trainee.email),
-            _safe_str(payment.get_payment_type_display()),
-            _format_amount(payment.amount),
-            payment.currency.upper(),
-            _safe_str(payment.get_status_display()),
-            _sanitize_csv_value(payment.description),
-        ])
-        row_count += 1
+    def rows() -> Iterator[list[Any]]:
+        for payment in payments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            trainee = payment.trainee
+            name = f"{trainee.first_name} {trainee.last_name}".strip()
+            date_val = payment.paid_at if payment.paid_at else payment.created_at
+            yield [
+                _format_date(date_val),
+                _sanitize_csv_value(name or trainee.email),
+                _sanitize_csv_value(trainee.email),
+                _safe_str(payment.get_payment_type_display()),
+                _format_amount(payment.amount),
+                payment.currency.upper(),
+                _safe_str(payment.get_status_display()),
+                _sanitize_csv_value(payment.description),
+            ]
 
     today = timezone.now().strftime("%Y-%m-%d")
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f"payments_{today}.csv",
-        row_count=row_count,
+        headers=PAYMENT_HEADERS,
+        rows=rows,
+        estimate_rows=payments.count,
     )
 
 
@@ -155,6 +233,11 @@ def export_subscribers_csv(trainer: User) -> CsvExportResult:
     Returns:
         CsvExportResult with CSV content, filename, and row count.
     """
+    return subscribers_export(trainer).render()
+
+
+def subscribers_export(trainer: User) -> CsvExportSpec:
+    """Describe the subscribers export for a trainer (see export_subscribers_csv)."""
     from subscriptions.models import TraineeSubscription
 
     subscriptions = (
@@ -163,32 +246,28 @@ def export_subscribers_csv(trainer: User) -> CsvExportResult:
         .order_by("-created_at")
     )
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(SUBSCRIBER_HEADERS)
-
-    row_count = 0
-    for sub in subscriptions:
-        trainee = sub.trainee
-        name = f"{trainee.first_name} {trainee.last_name}".strip()
-        renewal_days = sub.days_until_renewal()
-        writer.writerow([
-            _sanitize_csv_value(name or trainee.email),
-            _sanitize_csv_value(trainee.email),
-            _format_amount(sub.amount),
-            sub.currency.upper(),
-            _safe_str(sub.get_status_display()),
-            _format_date(sub.current_period_end),
-            _safe_str(renewal_days),
-            _format_date(sub.created_at),
-        ])
-        row_count += 1
+    def rows() -> Iterator[list[Any]]:
+        for sub in subscriptions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            trainee = sub.trainee
+            name = f"{trainee.first_name} {trainee.last_name}".strip()
+            renewal_days = sub.days_until_renewal()
+            yield [
+                _sanitize_csv_value(name or trainee.email),
+                _sanitize_csv_value(trainee.email),
+                _format_amount(sub.amount),
+                sub.currency.upper(),
+                _safe_str(sub.get_status_display()),
+                _format_date(sub.current_period_end),
+                _safe_str(renewal_days),
+                _format_date(sub.created_at),
+            ]
 
     today = timezone.now().strftime("%Y-%m-%d")
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f"subscribers_{today}.csv",
-        row_count=row_count,
+        headers=SUBSCRIBER_HEADERS,
+        rows=rows,
+        estimate_rows=subscriptions.count,
     )
 
 
@@ -205,6 +284,11 @@ def export_trainees_csv(trainer: User) -> CsvExportResult:
     Returns:
         CsvExportResult with CSV content, filename, and row count.
     """
+    return trainees_export(trainer).render()
+
+
+def trainees_export(trainer: User) -> CsvExportSpec:
+    """Describe the trainee roster export for a trainer (see export_trainees_csv)."""
     from users.models import User as UserModel
     from workouts.models import Program
 
@@ -225,41 +309,41 @@ def export_trainees_csv(trainer: User) -> CsvExportResult:
         .order_by("-created_at")
     )
 
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
-    writer.writerow(TRAINEE_HEADERS)
-
-    row_count = 0
-    for trainee in trainees:
-        name = f"{trainee.first_name} {trainee.last_name}".strip()
-
-        # Profile complete check
-        try:
-            profile_complete = trainee.profile.onboarding_completed
-        except UserModel.profile.RelatedObjectDoesNotExist:  # type: ignore[union-attr]
-            profile_complete = False
-
-        # Last activity from annotated Max
-        last_activity = _format_date_only(trainee.last_log_date)  # type: ignore[attr-defined]
-
-        # Current program from filtered prefetch
-        active_programs: list[Program] = trainee.active_programs  # type: ignore[attr-defined]
-        program_name = active_programs[0].name if active_programs else ""
-
-        writer.writerow([
-            _sanitize_csv_value(name or trainee.email),
-            _sanitize_csv_value(trainee.email),
-            "Yes" if trainee.is_active else "No",
-            "Yes" if profile_complete else "No",
-            last_activity,
-            _sanitize_csv_value(program_name),
-            _format_date_only(trainee.created_at),
-        ])
-        row_count += 1
+    def rows() -> Iterator[list[Any]]:
+        # Prefetches run per chunk when iterating with chunk_size
+        for trainee in trainees.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            name = f"{trainee.first_name} {trainee.last_name}".strip()
+
+            # Profile complete check
+            try:
+                profile_complete = trainee.profile.onboarding_completed
+            except UserModel.profile.RelatedObjectDoesNotExist:  # type: ignore[union-attr]
+                profile_complete = False
+
+            # Last activity from annotated Max
+            last_activity = _format_date_only(trainee.last_log_date)  # type: ignore[attr-defined]
+
+            # Current program from filtered prefetch
+            active_programs: list[Program] = trainee.active_programs  # type: ignore[attr-defined]
+            program_name = active_programs[0].name if active_programs else ""
+
+            yield [
+                _sanitize_csv_value(name or trainee.email),
+                _sanitize_csv_value(trainee.email),
+                "Yes" if trainee.is_active else "No",
+                "Yes" if profile_complete else "No",
+                last_activity,
+                _sanitize_csv_value(program_name),
+                _format_date_only(trainee.created_at),
+            ]
 
     today = timezone.now().strftime("%Y-%m-%d")
-    return CsvExportResult(
-        content=buffer.getvalue(),
+    return CsvExportSpec(
         filename=f"trainees_{today}.csv",
-        row_count=row_count,
+        headers=TRAINEE_HEADERS,
+        rows=rows,
+        estimate_rows=UserModel.objects.filter(
+            parent_trainer=trainer,
+            role=UserModel.Role.TRAINEE,
+        ).count,
     )
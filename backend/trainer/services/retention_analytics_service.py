@@ -3,16 +3,27 @@ Service for computing trainee engagement and churn risk analytics.
 
 Calculates a per-trainee engagement score (0-100) and churn risk score (0-100)
 over a configurable rolling window, using data from TraineeActivitySummary.
+
+Activity for the whole roster is fetched in one query and scored as NumPy
+arrays (one element per trainee), so cost is linear in summary rows with no
+per-trainee Python loop and no roster cap. Scores are persisted to
+TraineeRetentionSnapshot by compute_retention (or an explicit refresh); the
+dashboard reads the latest stored snapshot and never writes on GET.
 """
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date, timedelta
-from typing import TYPE_CHECKING
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Collection, cast
 
+import numpy as np
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OrderBy, OuterRef, Q, QuerySet
 from django.utils import timezone
 
 if TYPE_CHECKING:
+    from trainer.models import TraineeRetentionSnapshot
     from users.models import User
 
 
@@ -22,6 +33,25 @@ CRITICAL_THRESHOLD: int = 75
 HIGH_THRESHOLD: int = 50
 MEDIUM_THRESHOLD: int = 25
 
+AT_RISK_TIERS: tuple[str, ...] = ("critical", "high")
+
+# Today's snapshots older than this are re-scored by the incremental refresh
+# even without a newer activity summary: QuerySet.update(), raw SQL and
+# deletes leave no updated_at watermark behind.
+RESCORE_MAX_AGE = timedelta(hours=1)
+
+AT_RISK_DEFAULT_PAGE_SIZE: int = 100
+AT_RISK_MAX_PAGE_SIZE: int = 500
+
+# Public ordering keys for the at-risk list -> snapshot ORDER BY columns.
+AT_RISK_ORDERINGS: dict[str, tuple[str, ...]] = {
+    "churn_risk_score": ("churn_risk_score",),
+    "engagement_score": ("engagement_score",),
+    "days_since_last_activity": ("days_since_last_activity",),
+    "last_active_date": ("last_active_date",),
+    "trainee_name": ("trainee__first_name", "trainee__last_name"),
+}
+
 
 def _risk_tier(score: float) -> str:
     if score >= CRITICAL_THRESHOLD:
@@ -33,10 +63,6 @@ def _risk_tier(score: float) -> str:
     return "low"
 
 
-def _clamp(value: float, lo: float = 0.0, hi: float = 100.0) -> float:
-    return max(lo, min(hi, value))
-
-
 # ── Dataclasses ──
 
 
@@ -80,54 +106,77 @@ class RetentionAnalyticsResult:
     summary: RetentionSummary
     trainees: list[TraineeEngagementItem]
     trends: list[RetentionTrendPoint]
+    computed_at: datetime | None = None  # None when scored live
 
 
-# ── Scoring helpers ──
+@dataclass(frozen=True)
+class IncrementalRefreshResult:
+    period_days: int
+    rescored: list[TraineeEngagementItem]
+    unchanged_count: int
+    removed_count: int
+
 
+@dataclass(frozen=True)
+class AtRiskPage:
+    period_days: int
+    trainees: list[TraineeEngagementItem]
+    count: int
+    page: int
+    num_pages: int
+    has_next: bool
+    has_previous: bool
+    computed_at: datetime | None = None  # None when scored live
 
-def _recency_score(days_inactive: int) -> float:
+
+# ── Vectorized scoring helpers ──
+
+
+def _recency_scores(days_inactive: np.ndarray) -> np.ndarray:
     """Exponential-style decay: today=100, 1d=85, 2d=65, 3d=45, 5d+=near 0."""
-    if days_inactive <= 0:
-        return 100.0
-    if days_inactive == 1:
-        return 85.0
-    if days_inactive == 2:
-        return 65.0
-    if days_inactive == 3:
-        return 45.0
-    return max(0.0, 100.0 - days_inactive * 20.0)
-
-
-def _inactivity_signal(days_inactive: int) -> float:
+    return np.select(
+        [days_inactive <= 0, days_inactive == 1, days_inactive == 2, days_inactive == 3],
+        [100.0, 85.0, 65.0, 45.0],
+        default=np.maximum(0.0, 100.0 - days_inactive * 20.0),
+    )
+
+
+def _inactivity_signals(days_inactive: np.ndarray) -> np.ndarray:
     """Convert days inactive to a 0-100 signal for churn risk."""
-    if days_inactive <= 1:
-        return 0.0
-    if days_inactive == 2:
-        return 20.0
-    if days_inactive == 3:
-        return 40.0
-    if days_inactive == 4:
-        return 60.0
-    if days_inactive == 5:
-        return 80.0
-    return 100.0
+    return np.select(
+        [
+            days_inactive <= 1,
+            days_inactive == 2,
+            days_inactive == 3,
+            days_inactive == 4,
+            days_inactive == 5,
+        ],
+        [0.0, 20.0, 40.0, 60.0, 80.0],
+        default=100.0,
+    )
+
+
+def _relative_drop(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """max(0, (before - after) / before), or 0 where ``before`` is 0."""
+    safe_before = np.where(before > 0, before, 1.0)
+    return np.where(before > 0, np.maximum(0.0, (before - after) / safe_before), 0.0)
 
 
 def _compute_scores(
     *,
-    days_logged_workout: int,
-    days_logged_food: int,
-    days_hit_protein: int,
-    days_hit_calorie: int,
+    days_logged_workout: np.ndarray,
+    days_logged_food: np.ndarray,
+    days_hit_protein: np.ndarray,
+    days_hit_calorie: np.ndarray,
     lookback_days: int,
-    days_since_last_activity: int,
-    first_half_engagement: float,
-    second_half_engagement: float,
-    current_volume: int,
-    previous_volume: int,
-    is_new_trainee: bool,
-) -> tuple[float, float]:
-    """Return (engagement_score, churn_risk_score), both 0-100."""
+    days_since_last_activity: np.ndarray,
+    first_half_engagement: np.ndarray,
+    second_half_engagement: np.ndarray,
+    current_volume: np.ndarray,
+    previous_volume: np.ndarray,
+    is_new_trainee: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return unrounded (engagement_score, churn_risk_score) arrays, both 0-100."""
     safe_lookback = max(lookback_days, 1)
 
     workout_consistency = (days_logged_workout / safe_lookback) * 100.0
@@ -135,112 +184,91 @@ def _compute_scores(
     goal_adherence = (
         (days_hit_protein + days_hit_calorie) / (2.0 * safe_lookback) * 100.0
     )
-    recency = _recency_score(days_since_last_activity)
+    recency = _recency_scores(days_since_last_activity)
 
-    engagement = (
+    engagement = np.clip(
         workout_consistency * 0.30
         + nutrition_consistency * 0.25
         + goal_adherence * 0.25
-        + recency * 0.20
+        + recency * 0.20,
+        0.0,
+        100.0,
     )
-    engagement = _clamp(engagement)
 
     # ── Churn risk ──
-    inactivity = _inactivity_signal(days_since_last_activity)
+    inactivity = _inactivity_signals(days_since_last_activity)
 
     # Declining trend: compare first half vs second half of window
-    if first_half_engagement > 0:
-        decline_pct = max(0.0, (first_half_engagement - second_half_engagement) / first_half_engagement)
-    else:
-        decline_pct = 0.0
-    declining_trend = decline_pct * 100.0
+    declining_trend = _relative_drop(first_half_engagement, second_half_engagement) * 100.0
 
     # Low volume signal: compare current window vs previous equivalent window
-    if previous_volume > 0:
-        vol_drop_pct = max(0.0, (previous_volume - current_volume) / previous_volume)
-    else:
-        vol_drop_pct = 0.0
-    low_volume = vol_drop_pct * 100.0
+    low_volume = _relative_drop(previous_volume, current_volume) * 100.0
 
-    churn_risk = _clamp(
+    churn_risk = np.clip(
         (100.0 - engagement) * 0.40
         + inactivity * 0.30
         + declining_trend * 0.20
-        + low_volume * 0.10
+        + low_volume * 0.10,
+        0.0,
+        100.0,
     )
 
     # New trainee guard: cap risk at Medium (50) if truly new with zero activity
-    if is_new_trainee:
-        churn_risk = min(churn_risk, 50.0)
-
-    return round(engagement, 1), round(churn_risk, 1)
+    churn_risk = np.where(is_new_trainee, np.minimum(churn_risk, 50.0), churn_risk)
 
+    return engagement, churn_risk
 
-# ── Main service function ──
 
-
-def get_retention_analytics(
+def _score_roster(
     trainer: User,
-    days: int,
-) -> RetentionAnalyticsResult:
+    lookback_days: int,
+    today: date,
+    trainee_ids: Collection[int] | None = None,
+) -> tuple[list[TraineeEngagementItem], list[RetentionTrendPoint]]:
     """
-    Compute retention analytics for all active trainees of a trainer.
+    Score every active trainee of ``trainer`` and build the daily trend.
 
-    Args:
-        trainer: The authenticated trainer user.
-        days: Lookback window in days (clamped to 3-365 by caller).
+    If ``trainee_ids`` is given, only those trainees (still on the active
+    roster) are scored, and the trend covers just that subset.
 
-    Returns:
-        Frozen dataclass with summary, per-trainee engagement/risk, and daily trends.
+    Returns items sorted by churn risk descending, and one trend point per
+    day from the start of the window through ``today``.
     """
     from trainer.models import TraineeActivitySummary
     from users.models import User as UserModel
 
-    now = timezone.now()
-    today = now.date()
-    lookback_days = max(days, 3)
     start_date = today - timedelta(days=lookback_days)
     prev_start = start_date - timedelta(days=lookback_days)
     half_point = today - timedelta(days=lookback_days // 2)
-
-    # ── Fetch trainees with aggregated activity data ──
-    trainees_qs = (
-        UserModel.objects.filter(
-            parent_trainer=trainer,
-            role=UserModel.Role.TRAINEE,
-            is_active=True,
-        )
-        .select_related('profile')
+    start_ord = start_date.toordinal()
+    half_ord = half_point.toordinal()
+    today_ord = today.toordinal()
+
+    roster_filter: dict[str, object] = {
+        'parent_trainer': trainer,
+        'role': UserModel.Role.TRAINEE,
+        'is_active': True,
+    }
+    if trainee_ids is not None:
+        roster_filter['id__in'] = list(trainee_ids)
+    trainees = list(
+        UserModel.objects.filter(**roster_filter)
         .order_by('id')
+        .values_list('id', 'email', 'first_name', 'last_name', 'date_joined')
     )
+    n = len(trainees)
+    if n == 0:
+        return [], []
 
-    trainee_list = list(trainees_qs[:100])
-    if not trainee_list:
-        return RetentionAnalyticsResult(
-            period_days=lookback_days,
-            summary=RetentionSummary(
-                total_trainees=0,
-                at_risk_count=0,
-                critical_count=0,
-                high_count=0,
-                medium_count=0,
-                low_count=0,
-                avg_engagement=0.0,
-                retention_rate=100.0,
-            ),
-            trainees=[],
-            trends=[],
-        )
-
-    trainee_ids = [t.id for t in trainee_list]
+    roster_ids = np.fromiter((t[0] for t in trainees), dtype=np.int64, count=n)
+    joined_ord = np.fromiter((t[4].date().toordinal() for t in trainees), dtype=np.int64, count=n)
 
-    # ── Bulk fetch activity summaries for the window + previous window ──
-    summaries = list(
+    # ── One query for current + previous window across the whole roster ──
+    rows = list(
         TraineeActivitySummary.objects.filter(
-            trainee_id__in=trainee_ids,
+            **{f'trainee__{key}': value for key, value in roster_filter.items()},
             date__gte=prev_start,
-        )
-        .values(
+        ).values_list(
             'trainee_id',
             'date',
             'logged_workout',
@@ -249,188 +277,550 @@ def get_retention_analytics(
             'hit_calorie_goal',
             'workouts_completed',
         )
-        .order_by('trainee_id', 'date')
+    )
+    m = len(rows)
+    idx = np.searchsorted(roster_ids, np.fromiter((r[0] for r in rows), dtype=np.int64, count=m))
+    day = np.fromiter((r[1].toordinal() for r in rows), dtype=np.int64, count=m)
+    workout = np.fromiter((r[2] for r in rows), dtype=bool, count=m)
+    food = np.fromiter((r[3] for r in rows), dtype=bool, count=m)
+    protein = np.fromiter((r[4] for r in rows), dtype=bool, count=m)
+    calorie = np.fromiter((r[5] for r in rows), dtype=bool, count=m)
+    volume = np.fromiter((r[6] for r in rows), dtype=np.float64, count=m)
+
+    def per_trainee(mask: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+        w = None if weights is None else weights[mask]
+        return np.bincount(idx[mask], weights=w, minlength=n).astype(np.float64)
+
+    current = day >= start_ord
+    days_logged_workout = per_trainee(current & workout)
+    days_logged_food = per_trainee(current & food)
+    days_hit_protein = per_trainee(current & protein)
+    days_hit_calorie = per_trainee(current & calorie)
+    current_rows = per_trainee(current)
+
+    # Most recent active day over both windows (current-window days always win)
+    active = workout | food
+    last_active_ord = np.full(n, -1, dtype=np.int64)
+    np.maximum.at(last_active_ord, idx[active], day[active])
+    has_activity = last_active_ord >= 0
+    days_since_last = np.where(has_activity, today_ord - last_active_ord, lookback_days)
+
+    # First half vs second half engagement (for declining trend)
+    first_half = current & (day < half_ord)
+    second_half = current & (day >= half_ord)
+    first_half_days = max((half_point - start_date).days, 1)
+    second_half_days = max((today - half_point).days, 1)
+    first_eng = (
+        (per_trainee(first_half & workout) + per_trainee(first_half & food))
+        / (2.0 * first_half_days)
+    ) * 100.0
+    second_eng = (
+        (per_trainee(second_half & workout) + per_trainee(second_half & food))
+        / (2.0 * second_half_days)
+    ) * 100.0
+
+    engagement, churn_risk = _compute_scores(
+        days_logged_workout=days_logged_workout,
+        days_logged_food=days_logged_food,
+        days_hit_protein=days_hit_protein,
+        days_hit_calorie=days_hit_calorie,
+        lookback_days=lookback_days,
+        days_since_last_activity=days_since_last,
+        first_half_engagement=first_eng,
+        second_half_engagement=second_eng,
+        current_volume=per_trainee(current, volume),
+        previous_volume=per_trainee(~current, volume),
+        is_new_trainee=(joined_ord >= start_ord) & (current_rows == 0),
     )
 
-    # ── Index summaries by trainee ──
-    summaries_by_trainee: dict[int, list[dict]] = {}
-    for s in summaries:
-        summaries_by_trainee.setdefault(s['trainee_id'], []).append(s)
+    # ── Materialize items, most at-risk first (stable on trainee id) ──
+    safe_lookback = max(lookback_days, 1)
+    engagement_r = [round(x, 1) for x in engagement.tolist()]
+    churn_r = [round(x, 1) for x in churn_risk.tolist()]
+    workout_pct = [round(x, 1) for x in (days_logged_workout / safe_lookback * 100.0).tolist()]
+    food_pct = [round(x, 1) for x in (days_logged_food / safe_lookback * 100.0).tolist()]
+    days_since_list = days_since_last.tolist()
+    last_active_list = last_active_ord.tolist()
 
-    # ── Compute per-trainee scores ──
     items: list[TraineeEngagementItem] = []
-    tier_counts: dict[str, int] = {"critical": 0, "high": 0, "medium": 0, "low": 0}
-    total_engagement = 0.0
-
-    for trainee in trainee_list:
-        trainee_summaries = summaries_by_trainee.get(trainee.id, [])
-
-        # Split into current window and previous window
-        current_window = [s for s in trainee_summaries if s['date'] >= start_date]
-        previous_window = [s for s in trainee_summaries if s['date'] < start_date]
-
-        # Current window metrics
-        days_logged_workout = sum(1 for s in current_window if s['logged_workout'])
-        days_logged_food = sum(1 for s in current_window if s['logged_food'])
-        days_hit_protein = sum(1 for s in current_window if s['hit_protein_goal'])
-        days_hit_calorie = sum(1 for s in current_window if s['hit_calorie_goal'])
-
-        # Days since last activity
-        active_dates = [
-            s['date'] for s in current_window
-            if s['logged_workout'] or s['logged_food']
-        ]
-        if active_dates:
-            last_active = max(active_dates)
-            days_since_last = (today - last_active).days
-        else:
-            # Check if there's any activity at all in the full range
-            all_active = [
-                s['date'] for s in trainee_summaries
-                if s['logged_workout'] or s['logged_food']
-            ]
-            if all_active:
-                last_active = max(all_active)
-                days_since_last = (today - last_active).days
-            else:
-                last_active = None
-                days_since_last = lookback_days
-
-        # First half vs second half engagement (for declining trend)
-        first_half = [s for s in current_window if s['date'] < half_point]
-        second_half = [s for s in current_window if s['date'] >= half_point]
-
-        def _half_engagement(half: list[dict], half_days: int) -> float:
-            if half_days <= 0:
-                return 0.0
-            w = sum(1 for s in half if s['logged_workout'])
-            f = sum(1 for s in half if s['logged_food'])
-            return ((w + f) / (2.0 * half_days)) * 100.0
-
-        first_half_days = max((half_point - start_date).days, 1)
-        second_half_days = max((today - half_point).days, 1)
-        first_eng = _half_engagement(first_half, first_half_days)
-        second_eng = _half_engagement(second_half, second_half_days)
-
-        # Volume comparison
-        current_volume = sum(s['workouts_completed'] for s in current_window)
-        previous_volume = sum(s['workouts_completed'] for s in previous_window)
-
-        # New trainee detection
-        is_new = (
-            trainee.date_joined.date() >= start_date
-            and len(current_window) == 0
+    for i in np.argsort(-np.asarray(churn_r), kind='stable').tolist():
+        trainee_id, email, first_name, last_name, _ = trainees[i]
+        name = f"{first_name} {last_name}".strip()
+        last_active = date.fromordinal(last_active_list[i]) if last_active_list[i] >= 0 else None
+        items.append(
+            TraineeEngagementItem(
+                trainee_id=trainee_id,
+                trainee_email=email,
+                trainee_name=name or email,
+                engagement_score=engagement_r[i],
+                churn_risk_score=churn_r[i],
+                risk_tier=_risk_tier(churn_r[i]),
+                days_since_last_activity=days_since_list[i] if last_active else None,
+                workout_consistency=workout_pct[i],
+                nutrition_consistency=food_pct[i],
+                last_active_date=last_active.isoformat() if last_active else None,
+            )
         )
 
-        engagement, churn_risk = _compute_scores(
-            days_logged_workout=days_logged_workout,
-            days_logged_food=days_logged_food,
-            days_hit_protein=days_hit_protein,
-            days_hit_calorie=days_hit_calorie,
-            lookback_days=lookback_days,
-            days_since_last_activity=days_since_last,
-            first_half_engagement=first_eng,
-            second_half_engagement=second_eng,
-            current_volume=current_volume,
-            previous_volume=previous_volume,
-            is_new_trainee=is_new,
+    # ── Daily trend: per-day totals via bincount over day offsets ──
+    num_days = today_ord - start_ord + 1
+    in_trend = current & (day <= today_ord)
+    offset = day[in_trend] - start_ord
+    day_score = (workout[in_trend] * 50.0) + (food[in_trend] * 50.0)
+    rows_per_day = np.bincount(offset, minlength=num_days)
+    score_per_day = np.bincount(offset, weights=day_score, minlength=num_days)
+    low_per_day = np.bincount(
+        offset, weights=(day_score < 25.0).astype(np.float64), minlength=num_days,
+    )
+    # Trainees without a summary on a day count as inactive (at risk)
+    at_risk_per_day = (low_per_day + (n - rows_per_day)).astype(np.int64)
+
+    trends: list[RetentionTrendPoint] = []
+    for offset_days, (row_count, score_total, at_risk) in enumerate(
+        zip(rows_per_day.tolist(), score_per_day.tolist(), at_risk_per_day.tolist())
+    ):
+        trends.append(
+            RetentionTrendPoint(
+                date=date.fromordinal(start_ord + offset_days).isoformat(),
+                avg_engagement=round(score_total / n, 1) if row_count else 0.0,
+                at_risk_count=at_risk if row_count else n,
+                total_trainees=n,
+            )
         )
 
-        tier = _risk_tier(churn_risk)
-        tier_counts[tier] += 1
-        total_engagement += engagement
+    return items, trends
 
-        name = f"{trainee.first_name} {trainee.last_name}".strip()
-        safe_lookback_for_consistency = max(lookback_days, 1)
 
-        items.append(
-            TraineeEngagementItem(
-                trainee_id=trainee.id,
-                trainee_email=trainee.email,
-                trainee_name=name or trainee.email,
-                engagement_score=engagement,
-                churn_risk_score=churn_risk,
-                risk_tier=tier,
-                days_since_last_activity=days_since_last if last_active else None,
-                workout_consistency=round(
-                    days_logged_workout / safe_lookback_for_consistency * 100.0, 1
-                ),
-                nutrition_consistency=round(
-                    days_logged_food / safe_lookback_for_consistency * 100.0, 1
-                ),
-                last_active_date=last_active.isoformat() if last_active else None,
-            )
-        )
+# ── Main service functions ──
 
-    total_trainees = len(trainee_list)
+
+def _summarize(items: list[TraineeEngagementItem]) -> RetentionSummary:
+    total_trainees = len(items)
+    tier_counts: dict[str, int] = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+    for item in items:
+        tier_counts[item.risk_tier] += 1
     at_risk_count = tier_counts["critical"] + tier_counts["high"]
-    avg_engagement = round(total_engagement / total_trainees, 1) if total_trainees > 0 else 0.0
+    avg_engagement = round(
+        sum(item.engagement_score for item in items) / total_trainees, 1
+    ) if total_trainees > 0 else 0.0
     retention_rate = round(
         ((total_trainees - at_risk_count) / total_trainees) * 100.0, 1
     ) if total_trainees > 0 else 100.0
 
-    # Sort by churn risk descending (most at-risk first)
-    items.sort(key=lambda x: x.churn_risk_score, reverse=True)
+    return RetentionSummary(
+        total_trainees=total_trainees,
+        at_risk_count=at_risk_count,
+        critical_count=tier_counts["critical"],
+        high_count=tier_counts["high"],
+        medium_count=tier_counts["medium"],
+        low_count=tier_counts["low"],
+        avg_engagement=avg_engagement,
+        retention_rate=retention_rate,
+    )
+
 
-    # ── Daily trend data ──
-    trends: list[RetentionTrendPoint] = []
-    # Group current-window summaries by date
-    summaries_by_date: dict[date, list[dict]] = {}
-    for s in summaries:
-        if s['date'] >= start_date:
-            summaries_by_date.setdefault(s['date'], []).append(s)
-
-    cursor = start_date
-    while cursor <= today:
-        day_summaries = summaries_by_date.get(cursor, [])
-
-        if day_summaries:
-            day_eng_total = 0.0
-            day_at_risk = 0
-            active_on_day = set()
-            for s in day_summaries:
-                active_on_day.add(s['trainee_id'])
-                # Simple daily engagement: did they log workout or food?
-                score = 0.0
-                if s['logged_workout']:
-                    score += 50.0
-                if s['logged_food']:
-                    score += 50.0
-                day_eng_total += score
-                if score < 25.0:
-                    day_at_risk += 1
-
-            # Trainees without summaries on this date count as inactive
-            inactive_count = total_trainees - len(active_on_day)
-            day_at_risk += inactive_count
-
-            avg_day_eng = round(day_eng_total / total_trainees, 1) if total_trainees > 0 else 0.0
-        else:
-            avg_day_eng = 0.0
-            day_at_risk = total_trainees
+def get_retention_analytics(
+    trainer: User,
+    days: int,
+) -> RetentionAnalyticsResult:
+    """
+    Compute retention analytics for all active trainees of a trainer.
+
+    Read-only: nothing is persisted (see refresh_retention_snapshots).
+
+    Args:
+        trainer: The authenticated trainer user.
+        days: Lookback window in days (clamped to 3-365 by caller).
+
+    Returns:
+        Frozen dataclass with summary, per-trainee engagement/risk, and daily trends.
+    """
+    lookback_days = max(days, 3)
+    items, trends = _score_roster(trainer, lookback_days, timezone.now().date())
+
+    return RetentionAnalyticsResult(
+        period_days=lookback_days,
+        summary=_summarize(items),
+        trainees=items,
+        trends=trends,
+    )
 
+
+def _write_snapshots(
+    trainer: User,
+    period_days: int,
+    items: list[TraineeEngagementItem],
+    now: datetime,
+) -> int:
+    """Upsert today's snapshot rows for ``items``; returns rows written."""
+    from trainer.models import TraineeRetentionSnapshot
+
+    rows = [
+        TraineeRetentionSnapshot(
+            trainer=trainer,
+            trainee_id=item.trainee_id,
+            snapshot_date=now.date(),
+            period_days=period_days,
+            engagement_score=item.engagement_score,
+            churn_risk_score=item.churn_risk_score,
+            risk_tier=item.risk_tier,
+            days_since_last_activity=(
+                max(item.days_since_last_activity, 0)
+                if item.days_since_last_activity is not None else None
+            ),
+            workout_consistency=item.workout_consistency,
+            nutrition_consistency=item.nutrition_consistency,
+            last_active_date=(
+                date.fromisoformat(item.last_active_date) if item.last_active_date else None
+            ),
+            computed_at=now,
+        )
+        for item in items
+    ]
+    TraineeRetentionSnapshot.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['trainee', 'snapshot_date', 'period_days'],
+        update_fields=[
+            'trainer', 'engagement_score', 'churn_risk_score', 'risk_tier',
+            'days_since_last_activity', 'workout_consistency',
+            'nutrition_consistency', 'last_active_date', 'computed_at',
+        ],
+    )
+    return len(rows)
+
+
+def save_retention_snapshots(
+    trainer: User,
+    result: RetentionAnalyticsResult,
+    *,
+    now: datetime | None = None,
+) -> int:
+    """
+    Persist per-trainee scores from ``result`` as today's snapshot.
+
+    Upserts one row per trainee for (today, period_days) and drops today's
+    rows for trainees no longer on the roster. Earlier days are untouched.
+
+    Returns:
+        Number of snapshot rows written.
+    """
+    from trainer.models import TraineeRetentionSnapshot
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        written = _write_snapshots(trainer, result.period_days, result.trainees, now)
+        TraineeRetentionSnapshot.objects.filter(
+            trainer=trainer,
+            snapshot_date=now.date(),
+            period_days=result.period_days,
+            computed_at__lt=now,
+        ).delete()
+    return written
+
+
+def refresh_retention_snapshots(trainer: User, days: int) -> RetentionAnalyticsResult:
+    """Compute retention analytics and persist them as today's snapshot."""
+    result = get_retention_analytics(trainer, days)
+    now = timezone.now()
+    save_retention_snapshots(trainer, result, now=now)
+    return replace(result, computed_at=now)
+
+
+def refresh_stale_retention_snapshots(
+    trainer: User,
+    days: int,
+) -> IncrementalRefreshResult:
+    """
+    Re-score only trainees whose snapshot for today is missing or stale.
+
+    A trainee's ``computed_at`` is its watermark: the snapshot is stale if any
+    of their activity summaries was saved after it, or if it is older than
+    RESCORE_MAX_AGE (writes that bypass save() do not move updated_at).
+    Trainees that left the roster lose today's row. Scores depend on the
+    date, so the first run of a day re-scores everyone; later runs (re-runs,
+    resumes after an interruption) only touch what changed.
+
+    Writes are not wrapped in a transaction here; callers batching several
+    trainers (see compute_retention) own the commit.
+    """
+    from trainer.models import TraineeActivitySummary, TraineeRetentionSnapshot
+    from users.models import User as UserModel
+
+    lookback_days = max(days, 3)
+    now = timezone.now()
+    today = now.date()
+
+    roster_ids = set(
+        UserModel.objects.filter(
+            parent_trainer=trainer,
+            role=UserModel.Role.TRAINEE,
+            is_active=True,
+        ).values_list('id', flat=True)
+    )
+    today_rows = TraineeRetentionSnapshot.objects.filter(
+        trainer=trainer,
+        snapshot_date=today,
+        period_days=lookback_days,
+    )
+    snapshotted_ids = set(today_rows.values_list('trainee_id', flat=True))
+    changed_ids = set(
+        today_rows.filter(
+            Q(computed_at__lt=now - RESCORE_MAX_AGE)
+            | Exists(
+                TraineeActivitySummary.objects.filter(
+                    trainee_id=OuterRef('trainee_id'),
+                    updated_at__gt=OuterRef('computed_at'),
+                )
+            )
+        ).values_list('trainee_id', flat=True)
+    )
+    stale_ids = (roster_ids - snapshotted_ids) | (changed_ids & roster_ids)
+
+    removed = 0
+    departed_ids = snapshotted_ids - roster_ids
+    if departed_ids:
+        removed, _ = today_rows.filter(trainee_id__in=departed_ids).delete()
+
+    items: list[TraineeEngagementItem] = []
+    if stale_ids:
+        items, _ = _score_roster(trainer, lookback_days, today, trainee_ids=stale_ids)
+        _write_snapshots(trainer, lookback_days, items, now)
+
+    return IncrementalRefreshResult(
+        period_days=lookback_days,
+        rescored=items,
+        unchanged_count=len(roster_ids) - len(stale_ids),
+        removed_count=removed,
+    )
+
+
+# Columns read to build a TraineeEngagementItem from a snapshot row
+_SNAPSHOT_ITEM_FIELDS: tuple[str, ...] = (
+    'engagement_score', 'churn_risk_score', 'risk_tier',
+    'days_since_last_activity', 'workout_consistency',
+    'nutrition_consistency', 'last_active_date',
+    'trainee__id', 'trainee__email', 'trainee__first_name', 'trainee__last_name',
+)
+
+
+def _snapshot_to_item(snapshot: TraineeRetentionSnapshot) -> TraineeEngagementItem:
+    trainee = snapshot.trainee
+    name = f"{trainee.first_name} {trainee.last_name}".strip()
+    return TraineeEngagementItem(
+        trainee_id=trainee.id,
+        trainee_email=trainee.email,
+        trainee_name=name or trainee.email,
+        engagement_score=snapshot.engagement_score,
+        churn_risk_score=snapshot.churn_risk_score,
+        risk_tier=snapshot.risk_tier,
+        days_since_last_activity=snapshot.days_since_last_activity,
+        workout_consistency=snapshot.workout_consistency,
+        nutrition_consistency=snapshot.nutrition_consistency,
+        last_active_date=(
+            snapshot.last_active_date.isoformat() if snapshot.last_active_date else None
+        ),
+    )
+
+
+def _latest_snapshot(
+    trainer: User,
+    period_days: int,
+) -> tuple[QuerySet[TraineeRetentionSnapshot], datetime | None]:
+    """
+    The trainer's most recent stored snapshot rows for ``period_days``,
+    limited to trainees still on the active roster, and when they were
+    computed (None if nothing is stored).
+    """
+    from trainer.models import TraineeRetentionSnapshot
+    from users.models import User as UserModel
+
+    rows = TraineeRetentionSnapshot.objects.filter(trainer=trainer, period_days=period_days)
+    latest_date = rows.aggregate(latest=Max('snapshot_date'))['latest']
+    if latest_date is None:
+        return rows.none(), None
+    rows = rows.filter(
+        snapshot_date=latest_date,
+        trainee__parent_trainer=trainer,
+        trainee__role=UserModel.Role.TRAINEE,
+        trainee__is_active=True,
+    )
+    return rows, rows.aggregate(latest=Max('computed_at'))['latest']
+
+
+def _activity_trend(trainer: User, lookback_days: int, today: date) -> list[RetentionTrendPoint]:
+    """The daily trend of _score_roster, aggregated in the database."""
+    from trainer.models import TraineeActivitySummary
+    from users.models import User as UserModel
+
+    n = UserModel.objects.filter(
+        parent_trainer=trainer,
+        role=UserModel.Role.TRAINEE,
+        is_active=True,
+    ).count()
+    if n == 0:
+        return []
+
+    start_date = today - timedelta(days=lookback_days)
+    per_day = {
+        row['date']: row
+        for row in TraineeActivitySummary.objects.filter(
+            trainee__parent_trainer=trainer,
+            trainee__role=UserModel.Role.TRAINEE,
+            trainee__is_active=True,
+            date__gte=start_date,
+            date__lte=today,
+        )
+        .order_by()
+        .values('date')
+        .annotate(
+            rows=Count('id'),
+            active_flags=(
+                Count('id', filter=Q(logged_workout=True))
+                + Count('id', filter=Q(logged_food=True))
+            ),
+            idle=Count('id', filter=Q(logged_workout=False, logged_food=False)),
+        )
+    }
+
+    trends: list[RetentionTrendPoint] = []
+    for offset_days in range((today - start_date).days + 1):
+        day = start_date + timedelta(days=offset_days)
+        row = per_day.get(day)
         trends.append(
             RetentionTrendPoint(
-                date=cursor.isoformat(),
-                avg_engagement=avg_day_eng,
-                at_risk_count=day_at_risk,
-                total_trainees=total_trainees,
+                date=day.isoformat(),
+                avg_engagement=round(row['active_flags'] * 50.0 / n, 1) if row else 0.0,
+                # Trainees without a summary on a day count as inactive (at risk)
+                at_risk_count=row['idle'] + n - row['rows'] if row else n,
+                total_trainees=n,
             )
         )
-        cursor += timedelta(days=1)
+    return trends
+
+
+def get_stored_retention_analytics(
+    trainer: User,
+    days: int,
+) -> RetentionAnalyticsResult | None:
+    """
+    Retention analytics from the latest stored snapshot, without writing.
+
+    Per-trainee scores come from the most recent TraineeRetentionSnapshot
+    rows (written by compute_retention or refresh_retention_snapshots); the
+    daily trend is one aggregate query over activity summaries.
 
+    Returns:
+        None if no snapshot has been stored for this window yet.
+    """
+    lookback_days = max(days, 3)
+    rows, computed_at = _latest_snapshot(trainer, lookback_days)
+    if computed_at is None:
+        return None
+
+    items = [
+        _snapshot_to_item(snapshot)
+        for snapshot in rows.select_related('trainee')
+        .only(*_SNAPSHOT_ITEM_FIELDS)
+        .order_by('-churn_risk_score', 'trainee_id')
+    ]
     return RetentionAnalyticsResult(
         period_days=lookback_days,
-        summary=RetentionSummary(
-            total_trainees=total_trainees,
-            at_risk_count=at_risk_count,
-            critical_count=tier_counts["critical"],
-            high_count=tier_counts["high"],
-            medium_count=tier_counts["medium"],
-            low_count=tier_counts["low"],
-            avg_engagement=avg_engagement,
-            retention_rate=retention_rate,
-        ),
+        summary=_summarize(items),
         trainees=items,
-        trends=trends,
+        trends=_activity_trend(trainer, lookback_days, timezone.now().date()),
+        computed_at=computed_at,
+    )
+
+
+def _parse_ordering(ordering: str) -> list[OrderBy]:
+    descending = ordering.startswith('-')
+    key = ordering.lstrip('-')
+    if key not in AT_RISK_ORDERINGS:
+        raise ValueError(
+            f"Invalid ordering '{ordering}'. "
+            f"Choose from: {', '.join(sorted(AT_RISK_ORDERINGS))} (prefix '-' for descending)."
+        )
+    order_by = [
+        F(column).desc(nulls_last=True) if descending else F(column).asc(nulls_last=True)
+        for column in AT_RISK_ORDERINGS[key]
+    ]
+    # Deterministic tiebreak so pages never overlap
+    order_by.append(F('trainee_id').asc())
+    return order_by
+
+
+def _sort_items(
+    items: list[TraineeEngagementItem],
+    ordering: str,
+) -> list[TraineeEngagementItem]:
+    """In-memory equivalent of _parse_ordering, for live-scored items."""
+    descending = ordering.startswith('-')
+    key = ordering.lstrip('-')
+    by_id = sorted(items, key=lambda item: item.trainee_id)
+    present = [item for item in by_id if getattr(item, key) is not None]
+    missing = [item for item in by_id if getattr(item, key) is None]
+    # Stable sorts keep the trainee id tiebreak, nulls go last either way
+    present.sort(key=lambda item: getattr(item, key), reverse=descending)
+    return present + missing
+
+
+def get_at_risk_page(
+    trainer: User,
+    days: int,
+    *,
+    ordering: str = '-churn_risk_score',
+    page: int = 1,
+    page_size: int = AT_RISK_DEFAULT_PAGE_SIZE,
+) -> AtRiskPage:
+    """
+    Return one page of critical/high-risk trainees from the latest stored snapshot.
+
+    Read-only: sorting and pagination are index-backed queries over the
+    rows written by compute_retention (or an explicit refresh). Until a
+    snapshot exists, the roster is scored live and sorted in memory.
+
+    Raises:
+        ValueError: If ``ordering`` is not a supported key.
+    """
+    order_by = _parse_ordering(ordering)
+    lookback_days = max(days, 3)
+
+    rows, computed_at = _latest_snapshot(trainer, lookback_days)
+    at_risk: QuerySet[TraineeRetentionSnapshot] | list[TraineeEngagementItem]
+    if computed_at is None:
+        at_risk = _sort_items(
+            [
+                item for item in get_retention_analytics(trainer, lookback_days).trainees
+                if item.risk_tier in AT_RISK_TIERS
+            ],
+            ordering,
+        )
+    else:
+        at_risk = (
+            rows.filter(risk_tier__in=AT_RISK_TIERS)
+            .select_related('trainee')
+            .only(*_SNAPSHOT_ITEM_FIELDS)
+            .order_by(*order_by)
+        )
+
+    page_size = max(1, min(page_size, AT_RISK_MAX_PAGE_SIZE))
+    paginator = Paginator(at_risk, page_size)
+    page_number = max(1, min(page, paginator.num_pages or 1))
+    page_obj = paginator.get_page(page_number)
+
+    return AtRiskPage(
+        period_days=lookback_days,
+        trainees=[
+            row if isinstance(row, TraineeEngagementItem)
+            else _snapshot_to_item(cast('TraineeRetentionSnapshot', row))
+            for row in page_obj
+        ],
+        count=paginator.count,
+        page=page_number,
+        num_pages=paginator.num_pages,
+        has_next=page_obj.has_next(),
+        has_previous=page_obj.has_previous(),
+        computed_at=computed_at,
     )
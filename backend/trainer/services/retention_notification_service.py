@@ -7,6 +7,11 @@ Deduplication rules:
 - Trainee push: skip if a re-engagement push was sent within the last 7 days,
   tracked via TrainerNotification.data['re_engagement_push'] flag.
 
+Snapshot alerts:
+- alert_at_risk_snapshots() alerts on today's at-risk retention snapshots
+  and stamps their alerted_at, so each trainee is considered once a day no
+  matter which run (or dashboard refresh) scored them.
+
 FCM integration:
 - Trainer churn alerts are sent as push notifications (category: churn_alert).
 - Trainee re-engagement pushes are sent as push notifications (category: re_engagement).
@@ -14,9 +19,11 @@ FCM integration:
 from __future__ import annotations
 
 import logging
+from dataclasses import dataclass
 from datetime import timedelta
 from typing import TYPE_CHECKING
 
+from django.db import transaction
 from django.utils import timezone
 
 if TYPE_CHECKING:
@@ -29,6 +36,13 @@ TRAINER_ALERT_COOLDOWN_DAYS: int = 3
 PUSH_COOLDOWN_DAYS: int = 7
 
 
+@dataclass(frozen=True)
+class SnapshotAlertResult:
+    snapshots: int  # at-risk snapshots stamped as alerted
+    alerts: int
+    pushes: int
+
+
 def _send_trainer_churn_push(
     trainer_id: int,
     trainee_id: int,
@@ -284,3 +298,47 @@ def send_re_engagement_pushes(
         )
 
     return len(notifications_to_create)
+
+
+def alert_at_risk_snapshots(trainer: User, days: int) -> SnapshotAlertResult:
+    """
+    Send churn alerts for today's critical/high snapshots not alerted on yet.
+
+    The rows are claimed with SKIP LOCKED, and notifications, queued pushes
+    and the alerted_at stamp commit together: a failure leaves the rows
+    unalerted for the next run, and concurrent runs never alert twice.
+    """
+    from trainer.models import TraineeRetentionSnapshot
+    from trainer.services.retention_analytics_service import (
+        AT_RISK_TIERS,
+        _snapshot_to_item,
+    )
+
+    with transaction.atomic():
+        snapshots = list(
+            TraineeRetentionSnapshot.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(
+                trainer=trainer,
+                snapshot_date=timezone.now().date(),
+                period_days=max(days, 3),
+                risk_tier__in=AT_RISK_TIERS,
+                alerted_at__isnull=True,
+                trainee__parent_trainer=trainer,
+                trainee__is_active=True,
+            )
+            .select_related('trainee')
+            .order_by('-churn_risk_score', 'trainee_id')
+        )
+        if not snapshots:
+            return SnapshotAlertResult(0, 0, 0)
+
+        at_risk = [_snapshot_to_item(snapshot) for snapshot in snapshots]
+        alerts = create_churn_alerts(trainer, at_risk)
+        pushes = send_re_engagement_pushes(
+            trainer, [item for item in at_risk if item.risk_tier == "critical"],
+        )
+        TraineeRetentionSnapshot.objects.filter(
+            id__in=[snapshot.id for snapshot in snapshots],
+        ).update(alerted_at=timezone.now())
+
+    return SnapshotAlertResult(snapshots=len(snapshots), alerts=alerts, pushes=pushes)
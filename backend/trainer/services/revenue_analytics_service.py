@@ -1,18 +1,23 @@
 """
 Service for computing trainer revenue analytics from TraineePayment and
 TraineeSubscription models.
+
+Period totals and the monthly series are read from the per-trainer revenue
+rollups (see revenue_rollup_service); the subscriber and payment lists come
+from the source tables.
 """
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from typing import TYPE_CHECKING
 
 from django.db.models import Count, Sum
-from django.db.models.functions import TruncMonth
 from django.utils import timezone
 
+from trainer.services.revenue_rollup_service import get_monthly_revenue, get_net_revenue_since
+
 if TYPE_CHECKING:
     from users.models import User
 
@@ -47,6 +52,11 @@ class RevenuePaymentItem:
 class MonthlyRevenuePoint:
     month: str
     amount: str
+    gross: str
+    refunds: str
+    new_subscribers: int
+    churned_subscribers: int
+    mrr: str
 
 
 @dataclass(frozen=True)
@@ -61,13 +71,31 @@ class RevenueAnalyticsResult:
     recent_payments: list[RevenuePaymentItem]
 
 
-def get_revenue_analytics(trainer: User, days: int) -> RevenueAnalyticsResult:
+_ZERO = Decimal('0.00')
+
+DEFAULT_REVENUE_MONTHS: int = 12
+MAX_REVENUE_MONTHS: int = 120
+
+
+def _add_months(month: date, count: int) -> date:
+    """Shift a first-of-month date by ``count`` months."""
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def get_revenue_analytics(
+    trainer: User,
+    days: int,
+    months: int = DEFAULT_REVENUE_MONTHS,
+) -> RevenueAnalyticsResult:
     """
     Compute revenue analytics for a trainer.
 
     Args:
         trainer: The authenticated trainer user.
         days: Number of days to look back for period-based stats (1-365).
+        months: Months of history in the monthly series, besides the
+            current one (clamped to 1-120).
 
     Returns:
         Frozen dataclass with aggregated revenue metrics, monthly breakdown,
@@ -91,45 +119,34 @@ def get_revenue_analytics(trainer: User, days: int) -> RevenueAnalyticsResult:
         (mrr / active_count) if active_count > 0 else Decimal('0.00')
     )
 
-    # ── Total revenue in period (only succeeded payments) ──
-    period_payments = TraineePayment.objects.filter(
-        trainer=trainer,
-        status=TraineePayment.Status.SUCCEEDED,
-        paid_at__gte=start_date,
-    )
-    total_revenue_result = period_payments.aggregate(total=Sum('amount'))
-    total_revenue = total_revenue_result['total'] or Decimal('0.00')
-
-    # ── Monthly revenue breakdown (last 12 months, zero-filled) ──
-    twelve_months_ago = (now.replace(day=1) - timedelta(days=365)).replace(day=1)
-    monthly_data = (
-        TraineePayment.objects.filter(
-            trainer=trainer,
-            status=TraineePayment.Status.SUCCEEDED,
-            paid_at__gte=twelve_months_ago,
-        )
-        .annotate(month=TruncMonth('paid_at'))
-        .values('month')
-        .annotate(revenue=Sum('amount'))
-        .order_by('month')
-    )
-    revenue_by_month: dict[str, str] = {
-        entry['month'].strftime('%Y-%m'): str(entry['revenue'])
-        for entry in monthly_data
-    }
+    # ── Total revenue in period (net of refunds) ──
+    total_revenue = get_net_revenue_since(trainer, timezone.localdate(start_date))
+
+    # ── Monthly revenue breakdown (zero-filled, MRR carried forward) ──
+    months = max(1, min(months, MAX_REVENUE_MONTHS))
+    now_month = timezone.localdate(now).replace(day=1)
+    first_month = _add_months(now_month, -months)
+    running_mrr, rollup_rows = get_monthly_revenue(trainer, first_month)
+    rollup_by_month = {row['month']: row for row in rollup_rows}
 
     monthly_revenue: list[MonthlyRevenuePoint] = []
-    cursor = twelve_months_ago
-    now_month = now.replace(day=1)
+    cursor = first_month
     while cursor <= now_month:
-        key = cursor.strftime('%Y-%m')
+        row = rollup_by_month.get(cursor)
+        if row is not None:
+            running_mrr = row['mrr']
         monthly_revenue.append(
-            MonthlyRevenuePoint(month=key, amount=revenue_by_month.get(key, '0.00'))
+            MonthlyRevenuePoint(
+                month=cursor.strftime('%Y-%m'),
+                amount=str(row['net'] if row else _ZERO),
+                gross=str(row['gross'] if row else _ZERO),
+                refunds=str(row['refunds'] if row else _ZERO),
+                new_subscribers=row['new_subscribers'] if row else 0,
+                churned_subscribers=row['churned_subscribers'] if row else 0,
+                mrr=str(running_mrr),
+            )
         )
-        if cursor.month == 12:
-            cursor = cursor.replace(year=cursor.year + 1, month=1)
-        else:
-            cursor = cursor.replace(month=cursor.month + 1)
+        cursor = _add_months(cursor, 1)
 
     # ── Active subscribers list (capped at 100 to prevent unbounded response) ──
     subscribers: list[RevenueSubscriberItem] = []
@@ -0,0 +1,228 @@
+"""
+Service for maintaining and reading the per-trainer revenue rollups.
+
+TrainerDailyRevenue and TrainerMonthlyRevenue hold, per trainer and period,
+gross / refunded / net payment amounts, new and churned subscribers, and the
+change in MRR. Rows are adjusted incrementally as payments and subscriptions
+are written (see trainer.signals), so revenue charts of any length read one
+row per period.
+
+Attribution rules (shared by the incremental path and the rebuild):
+- A payment counts once it has succeeded, on its paid date (falling back to
+  its creation date). Refunding it later moves its amount from net to
+  refunds on that same date, so past months stay comparable.
+- A subscription is new on its creation day, or on the day a canceled one is
+  reactivated. It churns on the day it is canceled.
+- MRR moves by the subscription amount when it enters or leaves ACTIVE, and
+  by the difference when an active subscription's amount changes. MRR at the
+  end of a period is the running sum of ``mrr_delta``. The rebuild only sees
+  current state, so it dates a departure from ACTIVE at ``canceled_at`` or,
+  failing that, ``updated_at``; the running sum always ends at today's MRR.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from trainer.models import TrainerDailyRevenue, TrainerMonthlyRevenue
+
+if TYPE_CHECKING:
+    from users.models import User
+
+logger = logging.getLogger(__name__)
+
+AMOUNT_FIELDS: tuple[str, ...] = ('gross', 'refunds', 'net', 'mrr_delta')
+COUNTER_FIELDS: tuple[str, ...] = ('new_subscribers', 'churned_subscribers')
+ROLLUP_FIELDS: tuple[str, ...] = AMOUNT_FIELDS + COUNTER_FIELDS
+
+ZERO = Decimal('0.00')
+
+
+def _local_date(value: datetime) -> date:
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def payment_contribution(
+    *,
+    status: str,
+    amount: Decimal,
+    paid_at: datetime | None,
+    created_at: datetime | None,
+) -> tuple[date | None, dict[str, Decimal]]:
+    """Rollup day and amounts a single payment contributes (``None`` if none)."""
+    from subscriptions.models import TraineePayment
+
+    when = paid_at or created_at
+    if when is None or status not in (
+        TraineePayment.Status.SUCCEEDED,
+        TraineePayment.Status.REFUNDED,
+    ):
+        return None, {}
+    refunded = amount if status == TraineePayment.Status.REFUNDED else ZERO
+    return _local_date(when), {
+        'gross': amount,
+        'refunds': refunded,
+        'net': amount - refunded,
+    }
+
+
+def subscription_mrr(*, status: str, amount: Decimal) -> Decimal:
+    """A subscription's contribution to MRR in its current state."""
+    from subscriptions.models import TraineeSubscription
+
+    return amount if status == TraineeSubscription.Status.ACTIVE else ZERO
+
+
+def apply_revenue_delta(trainer_id: int, day: date, delta: dict[str, Any]) -> None:
+    """
+    Atomically add ``delta`` to the daily and monthly rows containing ``day``.
+
+    Rows are created on first use; concurrent writers serialize on the row
+    locks taken by the UPDATEs. Subscriber counters are floored at zero so a
+    missing backfill can never violate the PositiveIntegerField check.
+    """
+    changes = {name: value for name, value in delta.items() if value}
+    if not changes:
+        return
+
+    updates = {
+        name: Greatest(F(name) + value, 0) if name in COUNTER_FIELDS else F(name) + value
+        for name, value in changes.items()
+    }
+    now = timezone.now()
+    month = day.replace(day=1)
+    with transaction.atomic():
+        TrainerDailyRevenue.objects.bulk_create(
+            [TrainerDailyRevenue(trainer_id=trainer_id, date=day)],
+            ignore_conflicts=True,
+        )
+        TrainerDailyRevenue.objects.filter(trainer_id=trainer_id, date=day).update(
+            updated_at=now, **updates,
+        )
+        TrainerMonthlyRevenue.objects.bulk_create(
+            [TrainerMonthlyRevenue(trainer_id=trainer_id, month=month)],
+            ignore_conflicts=True,
+        )
+        TrainerMonthlyRevenue.objects.filter(trainer_id=trainer_id, month=month).update(
+            updated_at=now, **updates,
+        )
+
+
+def rebuild_revenue_rollup(trainer_id: int) -> int:
+    """
+    Recompute every daily and monthly revenue row for a trainer.
+
+    Used by the ``rebuild_revenue_rollups`` command, and after bulk writes
+    that bypass model signals.
+
+    Returns:
+        Number of daily rows written.
+    """
+    from subscriptions.models import TraineePayment, TraineeSubscription
+
+    daily: dict[date, dict[str, Any]] = defaultdict(
+        lambda: {name: (ZERO if name in AMOUNT_FIELDS else 0) for name in ROLLUP_FIELDS}
+    )
+
+    payments = (
+        TraineePayment.objects.filter(
+            trainer_id=trainer_id,
+            status__in=[TraineePayment.Status.SUCCEEDED, TraineePayment.Status.REFUNDED],
+        )
+        .annotate(day=TruncDate(Coalesce('paid_at', 'created_at')))
+        .values('day', 'status')
+        .annotate(total=Sum('amount'))
+    )
+    for row in payments:
+        counters = daily[row['day']]
+        counters['gross'] += row['total']
+        if row['status'] == TraineePayment.Status.REFUNDED:
+            counters['refunds'] += row['total']
+        else:
+            counters['net'] += row['total']
+
+    subscriptions = TraineeSubscription.objects.filter(trainer_id=trainer_id).values(
+        'status', 'amount', 'created_at', 'canceled_at', 'updated_at',
+    )
+    for sub in subscriptions:
+        started = daily[_local_date(sub['created_at'])]
+        started['new_subscribers'] += 1
+        started['mrr_delta'] += sub['amount']
+        if sub['status'] == TraineeSubscription.Status.ACTIVE:
+            continue
+        ended = daily[_local_date(sub['canceled_at'] or sub['updated_at'])]
+        ended['mrr_delta'] -= sub['amount']
+        if sub['status'] == TraineeSubscription.Status.CANCELED:
+            ended['churned_subscribers'] += 1
+
+    monthly: dict[date, dict[str, Any]] = defaultdict(
+        lambda: {name: (ZERO if name in AMOUNT_FIELDS else 0) for name in ROLLUP_FIELDS}
+    )
+    for day, counters in daily.items():
+        month = monthly[day.replace(day=1)]
+        for name in ROLLUP_FIELDS:
+            month[name] += counters[name]
+
+    with transaction.atomic():
+        TrainerDailyRevenue.objects.filter(trainer_id=trainer_id).delete()
+        TrainerMonthlyRevenue.objects.filter(trainer_id=trainer_id).delete()
+        TrainerDailyRevenue.objects.bulk_create(
+            [
+                TrainerDailyRevenue(trainer_id=trainer_id, date=day, **counters)
+                for day, counters in sorted(daily.items())
+            ],
+            batch_size=500,
+        )
+        TrainerMonthlyRevenue.objects.bulk_create(
+            [
+                TrainerMonthlyRevenue(trainer_id=trainer_id, month=month, **counters)
+                for month, counters in sorted(monthly.items())
+            ],
+            batch_size=500,
+        )
+    return len(daily)
+
+
+def get_net_revenue_since(trainer: User, start_date: date) -> Decimal:
+    """Net revenue on or after ``start_date``, summed over daily rows."""
+    total = TrainerDailyRevenue.objects.filter(
+        trainer=trainer,
+        date__gte=start_date,
+    ).aggregate(total=Sum('net'))['total']
+    return total if total is not None else ZERO
+
+
+def get_monthly_revenue(
+    trainer: User,
+    start_month: date,
+) -> tuple[Decimal, list[dict[str, Any]]]:
+    """
+    Return the MRR entering ``start_month`` and monthly rows from it, ascending.
+
+    Each row carries its counters plus ``mrr``, the running MRR at month
+    end. The running sum needs every earlier month too, so all of the
+    trainer's monthly rows (one per month with any activity) are read in
+    one indexed query and the window is sliced here.
+    """
+    rows: list[dict[str, Any]] = []
+    opening_mrr: Decimal | None = None
+    running_mrr = ZERO
+    for row in (
+        TrainerMonthlyRevenue.objects.filter(trainer=trainer)
+        .values('month', *ROLLUP_FIELDS)
+        .order_by('month')
+    ):
+        if row['month'] >= start_month and opening_mrr is None:
+            opening_mrr = running_mrr
+        running_mrr += row['mrr_delta']
+        if row['month'] >= start_month:
+            rows.append({**row, 'mrr': running_mrr})
+    return (running_mrr if opening_mrr is None else opening_mrr), rows
@@ -0,0 +1,301 @@
+"""
+Signal handlers for the trainer app.
+
+Keeps per-trainer cached aggregates and rollups consistent with the rows
+they are derived from. Bulk operations (``QuerySet.update``,
+``bulk_create``) do not fire these signals; callers using them must
+invalidate or rebuild explicitly.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from subscriptions.models import Subscription, TraineePayment, TraineeSubscription
+from trainer.models import TraineeActivitySummary
+from trainer.services.adherence_rollup_service import (
+    apply_adherence_delta,
+    apply_trainee_membership,
+    summary_counts,
+)
+from trainer.services.ai_context_service import (
+    invalidate_roster_context,
+    invalidate_trainee_context,
+)
+from trainer.services.dashboard_stats_service import invalidate_trainer_stats
+from trainer.services.revenue_rollup_service import (
+    apply_revenue_delta,
+    payment_contribution,
+    subscription_mrr,
+)
+from users.models import User, UserProfile
+from workouts.models import DailyLog, NutritionGoal, Program, WeightCheckIn
+
+_ROSTER_FIELDS = frozenset({'parent_trainer', 'parent_trainer_id', 'is_active', 'role'})
+
+
+def _parent_trainer_id(trainee_id: int) -> int | None:
+    return (
+        User.objects.filter(id=trainee_id)
+        .values_list('parent_trainer_id', flat=True)
+        .first()
+    )
+
+
+def _rollup_trainer_id(trainee_id: int) -> int | None:
+    """Trainer whose adherence rollup counts this trainee, if any."""
+    return (
+        User.objects.filter(id=trainee_id, role=User.Role.TRAINEE, is_active=True)
+        .values_list('parent_trainer_id', flat=True)
+        .first()
+    )
+
+
+def _counted_trainer_id(parent_trainer_id: int | None, is_active: bool, role: str) -> int | None:
+    """Trainer whose adherence rollup counts a user in this roster state, if any."""
+    return parent_trainer_id if is_active and role == User.Role.TRAINEE else None
+
+
+def _counts(values: Any) -> dict[str, int]:
+    return summary_counts(
+        logged_food=values.logged_food,
+        logged_workout=values.logged_workout,
+        hit_protein_goal=values.hit_protein_goal,
+        hit_calorie_goal=values.hit_calorie_goal,
+    )
+
+
+# ── Activity summaries ──
+
+
+@receiver(pre_save, sender=TraineeActivitySummary)
+def remember_previous_summary(
+    sender: type[TraineeActivitySummary],
+    instance: TraineeActivitySummary,
+    **kwargs: Any,
+) -> None:
+    instance._adherence_prev = (  # type: ignore[attr-defined]
+        TraineeActivitySummary.objects.filter(pk=instance.pk).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=TraineeActivitySummary)
+def on_activity_summary_saved(
+    sender: type[TraineeActivitySummary],
+    instance: TraineeActivitySummary,
+    created: bool,
+    **kwargs: Any,
+) -> None:
+    trainer_id = _rollup_trainer_id(instance.trainee_id)
+    if trainer_id is not None:
+        new = _counts(instance)
+        prev: TraineeActivitySummary | None = getattr(instance, '_adherence_prev', None)
+        if created or prev is None:
+            apply_adherence_delta(trainer_id, instance.date, new)
+        elif prev.date != instance.date:
+            apply_adherence_delta(trainer_id, prev.date, {k: -v for k, v in _counts(prev).items()})
+            apply_adherence_delta(trainer_id, instance.date, new)
+        else:
+            old = _counts(prev)
+            apply_adherence_delta(trainer_id, instance.date, {k: new[k] - old[k] for k in new})
+    parent_id = _parent_trainer_id(instance.trainee_id)
+    invalidate_trainer_stats(parent_id)
+    invalidate_roster_context(parent_id)
+
+
+@receiver(post_delete, sender=TraineeActivitySummary)
+def on_activity_summary_deleted(
+    sender: type[TraineeActivitySummary],
+    instance: TraineeActivitySummary,
+    **kwargs: Any,
+) -> None:
+    trainer_id = _rollup_trainer_id(instance.trainee_id)
+    if trainer_id is not None:
+        apply_adherence_delta(
+            trainer_id, instance.date, {k: -v for k, v in _counts(instance).items()},
+        )
+    parent_id = _parent_trainer_id(instance.trainee_id)
+    invalidate_trainer_stats(parent_id)
+    invalidate_roster_context(parent_id)
+
+
+# ── Roster membership ──
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_roster_state(sender: type[User], instance: User, **kwargs: Any) -> None:
+    update_fields = kwargs.get('update_fields')
+    if not instance.pk or (update_fields is not None and not _ROSTER_FIELDS & set(update_fields)):
+        instance._roster_prev = None  # type: ignore[attr-defined]
+        return
+    instance._roster_prev = (  # type: ignore[attr-defined]
+        User.objects.filter(pk=instance.pk)
+        .values_list('parent_trainer_id', 'is_active', 'role')
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def on_user_saved(sender: type[User], instance: User, created: bool, **kwargs: Any) -> None:
+    if instance.role == User.Role.TRAINEE:
+        # Name, email or status may have changed — all appear in AI chat context.
+        invalidate_trainee_context(instance.id)
+        invalidate_roster_context(instance.parent_trainer_id)
+
+    if created:
+        if instance.role == User.Role.TRAINEE:
+            invalidate_trainer_stats(instance.parent_trainer_id)
+        return
+
+    prev = getattr(instance, '_roster_prev', None)
+    if prev is None:
+        return
+    current = (instance.parent_trainer_id, instance.is_active, instance.role)
+    if prev == current or User.Role.TRAINEE not in (prev[2], current[2]):
+        return
+
+    # Move the trainee's history between rollups, as the summary handlers do
+    counted_before = _counted_trainer_id(*prev)
+    counted_now = _counted_trainer_id(*current)
+    if counted_before != counted_now:
+        if counted_before is not None:
+            apply_trainee_membership(counted_before, instance.pk, -1)
+        if counted_now is not None:
+            apply_trainee_membership(counted_now, instance.pk, 1)
+
+    for trainer_id in {prev[0], current[0]} - {None}:
+        invalidate_trainer_stats(trainer_id)
+        invalidate_roster_context(trainer_id)
+
+
+@receiver(post_delete, sender=User)
+def on_user_deleted(sender: type[User], instance: User, **kwargs: Any) -> None:
+    if instance.role == User.Role.TRAINEE:
+        invalidate_trainer_stats(instance.parent_trainer_id)
+        invalidate_roster_context(instance.parent_trainer_id)
+
+
+# ── Other stats inputs ──
+
+
+@receiver(post_save, sender=UserProfile)
+def on_profile_change(sender: type[UserProfile], instance: UserProfile, **kwargs: Any) -> None:
+    invalidate_trainer_stats(_parent_trainer_id(instance.user_id))
+    invalidate_trainee_context(instance.user_id)
+
+
+@receiver(post_save, sender=Subscription)
+def on_subscription_change(
+    sender: type[Subscription], instance: Subscription, **kwargs: Any
+) -> None:
+    invalidate_trainer_stats(instance.trainer_id)
+
+
+# ── AI chat trainee context ──
+
+
+@receiver([post_save, post_delete], sender=DailyLog)
+@receiver([post_save, post_delete], sender=WeightCheckIn)
+@receiver([post_save, post_delete], sender=Program)
+@receiver([post_save, post_delete], sender=NutritionGoal)
+def on_trainee_context_change(sender: type[Any], instance: Any, **kwargs: Any) -> None:
+    invalidate_trainee_context(instance.trainee_id)
+
+
+# ── Revenue rollup ──
+
+
+def _payment_contribution(payment: TraineePayment) -> tuple[Any, dict[str, Any]]:
+    return payment_contribution(
+        status=payment.status,
+        amount=payment.amount,
+        paid_at=payment.paid_at,
+        created_at=payment.created_at,
+    )
+
+
+@receiver(pre_save, sender=TraineePayment)
+def remember_previous_payment(
+    sender: type[TraineePayment], instance: TraineePayment, **kwargs: Any
+) -> None:
+    instance._revenue_prev = (  # type: ignore[attr-defined]
+        TraineePayment.objects.filter(pk=instance.pk).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=TraineePayment)
+def on_payment_saved(
+    sender: type[TraineePayment], instance: TraineePayment, **kwargs: Any
+) -> None:
+    prev: TraineePayment | None = getattr(instance, '_revenue_prev', None)
+    if prev is not None:
+        prev_day, prev_amounts = _payment_contribution(prev)
+        if prev_day is not None:
+            apply_revenue_delta(
+                prev.trainer_id, prev_day, {k: -v for k, v in prev_amounts.items()},
+            )
+    day, amounts = _payment_contribution(instance)
+    if day is not None:
+        apply_revenue_delta(instance.trainer_id, day, amounts)
+
+
+@receiver(post_delete, sender=TraineePayment)
+def on_payment_deleted(
+    sender: type[TraineePayment], instance: TraineePayment, **kwargs: Any
+) -> None:
+    day, amounts = _payment_contribution(instance)
+    if day is not None:
+        apply_revenue_delta(instance.trainer_id, day, {k: -v for k, v in amounts.items()})
+
+
+@receiver(pre_save, sender=TraineeSubscription)
+def remember_previous_trainee_subscription(
+    sender: type[TraineeSubscription], instance: TraineeSubscription, **kwargs: Any
+) -> None:
+    instance._revenue_prev = (  # type: ignore[attr-defined]
+        TraineeSubscription.objects.filter(pk=instance.pk)
+        .values_list('status', 'amount')
+        .first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=TraineeSubscription)
+def on_trainee_subscription_saved(
+    sender: type[TraineeSubscription],
+    instance: TraineeSubscription,
+    created: bool,
+    **kwargs: Any,
+) -> None:
+    prev = getattr(instance, '_revenue_prev', None)
+    prev_status, prev_mrr = (
+        (prev[0], subscription_mrr(status=prev[0], amount=prev[1]))
+        if prev is not None else (None, 0)
+    )
+    canceled = TraineeSubscription.Status.CANCELED
+
+    apply_revenue_delta(instance.trainer_id, timezone.localdate(), {
+        'new_subscribers': int(
+            prev is None
+            or (prev_status == canceled and instance.status == TraineeSubscription.Status.ACTIVE)
+        ),
+        'churned_subscribers': int(
+            prev is not None and prev_status != canceled and instance.status == canceled
+        ),
+        'mrr_delta': subscription_mrr(status=instance.status, amount=instance.amount) - prev_mrr,
+    })
+
+
+@receiver(post_delete, sender=TraineeSubscription)
+def on_trainee_subscription_deleted(
+    sender: type[TraineeSubscription], instance: TraineeSubscription, **kwargs: Any
+) -> None:
+    apply_revenue_delta(
+        instance.trainer_id,
+        timezone.localdate(),
+        {'mrr_delta': -subscription_mrr(status=instance.status, amount=instance.amount)},
+    )
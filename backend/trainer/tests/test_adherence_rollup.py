@@ -0,0 +1,193 @@
+"""
+Tests for the per-trainer daily adherence rollup.
+
+Covers:
+- Incremental maintenance on summary create / update / date change / delete
+- Roster changes (deactivation, reassignment, role) move history incrementally
+- rebuild_adherence_rollups command matches incremental state
+- Adherence views read from the rollup
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+from typing import Any
+from unittest.mock import call, patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from trainer.models import TraineeActivitySummary, TrainerDailyAdherence
+from trainer.services.adherence_rollup_service import (
+    COUNTER_FIELDS,
+    apply_trainee_membership,
+    rebuild_adherence_rollup,
+)
+from users.models import User
+
+
+def _create_trainer(email: str = 'trainer@test.com') -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINER,
+    )
+
+
+def _create_trainee(trainer: User, email: str) -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINEE,
+        parent_trainer=trainer,
+    )
+
+
+def _rollup(trainer: User) -> list[dict[str, Any]]:
+    return list(
+        TrainerDailyAdherence.objects.filter(trainer=trainer, trainee_count__gt=0)
+        .values('date', *COUNTER_FIELDS)
+        .order_by('date')
+    )
+
+
+class AdherenceRollupMaintenanceTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.a = _create_trainee(self.trainer, 'a@test.com')
+        self.b = _create_trainee(self.trainer, 'b@test.com')
+        self.today = timezone.now().date()
+
+    def test_create_increments(self) -> None:
+        TraineeActivitySummary.objects.create(
+            trainee=self.a, date=self.today, logged_food=True, hit_protein_goal=True,
+        )
+        TraineeActivitySummary.objects.create(
+            trainee=self.b, date=self.today, logged_workout=True,
+        )
+        row = TrainerDailyAdherence.objects.get(trainer=self.trainer, date=self.today)
+        self.assertEqual(row.trainee_count, 2)
+        self.assertEqual(row.food_logged, 1)
+        self.assertEqual(row.workout_logged, 1)
+        self.assertEqual(row.protein_hit, 1)
+        self.assertEqual(row.calorie_hit, 0)
+
+    def test_update_applies_delta(self) -> None:
+        summary = TraineeActivitySummary.objects.create(
+            trainee=self.a, date=self.today, logged_food=True,
+        )
+        summary.logged_food = False
+        summary.hit_calorie_goal = True
+        summary.save()
+
+        row = TrainerDailyAdherence.objects.get(trainer=self.trainer, date=self.today)
+        self.assertEqual(row.trainee_count, 1)
+        self.assertEqual(row.food_logged, 0)
+        self.assertEqual(row.calorie_hit, 1)
+
+    def test_date_change_moves_counts(self) -> None:
+        yesterday = self.today - timedelta(days=1)
+        summary = TraineeActivitySummary.objects.create(
+            trainee=self.a, date=yesterday, logged_food=True,
+        )
+        summary.date = self.today
+        summary.save()
+
+        rows = _rollup(self.trainer)
+        self.assertEqual([r['date'] for r in rows], [self.today])
+        self.assertEqual(rows[0]['food_logged'], 1)
+
+    def test_delete_decrements(self) -> None:
+        summary = TraineeActivitySummary.objects.create(
+            trainee=self.a, date=self.today, logged_food=True,
+        )
+        summary.delete()
+        self.assertEqual(_rollup(self.trainer), [])
+
+    def test_inactive_trainee_not_counted(self) -> None:
+        self.a.is_active = False
+        self.a.save()
+        TraineeActivitySummary.objects.create(trainee=self.a, date=self.today, logged_food=True)
+        self.assertEqual(_rollup(self.trainer), [])
+
+    def test_deactivation_removes_history(self) -> None:
+        TraineeActivitySummary.objects.create(trainee=self.a, date=self.today, logged_food=True)
+        TraineeActivitySummary.objects.create(trainee=self.b, date=self.today, logged_food=True)
+
+        self.a.is_active = False
+        self.a.save()
+
+        row = TrainerDailyAdherence.objects.get(trainer=self.trainer, date=self.today)
+        self.assertEqual(row.trainee_count, 1)
+
+    def test_reassignment_moves_history(self) -> None:
+        other = _create_trainer('other@test.com')
+        TraineeActivitySummary.objects.create(trainee=self.a, date=self.today, logged_food=True)
+
+        self.a.parent_trainer = other
+        self.a.save()
+
+        self.assertEqual(_rollup(self.trainer), [])
+        self.assertEqual(_rollup(other)[0]['trainee_count'], 1)
+
+    def test_roster_changes_apply_deltas_not_rebuilds(self) -> None:
+        yesterday = self.today - timedelta(days=1)
+        TraineeActivitySummary.objects.create(trainee=self.a, date=self.today, logged_food=True)
+        TraineeActivitySummary.objects.create(
+            trainee=self.a, date=yesterday, logged_workout=True, hit_calorie_goal=True,
+        )
+        TraineeActivitySummary.objects.create(trainee=self.b, date=self.today, logged_food=True)
+        before = _rollup(self.trainer)
+
+        with patch(
+            'trainer.signals.apply_trainee_membership', wraps=apply_trainee_membership,
+        ) as membership, CaptureQueriesContext(connection) as queries:
+            self.a.is_active = False
+            self.a.save()
+            self.assertEqual(_rollup(self.trainer), [{
+                'date': self.today, 'trainee_count': 1, 'food_logged': 1,
+                'workout_logged': 0, 'protein_hit': 0, 'calorie_hit': 0,
+            }])
+
+            self.a.is_active = True
+            self.a.save()
+        self.assertEqual(membership.call_args_list, [
+            call(self.trainer.id, self.a.id, -1),
+            call(self.trainer.id, self.a.id, 1),
+        ])
+        rollup_table = TrainerDailyAdherence._meta.db_table
+        self.assertFalse([
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('DELETE') and rollup_table in q['sql']
+        ])
+        self.assertEqual(_rollup(self.trainer), before)
+
+        rebuild_adherence_rollup(self.trainer.id)
+        self.assertEqual(_rollup(self.trainer), before)
+
+    def test_rebuild_matches_incremental(self) -> None:
+        for i in range(5):
+            TraineeActivitySummary.objects.create(
+                trainee=self.a if i % 2 else self.b,
+                date=self.today - timedelta(days=i % 3),
+                logged_food=bool(i % 2),
+                hit_protein_goal=i > 2,
+            )
+        incremental = _rollup(self.trainer)
+
+        rebuild_adherence_rollup(self.trainer.id)
+        self.assertEqual(_rollup(self.trainer), incremental)
+
+    def test_command_backfills(self) -> None:
+        TraineeActivitySummary.objects.create(trainee=self.a, date=self.today, logged_food=True)
+        TrainerDailyAdherence.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_adherence_rollups', stdout=out)
+
+        self.assertIn('1 daily row(s)', out.getvalue())
+        self.assertEqual(_rollup(self.trainer)[0]['food_logged'], 1)
@@ -0,0 +1,159 @@
+"""
+Tests for AI chat conversation memory: paged history and rolling summaries.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from trainer.llm_fake import scripted_llm
+from trainer.models import AIChatMessage, AIChatThread
+from trainer.services.ai_chat_memory_service import (
+    SUMMARIZE_BATCH_MESSAGES,
+    VERBATIM_MESSAGES,
+    load_memory,
+    update_thread_summary,
+)
+from trainer.services.ai_chat_service import send_message_to_thread
+from users.models import User
+
+
+class _InlineThread:
+    """Stand-in for threading.Thread that runs the target when started."""
+
+    def __init__(self, target: Callable[..., None], args: tuple[Any, ...], daemon: bool) -> None:
+        self._target = target
+        self._args = args
+
+    def start(self) -> None:
+        with patch("django.db.connection.close"):
+            self._target(*self._args)
+
+
+class MemoryTestBase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='memory_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        self.thread = AIChatThread.objects.create(trainer=self.trainer, title='Long chat')
+
+    def _add_turns(self, count: int, content: str = 'message') -> list[AIChatMessage]:
+        return AIChatMessage.objects.bulk_create([
+            AIChatMessage(
+                thread=self.thread,
+                role=AIChatMessage.Role.USER if i % 2 == 0 else AIChatMessage.Role.ASSISTANT,
+                content=f'{content} {i}',
+            )
+            for i in range(count)
+        ])
+
+
+class LoadMemoryTests(MemoryTestBase):
+    def test_short_thread_is_sent_verbatim(self) -> None:
+        self._add_turns(4)
+        memory = load_memory(self.thread, token_budget=10_000)
+        self.assertEqual([m['content'] for m in memory.messages], [f'message {i}' for i in range(4)])
+        self.assertEqual(memory.summary, '')
+        self.assertFalse(memory.needs_summary)
+
+    def test_lagging_fold_still_sends_every_unsummarized_message(self) -> None:
+        self._add_turns(40)
+        with self.assertNumQueries(1):
+            memory = load_memory(self.thread, token_budget=10_000)
+        self.assertEqual([m['content'] for m in memory.messages], [f'message {i}' for i in range(40)])
+        self.assertTrue(memory.needs_summary)
+
+    def test_budget_stops_reading_early(self) -> None:
+        self._add_turns(40, content='x' * 400)  # ~100 tokens each
+        with self.assertNumQueries(2):
+            memory = load_memory(self.thread, token_budget=350)
+        self.assertEqual(len(memory.messages), 2)
+        self.assertEqual(memory.messages[-1]['content'], 'x' * 400 + ' 39')
+        self.assertTrue(memory.needs_summary)
+
+    def test_every_message_after_the_summary_is_sent(self) -> None:
+        messages = self._add_turns(VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES)
+        for unsummarized in range(VERBATIM_MESSAGES + 1, VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES):
+            with self.subTest(unsummarized=unsummarized):
+                boundary = len(messages) - unsummarized - 1
+                self.thread.history_summary = 'Earlier turns.'
+                self.thread.summary_through_message_id = messages[boundary].id
+
+                memory = load_memory(self.thread, token_budget=10_000)
+
+                expected = list(messages[boundary + 1:])
+                if expected[0].role != AIChatMessage.Role.USER:
+                    expected.pop(0)
+                self.assertEqual([m['content'] for m in memory.messages], [m.content for m in expected])
+                self.assertFalse(memory.needs_summary)
+
+    def test_token_budget_trims_oldest_and_starts_with_user(self) -> None:
+        self._add_turns(8, content='x' * 400)  # ~100 tokens each
+        memory = load_memory(self.thread, token_budget=350)
+        self.assertEqual(len(memory.messages), 2)
+        self.assertEqual(memory.messages[0]['role'], AIChatMessage.Role.USER)
+
+    def test_summary_counts_against_budget(self) -> None:
+        messages = self._add_turns(8, content='x' * 400)
+        self.thread.history_summary = 'y' * 800  # ~200 tokens
+        self.thread.summary_through_message_id = messages[1].id
+        memory = load_memory(self.thread, token_budget=650)
+        self.assertEqual(memory.summary, self.thread.history_summary)
+        self.assertEqual(len(memory.messages), 4)
+
+
+class UpdateSummaryTests(MemoryTestBase):
+    def test_folds_messages_outside_verbatim_window(self) -> None:
+        messages = self._add_turns(VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES)
+
+        with scripted_llm('Discussed 10 trainees.'):
+            self.assertTrue(update_thread_summary(self.thread.id))
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.history_summary, 'Discussed 10 trainees.')
+        self.assertEqual(
+            self.thread.summary_through_message_id, messages[SUMMARIZE_BATCH_MESSAGES - 1].id,
+        )
+        memory = load_memory(self.thread, token_budget=10_000)
+        self.assertFalse(memory.needs_summary)
+        self.assertEqual(len(memory.messages), VERBATIM_MESSAGES)
+
+    def test_nothing_to_fold(self) -> None:
+        self._add_turns(VERBATIM_MESSAGES)
+        with scripted_llm() as llm:
+            self.assertFalse(update_thread_summary(self.thread.id))
+            self.assertEqual(llm.prompts, [])
+
+    def test_concurrent_run_is_skipped(self) -> None:
+        self._add_turns(VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES)
+        cache.add(f'ai_chat_summary_lock:{self.thread.id}', 1)
+        with scripted_llm() as llm:
+            self.assertFalse(update_thread_summary(self.thread.id))
+            self.assertEqual(llm.prompts, [])
+
+
+@patch('trainer.services.ai_chat_memory_service.threading.Thread', _InlineThread)
+class SendWithMemoryTests(MemoryTestBase):
+    def test_send_uses_summary_and_schedules_fold(self) -> None:
+        messages = self._add_turns(VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES)
+        self.thread.history_summary = 'Trainer asked about Sam.'
+        self.thread.save(update_fields=['history_summary'])
+
+        with scripted_llm('Sure thing.', 'Sam plus newer topics.') as llm:
+            send_message_to_thread(self.trainer, self.thread.id, 'And now?')
+            prompts = llm.prompts
+
+        system_prompt = prompts[0][0].content
+        self.assertIn('Trainer asked about Sam.', system_prompt)
+        self.assertEqual(len(prompts[0]), VERBATIM_MESSAGES + SUMMARIZE_BATCH_MESSAGES + 2)
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.history_summary, 'Sam plus newer topics.')
+        # The new user + assistant messages push two more turns out of the window
+        self.assertEqual(
+            self.thread.summary_through_message_id, messages[SUMMARIZE_BATCH_MESSAGES + 1].id,
+        )
@@ -0,0 +1,176 @@
+"""
+Tests for AI chat thread replies: transaction scope, SSE streaming, cancellation.
+"""
+from __future__ import annotations
+
+from typing import Any
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from trainer import llm_gateway
+from trainer.llm_fake import scripted_llm
+from trainer.models import AIChatMessage, AIChatThread
+from trainer.services.ai_chat_service import (
+    _FollowupFilter,
+    request_stream_cancel,
+    send_message_to_thread,
+    start_streamed_message,
+)
+from users.models import User
+
+REPLY = 'Bench twice a week. <suggested_followup>What about squats?</suggested_followup>'
+
+
+class AIChatThreadTestBase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='chat_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        self.thread = AIChatThread.objects.create(trainer=self.trainer)
+
+
+class SendMessageTests(AIChatThreadTestBase):
+    def test_llm_call_runs_outside_a_transaction(self) -> None:
+        depth_at_call: list[int] = []
+        baseline = len(connection.savepoint_ids)
+        real_invoke = llm_gateway.invoke
+
+        def invoke(*args: Any, **kwargs: Any) -> Any:
+            depth_at_call.append(len(connection.savepoint_ids))
+            return real_invoke(*args, **kwargs)
+
+        with scripted_llm(REPLY), patch('trainer.llm_gateway.invoke', side_effect=invoke):
+            result = send_message_to_thread(self.trainer, self.thread.id, 'How often should I bench?')
+
+        self.assertEqual(depth_at_call, [baseline])
+        self.assertEqual(result.assistant_message.content, 'Bench twice a week.')
+        self.assertEqual(result.assistant_message.provider, 'fake')
+        self.assertEqual(result.suggested_followup, 'What about squats?')
+        self.assertEqual(result.thread_title, 'How often should I bench?')
+
+    def test_failed_call_removes_user_message(self) -> None:
+        with scripted_llm(ConnectionError('provider down')), self.assertRaises(RuntimeError):
+            send_message_to_thread(self.trainer, self.thread.id, 'Hello')
+        self.assertFalse(AIChatMessage.objects.filter(thread=self.thread).exists())
+
+    def test_unconfigured_provider_removes_user_message(self) -> None:
+        with patch(
+            'trainer.services.ai_chat_service.AIChat',
+            side_effect=ValueError('No API key configured'),
+        ), self.assertRaises(ValueError):
+            send_message_to_thread(self.trainer, self.thread.id, 'Hello')
+        self.assertFalse(AIChatMessage.objects.filter(thread=self.thread).exists())
+
+
+class StreamMessageTests(AIChatThreadTestBase):
+    def test_streams_tokens_then_persists_reply(self) -> None:
+        with scripted_llm(REPLY):
+            session = start_streamed_message(self.trainer, self.thread.id, 'Bench?')
+            events = list(session.events())
+
+        kinds = [e.kind for e in events]
+        self.assertEqual(kinds[0], 'user_message')
+        self.assertEqual(kinds[-1], 'done')
+        self.assertGreater(kinds.count('token'), 1)
+        streamed = ''.join(e.data for e in events if e.kind == 'token')
+        self.assertEqual(streamed.strip(), 'Bench twice a week.')
+
+        result = events[-1].data
+        self.assertEqual(result.assistant_message.content, 'Bench twice a week.')
+        self.assertEqual(result.suggested_followup, 'What about squats?')
+        self.assertEqual(
+            list(AIChatMessage.objects.filter(thread=self.thread).values_list('role', flat=True)),
+            ['user', 'assistant'],
+        )
+        assistant = AIChatMessage.objects.get(thread=self.thread, role='assistant')
+        self.assertGreater(assistant.usage_metadata['output_tokens'], 0)
+
+    def test_invalid_message_rejected_before_streaming(self) -> None:
+        with scripted_llm(REPLY) as llm:
+            with self.assertRaises(ValueError):
+                start_streamed_message(self.trainer, self.thread.id, '   ')
+            self.assertEqual(llm.prompts, [])
+
+    @patch('trainer.services.ai_chat_service.CANCEL_POLL_INTERVAL_SECONDS', 0)
+    def test_cancel_keeps_partial_reply(self) -> None:
+        with scripted_llm(REPLY):
+            events = start_streamed_message(self.trainer, self.thread.id, 'Bench?').events()
+            self.assertEqual(next(events).kind, 'user_message')
+            self.assertEqual(next(events).kind, 'token')
+
+            request_stream_cancel(self.trainer, self.thread.id)
+            rest = list(events)
+
+        self.assertEqual(rest[-1].kind, 'cancelled')
+        assistant = AIChatMessage.objects.get(thread=self.thread, role='assistant')
+        self.assertEqual(assistant.content, 'Bench')
+        self.assertTrue(assistant.usage_metadata['cancelled'])
+
+    def test_client_disconnect_keeps_partial_reply(self) -> None:
+        with scripted_llm(REPLY):
+            events = start_streamed_message(self.trainer, self.thread.id, 'Bench?').events()
+            next(events)
+            next(events)
+            events.close()
+
+        assistant = AIChatMessage.objects.get(thread=self.thread, role='assistant')
+        self.assertTrue(assistant.usage_metadata['cancelled'])
+
+    def test_disconnect_before_reply_removes_user_message(self) -> None:
+        with scripted_llm(REPLY) as llm:
+            events = start_streamed_message(self.trainer, self.thread.id, 'Bench?').events()
+            self.assertEqual(next(events).kind, 'user_message')
+            events.close()
+            self.assertEqual(llm.prompts, [])
+        self.assertFalse(AIChatMessage.objects.filter(thread=self.thread).exists())
+
+    def test_provider_error_emits_error_and_removes_user_message(self) -> None:
+        with scripted_llm(ConnectionError('provider down')):
+            events = list(start_streamed_message(self.trainer, self.thread.id, 'Bench?').events())
+        self.assertEqual([e.kind for e in events], ['user_message', 'error'])
+        self.assertFalse(AIChatMessage.objects.filter(thread=self.thread).exists())
+
+    def test_sse_endpoint(self) -> None:
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        with scripted_llm(REPLY):
+            resp = client.post(
+                f'/api/trainer/ai/threads/{self.thread.id}/stream/',
+                {'message': 'Bench?'},
+                format='json',
+            )
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            self.assertEqual(resp['Content-Type'], 'text/event-stream')
+            body = b''.join(resp.streaming_content).decode()
+        self.assertTrue(body.startswith('event: user_message\n'))
+        self.assertIn('event: token\n', body)
+        self.assertIn('event: done\n', body)
+        self.assertNotIn('suggested_followup>', body)
+
+    def test_cancel_endpoint_requires_own_thread(self) -> None:
+        other = User.objects.create_user(
+            email='other_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        client = APIClient()
+        client.force_authenticate(user=other)
+        resp = client.post(f'/api/trainer/ai/threads/{self.thread.id}/cancel/')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FollowupFilterTests(TestCase):
+    def test_hides_tag_split_across_chunks(self) -> None:
+        followup_filter = _FollowupFilter()
+        chunks = ['Done.', ' <sugg', 'ested_follow', 'up>Next?</suggested_followup>']
+        visible = ''.join(followup_filter.feed(c) for c in chunks) + followup_filter.flush()
+        self.assertEqual(visible, 'Done. ')
+
+    def test_passes_lookalike_text(self) -> None:
+        followup_filter = _FollowupFilter()
+        visible = followup_filter.feed('a <b> c <su') + followup_filter.feed('m') + followup_filter.flush()
+        self.assertEqual(visible, 'a <b> c <sum')
@@ -0,0 +1,165 @@
+"""
+Tests for cached AI chat context snapshots and prompt trimming.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from trainer.models import TraineeActivitySummary
+from trainer.services.ai_context_service import (
+    build_prompt_context,
+    estimate_tokens,
+    get_roster_snapshot,
+    get_trainee_snapshot,
+)
+from users.models import User, UserProfile
+from workouts.models import DailyLog, WeightCheckIn
+
+
+def _create_trainee(trainer: User, email: str, **kwargs: object) -> User:
+    return User.objects.create_user(
+        email=email, password='pass1234', role='TRAINEE', parent_trainer=trainer, **kwargs,
+    )
+
+
+class RosterSnapshotTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='ctx_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        self.today = timezone.now().date()
+
+    def _roster(self, count: int) -> None:
+        for i in range(count):
+            trainee = _create_trainee(self.trainer, f't{i}@test.com', first_name=f'T{i}')
+            if i % 2 == 0:
+                TraineeActivitySummary.objects.create(
+                    trainee=trainee, date=self.today, logged_food=True,
+                )
+
+    def test_single_query_regardless_of_roster_size(self) -> None:
+        self._roster(12)
+        _create_trainee(self.trainer, 'gone@test.com', is_active=False)
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            snapshot = get_roster_snapshot(self.trainer)
+
+        self.assertEqual(snapshot['overview']['total_trainees'], 13)
+        self.assertEqual(snapshot['overview']['active_trainees'], 12)
+        self.assertEqual(snapshot['overview']['trainees_needing_attention'], 6)
+        self.assertEqual(len(snapshot['trainees']), 12)
+
+    def test_served_from_cache_until_roster_changes(self) -> None:
+        self._roster(2)
+        get_roster_snapshot(self.trainer)
+        with self.assertNumQueries(0):
+            get_roster_snapshot(self.trainer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            _create_trainee(self.trainer, 'new@test.com')
+        self.assertEqual(get_roster_snapshot(self.trainer)['overview']['total_trainees'], 3)
+
+    def test_activity_clears_attention_flag(self) -> None:
+        trainee = _create_trainee(self.trainer, 'quiet@test.com')
+        self.assertEqual(get_roster_snapshot(self.trainer)['overview']['trainees_needing_attention'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TraineeActivitySummary.objects.create(
+                trainee=trainee, date=self.today - timedelta(days=1), logged_workout=True,
+            )
+        self.assertEqual(get_roster_snapshot(self.trainer)['overview']['trainees_needing_attention'], 0)
+
+
+class TraineeSnapshotTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='ctx_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        self.trainee = _create_trainee(self.trainer, 'detail@test.com', first_name='Dana')
+        UserProfile.objects.create(user=self.trainee, sex='female', age=30, weight_kg=70)
+        today = timezone.now().date()
+        for days_ago in range(10):
+            DailyLog.objects.create(
+                trainee=self.trainee,
+                date=today - timedelta(days=days_ago),
+                nutrition_data={'totals': {'protein': 120 + days_ago}},
+            )
+        WeightCheckIn.objects.create(trainee=self.trainee, date=today, weight_kg=70.0)
+        WeightCheckIn.objects.create(trainee=self.trainee, date=today - timedelta(days=7), weight_kg=71.5)
+        cache.clear()
+
+    def test_constant_queries_and_cached(self) -> None:
+        with self.assertNumQueries(4):
+            summary = get_trainee_snapshot(self.trainer, self.trainee.id)
+        assert summary is not None
+        self.assertEqual(summary['name'], 'Dana')
+        self.assertEqual(summary['profile']['age'], 30)
+        self.assertIsNone(summary['nutrition_goals'])
+        self.assertEqual(len(summary['recent_logs']), 7)
+        self.assertEqual(summary['weight_change'], -1.5)
+
+        with self.assertNumQueries(0):
+            get_trainee_snapshot(self.trainer, self.trainee.id)
+
+    def test_new_log_invalidates(self) -> None:
+        get_trainee_snapshot(self.trainer, self.trainee.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            WeightCheckIn.objects.create(
+                trainee=self.trainee,
+                date=timezone.now().date() - timedelta(days=14),
+                weight_kg=73.0,
+            )
+        summary = get_trainee_snapshot(self.trainer, self.trainee.id)
+        assert summary is not None
+        self.assertEqual(len(summary['weight_checkins']), 3)
+
+    def test_foreign_trainee(self) -> None:
+        other = User.objects.create_user(
+            email='other_ctx@test.com', password='pass1234', role='TRAINER',
+        )
+        self.assertIsNone(get_trainee_snapshot(other, self.trainee.id))
+
+
+class PromptBudgetTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='ctx_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        today = timezone.now().date()
+        for i in range(40):
+            trainee = _create_trainee(self.trainer, f'roster{i}@test.com')
+            if i >= 5:
+                TraineeActivitySummary.objects.create(trainee=trainee, date=today, logged_food=True)
+        self.detail = User.objects.get(email='roster0@test.com')
+        for days_ago in range(7):
+            DailyLog.objects.create(
+                trainee=self.detail,
+                date=today - timedelta(days=days_ago),
+                nutrition_data={'totals': {'protein': 100, 'carbs': 200, 'fat': 60}},
+            )
+
+    def test_fits_budget_and_keeps_attention_trainees(self) -> None:
+        context = build_prompt_context(self.trainer, token_budget=600)
+        self.assertLessEqual(estimate_tokens(context), 650)
+        self.assertIn('more trainees omitted', context)
+        for i in range(5):
+            self.assertIn(f'roster{i}@test.com', context)
+
+    def test_no_trimming_when_under_budget(self) -> None:
+        context = build_prompt_context(self.trainer, trainee_id=self.detail.id, token_budget=100_000)
+        self.assertNotIn('omitted', context)
+        self.assertIn(f'Detailed Context for Trainee ID {self.detail.id}', context)
+        self.assertEqual(context.count('"workout_exercises"'), 7)
+
+    def test_trainee_detail_trimmed_before_dropped(self) -> None:
+        context = build_prompt_context(self.trainer, trainee_id=self.detail.id, token_budget=300)
+        self.assertIn(f'Detailed Context for Trainee ID {self.detail.id}', context)
+        self.assertLess(context.count('"workout_exercises"'), 7)
@@ -0,0 +1,164 @@
+"""
+Tests for Parquet exports of trainee training and nutrition data.
+"""
+from __future__ import annotations
+
+import dataclasses
+import io
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from trainer.services.columnar_export_service import (
+    daily_logs_export,
+    lift_sets_export,
+    meal_entries_export,
+)
+from users.models import User
+from workouts.models import DailyLog, Exercise, LiftSetLog, MealLog, MealLogEntry
+
+
+def _create_trainer(email: str = 'trainer@test.com') -> User:
+    return User.objects.create_user(
+        email=email, password='pass1234', role='TRAINER',
+    )
+
+
+def _create_trainee(trainer: User, email: str = 'trainee@test.com') -> User:
+    return User.objects.create_user(
+        email=email, password='pass1234', role='TRAINEE',
+        parent_trainer=trainer,
+    )
+
+
+def _read(spec: object) -> pq.ParquetFile:
+    buffer = io.BytesIO()
+    spec.write(buffer, lambda _count: None)  # type: ignore[attr-defined]
+    buffer.seek(0)
+    return pq.ParquetFile(buffer)
+
+
+class LiftSetParquetExportTests(TestCase):
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainee1 = _create_trainee(self.trainer, 'one@test.com')
+        self.trainee2 = _create_trainee(self.trainer, 'two@test.com')
+        self.bench = Exercise.objects.create(name='Bench Press', created_by=self.trainer)
+        self.squat = Exercise.objects.create(name='Squat', created_by=self.trainer)
+        today = timezone.now().date()
+        for trainee in (self.trainee1, self.trainee2):
+            for set_number, exercise in enumerate((self.bench, self.squat, self.bench), start=1):
+                LiftSetLog.objects.create(
+                    trainee=trainee,
+                    exercise=exercise,
+                    session_date=today,
+                    set_number=set_number,
+                    entered_load_value=Decimal('135'),
+                    completed_reps=8,
+                    rpe=Decimal('7.5'),
+                )
+
+        other_trainee = _create_trainee(_create_trainer('other@test.com'), 'x@test.com')
+        LiftSetLog.objects.create(
+            trainee=other_trainee, exercise=self.bench,
+            session_date=today, set_number=1,
+        )
+
+    def test_roster_export_has_typed_columns(self) -> None:
+        table = _read(lift_sets_export(self.trainer, days=30)).read()
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.schema.field('exercise').type, pa.dictionary(pa.int32(), pa.string()))
+        self.assertEqual(table.schema.field('session_date').type, pa.date32())
+        self.assertEqual(table.schema.field('rpe').type, pa.decimal128(3, 1))
+        self.assertEqual(
+            set(table.column('exercise').to_pylist()), {'Bench Press', 'Squat'},
+        )
+        self.assertEqual(table.column('rpe').to_pylist()[0], Decimal('7.5'))
+        self.assertIsNone(table.column('completed_time_seconds').to_pylist()[0])
+
+    def test_writes_zstd_row_groups(self) -> None:
+        spec = dataclasses.replace(lift_sets_export(self.trainer, days=30), row_group_size=4)
+        parquet = _read(spec)
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        self.assertEqual(parquet.metadata.row_group(0).column(0).compression, 'ZSTD')
+
+    def test_single_trainee_export(self) -> None:
+        spec = lift_sets_export(self.trainer, days=30, trainee_id=self.trainee1.pk)
+        self.assertEqual(spec.estimate_rows(), 3)
+        table = _read(spec).read()
+        self.assertEqual(set(table.column('trainee_id').to_pylist()), {self.trainee1.pk})
+
+    def test_foreign_trainee_raises(self) -> None:
+        other_trainer = _create_trainer('third@test.com')
+        with self.assertRaises(ValueError):
+            lift_sets_export(other_trainer, days=30, trainee_id=self.trainee1.pk)
+
+
+class NutritionParquetExportTests(TestCase):
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainee = _create_trainee(self.trainer)
+        self.today = timezone.now().date()
+
+    def test_daily_log_totals_are_extracted(self) -> None:
+        DailyLog.objects.create(
+            trainee=self.trainee,
+            date=self.today,
+            nutrition_data={'totals': {'calories': 2200, 'protein': '150', 'fat': 'n/a'}},
+            steps=9000,
+        )
+        row = _read(daily_logs_export(self.trainer, days=30)).read().to_pylist()[0]
+        self.assertEqual(row['calories'], 2200.0)
+        self.assertEqual(row['protein'], 150.0)
+        self.assertIsNone(row['carbs'])
+        self.assertIsNone(row['fat'])
+        self.assertEqual(row['steps'], 9000)
+
+    def test_meal_entries_fall_back_to_custom_name(self) -> None:
+        meal = MealLog.objects.create(
+            trainee=self.trainee, date=self.today, meal_number=1, meal_name='Breakfast',
+        )
+        MealLogEntry.objects.create(
+            meal_log=meal, custom_name='Oats', calories=300, protein=10,
+        )
+        rows = _read(meal_entries_export(self.trainer, days=30)).read().to_pylist()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['food'], 'Oats')
+        self.assertEqual(rows[0]['meal_name'], 'Breakfast')
+        self.assertEqual(rows[0]['calories'], 300)
+
+
+class ParquetExportAPITests(TestCase):
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainee = _create_trainee(self.trainer)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.trainer)
+
+    def test_download(self) -> None:
+        resp = self.client.get('/api/trainer/export/parquet/daily-logs/?days=30')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertIn('.parquet', resp['Content-Disposition'])
+        table = pq.read_table(io.BytesIO(resp.getvalue()))
+        self.assertEqual(table.num_rows, 0)
+
+    def test_unknown_dataset(self) -> None:
+        resp = self.client.get('/api/trainer/export/parquet/payments/')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_trainers_trainee(self) -> None:
+        other = _create_trainee(_create_trainer('other@test.com'), 'other_trainee@test.com')
+        resp = self.client.get(f'/api/trainer/export/parquet/lift-sets/?trainee_id={other.pk}')
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_trainee_forbidden(self) -> None:
+        client = APIClient()
+        client.force_authenticate(user=self.trainee)
+        resp = client.get('/api/trainer/export/parquet/lift-sets/')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
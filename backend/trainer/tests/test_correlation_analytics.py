@@ -7,6 +7,7 @@ from datetime import date, timedelta
 from decimal import Decimal
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -18,6 +19,7 @@ from trainer.services.correlation_analytics_service import (
     ExerciseProgression,
     TraineePatterns,
     _compute_adherence_stats,
+    _p_value,
     _pearson_r,
     get_cohort_analysis,
     get_correlation_overview,
@@ -110,6 +112,20 @@ class PearsonCorrelationTests(TestCase):
         self.assertEqual(_pearson_r([1.0, 2.0, 3.0], [1.0, 2.0]), 0.0)
 
 
+class PValueTests(TestCase):
+    """Test the Student's t p-value for Pearson r."""
+
+    def test_matches_reference_values(self) -> None:
+        # Reference values from the t distribution (two-sided)
+        self.assertAlmostEqual(_p_value(0.5, 30), 0.0049, places=4)
+        self.assertAlmostEqual(_p_value(-0.9, 5), 0.0374, places=4)
+
+    def test_edge_cases(self) -> None:
+        self.assertEqual(_p_value(0.0, 10), 1.0)
+        self.assertEqual(_p_value(1.0, 10), 0.0)
+        self.assertEqual(_p_value(0.9, 2), 1.0)
+
+
 # ---------------------------------------------------------------------------
 # Unit tests — Adherence stats
 # ---------------------------------------------------------------------------
@@ -173,6 +189,25 @@ class CorrelationOverviewTests(TestCase):
         # With 3 trainees we should get at least some correlations
         self.assertGreaterEqual(len(overview.correlations), 1)
 
+    def test_full_matrix_with_p_values(self) -> None:
+        for i, (protein, sleep) in enumerate([(True, 8.0), (True, 7.5), (False, 5.0)]):
+            trainee = _create_trainee(self.trainer, f'm{i}@test.com')
+            _seed_summaries(trainee, 10, protein=protein, sleep=sleep)
+
+        overview = get_correlation_overview(trainer=self.trainer, days=30)
+        matrix = overview.correlation_matrix
+        assert matrix is not None
+        self.assertEqual(matrix.sample_size, 3)
+        k = len(matrix.metrics)
+        self.assertEqual(len(matrix.coefficients), k)
+        i = matrix.metrics.index('protein_adherence_pct')
+        j = matrix.metrics.index('avg_sleep_hours')
+        self.assertEqual(matrix.coefficients[i][j], matrix.coefficients[j][i])
+        self.assertGreater(matrix.coefficients[i][j], 0.8)
+        for point in overview.correlations:
+            self.assertGreaterEqual(point.p_value, 0.0)
+            self.assertLessEqual(point.p_value, 1.0)
+
     def test_days_clamped(self) -> None:
         overview = get_correlation_overview(trainer=self.trainer, days=1)
         self.assertEqual(overview.period_days, 7)  # min 7
@@ -268,6 +303,19 @@ class CohortAnalysisTests(TestCase):
         self.assertEqual(result[0].high_count, 1)
         self.assertEqual(result[0].low_count, 1)
 
+    def test_threshold_drill_down_served_from_cache(self) -> None:
+        cache.clear()
+        t_high = _create_trainee(self.trainer, 'high@test.com')
+        t_low = _create_trainee(self.trainer, 'low@test.com')
+        _seed_summaries(t_high, 14, food=True, workout=True)
+        _seed_summaries(t_low, 14, food=False, workout=False)
+        get_cohort_analysis(trainer=self.trainer, days=30, threshold=70.0)
+
+        # Only the roster lookup; the metric matrix comes from cache
+        with self.assertNumQueries(1):
+            result = get_cohort_analysis(trainer=self.trainer, days=30, threshold=100.0)
+        self.assertEqual((result[0].high_count, result[0].low_count), (1, 1))
+
 
 # ---------------------------------------------------------------------------
 # API tests
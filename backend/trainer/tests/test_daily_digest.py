@@ -3,8 +3,12 @@ Tests for Daily Digest + Message Drafting — v6.5 Step 11.
 """
 from __future__ import annotations
 
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
 
+from django.core import mail
+from django.core.management import call_command
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -13,10 +17,13 @@ from trainer.models import (
     DailyDigest,
     DigestPreference,
     TraineeActivitySummary,
+    TrainerNotification,
 )
 from trainer.services.daily_digest_service import (
     draft_trainee_message,
+    find_due_trainers,
     generate_daily_digest,
+    generate_due_digests,
     get_digest_history,
     get_or_create_digest_preference,
     mark_digest_read,
@@ -93,6 +100,105 @@ class GenerateDigestTest(DigestTestBase):
         self.assertIn('Daily Digest', result.summary_text)
 
 
+class BatchDigestTest(DigestTestBase):
+    """Time-zone bucketed batch generation."""
+
+    NOW = datetime(2026, 3, 10, 7, 30, tzinfo=dt_timezone.utc)
+
+    def setUp(self) -> None:
+        super().setUp()
+        DigestPreference.objects.create(
+            trainer=self.trainer, timezone='UTC', delivery_hour=7,
+        )
+        self.other_trainer = User.objects.create_user(
+            email="dd_trainer2@test.com",
+            password="testpass123",
+            role="TRAINER",
+        )
+        DigestPreference.objects.create(
+            trainer=self.other_trainer,
+            timezone='Europe/Berlin',
+            delivery_hour=8,
+            delivery_method=DigestPreference.DeliveryMethod.EMAIL,
+        )
+        self.digest_date = date(2026, 3, 9)
+
+    def test_finds_trainers_by_local_hour(self) -> None:
+        buckets = find_due_trainers(self.NOW)
+        self.assertEqual(list(buckets), [self.digest_date])
+        self.assertEqual(
+            {t.trainer_id for t in buckets[self.digest_date]},
+            {self.trainer.pk, self.other_trainer.pk},
+        )
+        self.assertEqual(find_due_trainers(self.NOW + timedelta(hours=1)), {})
+
+    def test_skips_disabled_preferences(self) -> None:
+        DigestPreference.objects.filter(trainer=self.other_trainer).update(
+            delivery_method=DigestPreference.DeliveryMethod.DISABLED,
+        )
+        buckets = find_due_trainers(self.NOW)
+        self.assertEqual(
+            [t.trainer_id for t in buckets[self.digest_date]],
+            [self.trainer.pk],
+        )
+
+    def test_batch_metrics_match_single_generation(self) -> None:
+        TraineeActivitySummary.objects.create(
+            trainee=self.trainee1,
+            date=self.digest_date,
+            workouts_completed=2,
+            logged_workout=True,
+            hit_calorie_goal=True,
+            hit_protein_goal=True,
+        )
+        result = generate_due_digests(now=self.NOW, workers=2)
+        self.assertEqual(result.trainers_due, 2)
+        self.assertEqual(result.digests_created, 2)
+
+        batch = DailyDigest.objects.get(trainer=self.trainer, date=self.digest_date)
+        batch_values = (
+            batch.total_trainees, batch.active_trainees, batch.workouts_completed,
+            batch.workouts_missed, batch.avg_compliance_pct, batch.summary_text,
+            batch.highlights, batch.concerns, batch.action_items,
+        )
+        batch.delete()
+        single = generate_daily_digest(trainer=self.trainer, target_date=self.digest_date)
+        m = single.metrics
+        self.assertEqual(batch_values, (
+            m.total_trainees, m.active_trainees, m.workouts_completed,
+            m.workouts_missed, m.avg_compliance_pct, single.summary_text,
+            m.highlights, m.concerns, m.action_items,
+        ))
+
+    def test_delivers_per_method_and_marks_delivered(self) -> None:
+        result = generate_due_digests(now=self.NOW)
+        self.assertEqual(result.in_app_notifications, 1)
+        self.assertEqual(result.emails_sent, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.other_trainer.email])
+        notification = TrainerNotification.objects.get(trainer=self.trainer)
+        self.assertEqual(notification.data['date'], str(self.digest_date))
+        self.assertFalse(
+            DailyDigest.objects.filter(delivered_at__isnull=True).exists()
+        )
+
+    def test_existing_digests_are_not_regenerated(self) -> None:
+        generate_daily_digest(trainer=self.trainer, target_date=self.digest_date)
+        result = generate_due_digests(now=self.NOW)
+        self.assertEqual(result.digests_created, 1)
+        self.assertEqual(result.already_existing, 1)
+        self.assertFalse(TrainerNotification.objects.filter(trainer=self.trainer).exists())
+
+        rerun = generate_due_digests(now=self.NOW)
+        self.assertEqual(rerun.digests_created, 0)
+        self.assertEqual(rerun.already_existing, 2)
+
+    def test_command_reports_summary(self) -> None:
+        out = StringIO()
+        call_command('send_daily_digests', '--workers=1', stdout=out)
+        self.assertIn('trainer(s) due', out.getvalue())
+
+
 class DigestPreferenceTest(DigestTestBase):
     def test_get_or_create(self) -> None:
         pref = get_or_create_digest_preference(self.trainer)
@@ -0,0 +1,161 @@
+"""
+Tests for TrainerStatsView and the cached dashboard stats service.
+
+Covers:
+- Single-query conditional aggregation produces the same counters as before
+- Cache hits serve stats without touching activity tables
+- Activity summary writes invalidate the cache after commit
+- Removing a trainee invalidates the former trainer's stats
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import cast
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from trainer.models import TraineeActivitySummary
+from trainer.services.dashboard_stats_service import get_trainer_dashboard_stats
+from users.models import User, UserProfile
+
+
+def _create_trainer(email: str = 'trainer@test.com') -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINER,
+    )
+
+
+def _create_trainee(trainer: User, email: str, onboarded: bool = True) -> User:
+    trainee = User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINEE,
+        parent_trainer=trainer,
+    )
+    UserProfile.objects.create(user=trainee, onboarding_completed=onboarded)
+    return trainee
+
+
+def _auth_client(user: User) -> APIClient:
+    client = APIClient()
+    token = cast(str, str(RefreshToken.for_user(user).access_token))
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+class DashboardStatsAggregationTests(TestCase):
+    """Counters computed by the single aggregation query."""
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.today = timezone.now().date()
+        self.a = _create_trainee(self.trainer, 'a@test.com')
+        self.b = _create_trainee(self.trainer, 'b@test.com', onboarded=False)
+        self.c = _create_trainee(self.trainer, 'c@test.com')
+        self.c.is_active = False
+        self.c.save()
+
+    def test_counts(self) -> None:
+        TraineeActivitySummary.objects.create(
+            trainee=self.a, date=self.today, logged_food=True, hit_protein_goal=True,
+        )
+        TraineeActivitySummary.objects.create(
+            trainee=self.a, date=self.today - timedelta(days=1), hit_protein_goal=True,
+        )
+        TraineeActivitySummary.objects.create(
+            trainee=self.b, date=self.today, logged_workout=True,
+        )
+        # Outside the 7-day window — ignored
+        TraineeActivitySummary.objects.create(
+            trainee=self.b, date=self.today - timedelta(days=30), hit_protein_goal=True,
+        )
+
+        stats = get_trainer_dashboard_stats(self.trainer)
+
+        self.assertEqual(stats['total_trainees'], 3)
+        self.assertEqual(stats['active_trainees'], 2)
+        self.assertEqual(stats['trainees_logged_today'], 2)
+        self.assertEqual(stats['trainees_on_track'], 1)
+        # 2 of 3 in-window summaries hit protein
+        self.assertEqual(stats['avg_adherence_rate'], 66.7)
+        self.assertEqual(stats['trainees_pending_onboarding'], 1)
+        self.assertEqual(stats['subscription_tier'], 'NONE')
+
+    def test_empty_roster(self) -> None:
+        trainer = _create_trainer('empty@test.com')
+        stats = get_trainer_dashboard_stats(trainer)
+        self.assertEqual(stats['total_trainees'], 0)
+        self.assertEqual(stats['avg_adherence_rate'], 0)
+
+    def test_other_trainers_excluded(self) -> None:
+        other = _create_trainer('other@test.com')
+        stranger = _create_trainee(other, 'x@test.com')
+        TraineeActivitySummary.objects.create(
+            trainee=stranger, date=self.today, logged_food=True,
+        )
+        stats = get_trainer_dashboard_stats(self.trainer)
+        self.assertEqual(stats['total_trainees'], 3)
+        self.assertEqual(stats['trainees_logged_today'], 0)
+
+
+class DashboardStatsCacheTests(TestCase):
+    """Cache hits and write-driven invalidation."""
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainee = _create_trainee(self.trainer, 'a@test.com')
+        self.today = timezone.now().date()
+
+    def test_cache_hit_skips_database(self) -> None:
+        get_trainer_dashboard_stats(self.trainer)
+        with CaptureQueriesContext(connection) as ctx:
+            get_trainer_dashboard_stats(self.trainer)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_activity_write_invalidates_after_commit(self) -> None:
+        before = get_trainer_dashboard_stats(self.trainer)
+        self.assertEqual(before['trainees_logged_today'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TraineeActivitySummary.objects.create(
+                trainee=self.trainee, date=self.today, logged_food=True,
+            )
+
+        after = get_trainer_dashboard_stats(self.trainer)
+        self.assertEqual(after['trainees_logged_today'], 1)
+
+    def test_activity_delete_invalidates(self) -> None:
+        summary = TraineeActivitySummary.objects.create(
+            trainee=self.trainee, date=self.today, logged_food=True,
+        )
+        self.assertEqual(get_trainer_dashboard_stats(self.trainer)['trainees_logged_today'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary.delete()
+
+        self.assertEqual(get_trainer_dashboard_stats(self.trainer)['trainees_logged_today'], 0)
+
+    def test_remove_trainee_invalidates_former_trainer(self) -> None:
+        client = _auth_client(self.trainer)
+        self.assertEqual(get_trainer_dashboard_stats(self.trainer)['total_trainees'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = client.post(f'/api/trainer/trainees/{self.trainee.id}/remove/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(get_trainer_dashboard_stats(self.trainer)['total_trainees'], 0)
+
+    def test_view_returns_stats(self) -> None:
+        client = _auth_client(self.trainer)
+        resp = client.get('/api/trainer/dashboard/stats/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['total_trainees'], 1)
+        self.assertEqual(resp.data['max_trainees'], 0)
@@ -7,16 +7,21 @@ Covers:
 - TraineeExportView: auth, content type, headers, CSV content, profile/program data
 - Row-level security: trainer isolation across all three endpoints
 - Edge cases: empty data, special characters, null fields
+- Streaming responses and background export jobs for large exports
 """
 from __future__ import annotations
 
 import csv
+import gzip
 import io
+from collections.abc import Callable
 from datetime import timedelta
 from decimal import Decimal
-from typing import cast
+from typing import Any, cast
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -156,7 +161,7 @@ class PaymentExportResponseTests(TestCase):
 
     def test_csv_header_row(self) -> None:
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(
             rows[0],
             ["Date", "Trainee", "Email", "Type", "Amount", "Currency", "Status", "Description"],
@@ -181,7 +186,7 @@ class PaymentExportDataTests(TestCase):
             description="Monthly coaching",
         )
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 2)  # header + 1 data row
         row = rows[1]
         self.assertEqual(row[1], "Alice Smith")
@@ -202,7 +207,7 @@ class PaymentExportDataTests(TestCase):
         ]:
             _create_payment(self.trainee, self.trainer, pay_status=pay_status)
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 6)  # header + 5 data rows
 
     def test_payment_type_display(self) -> None:
@@ -212,12 +217,12 @@ class PaymentExportDataTests(TestCase):
             payment_type=TraineePayment.Type.ONE_TIME,
         )
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(rows[1][3], "One-Time Purchase")
 
     def test_empty_data_returns_header_only(self) -> None:
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 1)  # header only
 
     def test_days_30_filters_recent(self) -> None:
@@ -229,7 +234,7 @@ class PaymentExportDataTests(TestCase):
             paid_at=timezone.now() - timedelta(days=60),
         )
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 2)  # header + 1 recent
 
     def test_days_365_includes_old(self) -> None:
@@ -241,7 +246,7 @@ class PaymentExportDataTests(TestCase):
             paid_at=timezone.now() - timedelta(days=60),
         )
         resp = self.client.get(f"{self.url}?days=365")
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 3)  # header + 2 rows
 
     def test_invalid_days_defaults_to_30(self) -> None:
@@ -252,7 +257,7 @@ class PaymentExportDataTests(TestCase):
             paid_at=timezone.now() - timedelta(days=60),
         )
         resp = self.client.get(f"{self.url}?days=abc")
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 2)  # header + 1 recent (same as days=30)
 
     def test_null_paid_at_uses_created_at(self) -> None:
@@ -263,7 +268,7 @@ class PaymentExportDataTests(TestCase):
             pay_status=TraineePayment.Status.PENDING,
         )
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertNotEqual(rows[1][0], "")  # date should not be empty
 
 
@@ -280,7 +285,7 @@ class PaymentExportIsolationTests(TestCase):
 
         client = _auth_client(trainer_a)
         resp = client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 1)  # header only — no data
 
 
@@ -332,7 +337,7 @@ class SubscriberExportResponseTests(TestCase):
 
     def test_csv_header_row(self) -> None:
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(
             rows[0],
             [
@@ -354,7 +359,7 @@ class SubscriberExportDataTests(TestCase):
     def test_subscriber_appears_in_csv(self) -> None:
         _create_subscription(self.trainee, self.trainer, amount=Decimal("79.99"))
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 2)
         row = rows[1]
         self.assertEqual(row[0], "Bob Jones")
@@ -376,19 +381,19 @@ class SubscriberExportDataTests(TestCase):
             trainee = _create_trainee(self.trainer, email=email)
             _create_subscription(trainee, self.trainer, sub_status=sub_status)
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 5)  # header + 4
 
     def test_empty_data_returns_header_only(self) -> None:
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 1)
 
     def test_null_period_end_shows_empty(self) -> None:
         """Null current_period_end shows empty string, not 'None'."""
         _create_subscription(self.trainee, self.trainer)
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         # Renewal Date and Days Until Renewal should be empty
         self.assertEqual(rows[1][5], "")  # Renewal Date
         self.assertEqual(rows[1][6], "")  # Days Until Renewal
@@ -407,7 +412,7 @@ class SubscriberExportIsolationTests(TestCase):
 
         client = _auth_client(trainer_a)
         resp = client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 1)  # header only
 
 
@@ -459,7 +464,7 @@ class TraineeExportResponseTests(TestCase):
 
     def test_csv_header_row(self) -> None:
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(
             rows[0],
             ["Name", "Email", "Active", "Profile Complete", "Last Activity", "Current Program", "Joined"],
@@ -477,7 +482,7 @@ class TraineeExportDataTests(TestCase):
     def test_trainee_appears_in_csv(self) -> None:
         _create_trainee(self.trainer, first_name="Carol", last_name="Davis")
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 2)
         row = rows[1]
         self.assertEqual(row[0], "Carol Davis")
@@ -492,19 +497,19 @@ class TraineeExportDataTests(TestCase):
         _create_trainee(self.trainer, email="b@test.com", first_name="B")
         _create_trainee(self.trainer, email="c@test.com", first_name="C")
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 4)  # header + 3
 
     def test_empty_data_returns_header_only(self) -> None:
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 1)
 
     def test_joined_date_format(self) -> None:
         """Joined date is formatted as YYYY-MM-DD."""
         _create_trainee(self.trainer)
         resp = self.client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         joined = rows[1][6]
         self.assertRegex(joined, r"^\d{4}-\d{2}-\d{2}$")
 
@@ -521,7 +526,7 @@ class TraineeExportIsolationTests(TestCase):
 
         client = _auth_client(trainer_a)
         resp = client.get(self.url)
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 1)  # header only
 
 
@@ -544,7 +549,7 @@ class CsvSpecialCharacterTests(TestCase):
             last_name='"DJ" Martinez',
         )
         resp = self.client.get("/api/trainer/export/trainees/")
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(len(rows), 2)
         # Python csv module handles quoting automatically
         self.assertIn("O'Brien,", rows[1][0])
@@ -558,5 +563,77 @@ class CsvSpecialCharacterTests(TestCase):
             description='Coaching plan, premium tier',
         )
         resp = self.client.get("/api/trainer/export/payments/")
-        rows = _parse_csv(resp.content)
+        rows = _parse_csv(resp.getvalue())
         self.assertEqual(rows[1][7], "Coaching plan, premium tier")
+
+
+# ─────────────────────────────────────────────
+# Streaming / Background Job Tests
+# ─────────────────────────────────────────────
+
+
+class _InlineThread:
+    """Stand-in for threading.Thread that runs the job when started."""
+
+    def __init__(self, target: Callable[..., None], args: tuple[Any, ...], daemon: bool) -> None:
+        self._target = target
+        self._args = args
+
+    def start(self) -> None:
+        # The job closes its connection when done; keep the test's open
+        with patch("django.db.connection.close"):
+            self._target(*self._args)
+
+
+@override_settings(STORAGES={
+    **settings.STORAGES,
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+})
+class ExportStreamingTests(TestCase):
+    """Small exports stream; large ones become background jobs."""
+
+    url = "/api/trainer/export/payments/"
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.client = _auth_client(self.trainer)
+        trainee = _create_trainee(self.trainer)
+        for i in range(3):
+            _create_payment(trainee, self.trainer, description=f"payment {i}")
+
+    def test_small_export_is_streamed(self) -> None:
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(len(_parse_csv(resp.getvalue())), 4)
+
+    @patch("trainer.services.export_job_service.threading.Thread", _InlineThread)
+    @patch("trainer.services.export_job_service.EXPORT_BACKGROUND_ROW_THRESHOLD", 2)
+    def test_large_export_runs_as_job(self) -> None:
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.data["estimated_rows"], 3)
+
+        status_resp = self.client.get(resp.data["status_url"])
+        self.assertEqual(status_resp.data["status"], "completed")
+        self.assertEqual(status_resp.data["rows_written"], 3)
+        self.assertEqual(status_resp.data["progress_pct"], 100.0)
+
+        download = self.client.get(status_resp.data["download_url"])
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertEqual(download["Content-Encoding"], "gzip")
+        rows = _parse_csv(gzip.decompress(download.getvalue()))
+        self.assertEqual(rows[0][0], "Date")
+        self.assertEqual(len(rows), 4)
+
+    @patch("trainer.services.export_job_service.threading.Thread", _InlineThread)
+    @patch("trainer.services.export_job_service.EXPORT_BACKGROUND_ROW_THRESHOLD", 2)
+    def test_other_trainer_cannot_see_job(self) -> None:
+        resp = self.client.get(self.url)
+        other = _auth_client(_create_trainer("other@test.com"))
+        self.assertEqual(
+            other.get(resp.data["status_url"]).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        download_url = resp.data["status_url"] + "download/"
+        self.assertEqual(other.get(download_url).status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,121 @@
+"""
+Tests for the concurrent LLM batch runner: parallelism, pacing, rate-limit retries.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from trainer.llm_batch_runner import BatchLimits, TokenBucket, run_llm_batches
+from trainer.llm_gateway import LLMUnavailableError
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+def _one_token(batch: object) -> int:
+    return 1
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_waits_for_refill_once_empty(self) -> None:
+        async def drain() -> float:
+            bucket = TokenBucket(per_minute=600)  # 10 per second
+            await bucket.acquire(600)
+            start = time.monotonic()
+            await bucket.acquire(1)
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(drain()), 0.08)
+
+    def test_pause_blocks_until_it_expires(self) -> None:
+        async def paused() -> float:
+            bucket = TokenBucket(per_minute=600)
+            bucket.pause(0.1)
+            start = time.monotonic()
+            await bucket.acquire(1)
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(paused()), 0.08)
+
+    def test_oversized_request_is_capped_at_capacity(self) -> None:
+        async def oversized() -> None:
+            await TokenBucket(per_minute=100).acquire(10_000)
+
+        asyncio.run(asyncio.wait_for(oversized(), timeout=1))
+
+
+class RunLLMBatchesTests(SimpleTestCase):
+    def test_batches_run_in_parallel(self) -> None:
+        barrier = threading.Barrier(3, timeout=5)
+
+        def call(batch: int) -> int:
+            barrier.wait()  # only passes if all three calls are in flight together
+            return batch * 10
+
+        results = dict(run_llm_batches(
+            [1, 2, 3], call, estimate_tokens=_one_token, limits=BatchLimits(concurrency=3),
+        ))
+        self.assertEqual(results, {1: 10, 2: 20, 3: 30})
+
+    def test_concurrency_is_capped(self) -> None:
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        def call(batch: int) -> int:
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return batch
+
+        list(run_llm_batches(
+            list(range(8)), call, estimate_tokens=_one_token, limits=BatchLimits(concurrency=2),
+        ))
+        self.assertEqual(peak, 2)
+
+    @patch('trainer.llm_batch_runner.DEFAULT_RATE_LIMIT_PAUSE_SECONDS', 0.01)
+    @patch('trainer.llm_batch_runner.GATEWAY_BUSY_PAUSE_SECONDS', 0.01)
+    def test_rate_limited_batch_is_retried(self) -> None:
+        failures = [_StatusError(429), LLMUnavailableError('busy')]
+
+        def call(batch: str) -> str:
+            if failures:
+                raise failures.pop(0)
+            return batch.upper()
+
+        results = list(run_llm_batches(['a'], call, estimate_tokens=_one_token))
+        self.assertEqual(results, [('a', 'A')])
+
+    def test_other_errors_are_yielded(self) -> None:
+        def call(batch: str) -> str:
+            raise _StatusError(500)
+
+        [(batch, outcome)] = run_llm_batches(['a'], call, estimate_tokens=_one_token)
+        self.assertIsInstance(outcome, _StatusError)
+
+    def test_closing_early_stops_new_batches(self) -> None:
+        started: list[int] = []
+
+        def call(batch: int) -> int:
+            started.append(batch)
+            time.sleep(0.02)
+            return batch
+
+        results = run_llm_batches(
+            list(range(20)), call, estimate_tokens=_one_token, limits=BatchLimits(concurrency=1),
+        )
+        next(results)
+        results.close()
+        time.sleep(0.1)
+        self.assertLessEqual(len(started), 3)
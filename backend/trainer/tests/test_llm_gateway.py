@@ -0,0 +1,200 @@
+"""
+Tests for the shared LLM gateway: client reuse, limits, circuit breaking, fallback.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from langchain_core.messages import HumanMessage
+
+from trainer import llm_gateway
+from trainer.ai_config import MODEL_CONFIGS, AIProvider, get_ai_config
+from trainer.llm_fake import ScriptedChatModel, scripted_llm
+from trainer.llm_gateway import (
+    CircuitBreaker,
+    ConcurrencyLimiter,
+    LLMLane,
+    LLMUnavailableError,
+)
+
+PROMPT = [HumanMessage(content='Hi')]
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+class ClientTests(SimpleTestCase):
+    def test_client_is_reused(self) -> None:
+        with scripted_llm():
+            config = get_ai_config()
+            self.assertIs(llm_gateway.get_client(config), llm_gateway.get_client(config))
+
+    @patch.dict('os.environ', {'OPENAI_API_KEY': ''})
+    def test_missing_key_raises_value_error(self) -> None:
+        with self.assertRaises(ValueError):
+            llm_gateway.get_client(MODEL_CONFIGS[AIProvider.OPENAI])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_probes_after_cooldown(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        breaker.allow()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_open_breaker_rejects_during_cooldown(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def test_saturated_limiter_fails_fast(self) -> None:
+        limiter = ConcurrencyLimiter(limit=1, batch_limit=1)
+        with limiter.slot(LLMLane.INTERACTIVE, wait_seconds=0):
+            with self.assertRaises(LLMUnavailableError):
+                with limiter.slot(LLMLane.INTERACTIVE, wait_seconds=0):
+                    pass
+
+    def test_batch_lane_is_capped(self) -> None:
+        limiter = ConcurrencyLimiter(limit=4, batch_limit=1)
+        with limiter.slot(LLMLane.BATCH, wait_seconds=0):
+            with self.assertRaises(LLMUnavailableError):
+                with limiter.slot(LLMLane.BATCH, wait_seconds=0):
+                    pass
+            with limiter.slot(LLMLane.INTERACTIVE, wait_seconds=0):
+                pass
+
+    def test_waiting_interactive_call_goes_before_batch(self) -> None:
+        limiter = ConcurrencyLimiter(limit=1, batch_limit=1)
+        order: list[str] = []
+        holding = limiter.slot(LLMLane.INTERACTIVE, wait_seconds=0)
+        holding.__enter__()
+
+        def run(lane: LLMLane) -> None:
+            with limiter.slot(lane, wait_seconds=5):
+                order.append(lane.value)
+
+        interactive = threading.Thread(target=run, args=(LLMLane.INTERACTIVE,))
+        interactive.start()
+        while limiter._interactive_waiting == 0:
+            pass
+        batch = threading.Thread(target=run, args=(LLMLane.BATCH,))
+        batch.start()
+        holding.__exit__(None, None, None)
+        interactive.join()
+        batch.join()
+
+        self.assertEqual(order, ['interactive', 'batch'])
+
+
+class InvokeTests(SimpleTestCase):
+    def test_records_metrics(self) -> None:
+        with scripted_llm('Hello there.'):
+            response = llm_gateway.invoke(PROMPT, config=get_ai_config(), lane=LLMLane.BATCH)
+            stats = llm_gateway.get_llm_metrics()
+
+        self.assertEqual(response.message.content, 'Hello there.')
+        self.assertEqual(response.provider, AIProvider.FAKE)
+        self.assertEqual(len(stats), 1)
+        self.assertEqual((stats[0].provider, stats[0].lane, stats[0].calls), ('fake', 'batch', 1))
+        self.assertGreater(stats[0].output_tokens, 0)
+
+    def test_client_error_does_not_trip_breaker(self) -> None:
+        with scripted_llm(*[_StatusError(400)] * 6, 'ok'):
+            for _ in range(6):
+                with self.assertRaises(_StatusError):
+                    llm_gateway.invoke(PROMPT, config=get_ai_config())
+            self.assertEqual(llm_gateway.invoke(PROMPT, config=get_ai_config()).message.content, 'ok')
+
+    @patch('trainer.llm_gateway.LLM_BREAKER_FAILURES', 1)
+    def test_open_breaker_without_fallback_is_unavailable(self) -> None:
+        with scripted_llm(ConnectionError('down'), 'unused') as llm:
+            with self.assertRaises(ConnectionError):
+                llm_gateway.invoke(PROMPT, config=get_ai_config())
+            with self.assertRaises(LLMUnavailableError):
+                llm_gateway.invoke(PROMPT, config=get_ai_config())
+            self.assertEqual(llm.remaining, 1)
+
+    def test_falls_back_to_next_provider(self) -> None:
+        failing = ScriptedChatModel()
+        healthy = ScriptedChatModel()
+
+        def get_client(config: Any, timeout: Any = None, **kwargs: Any) -> ScriptedChatModel:
+            return failing if config.provider == AIProvider.OPENAI else healthy
+
+        with scripted_llm(ConnectionError('down'), 'From Anthropic.'), \
+                patch('trainer.llm_gateway.get_client', side_effect=get_client), \
+                patch('trainer.llm_gateway._fallback_order', return_value=[AIProvider.ANTHROPIC]):
+            response = llm_gateway.invoke(PROMPT, config=MODEL_CONFIGS[AIProvider.OPENAI])
+
+        self.assertEqual(response.provider, AIProvider.ANTHROPIC)
+        self.assertEqual(response.model_name, MODEL_CONFIGS[AIProvider.ANTHROPIC].model_name)
+        self.assertEqual(response.message.content, 'From Anthropic.')
+
+
+    def test_deadline_covers_fallbacks_without_retries(self) -> None:
+        clients: list[tuple[AIProvider, Any, bool]] = []
+
+        def get_client(config: Any, timeout: Any = None, *, retries: bool = True) -> ScriptedChatModel:
+            clients.append((config.provider, timeout, retries))
+            return ScriptedChatModel()
+
+        def slow_failure(*args: Any, **kwargs: Any) -> Any:
+            clock[0] += 30.0
+            raise ConnectionError('timed out')
+
+        clock = [1000.0]
+        with scripted_llm('unused'), \
+                patch('trainer.llm_gateway.get_client', side_effect=get_client), \
+                patch('trainer.llm_gateway._fallback_order', return_value=[AIProvider.ANTHROPIC]), \
+                patch('trainer.llm_gateway.time.monotonic', side_effect=lambda: clock[0]), \
+                patch.object(ScriptedChatModel, 'invoke', slow_failure):
+            with self.assertRaises(ConnectionError):
+                llm_gateway.invoke(PROMPT, config=MODEL_CONFIGS[AIProvider.OPENAI], deadline_seconds=30)
+
+        # One 30s attempt, no client retries, no fallback once the deadline passed
+        self.assertEqual(clients, [(AIProvider.OPENAI, None, False), (AIProvider.OPENAI, 30.0, False)])
+
+
+class StreamTests(SimpleTestCase):
+    def test_streams_chunks_and_records_usage(self) -> None:
+        with scripted_llm('one two three'):
+            chunks = list(llm_gateway.stream(PROMPT, config=get_ai_config()))
+            stats = llm_gateway.get_llm_metrics()
+
+        self.assertEqual(''.join(str(c.content) for c in chunks), 'one two three')
+        self.assertEqual(stats[0].calls, 1)
+        self.assertGreater(stats[0].output_tokens, 0)
+
+    def test_error_after_first_chunk_propagates(self) -> None:
+        real_stream = ScriptedChatModel._stream
+
+        def broken_stream(*args: Any, **kwargs: Any) -> Any:
+            yield from real_stream(*args, **kwargs)
+            raise ConnectionError('dropped')
+
+        with scripted_llm('partial reply'), \
+                patch.object(ScriptedChatModel, '_stream', broken_stream):
+            stream = llm_gateway.stream(PROMPT, config=get_ai_config())
+            received = []
+            with self.assertRaises(ConnectionError):
+                for chunk in stream:
+                    received.append(chunk.content)
+        self.assertIn('partial', received)
@@ -0,0 +1,393 @@
+"""
+Tests for vectorized retention scoring and persisted retention snapshots.
+
+Covers:
+- Full-roster scoring (no 100-trainee cap)
+- Engagement / churn scores and risk tiers
+- Snapshot persistence: same-day overwrite, history, roster removals
+- Retention views: GETs serve stored snapshots read-only, POST refreshes
+- AtRiskTraineesView: pagination, ordering
+- compute_retention: watermark-based incremental runs, resume, worker pool
+- Churn alerts from today's at-risk snapshots, once per snapshot
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+from typing import cast
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from trainer.models import TraineeActivitySummary, TraineeRetentionSnapshot, TrainerNotification
+from trainer.services.retention_analytics_service import (
+    RESCORE_MAX_AGE,
+    get_retention_analytics,
+    refresh_retention_snapshots,
+    refresh_stale_retention_snapshots,
+)
+from users.models import User
+
+
+def _create_trainer(email: str = 'trainer@test.com') -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINER,
+    )
+
+
+def _bulk_trainees(trainer: User, count: int, prefix: str = 'trainee') -> list[User]:
+    """Create trainees without password hashing, backdated past the window."""
+    joined = timezone.now() - timedelta(days=90)
+    User.objects.bulk_create([
+        User(
+            email=f'{prefix}{i}@test.com',
+            role=User.Role.TRAINEE,
+            parent_trainer=trainer,
+            first_name=f'T{i:03d}',
+            date_joined=joined,
+        )
+        for i in range(count)
+    ])
+    return list(User.objects.filter(parent_trainer=trainer).order_by('id'))
+
+
+def _log_days(trainee: User, days: range) -> None:
+    today = timezone.now().date()
+    TraineeActivitySummary.objects.bulk_create([
+        TraineeActivitySummary(
+            trainee=trainee,
+            date=today - timedelta(days=d),
+            logged_food=True,
+            logged_workout=True,
+            hit_protein_goal=True,
+            hit_calorie_goal=True,
+            workouts_completed=1,
+        )
+        for d in days
+    ])
+
+
+def _auth_client(user: User) -> APIClient:
+    client = APIClient()
+    token = cast(str, str(RefreshToken.for_user(user).access_token))
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+class RetentionScoringTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+
+    def test_scores_full_roster_without_cap(self) -> None:
+        _bulk_trainees(self.trainer, 120)
+        result = get_retention_analytics(self.trainer, 14)
+        self.assertEqual(result.summary.total_trainees, 120)
+        self.assertEqual(len(result.trainees), 120)
+
+    def test_engaged_vs_inactive(self) -> None:
+        engaged, lapsed = _bulk_trainees(self.trainer, 2)
+        _log_days(engaged, range(0, 14))
+        _log_days(lapsed, range(20, 28))
+
+        result = get_retention_analytics(self.trainer, 14)
+        by_id = {t.trainee_id: t for t in result.trainees}
+
+        self.assertEqual(by_id[engaged.id].engagement_score, 100.0)
+        self.assertEqual(by_id[engaged.id].risk_tier, 'low')
+        self.assertEqual(by_id[engaged.id].days_since_last_activity, 0)
+        self.assertIn(by_id[lapsed.id].risk_tier, ('critical', 'high'))
+        self.assertEqual(by_id[lapsed.id].days_since_last_activity, 20)
+        # Most at-risk first
+        self.assertEqual(result.trainees[0].trainee_id, lapsed.id)
+
+    def test_new_trainee_capped_at_medium(self) -> None:
+        User.objects.create(
+            email='new@test.com',
+            role=User.Role.TRAINEE,
+            parent_trainer=self.trainer,
+        )
+        result = get_retention_analytics(self.trainer, 14)
+        self.assertLessEqual(result.trainees[0].churn_risk_score, 50.0)
+        self.assertIsNone(result.trainees[0].last_active_date)
+
+    def test_trends_cover_window(self) -> None:
+        (trainee,) = _bulk_trainees(self.trainer, 1)
+        _log_days(trainee, range(0, 1))
+        result = get_retention_analytics(self.trainer, 7)
+        self.assertEqual(len(result.trends), 8)
+        self.assertEqual(result.trends[-1].avg_engagement, 100.0)
+        self.assertEqual(result.trends[0].at_risk_count, 1)
+
+
+class RetentionSnapshotTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainees = _bulk_trainees(self.trainer, 3)
+
+    def test_refresh_writes_one_row_per_trainee(self) -> None:
+        refresh_retention_snapshots(self.trainer, 14)
+        refresh_retention_snapshots(self.trainer, 14)
+        self.assertEqual(
+            TraineeRetentionSnapshot.objects.filter(trainer=self.trainer, period_days=14).count(),
+            3,
+        )
+
+    def test_history_kept_across_days(self) -> None:
+        refresh_retention_snapshots(self.trainer, 14)
+        yesterday = timezone.now().date() - timedelta(days=1)
+        TraineeRetentionSnapshot.objects.update(snapshot_date=yesterday)
+
+        refresh_retention_snapshots(self.trainer, 14)
+        self.assertEqual(TraineeRetentionSnapshot.objects.filter(snapshot_date=yesterday).count(), 3)
+        self.assertEqual(TraineeRetentionSnapshot.objects.count(), 6)
+
+    def test_removed_trainee_dropped_from_today(self) -> None:
+        refresh_retention_snapshots(self.trainer, 14)
+        removed = self.trainees[0]
+        removed.parent_trainer = None
+        removed.save()
+
+        refresh_retention_snapshots(self.trainer, 14)
+        self.assertFalse(
+            TraineeRetentionSnapshot.objects.filter(trainee=removed).exists()
+        )
+
+
+class AtRiskTraineesViewTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.client = _auth_client(self.trainer)
+        self.url = '/api/trainer/analytics/at-risk/'
+        trainees = _bulk_trainees(self.trainer, 6)
+        # Two engaged trainees; four with no activity at all (high risk)
+        _log_days(trainees[0], range(0, 14))
+        _log_days(trainees[1], range(0, 14))
+
+    def test_paginates_at_risk_only(self) -> None:
+        resp = self.client.get(self.url, {'days': 14, 'page_size': 3})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data['at_risk_count'], 4)
+        self.assertEqual(len(resp.data['trainees']), 3)
+        self.assertTrue(resp.data['has_next'])
+
+        resp2 = self.client.get(self.url, {'days': 14, 'page_size': 3, 'page': 2})
+        self.assertEqual(len(resp2.data['trainees']), 1)
+        ids = {t['trainee_id'] for t in resp.data['trainees'] + resp2.data['trainees']}
+        self.assertEqual(len(ids), 4)
+
+    def test_ordering_by_name(self) -> None:
+        resp = self.client.get(self.url, {'days': 14, 'ordering': '-trainee_name'})
+        names = [t['trainee_name'] for t in resp.data['trainees']]
+        self.assertEqual(names, sorted(names, reverse=True))
+
+    def test_invalid_ordering_rejected(self) -> None:
+        resp = self.client.get(self.url, {'ordering': 'password'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_page_rejected(self) -> None:
+        resp = self.client.get(self.url, {'page': 'abc'})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_served_from_stored_snapshot_without_writing(self) -> None:
+        refresh_retention_snapshots(self.trainer, 14)
+        # A lapsed trainee logs today; GET keeps serving the stored snapshot
+        lapsed = TraineeRetentionSnapshot.objects.filter(risk_tier='high').first()
+        assert lapsed is not None
+        _log_days(lapsed.trainee, range(0, 14))
+        before = list(TraineeRetentionSnapshot.objects.values_list('id', 'computed_at'))
+
+        resp = self.client.get(self.url, {'days': 14, 'ordering': 'trainee_name'})
+        self.assertEqual(resp.data['at_risk_count'], 4)
+        self.assertIsNotNone(resp.data['computed_at'])
+        names = [t['trainee_name'] for t in resp.data['trainees']]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(list(TraineeRetentionSnapshot.objects.values_list('id', 'computed_at')), before)
+
+    def test_live_fallback_writes_nothing(self) -> None:
+        resp = self.client.get(self.url, {'days': 14})
+        self.assertEqual(resp.data['at_risk_count'], 4)
+        self.assertIsNone(resp.data['computed_at'])
+        self.assertFalse(TraineeRetentionSnapshot.objects.exists())
+
+
+class RetentionAnalyticsViewTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.client = _auth_client(self.trainer)
+        self.url = '/api/trainer/analytics/retention/'
+        self.trainees = _bulk_trainees(self.trainer, 3)
+        _log_days(self.trainees[0], range(0, 14))
+
+    def test_get_is_read_only(self) -> None:
+        resp = self.client.get(self.url, {'days': 14})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIsNone(resp.data['computed_at'])
+        self.assertEqual(resp.data['summary']['at_risk_count'], 2)
+        self.assertFalse(TraineeRetentionSnapshot.objects.exists())
+
+    def test_get_serves_latest_snapshot_with_live_trend(self) -> None:
+        live = get_retention_analytics(self.trainer, 14)
+        refresh_retention_snapshots(self.trainer, 14)
+        TraineeRetentionSnapshot.objects.update(
+            snapshot_date=timezone.now().date() - timedelta(days=1),
+        )
+        _log_days(self.trainees[1], range(0, 14))
+
+        resp = self.client.get(self.url, {'days': 14})
+        self.assertIsNotNone(resp.data['computed_at'])
+        self.assertEqual(resp.data['summary']['at_risk_count'], 2)
+        self.assertEqual(
+            [t['trainee_id'] for t in resp.data['trainees']],
+            [t.trainee_id for t in live.trainees],
+        )
+        # The trend is aggregated the same way as a live scoring
+        self.assertEqual(
+            resp.data['trends'],
+            [vars(tp) for tp in get_retention_analytics(self.trainer, 14).trends],
+        )
+
+    def test_post_refreshes_snapshot(self) -> None:
+        resp = self.client.post(f'{self.url}?days=14')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(resp.data['computed_at'])
+        self.assertEqual(TraineeRetentionSnapshot.objects.count(), 3)
+
+        _log_days(self.trainees[1], range(0, 14))
+        self.client.post(f'{self.url}?days=14')
+        resp = self.client.get(self.url, {'days': 14})
+        self.assertEqual(resp.data['summary']['at_risk_count'], 1)
+
+
+class IncrementalRefreshTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainees = _bulk_trainees(self.trainer, 3)
+
+    def test_second_run_skips_unchanged(self) -> None:
+        first = refresh_stale_retention_snapshots(self.trainer, 14)
+        self.assertEqual(len(first.rescored), 3)
+
+        second = refresh_stale_retention_snapshots(self.trainer, 14)
+        self.assertEqual(second.rescored, [])
+        self.assertEqual(second.unchanged_count, 3)
+
+    def test_activity_after_watermark_rescored(self) -> None:
+        refresh_stale_retention_snapshots(self.trainer, 14)
+        _log_days(self.trainees[1], range(0, 3))
+
+        result = refresh_stale_retention_snapshots(self.trainer, 14)
+        self.assertEqual([t.trainee_id for t in result.rescored], [self.trainees[1].id])
+        snapshot = TraineeRetentionSnapshot.objects.get(trainee=self.trainees[1])
+        self.assertEqual(snapshot.days_since_last_activity, 0)
+
+    def test_resumes_missing_snapshots(self) -> None:
+        refresh_stale_retention_snapshots(self.trainer, 14)
+        TraineeRetentionSnapshot.objects.filter(trainee=self.trainees[2]).delete()
+
+        result = refresh_stale_retention_snapshots(self.trainer, 14)
+        self.assertEqual([t.trainee_id for t in result.rescored], [self.trainees[2].id])
+        self.assertEqual(TraineeRetentionSnapshot.objects.count(), 3)
+
+    def test_writes_bypassing_save_rescored_after_max_age(self) -> None:
+        _log_days(self.trainees[1], range(3, 4))
+        refresh_stale_retention_snapshots(self.trainer, 14)
+        # QuerySet.update() does not touch updated_at
+        TraineeActivitySummary.objects.filter(trainee=self.trainees[1]).update(
+            date=timezone.now().date(),
+        )
+        self.assertEqual(refresh_stale_retention_snapshots(self.trainer, 14).rescored, [])
+
+        TraineeRetentionSnapshot.objects.update(
+            computed_at=timezone.now() - RESCORE_MAX_AGE - timedelta(minutes=1),
+        )
+        result = refresh_stale_retention_snapshots(self.trainer, 14)
+        self.assertEqual(len(result.rescored), 3)
+        snapshot = TraineeRetentionSnapshot.objects.get(trainee=self.trainees[1])
+        self.assertEqual(snapshot.days_since_last_activity, 0)
+
+    def test_departed_trainee_removed(self) -> None:
+        refresh_stale_retention_snapshots(self.trainer, 14)
+        self.trainees[0].is_active = False
+        self.trainees[0].save()
+
+        result = refresh_stale_retention_snapshots(self.trainer, 14)
+        self.assertEqual(result.removed_count, 1)
+        self.assertEqual(result.unchanged_count, 2)
+
+
+class ComputeRetentionCommandTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        _bulk_trainees(self.trainer, 4)
+
+    def test_reports_throughput_and_is_incremental(self) -> None:
+        out = StringIO()
+        call_command('compute_retention', workers=1, stdout=out)
+        self.assertIn('4 re-scored, 0 unchanged', out.getvalue())
+        self.assertIn('trainee(s)/s', out.getvalue())
+        self.assertEqual(TraineeRetentionSnapshot.objects.count(), 4)
+
+        out = StringIO()
+        call_command('compute_retention', workers=1, stdout=out)
+        self.assertIn('0 re-scored, 4 unchanged', out.getvalue())
+
+
+class ComputeRetentionAlertTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainees = _bulk_trainees(self.trainer, 3)  # none active: all at risk
+        _log_days(self.trainees[0], range(0, 14))
+
+    def _churn_alerts(self) -> int:
+        return TrainerNotification.objects.filter(
+            trainer=self.trainer,
+            notification_type=TrainerNotification.NotificationType.CHURN_ALERT,
+            data__re_engagement_push__isnull=True,
+        ).count()
+
+    def test_alerts_snapshots_written_before_the_run(self) -> None:
+        # A dashboard refresh scores everyone before the nightly job runs
+        refresh_retention_snapshots(self.trainer, 14)
+
+        out = StringIO()
+        call_command('compute_retention', workers=1, stdout=out)
+        self.assertIn('0 re-scored, 3 unchanged', out.getvalue())
+        self.assertEqual(self._churn_alerts(), 2)
+        self.assertEqual(
+            TraineeRetentionSnapshot.objects.filter(alerted_at__isnull=False).count(), 2,
+        )
+
+    def test_each_snapshot_alerts_once(self) -> None:
+        call_command('compute_retention', workers=1, stdout=StringIO())
+        TrainerNotification.objects.all().delete()  # lift the cooldown
+
+        refresh_retention_snapshots(self.trainer, 14)
+        out = StringIO()
+        call_command('compute_retention', workers=1, stdout=out)
+        self.assertIn('0 alert(s) created', out.getvalue())
+        self.assertEqual(self._churn_alerts(), 0)
+
+
+class ComputeRetentionWorkerPoolTests(TransactionTestCase):
+
+    def test_shards_across_worker_processes(self) -> None:
+        for n in range(3):
+            _bulk_trainees(_create_trainer(f'trainer{n}@test.com'), 2, prefix=f't{n}-')
+
+        out = StringIO()
+        call_command('compute_retention', workers=2, shard_size=1, stdout=out)
+        self.assertIn('Processed 3 trainer(s) in 3 shard(s)', out.getvalue())
+        self.assertEqual(TraineeRetentionSnapshot.objects.count(), 6)
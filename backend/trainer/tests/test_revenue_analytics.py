@@ -81,12 +81,13 @@ def _create_payment(
         payment_type=payment_type,
         description=f'{payment_type} payment',
     )
+    # save() rather than QuerySet.update() so the revenue rollup signals fire
     if paid_at is not None:
-        TraineePayment.objects.filter(pk=payment.pk).update(paid_at=paid_at)
-        payment.refresh_from_db()
+        payment.paid_at = paid_at
+        payment.save(update_fields=['paid_at'])
     elif pay_status == TraineePayment.Status.SUCCEEDED:
-        TraineePayment.objects.filter(pk=payment.pk).update(paid_at=timezone.now())
-        payment.refresh_from_db()
+        payment.paid_at = timezone.now()
+        payment.save(update_fields=['paid_at'])
     return payment
 
 
@@ -0,0 +1,223 @@
+"""
+Tests for the per-trainer daily / monthly revenue rollups.
+
+Covers:
+- Incremental maintenance on payment success, refund, paid-date change, delete
+- Subscriber and MRR changes on subscription state transitions
+- rebuild_revenue_rollups command matches incremental state
+- RevenueAnalyticsView multi-year series from the monthly rollup
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from typing import Any
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from subscriptions.models import TraineePayment, TraineeSubscription
+from trainer.models import TrainerDailyRevenue, TrainerMonthlyRevenue
+from trainer.services.revenue_rollup_service import (
+    ROLLUP_FIELDS,
+    get_monthly_revenue,
+    rebuild_revenue_rollup,
+)
+from users.models import User
+
+
+def _create_trainer(email: str = 'trainer@test.com') -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINER,
+    )
+
+
+def _create_trainee(trainer: User, email: str) -> User:
+    return User.objects.create_user(
+        email=email,
+        password='testpass123',
+        role=User.Role.TRAINEE,
+        parent_trainer=trainer,
+    )
+
+
+def _pay(
+    trainee: User,
+    trainer: User,
+    amount: str,
+    paid_at: Any,
+    pay_status: str = TraineePayment.Status.SUCCEEDED,
+) -> TraineePayment:
+    return TraineePayment.objects.create(
+        trainee=trainee,
+        trainer=trainer,
+        amount=Decimal(amount),
+        status=pay_status,
+        payment_type=TraineePayment.Type.SUBSCRIPTION,
+        paid_at=paid_at,
+    )
+
+
+def _daily(trainer: User) -> list[dict[str, Any]]:
+    return list(
+        TrainerDailyRevenue.objects.filter(trainer=trainer)
+        .values('date', *ROLLUP_FIELDS)
+        .order_by('date')
+    )
+
+
+def _monthly(trainer: User) -> list[dict[str, Any]]:
+    return list(
+        TrainerMonthlyRevenue.objects.filter(trainer=trainer)
+        .values('month', *ROLLUP_FIELDS)
+        .order_by('month')
+    )
+
+
+def _nonzero(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    return [row for row in rows if any(row[name] for name in ROLLUP_FIELDS)]
+
+
+class PaymentRollupTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainee = _create_trainee(self.trainer, 'a@test.com')
+        self.now = timezone.now()
+
+    def test_succeeded_payment_counts_on_paid_date(self) -> None:
+        paid_at = self.now - timedelta(days=40)
+        _pay(self.trainee, self.trainer, '50.00', paid_at)
+
+        row = TrainerDailyRevenue.objects.get(trainer=self.trainer)
+        self.assertEqual(row.date, timezone.localdate(paid_at))
+        self.assertEqual((row.gross, row.refunds, row.net), (Decimal('50'), 0, Decimal('50')))
+        month = TrainerMonthlyRevenue.objects.get(trainer=self.trainer)
+        self.assertEqual(month.month, timezone.localdate(paid_at).replace(day=1))
+        self.assertEqual(month.net, Decimal('50'))
+
+    def test_pending_then_succeeded(self) -> None:
+        payment = _pay(self.trainee, self.trainer, '30.00', None, TraineePayment.Status.PENDING)
+        self.assertEqual(_nonzero(_daily(self.trainer)), [])
+
+        payment.status = TraineePayment.Status.SUCCEEDED
+        payment.paid_at = self.now
+        payment.save()
+        self.assertEqual(TrainerDailyRevenue.objects.get(trainer=self.trainer).net, Decimal('30'))
+
+    def test_refund_moves_net_to_refunds(self) -> None:
+        payment = _pay(self.trainee, self.trainer, '50.00', self.now)
+        payment.status = TraineePayment.Status.REFUNDED
+        payment.save()
+
+        row = TrainerDailyRevenue.objects.get(trainer=self.trainer)
+        self.assertEqual((row.gross, row.refunds, row.net), (Decimal('50'), Decimal('50'), 0))
+
+    def test_paid_date_change_moves_amount(self) -> None:
+        payment = _pay(self.trainee, self.trainer, '50.00', self.now - timedelta(days=70))
+        payment.paid_at = self.now
+        payment.save()
+
+        rows = _nonzero(_daily(self.trainer))
+        self.assertEqual([row['date'] for row in rows], [timezone.localdate(self.now)])
+
+    def test_delete_subtracts(self) -> None:
+        payment = _pay(self.trainee, self.trainer, '50.00', self.now)
+        payment.delete()
+        self.assertEqual(_nonzero(_daily(self.trainer)), [])
+        self.assertEqual(_nonzero(_monthly(self.trainer)), [])
+
+
+class SubscriptionRollupTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.trainee = _create_trainee(self.trainer, 'a@test.com')
+        self.sub = TraineeSubscription.objects.create(
+            trainee=self.trainee,
+            trainer=self.trainer,
+            amount=Decimal('40.00'),
+        )
+
+    def _today(self) -> TrainerDailyRevenue:
+        return TrainerDailyRevenue.objects.get(trainer=self.trainer, date=timezone.localdate())
+
+    def test_new_subscription(self) -> None:
+        row = self._today()
+        self.assertEqual((row.new_subscribers, row.mrr_delta), (1, Decimal('40')))
+
+    def test_cancel_churns_and_drops_mrr(self) -> None:
+        self.sub.status = TraineeSubscription.Status.CANCELED
+        self.sub.save()
+        row = self._today()
+        self.assertEqual((row.churned_subscribers, row.mrr_delta), (1, 0))
+
+    def test_reactivation_counts_as_new(self) -> None:
+        self.sub.status = TraineeSubscription.Status.CANCELED
+        self.sub.save()
+        self.sub.status = TraineeSubscription.Status.ACTIVE
+        self.sub.save()
+        row = self._today()
+        self.assertEqual((row.new_subscribers, row.mrr_delta), (2, Decimal('40')))
+
+    def test_price_change_while_active(self) -> None:
+        self.sub.amount = Decimal('55.00')
+        self.sub.save()
+        self.assertEqual(self._today().mrr_delta, Decimal('55'))
+
+    def test_running_mrr_across_months(self) -> None:
+        this_month = timezone.localdate().replace(day=1)
+        earlier = (this_month - timedelta(days=1)).replace(day=1)
+        TrainerMonthlyRevenue.objects.create(
+            trainer=self.trainer, month=earlier, mrr_delta=Decimal('100.00'),
+        )
+        opening, rows = get_monthly_revenue(self.trainer, this_month)
+        self.assertEqual(opening, Decimal('100'))
+        self.assertEqual(rows[-1]['mrr'], Decimal('140'))
+
+
+class RevenueRollupRebuildTests(TestCase):
+
+    def setUp(self) -> None:
+        self.trainer = _create_trainer()
+        self.a = _create_trainee(self.trainer, 'a@test.com')
+        self.b = _create_trainee(self.trainer, 'b@test.com')
+        now = timezone.now()
+        _pay(self.a, self.trainer, '50.00', now - timedelta(days=400))
+        _pay(self.a, self.trainer, '20.00', now - timedelta(days=3), TraineePayment.Status.REFUNDED)
+        _pay(self.b, self.trainer, '35.00', now)
+        TraineeSubscription.objects.create(
+            trainee=self.a, trainer=self.trainer, amount=Decimal('50.00'),
+        )
+
+    def test_rebuild_matches_incremental(self) -> None:
+        incremental = _nonzero(_monthly(self.trainer))
+        rebuild_revenue_rollup(self.trainer.id)
+        self.assertEqual(_nonzero(_monthly(self.trainer)), incremental)
+        self.assertEqual(len(incremental), len({row['month'] for row in incremental}))
+
+    def test_command_backfills(self) -> None:
+        expected = _nonzero(_daily(self.trainer))
+        TrainerDailyRevenue.objects.all().delete()
+        TrainerMonthlyRevenue.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_revenue_rollups', stdout=out)
+        self.assertIn('1 trainer(s)', out.getvalue())
+        self.assertEqual(_daily(self.trainer), expected)
+
+    def test_view_serves_multi_year_series(self) -> None:
+        client = APIClient()
+        client.force_authenticate(user=self.trainer)
+        resp = client.get('/api/trainer/analytics/revenue/', {'months': 36})
+        self.assertEqual(resp.status_code, 200)
+        series = resp.data['monthly_revenue']
+        self.assertEqual(len(series), 37)
+        self.assertEqual(sum(Decimal(p['amount']) for p in series), Decimal('85.00'))
+        self.assertEqual(sum(Decimal(p['refunds']) for p in series), Decimal('20.00'))
+        self.assertEqual(series[-1]['mrr'], '50.00')
@@ -22,6 +22,8 @@ from .ai_chat_views import (
     AIChatThreadListCreateView,
     AIChatThreadDetailView,
     AIChatThreadSendView,
+    AIChatThreadStreamView,
+    AIChatThreadCancelView,
 )
 from .digest_views import (
     DigestGenerateView,
@@ -36,6 +38,7 @@ from .notification_views import (
 )
 from .export_views import (
     PaymentExportView, SubscriberExportView, TraineeExportView,
+    ParquetExportView, ExportJobStatusView, ExportJobDownloadView,
 )
 from .correlation_views import (
     CohortAnalysisView,
@@ -132,6 +135,9 @@ urlpatterns = [
     path('export/payments/', PaymentExportView.as_view(), name='export-payments'),
     path('export/subscribers/', SubscriberExportView.as_view(), name='export-subscribers'),
     path('export/trainees/', TraineeExportView.as_view(), name='export-trainees'),
+    path('export/parquet/<slug:dataset>/', ParquetExportView.as_view(), name='export-parquet'),
+    path('export/jobs/<uuid:job_id>/', ExportJobStatusView.as_view(), name='export-job-status'),
+    path('export/jobs/<uuid:job_id>/download/', ExportJobDownloadView.as_view(), name='export-job-download'),
 
     # MCP Server Integration
     path('mcp/token/', GenerateMCPTokenView.as_view(), name='mcp-token'),
@@ -156,6 +162,8 @@ urlpatterns = [
     path('ai/threads/', AIChatThreadListCreateView.as_view(), name='ai-thread-list-create'),
     path('ai/threads/<int:thread_id>/', AIChatThreadDetailView.as_view(), name='ai-thread-detail'),
     path('ai/threads/<int:thread_id>/send/', AIChatThreadSendView.as_view(), name='ai-thread-send'),
+    path('ai/threads/<int:thread_id>/stream/', AIChatThreadStreamView.as_view(), name='ai-thread-stream'),
+    path('ai/threads/<int:thread_id>/cancel/', AIChatThreadCancelView.as_view(), name='ai-thread-cancel'),
 
     # Daily Digest
     path('ai/daily-digest/generate/', DigestGenerateView.as_view(), name='digest-generate'),
@@ -23,9 +23,21 @@ from django.core.files.storage import default_storage
 from django.utils import timezone
 from django.db.models import Case, Count, IntegerField, Q, Avg, Max, QuerySet, When
 
+from trainer.services.adherence_rollup_service import get_adherence_totals, get_adherence_trend
+from trainer.services.dashboard_stats_service import get_trainer_dashboard_stats
 from trainer.services.invitation_service import send_invitation_email
-from trainer.services.retention_analytics_service import get_retention_analytics
-from trainer.services.revenue_analytics_service import get_revenue_analytics
+from trainer.services.retention_analytics_service import (
+    AT_RISK_DEFAULT_PAGE_SIZE,
+    RetentionAnalyticsResult,
+    get_at_risk_page,
+    get_retention_analytics,
+    get_stored_retention_analytics,
+    refresh_retention_snapshots,
+)
+from trainer.services.revenue_analytics_service import (
+    DEFAULT_REVENUE_MONTHS,
+    get_revenue_analytics,
+)
 from trainer.utils import parse_days_param as _parse_days_param
 from django.http import Http404
 from datetime import timedelta
@@ -102,70 +114,7 @@ class TrainerStatsView(views.APIView):
 
     def get(self, request: Request) -> Response:
         trainer = cast(User, request.user)
-        trainees = User.objects.filter(
-            parent_trainer=trainer,
-            role=User.Role.TRAINEE
-        )
-
-        today = timezone.now().date()
-        total_trainees = trainees.count()
-        active_trainees = trainees.filter(is_active=True).count()
-
-        # Count trainees who logged today
-        logged_today = TraineeActivitySummary.objects.filter(
-            trainee__in=trainees,
-            date=today
-        ).filter(
-            Q(logged_food=True) | Q(logged_workout=True)
-        ).count()
-
-        # Count trainees on track (hit goals in last 7 days avg)
-        week_ago = today - timedelta(days=7)
-        on_track = TraineeActivitySummary.objects.filter(
-            trainee__in=trainees,
-            date__gte=week_ago,
-            hit_protein_goal=True
-        ).values('trainee').distinct().count()
-
-        # Calculate average adherence rate
-        total_summaries = TraineeActivitySummary.objects.filter(
-            trainee__in=trainees,
-            date__gte=week_ago
-        ).count()
-
-        hit_goals = TraineeActivitySummary.objects.filter(
-            trainee__in=trainees,
-            date__gte=week_ago,
-            hit_protein_goal=True
-        ).count()
-
-        avg_adherence = (hit_goals / total_summaries * 100) if total_summaries > 0 else 0
-
-        # Subscription info
-        try:
-            subscription = trainer.subscription
-            tier = subscription.tier
-            max_trainees = subscription.get_max_trainees()
-        except Exception:
-            tier = 'NONE'
-            max_trainees = 0
-
-        # Pending onboarding — single query instead of N+1 loop
-        pending_onboarding = trainees.filter(
-            Q(profile__isnull=True) | Q(profile__onboarding_completed=False)
-        ).count()
-
-        stats = {
-            'total_trainees': total_trainees,
-            'active_trainees': active_trainees,
-            'trainees_logged_today': logged_today,
-            'trainees_on_track': on_track,
-            'avg_adherence_rate': round(avg_adherence, 1),
-            'subscription_tier': tier,
-            'max_trainees': max_trainees if max_trainees != float('inf') else -1,
-            'trainees_pending_onboarding': pending_onboarding
-        }
-
+        stats = get_trainer_dashboard_stats(trainer)
         serializer = TrainerDashboardStatsSerializer(stats)
         return Response(serializer.data)
 
@@ -941,25 +890,20 @@ class AdherenceAnalyticsView(views.APIView):
         days = _parse_days_param(request)
         start_date = timezone.now().date() - timedelta(days=days)
 
+        # Overall adherence stats — one aggregate over the daily rollup
+        totals = get_adherence_totals(user, start_date)
+        total_days = totals['trainee_count']
+
+        # Per-trainee adherence — single annotated query instead of N+1
         trainees = User.objects.filter(
             parent_trainer=user,
             role=User.Role.TRAINEE,
             is_active=True
         )
-
-        # Overall adherence stats
         summaries = TraineeActivitySummary.objects.filter(
             trainee__in=trainees,
             date__gte=start_date
         )
-
-        total_days = summaries.count()
-        food_logged_days = summaries.filter(logged_food=True).count()
-        workout_logged_days = summaries.filter(logged_workout=True).count()
-        protein_hit_days = summaries.filter(hit_protein_goal=True).count()
-        calorie_hit_days = summaries.filter(hit_calorie_goal=True).count()
-
-        # Per-trainee adherence — single annotated query instead of N+1
         adherence_qs = summaries.values(
             'trainee__id', 'trainee__email',
             'trainee__first_name', 'trainee__last_name',
@@ -987,10 +931,10 @@ class AdherenceAnalyticsView(views.APIView):
         return Response({
             'period_days': days,
             'total_tracking_days': total_days,
-            'food_logged_rate': round(food_logged_days / total_days * 100, 1) if total_days > 0 else 0,
-            'workout_logged_rate': round(workout_logged_days / total_days * 100, 1) if total_days > 0 else 0,
-            'protein_goal_rate': round(protein_hit_days / total_days * 100, 1) if total_days > 0 else 0,
-            'calorie_goal_rate': round(calorie_hit_days / total_days * 100, 1) if total_days > 0 else 0,
+            'food_logged_rate': round(totals['food_logged'] / total_days * 100, 1) if total_days > 0 else 0,
+            'workout_logged_rate': round(totals['workout_logged'] / total_days * 100, 1) if total_days > 0 else 0,
+            'protein_goal_rate': round(totals['protein_hit'] / total_days * 100, 1) if total_days > 0 else 0,
+            'calorie_goal_rate': round(totals['calorie_hit'] / total_days * 100, 1) if total_days > 0 else 0,
             'trainee_adherence': sorted(trainee_adherence, key=lambda x: -x['adherence_rate'])
         })
 
@@ -1008,40 +952,12 @@ class AdherenceTrendView(views.APIView):
         days = _parse_days_param(request)
         start_date = timezone.now().date() - timedelta(days=days)
 
-        trainees = User.objects.filter(
-            parent_trainer=user,
-            role=User.Role.TRAINEE,
-            is_active=True,
-        )
-
-        daily_qs = (
-            TraineeActivitySummary.objects.filter(
-                trainee__in=trainees,
-                date__gte=start_date,
-            )
-            .values('date')
-            .annotate(
-                trainee_count=Count('trainee', distinct=True),
-                food_logged=Count(
-                    Case(When(logged_food=True, then=1), output_field=IntegerField()),
-                ),
-                workout_logged=Count(
-                    Case(When(logged_workout=True, then=1), output_field=IntegerField()),
-                ),
-                protein_hit=Count(
-                    Case(When(hit_protein_goal=True, then=1), output_field=IntegerField()),
-                ),
-                calorie_hit=Count(
-                    Case(When(hit_calorie_goal=True, then=1), output_field=IntegerField()),
-                ),
-                total=Count('id'),
-            )
-            .order_by('date')
-        )
+        # Precomputed per-day counters — O(days) rows regardless of roster size
+        daily_rows = get_adherence_trend(user, start_date)
 
         trends: list[dict[str, object]] = []
-        for row in daily_qs:
-            total = row['total']
+        for row in daily_rows:
+            total = row['trainee_count']
             trends.append({
                 'date': row['date'].isoformat(),
                 'food_logged_rate': round(row['food_logged'] / total * 100, 1) if total > 0 else 0,
@@ -1109,7 +1025,9 @@ class ProgressAnalyticsView(views.APIView):
 class RevenueAnalyticsView(views.APIView):
     """
     GET: Get revenue analytics for the authenticated trainer.
-    Query params: ?days=30 (default 30, range 1-365)
+    Query params:
+        ?days=30 (default 30, range 1-365)
+        ?months=12 (monthly series length, default 12, range 1-120)
 
     Returns aggregated revenue stats, monthly breakdown, active subscribers,
     and recent payments.
@@ -1119,7 +1037,11 @@ class RevenueAnalyticsView(views.APIView):
     def get(self, request: Request) -> Response:
         trainer = cast(User, request.user)
         days = _parse_days_param(request)
-        result = get_revenue_analytics(trainer, days)
+        try:
+            months = int(request.query_params.get('months', DEFAULT_REVENUE_MONTHS))
+        except (ValueError, TypeError):
+            months = DEFAULT_REVENUE_MONTHS
+        result = get_revenue_analytics(trainer, days, months)
         return Response({
             'period_days': result.period_days,
             'mrr': result.mrr,
@@ -1127,7 +1049,15 @@ class RevenueAnalyticsView(views.APIView):
             'active_subscribers': result.active_subscribers,
             'avg_revenue_per_subscriber': result.avg_revenue_per_subscriber,
             'monthly_revenue': [
-                {'month': point.month, 'amount': point.amount}
+                {
+                    'month': point.month,
+                    'amount': point.amount,
+                    'gross': point.gross,
+                    'refunds': point.refunds,
+                    'new_subscribers': point.new_subscribers,
+                    'churned_subscribers': point.churned_subscribers,
+                    'mrr': point.mrr,
+                }
                 for point in result.monthly_revenue
             ],
             'subscribers': [
@@ -1164,18 +1094,36 @@ class RevenueAnalyticsView(views.APIView):
 class RetentionAnalyticsView(views.APIView):
     """
     GET: Get retention analytics for the authenticated trainer.
+    POST: Re-score the roster now and store it as today's snapshot.
     Query params: ?days=14 (default 14, clamped 3-365)
 
     Returns engagement scores, churn risk, risk distribution, and trends.
+    GET serves the latest stored snapshot (written nightly by
+    compute_retention) and never writes; before the first snapshot exists
+    the roster is scored live. ``computed_at`` is null for live scores.
     """
     permission_classes = [IsAuthenticated, IsTrainer]
 
     def get(self, request: Request) -> Response:
         trainer = cast(User, request.user)
         days = _parse_days_param(request, default=14)
-        result = get_retention_analytics(trainer, days)
-        return Response({
+        result = (
+            get_stored_retention_analytics(trainer, days)
+            or get_retention_analytics(trainer, days)
+        )
+        return Response(self._serialize(result))
+
+    def post(self, request: Request) -> Response:
+        trainer = cast(User, request.user)
+        days = _parse_days_param(request, default=14)
+        result = refresh_retention_snapshots(trainer, days)
+        return Response(self._serialize(result))
+
+    @staticmethod
+    def _serialize(result: RetentionAnalyticsResult) -> dict[str, Any]:
+        return {
             'period_days': result.period_days,
+            'computed_at': result.computed_at.isoformat() if result.computed_at else None,
             'summary': {
                 'total_trainees': result.summary.total_trainees,
                 'at_risk_count': result.summary.at_risk_count,
@@ -1210,42 +1158,69 @@ class RetentionAnalyticsView(views.APIView):
                 }
                 for tp in result.trends
             ],
-        })
+        }
 
 
 class AtRiskTraineesView(views.APIView):
     """
     GET: Get at-risk trainees (critical + high) for the authenticated trainer.
-    Query params: ?days=14 (default 14, clamped 3-365)
+    Query params:
+        ?days=14 (default 14, clamped 3-365)
+        ?ordering=-churn_risk_score (churn_risk_score, engagement_score,
+            days_since_last_activity, last_active_date, trainee_name;
+            prefix '-' for descending)
+        ?page=1&page_size=100 (page_size max 500)
 
-    Returns only critical and high risk trainees, sorted by churn risk DESC.
+    Served from the latest stored retention snapshot (read-only).
     """
     permission_classes = [IsAuthenticated, IsTrainer]
 
     def get(self, request: Request) -> Response:
         trainer = cast(User, request.user)
         days = _parse_days_param(request, default=14)
-        result = get_retention_analytics(trainer, days)
-        at_risk = [
-            {
-                'trainee_id': t.trainee_id,
-                'trainee_email': t.trainee_email,
-                'trainee_name': t.trainee_name,
-                'engagement_score': t.engagement_score,
-                'churn_risk_score': t.churn_risk_score,
-                'risk_tier': t.risk_tier,
-                'days_since_last_activity': t.days_since_last_activity,
-                'workout_consistency': t.workout_consistency,
-                'nutrition_consistency': t.nutrition_consistency,
-                'last_active_date': t.last_active_date,
-            }
-            for t in result.trainees
-            if t.risk_tier in ('critical', 'high')
-        ]
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', AT_RISK_DEFAULT_PAGE_SIZE))
+        except (ValueError, TypeError):
+            return Response(
+                {'error': 'page and page_size must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            result = get_at_risk_page(
+                trainer,
+                days,
+                ordering=request.query_params.get('ordering', '-churn_risk_score'),
+                page=page,
+                page_size=page_size,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response({
             'period_days': result.period_days,
-            'at_risk_count': len(at_risk),
-            'trainees': at_risk,
+            'computed_at': result.computed_at.isoformat() if result.computed_at else None,
+            'at_risk_count': result.count,
+            'page': result.page,
+            'num_pages': result.num_pages,
+            'has_next': result.has_next,
+            'has_previous': result.has_previous,
+            'trainees': [
+                {
+                    'trainee_id': t.trainee_id,
+                    'trainee_email': t.trainee_email,
+                    'trainee_name': t.trainee_name,
+                    'engagement_score': t.engagement_score,
+                    'churn_risk_score': t.churn_risk_score,
+                    'risk_tier': t.risk_tier,
+                    'days_since_last_activity': t.days_since_last_activity,
+                    'workout_consistency': t.workout_consistency,
+                    'nutrition_consistency': t.nutrition_consistency,
+                    'last_active_date': t.last_active_date,
+                }
+                for t in result.trainees
+            ],
         })
 
 
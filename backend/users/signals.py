@@ -0,0 +1,41 @@
+"""
+Signal handlers for the users app.
+
+Invalidate cached push recipients (core.services.push_recipient_service)
+and queue FCM topic subscription syncs (core.services.push_topic_service)
+when a user's notification preferences or device tokens change. Bulk
+operations (``QuerySet.update``, ``bulk_create``) do not fire these signals;
+callers that use them invalidate explicitly.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.services.push_recipient_service import invalidate_recipients
+from core.services.push_topic_service import request_token_sync, request_topic_sync
+from users.models import DeviceToken, NotificationPreference
+
+
+@receiver(post_save, sender=DeviceToken)
+@receiver(post_delete, sender=DeviceToken)
+def on_device_token_changed(
+    sender: type[DeviceToken],
+    instance: DeviceToken,
+    **kwargs: Any,
+) -> None:
+    invalidate_recipients(instance.user_id)
+    request_token_sync([instance.token])
+
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def on_notification_preference_changed(
+    sender: type[NotificationPreference],
+    instance: NotificationPreference,
+    **kwargs: Any,
+) -> None:
+    invalidate_recipients(instance.user_id)
+    request_topic_sync(instance.user_id)
@@ -23,6 +23,8 @@ from .serializers import (
 )
 from .social_auth import verify_google_token, verify_apple_token, SocialAuthError
 from core.permissions import IsTrainee
+from core.services.push_recipient_service import invalidate_recipients
+from core.services.push_topic_service import request_token_sync
 from trainer.models import TrainerBranding
 from trainer.serializers import TrainerBrandingSerializer
 from workouts.services.macro_calculator import MacroCalculatorService
@@ -482,6 +484,9 @@ class DeviceTokenView(APIView):
         updated = DeviceToken.objects.filter(
             user=user, token=token,
         ).update(is_active=False)
+        invalidate_recipients(user.id)
+        if updated:
+            request_token_sync([token])  # leave the device's FCM topics
 
         if updated == 0:
             return Response(
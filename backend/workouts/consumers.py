@@ -0,0 +1,107 @@
+"""
+WebSocket consumer for voice memo processing status.
+
+Each trainee has one channel group: voice_memos_{trainee_id}.
+JWT authentication is performed via query parameter (token=...).
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer  # type: ignore[import-untyped]
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceMemoConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket consumer for a trainee's voice memos.
+
+    Connect:  ws://host/ws/voice-memos/?token=<JWT>
+    Sends:    voice_memo_status events as memos are transcribed and parsed.
+    """
+
+    group_name: str = ''
+
+    async def connect(self) -> None:
+        """Authenticate the trainee and join their voice memo group."""
+        user = await self._authenticate()
+        if user is None:
+            await self.close(code=4001)
+            return
+        if user.role != 'TRAINEE':
+            await self.close(code=4003)
+            return
+
+        self.group_name = f'voice_memos_{user.id}'
+        await self.channel_layer.group_add(
+            self.group_name,
+            self.channel_name,
+        )
+        await self.accept()
+        logger.debug("Voice memo WebSocket connected: user=%d", user.id)
+
+    async def disconnect(self, code: int) -> None:
+        """Leave the voice memo group on disconnect."""
+        if self.group_name:
+            await self.channel_layer.group_discard(
+                self.group_name,
+                self.channel_name,
+            )
+
+    async def receive_json(self, content: dict[str, Any], **kwargs: Any) -> None:
+        """Handle incoming messages from the client. Supports: ping."""
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    # ------------------------------------------------------------------
+    # Channel layer event handlers
+    # ------------------------------------------------------------------
+
+    async def voice_memo_status(self, event: dict[str, Any]) -> None:
+        """Forward a memo status change to the client."""
+        await self.send_json({
+            'type': 'voice_memo_status',
+            'memo_id': event['memo_id'],
+            'status': event['status'],
+            'transcript': event['transcript'],
+            'parsed_result': event['parsed_result'],
+            'error': event['error'],
+            'timestamp': event['timestamp'],
+        })
+
+    # ------------------------------------------------------------------
+    # Auth helpers
+    # ------------------------------------------------------------------
+
+    async def _authenticate(self) -> Any:
+        """Authenticate user from JWT token in query params."""
+        from urllib.parse import parse_qs
+
+        from channels.db import database_sync_to_async  # type: ignore[import-untyped]
+
+        query_string = self.scope.get('query_string', b'').decode('utf-8')
+        parsed = parse_qs(query_string)
+        token_values = parsed.get('token', [])
+        token = token_values[0] if token_values else None
+        if not token:
+            return None
+
+        @database_sync_to_async  # type: ignore[misc]
+        def get_user_from_token(jwt_token: str) -> Any:
+            from rest_framework_simplejwt.exceptions import TokenError  # type: ignore[import-untyped]
+            from rest_framework_simplejwt.tokens import AccessToken  # type: ignore[import-untyped]
+            from users.models import User
+
+            try:
+                validated = AccessToken(jwt_token)
+                user_id = validated.get('user_id')
+                if user_id is None:
+                    return None
+                return User.objects.get(id=user_id, is_active=True)
+            except (TokenError, User.DoesNotExist, ValueError, KeyError) as exc:
+                logger.debug("WebSocket JWT auth failed: %s", exc)
+                return None
+
+        return await get_user_from_token(token)
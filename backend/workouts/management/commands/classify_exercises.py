@@ -6,27 +6,40 @@ classify each exercise with:
   - difficulty_level: beginner / intermediate / advanced
   - suitable_for_goals: list of training goals the exercise is suited for
 
-Processes exercises in batches of BATCH_SIZE, grouped by muscle_group.
+Packs BATCH_SIZE exercises of one muscle_group into each prompt and runs
+several prompts at once through trainer.llm_batch_runner, which paces calls
+against the provider's request and token quotas. Results are bulk-updated
+every FLUSH_EVERY exercises as batches complete.
 Falls back to heuristic pattern-matching when AI is unavailable or fails.
-Idempotent: by default only processes unclassified exercises.
+Idempotent: by default only processes unclassified exercises. With --force,
+pass --checkpoint so an interrupted run resumes where it stopped.
 """
 from __future__ import annotations
 
 import json
 import logging
+import os
 import re
-import time
 from dataclasses import dataclass
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from django.core.management.base import BaseCommand, CommandParser
 from django.db.models import Q, QuerySet
 
 from workouts.models import Exercise
 
+if TYPE_CHECKING:
+    from trainer.llm_batch_runner import BatchLimits
+
 logger = logging.getLogger(__name__)
 
 BATCH_SIZE = 25
+CONCURRENCY = 4
+FLUSH_EVERY = 200
+# Rough prompt + completion size per exercise, for the tokens-per-minute bucket
+PROMPT_TOKENS_PER_BATCH = 900
+TOKENS_PER_EXERCISE = 90
 
 VALID_LEVELS = frozenset({'beginner', 'intermediate', 'advanced'})
 VALID_GOALS = frozenset({
@@ -160,8 +173,9 @@ def _classify_batch_with_ai(
     Raises:
         RuntimeError: If AI call fails or response is unparseable.
     """
+    from trainer import llm_gateway
     from trainer.ai_config import get_ai_config, get_api_key, AIModelConfig
-    from trainer.ai_chat import get_chat_model
+    from trainer.llm_gateway import LLMLane
     from langchain_core.messages import HumanMessage
     from workouts.ai_prompts import get_exercise_classification_prompt
 
@@ -179,10 +193,13 @@ def _classify_batch_with_ai(
     )
 
     prompt = get_exercise_classification_prompt(exercises)
-    llm = get_chat_model(gen_config)
-    response = llm.invoke([HumanMessage(content=prompt)])
+    response = llm_gateway.invoke(
+        [HumanMessage(content=prompt)],
+        config=gen_config,
+        lane=LLMLane.BATCH,
+    )
 
-    content = str(response.content).strip()
+    content = str(response.message.content).strip()
     if not content:
         raise RuntimeError("AI returned empty response.")
 
@@ -214,6 +231,38 @@ def _classify_batch_with_ai(
     return result
 
 
+def _estimate_tokens(exercises: list[dict[str, Any]]) -> int:
+    """Estimated prompt + completion tokens for one packed batch."""
+    return PROMPT_TOKENS_PER_BATCH + TOKENS_PER_EXERCISE * len(exercises)
+
+
+class _Checkpoint:
+    """
+    IDs of exercises whose results are already saved, kept in a JSON file.
+
+    Written atomically after every flush, removed when a run completes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: set[int] = set()
+
+    def load(self) -> set[int]:
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.done = {int(i) for i in data.get('done', [])}
+        return self.done
+
+    def save(self, ids: list[int]) -> None:
+        self.done.update(ids)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps({'done': sorted(self.done)}))
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
 # ──────────────────────────────────────────────────────────────────────────
 # Management Command
 # ──────────────────────────────────────────────────────────────────────────
@@ -254,6 +303,31 @@ class Command(BaseCommand):
             default=BATCH_SIZE,
             help=f"Number of exercises per AI batch (default: {BATCH_SIZE}).",
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=CONCURRENCY,
+            help=f"AI batches in flight at once (default: {CONCURRENCY}).",
+        )
+        parser.add_argument(
+            "--rpm",
+            type=int,
+            default=None,
+            help="Provider requests-per-minute budget (default: LLM_BATCH_RPM).",
+        )
+        parser.add_argument(
+            "--tpm",
+            type=int,
+            default=None,
+            help="Provider tokens-per-minute budget (default: LLM_BATCH_TPM).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            default=None,
+            help="JSON file recording saved progress; an interrupted run "
+                 "resumes from it. Removed when the run completes.",
+        )
 
     def handle(self, *args: Any, **options: Any) -> None:
         dry_run: bool = options["dry_run"]
@@ -299,7 +373,16 @@ class Command(BaseCommand):
         if use_heuristic:
             self._classify_heuristic(qs, dry_run)
         else:
-            self._classify_ai(qs, dry_run, batch_size)
+            from trainer.llm_batch_runner import BatchLimits
+
+            defaults = BatchLimits()
+            limits = BatchLimits(
+                concurrency=options["concurrency"],
+                requests_per_minute=options["rpm"] or defaults.requests_per_minute,
+                tokens_per_minute=options["tpm"] or defaults.tokens_per_minute,
+            )
+            checkpoint = _Checkpoint(options["checkpoint"]) if options["checkpoint"] else None
+            self._classify_ai(qs, dry_run, batch_size, limits, checkpoint)
 
     def _classify_heuristic(
         self, qs: QuerySet[Exercise], dry_run: bool
@@ -340,13 +423,44 @@ class Command(BaseCommand):
         )
 
     def _classify_ai(
-        self, qs: QuerySet[Exercise], dry_run: bool, batch_size: int
+        self,
+        qs: QuerySet[Exercise],
+        dry_run: bool,
+        batch_size: int,
+        limits: BatchLimits,
+        checkpoint: _Checkpoint | None,
     ) -> None:
-        """Classify exercises using AI, batched by muscle_group."""
-        muscle_groups = list(
-            qs.values_list('muscle_group', flat=True)
-            .distinct()
-            .order_by('muscle_group')
+        """Classify exercises using AI: packed muscle_group batches, run concurrently."""
+        from trainer.llm_batch_runner import run_llm_batches
+
+        done = checkpoint.load() if checkpoint and not dry_run else set()
+        exercises = [
+            ex for ex in qs.order_by('muscle_group', 'id')
+            .values('id', 'name', 'muscle_group', 'category')
+            if ex['id'] not in done
+        ]
+        if checkpoint is not None and done:
+            self.stdout.write(
+                f"  Resuming from {checkpoint.path}: {len(done)} already saved, "
+                f"{len(exercises)} remaining."
+            )
+
+        batches: list[list[dict[str, Any]]] = []
+        for ex in exercises:
+            if (
+                not batches
+                or len(batches[-1]) >= batch_size
+                or batches[-1][0]['muscle_group'] != ex['muscle_group']
+            ):
+                batches.append([])
+            batches[-1].append({
+                'id': str(ex['id']),
+                'name': ex['name'],
+                'muscle_group': ex['muscle_group'],
+                'category': ex['category'] or '',
+            })
+        self.stdout.write(
+            f"  {len(batches)} batches, up to {limits.concurrency} in flight."
         )
 
         total_classified = 0
@@ -354,52 +468,37 @@ class Command(BaseCommand):
         total_heuristic_fallback = 0
         counts: dict[str, int] = {'beginner': 0, 'intermediate': 0, 'advanced': 0}
         goal_counts: dict[str, int] = {g: 0 for g in VALID_GOALS}
-
-        for mg in muscle_groups:
-            mg_exercises = list(
-                qs.filter(muscle_group=mg)
-                .values('id', 'name', 'muscle_group', 'category')
-            )
-            self.stdout.write(f"\n  {mg.upper()}: {len(mg_exercises)} exercises")
-
-            for i in range(0, len(mg_exercises), batch_size):
-                batch = mg_exercises[i:i + batch_size]
-                batch_num = i // batch_size + 1
-                total_batches = (len(mg_exercises) + batch_size - 1) // batch_size
-                self.stdout.write(
-                    f"    Batch {batch_num}/{total_batches} "
-                    f"({len(batch)} exercises)...",
-                    ending="",
+        pending: list[Exercise] = []
+        completed = 0
+
+        try:
+            for batch, outcome in run_llm_batches(
+                batches,
+                _classify_batch_with_ai,
+                estimate_tokens=_estimate_tokens,
+                limits=limits,
+            ):
+                completed += 1
+                prefix = (
+                    f"    [{completed}/{len(batches)}] "
+                    f"{batch[0]['muscle_group']} ({len(batch)} exercises)"
                 )
-
-                batch_data = [
-                    {
-                        'id': str(ex['id']),
-                        'name': ex['name'],
-                        'muscle_group': ex['muscle_group'],
-                        'category': ex['category'] or '',
-                    }
-                    for ex in batch
-                ]
-
-                # Try AI classification
                 ai_results: dict[str, ExerciseClassification] = {}
-                try:
-                    ai_results = _classify_batch_with_ai(batch_data)
-                    self.stdout.write(f" AI OK ({len(ai_results)}/{len(batch)} parsed)")
-                except Exception as exc:
+                if isinstance(outcome, Exception):
                     self.stderr.write(
                         self.style.WARNING(
-                            f" AI failed: {exc}. Using heuristic fallback."
+                            f"{prefix} AI failed: {outcome}. Using heuristic fallback."
                         )
                     )
+                else:
+                    ai_results = outcome
+                    self.stdout.write(f"{prefix} AI OK ({len(ai_results)}/{len(batch)} parsed)")
 
                 # Apply results (AI with heuristic fallback per exercise)
-                updates: list[Exercise] = []
                 for ex_dict in batch:
-                    ex_id = str(ex_dict['id'])
+                    ex_id = ex_dict['id']
                     name = ex_dict['name']
-                    category = ex_dict.get('category', '')
+                    category = ex_dict['category']
 
                     ai_result = ai_results.get(ex_id)
                     if ai_result:
@@ -425,19 +524,17 @@ class Command(BaseCommand):
                         ex_obj = Exercise(id=int(ex_id))
                         ex_obj.difficulty_level = classification.difficulty_level
                         ex_obj.suitable_for_goals = classification.suitable_for_goals
-                        updates.append(ex_obj)
+                        pending.append(ex_obj)
                         total_classified += 1
 
-                if not dry_run and updates:
-                    Exercise.objects.bulk_update(
-                        updates,
-                        ['difficulty_level', 'suitable_for_goals'],
-                        batch_size=200,
-                    )
+                if len(pending) >= FLUSH_EVERY:
+                    self._flush(pending, checkpoint)
+        finally:
+            # Keep whatever finished, even if the run is interrupted
+            self._flush(pending, checkpoint)
 
-                # Rate-limit between batches to avoid API throttling
-                if i + batch_size < len(mg_exercises):
-                    time.sleep(1)
+        if checkpoint and not dry_run:
+            checkpoint.clear()
 
         # Summary
         self.stdout.write("")
@@ -457,3 +554,14 @@ class Command(BaseCommand):
         self.stdout.write(f"  Total: {sum(counts.values())} exercises")
         self.stdout.write(f"  AI classified: {total_ai_ok}")
         self.stdout.write(f"  Heuristic fallback: {total_heuristic_fallback}")
+
+    def _flush(self, pending: list[Exercise], checkpoint: _Checkpoint | None) -> None:
+        """Bulk-update pending classifications and record them in the checkpoint."""
+        if not pending:
+            return
+        Exercise.objects.bulk_update(
+            pending, ['difficulty_level', 'suitable_for_goals'], batch_size=200,
+        )
+        if checkpoint:
+            checkpoint.save([ex.id for ex in pending])
+        pending.clear()
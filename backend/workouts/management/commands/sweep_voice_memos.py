@@ -0,0 +1,26 @@
+"""
+Management command to fail voice memos abandoned mid-processing.
+
+Voice memos are processed by an in-process worker pool, so a memo whose
+server restarted or crashed stays uploaded / transcribing. This fails memos
+older than VOICE_MEMO_STALE_AFTER so clients stop waiting on them.
+
+Intended to run every few minutes via cron:
+    python manage.py sweep_voice_memos
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from workouts.services.voice_memo_service import VOICE_MEMO_STALE_AFTER, fail_stale_voice_memos
+
+
+class Command(BaseCommand):
+    help = "Fail voice memos stuck in processing past VOICE_MEMO_STALE_AFTER."
+
+    def handle(self, *args: object, **options: object) -> None:
+        failed = fail_stale_voice_memos()
+        self.stdout.write(self.style.SUCCESS(
+            f"Failed {failed} voice memo(s) stuck for over "
+            f"{int(VOICE_MEMO_STALE_AFTER.total_seconds() // 60)} minutes."
+        ))
@@ -1,7 +1,7 @@
 """
 Views for voice memo and video analysis — v6.5 Step 14.
 
-Voice memos: upload audio → transcribe → parse
+Voice memos: upload audio → (background) transcribe → parse
 Video analysis: upload video → analyze form → confirm
 """
 from __future__ import annotations
@@ -17,9 +17,10 @@ from rest_framework.views import APIView
 from users.models import User
 from .models import VideoAnalysis, VoiceMemo
 from .services.voice_memo_service import (
+    VoiceMemoQueueFullError,
     get_voice_memo,
     list_voice_memos,
-    upload_and_transcribe,
+    submit_voice_memo,
 )
 from .services.video_analysis_service import (
     confirm_analysis,
@@ -104,7 +105,13 @@ def _require_trainee(request: Request) -> User:
 # ---------------------------------------------------------------------------
 
 class VoiceMemoUploadView(APIView):
-    """POST /voice-memos/ — Upload audio, transcribe, parse."""
+    """
+    POST /voice-memos/ — Upload audio; transcription and parsing run in the background.
+
+    Returns 202 with status=uploaded. Progress arrives over ws/voice-memos/
+    or by polling the detail endpoint. Re-uploading the same audio returns
+    the existing memo with deduplicated=true.
+    """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser]
 
@@ -118,7 +125,7 @@ class VoiceMemoUploadView(APIView):
             )
 
         try:
-            result = upload_and_transcribe(
+            result = submit_voice_memo(
                 trainee=trainee,
                 audio_file=audio_file,
             )
@@ -127,6 +134,12 @@ class VoiceMemoUploadView(APIView):
                 {'detail': str(exc)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        except VoiceMemoQueueFullError as exc:
+            return Response(
+                {'detail': str(exc)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '30'},
+            )
 
         return Response(
             {
@@ -135,8 +148,9 @@ class VoiceMemoUploadView(APIView):
                 'transcript': result.transcript,
                 'parsed_result': result.parsed_result,
                 'error': result.error,
+                'deduplicated': result.deduplicated,
             },
-            status=status.HTTP_201_CREATED,
+            status=status.HTTP_202_ACCEPTED,
         )
 
 
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0046_add_video_message_asset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voicememo',
+            name='audio_sha256',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the audio content; re-uploads of the same audio reuse the memo.', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='voicememo',
+            index=models.Index(fields=['trainee', 'audio_sha256'], name='voice_memos_trainee_cf14f3_idx'),
+        ),
+    ]
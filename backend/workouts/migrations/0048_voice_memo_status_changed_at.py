@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0047_voice_memo_audio_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voicememo',
+            name='status_changed_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, help_text='When the status last changed; stalled memos are measured from here.'),
+            preserve_default=False,
+        ),
+    ]
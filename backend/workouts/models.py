@@ -4210,7 +4210,8 @@ class ExerciseTagDraft(models.Model):
 class VoiceMemo(models.Model):
     """
     Voice memo upload for workout/nutrition logging via speech.
-    Transcribed via OpenAI Whisper, then parsed through natural language parser.
+    Transcribed via OpenAI Whisper, then parsed through natural language parser,
+    in a background worker (status=uploaded until a worker picks it up).
     v6.5 Step 14.
     """
 
@@ -4243,6 +4244,12 @@ class VoiceMemo(models.Model):
         default='',
         help_text="Audio format (mp3, wav, m4a, webm).",
     )
+    audio_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="SHA-256 of the audio content; re-uploads of the same audio reuse the memo.",
+    )
     status = models.CharField(
         max_length=20,
         choices=Status.choices,
@@ -4291,6 +4298,10 @@ class VoiceMemo(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    status_changed_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="When the status last changed; stalled memos are measured from here.",
+    )
 
     class Meta:
         db_table = 'voice_memos'
@@ -4298,6 +4309,7 @@ class VoiceMemo(models.Model):
         indexes = [
             models.Index(fields=['trainee', '-created_at']),
             models.Index(fields=['status']),
+            models.Index(fields=['trainee', 'audio_sha256']),
         ]
 
     def __str__(self) -> str:
@@ -0,0 +1,10 @@
+"""
+WebSocket URL routing for the workouts app.
+"""
+from django.urls import path
+
+from .consumers import VoiceMemoConsumer
+
+websocket_urlpatterns = [
+    path('ws/voice-memos/', VoiceMemoConsumer.as_asgi()),
+]
@@ -13,13 +13,16 @@ from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any
 
 from django.db.models import Q
 
 from workouts.models import Exercise
 
+if TYPE_CHECKING:
+    from trainer.ai_config import AIModelConfig
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,44 +34,39 @@ class AIBuilderResponse:
     used_ai: bool
 
 
-def _get_llm(max_tokens: int = 2048, temperature: float = 0.5) -> Any:
-    """Get the LLM optimized for builder tasks (fast model by default)."""
-    from trainer.ai_config import get_builder_config, get_api_key, AIModelConfig
-    from trainer.ai_chat import get_chat_model
+def _builder_config(max_tokens: int = 2048, temperature: float = 0.5) -> AIModelConfig:
+    """Get the model config optimized for builder tasks (fast model by default)."""
+    from trainer.ai_config import get_builder_config, get_api_key
 
     config = get_builder_config()
     api_key = get_api_key(config.provider)
     if not api_key:
         raise RuntimeError(f"No API key configured for {config.provider.value}.")
 
-    gen_config = AIModelConfig(
-        provider=config.provider,
-        model_name=config.model_name,
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-    return get_chat_model(gen_config)
+    return replace(config, temperature=temperature, max_tokens=max_tokens)
 
 
 def _call_ai(prompt: str, max_tokens: int = 2048, timeout_seconds: int = 30) -> str:
-    """Call the LLM and return raw text response. Times out after timeout_seconds."""
-    import concurrent.futures
+    """
+    Call the LLM and return the raw text response.
+
+    Gives up after timeout_seconds in total: waiting for a slot, the request
+    and any provider fallback all share the one deadline, with no retries.
+    """
     import sys
     from langchain_core.messages import HumanMessage
+    from trainer import llm_gateway
 
     # Skip AI in test environment
     if 'test' in sys.argv:
         raise RuntimeError("AI skipped in test environment")
 
-    llm = _get_llm(max_tokens=max_tokens)
-
-    def _invoke() -> str:
-        response = llm.invoke([HumanMessage(content=prompt)])
-        return str(response.content)
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(_invoke)
-        return future.result(timeout=timeout_seconds)
+    response = llm_gateway.invoke(
+        [HumanMessage(content=prompt)],
+        config=_builder_config(max_tokens=max_tokens),
+        deadline_seconds=timeout_seconds,
+    )
+    return str(response.message.content)
 
 
 def _parse_json_from_response(raw: str) -> dict[str, Any]:
@@ -12,7 +12,8 @@ from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, replace
 from typing import Any
 
 from django.db import transaction
@@ -392,14 +393,17 @@ def _call_ai_for_tags(
     existing_tags: dict[str, Any],
 ) -> dict[str, Any]:
     """
-    Call OpenAI to generate auto-tag suggestions.
+    Call the configured AI provider (via the LLM gateway) for auto-tag suggestions.
     Returns parsed JSON dict. Falls back to empty tags on failure.
     """
-    from workouts.services.natural_language_parser import get_openai_client
+    from langchain_core.messages import HumanMessage
 
-    client = get_openai_client()
-    if client is None:
-        logger.warning("OpenAI client not available, returning empty tags")
+    from trainer import llm_gateway
+    from trainer.ai_config import get_ai_config, get_api_key
+
+    config = get_ai_config()
+    if not get_api_key(config.provider):
+        logger.warning("AI provider not configured, returning empty tags")
         return _empty_tag_response()
 
     prompt = get_exercise_auto_tag_prompt(
@@ -411,19 +415,21 @@ def _call_ai_for_tags(
     )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=2000,
-            response_format={"type": "json_object"},
+        response = llm_gateway.invoke(
+            [HumanMessage(content=prompt)],
+            config=replace(config, temperature=0.3, max_tokens=2000),
         )
 
-        content = response.choices[0].message.content
+        content = str(response.message.content).strip()
         if not content:
             logger.error("Empty AI response for exercise auto-tag")
             return _empty_tag_response()
 
+        # Strip markdown code fences if present
+        if content.startswith("```"):
+            content = re.sub(r'^```(?:json)?\s*', '', content)
+            content = re.sub(r'\s*```$', '', content)
+
         parsed = json.loads(content)
         return _validate_ai_response(parsed)
 
@@ -0,0 +1,400 @@
+"""
+In-memory fuzzy index for resolving free-text exercise names.
+
+Program imports, the natural-language log parser and video analysis all
+receive exercise names typed by people or produced by a model ("DB bench",
+"RDLs", "pullups"). This module resolves them against the catalog in one
+shared way:
+
+- Normalization lowercases and strips punctuation. It expands gym
+  abbreviations ("db" -> "dumbbell", "rdl" -> "romanian deadlift"),
+  splits run-together compounds ("pullups" -> "pull up") and singularizes
+  plurals.
+- Every exercise is indexed under its name and each alias.
+- A query that normalizes to an indexed name is an exact match (score 1.0).
+  Otherwise candidates are scored by trigram similarity (typos,
+  abbreviations) blended with BM25 over words (word overlap, weighted
+  towards rare words).
+- Equal scores go to an exercise's own name over another exercise's alias,
+  then to the requesting trainer's exercise over a public one (a trainer's
+  copy of "Bench Press" wins for that trainer).
+
+The index is built once per process and shared. The catalog version lives
+in the cache. Exercise saves and deletes bump it (see workouts.signals),
+and the next lookup in any process rebuilds the index.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import transaction
+
+from workouts.models import Exercise
+
+_VERSION_KEY = 'exercise_name_index:version'
+
+DEFAULT_MIN_SCORE: float = 0.6
+# The best match must beat the runner-up by this much to count as unambiguous
+AMBIGUITY_MARGIN: float = 0.05
+TRIGRAM_WEIGHT: float = 0.5
+# Query words this close to an indexed word (trigram Jaccard) count as that word
+TOKEN_MIN_SIMILARITY: float = 0.45
+SHORTLIST_SIZE: int = 50
+BM25_K1: float = 1.2
+BM25_B: float = 0.75
+
+# Token-level gym shorthand; values may be several words
+ABBREVIATIONS: dict[str, str] = {
+    'db': 'dumbbell', 'dbs': 'dumbbell',
+    'bb': 'barbell',
+    'kb': 'kettlebell', 'kbs': 'kettlebell',
+    'ez': 'ez bar',
+    'bw': 'bodyweight',
+    'rdl': 'romanian deadlift', 'rdls': 'romanian deadlift',
+    'sldl': 'stiff leg deadlift',
+    'ohp': 'overhead press',
+    'dl': 'deadlift', 'dls': 'deadlift',
+    'bss': 'bulgarian split squat',
+    'ghr': 'glute ham raise',
+    'cgbp': 'close grip bench press',
+    'inc': 'incline',
+    'dec': 'decline',
+    'ext': 'extension',
+    'alt': 'alternating',
+    'sl': 'single leg',
+    'flye': 'fly',
+    'ups': 'up',
+    'pullup': 'pull up',
+    'chinup': 'chin up',
+    'pushup': 'push up',
+    'situp': 'sit up',
+    'stepup': 'step up',
+    'pulldown': 'pull down',
+    'pushdown': 'push down',
+}
+
+# Shorthand that only applies when it is the whole name ("bench" on its own
+# means the bench press, but "incline bench" does not)
+WHOLE_NAME_SHORTHAND: dict[str, str] = {
+    'bench': 'bench press',
+}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def _singular(token: str) -> str:
+    if len(token) <= 3 or token.endswith(('ss', 'us', 'is')):
+        return token
+    if token.endswith('ies'):
+        return f'{token[:-3]}y'
+    if token.endswith(('sses', 'xes', 'ches', 'shes')):
+        return token[:-2]
+    if token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+def normalize_exercise_name(text: str) -> str:
+    """Canonical form used for both indexing and lookup."""
+    words: list[str] = []
+    for raw in _NON_WORD.sub(' ', text.lower().replace('&', ' and ')).split():
+        token = _singular(raw)
+        words.extend(ABBREVIATIONS.get(raw, ABBREVIATIONS.get(token, token)).split())
+    return ' '.join(words)
+
+
+def _trigrams(normalized: str) -> set[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces before, one after."""
+    grams: set[str] = set()
+    for word in normalized.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True)
+class ExerciseNameMatch:
+    """One candidate exercise for a free-text name."""
+    exercise_id: int
+    name: str
+    score: float
+    exact: bool
+    via_alias: bool
+    is_own: bool = False  # created by the requesting trainer
+
+    @property
+    def precedence(self) -> tuple[bool, bool]:
+        """Tie-break rank among equal scores; lower wins."""
+        return (self.via_alias, not self.is_own)
+
+
+@dataclass(frozen=True)
+class _Entry:
+    exercise_id: int
+    name: str
+    is_public: bool
+    created_by_id: Optional[int]
+
+
+@dataclass(frozen=True)
+class _Document:
+    entry: _Entry
+    text: str
+    tokens: Counter[str]
+    trigrams: frozenset[str]
+    is_alias: bool
+
+
+class ExerciseNameIndex:
+    """
+    Immutable index over a snapshot of the catalog.
+
+    Candidates come from the word vocabulary: each query word is matched to
+    indexed words that are equal or share enough trigrams ("dumbell" ->
+    "dumbbell"). Only documents containing one of those words are scored.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[tuple[int, str, list[str], bool, Optional[int]]],
+        version: str = '',
+    ) -> None:
+        self.version = version
+        self._docs: list[_Document] = []
+        self._exact: dict[str, list[int]] = defaultdict(list)
+        self._token_postings: dict[str, list[int]] = defaultdict(list)
+        self._bm25_postings: dict[str, list[tuple[int, float]]] = {}
+        self._vocab_trigrams: dict[str, list[str]] = defaultdict(list)
+
+        for exercise_id, name, aliases, is_public, created_by_id in rows:
+            entry = _Entry(exercise_id, name, is_public, created_by_id)
+            seen: set[str] = set()
+            for i, label in enumerate([name, *(aliases or [])]):
+                text = normalize_exercise_name(label)
+                if not text or text in seen:
+                    continue
+                seen.add(text)
+                self._add(_Document(
+                    entry=entry,
+                    text=text,
+                    tokens=Counter(text.split()),
+                    trigrams=frozenset(_trigrams(text)),
+                    is_alias=i > 0,
+                ))
+
+        for token in self._token_postings:
+            for gram in _trigrams(token):
+                self._vocab_trigrams[gram].append(token)
+        lengths = [sum(doc.tokens.values()) for doc in self._docs]
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 1.0
+        self._idf_cache = {token: self._idf(token) for token in self._token_postings}
+        # Precomputed BM25 term of every (word, document) pair
+        for token, doc_ids in self._token_postings.items():
+            self._bm25_postings[token] = [
+                (doc_id, self._bm25_term(token, self._docs[doc_id], lengths[doc_id]))
+                for doc_id in doc_ids
+            ]
+
+    def _add(self, doc: _Document) -> None:
+        doc_id = len(self._docs)
+        self._docs.append(doc)
+        self._exact[doc.text].append(doc_id)
+        for token in doc.tokens:
+            self._token_postings[token].append(doc_id)
+
+    def __len__(self) -> int:
+        return len({doc.entry.exercise_id for doc in self._docs})
+
+    @staticmethod
+    def _visible(entry: _Entry, trainer_id: Optional[int]) -> bool:
+        return entry.is_public or (trainer_id is not None and entry.created_by_id == trainer_id)
+
+    def _idf(self, token: str) -> float:
+        n = len(self._docs)
+        df = len(self._token_postings.get(token, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def _similar_tokens(self, token: str) -> dict[str, float]:
+        """Indexed words close to ``token``, with their trigram similarity."""
+        if token in self._token_postings:
+            return {token: 1.0}
+        grams = _trigrams(token)
+        shared: Counter[str] = Counter()
+        for gram in grams:
+            shared.update(self._vocab_trigrams.get(gram, ()))
+        similar: dict[str, float] = {}
+        for candidate, common in shared.items():
+            similarity = common / (len(grams) + len(_trigrams(candidate)) - common)
+            if similarity >= TOKEN_MIN_SIMILARITY:
+                similar[candidate] = similarity
+        return similar
+
+    def _bm25_term(self, token: str, doc: _Document, length: int) -> float:
+        tf = doc.tokens[token]
+        length_norm = 1 - BM25_B + BM25_B * length / self._avg_length
+        return self._idf_cache[token] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+
+    def _bm25_ceiling(self, idfs: list[float]) -> float:
+        """Score of a document identical to the query, to scale BM25 into 0..1."""
+        length_norm = 1 - BM25_B + BM25_B * len(idfs) / self._avg_length
+        return sum(idfs) * (BM25_K1 + 1) / (1 + BM25_K1 * length_norm)
+
+    def search(
+        self,
+        query: str,
+        *,
+        trainer_id: Optional[int] = None,
+        limit: int = 5,
+        min_score: float = 0.0,
+    ) -> list[ExerciseNameMatch]:
+        """
+        Top ``limit`` exercises for ``query``, best first.
+
+        Only public exercises and those created by ``trainer_id`` are returned.
+        """
+        text = normalize_exercise_name(query)
+        if not text:
+            return []
+        if text not in self._exact:
+            text = WHOLE_NAME_SHORTHAND.get(text, text)
+
+        best: dict[int, ExerciseNameMatch] = {}
+
+        def offer(doc: _Document, score: float, exact: bool) -> None:
+            current = best.get(doc.entry.exercise_id)
+            if current is None or (score, not doc.is_alias) > (current.score, not current.via_alias):
+                best[doc.entry.exercise_id] = ExerciseNameMatch(
+                    exercise_id=doc.entry.exercise_id,
+                    name=doc.entry.name,
+                    score=round(score, 4),
+                    exact=exact,
+                    via_alias=doc.is_alias,
+                    is_own=trainer_id is not None and doc.entry.created_by_id == trainer_id,
+                )
+
+        for doc_id in self._exact.get(text, ()):
+            doc = self._docs[doc_id]
+            if self._visible(doc.entry, trainer_id):
+                offer(doc, 1.0, exact=True)
+
+        # BM25 over words, with near-miss words counted at their similarity
+        query_tokens = text.split()
+        bm25: dict[int, float] = defaultdict(float)
+        idfs: list[float] = []
+        for token in query_tokens:
+            similar_tokens = self._similar_tokens(token)
+            # A misspelt word is worth what the word it stands for is worth
+            idfs.append(max(
+                (self._idf_cache[t] for t in similar_tokens), default=self._idf(token),
+            ))
+            per_doc: dict[int, float] = {}
+            for similar, similarity in similar_tokens.items():
+                for doc_id, term in self._bm25_postings[similar]:
+                    term *= similarity
+                    if term > per_doc.get(doc_id, 0.0):
+                        per_doc[doc_id] = term
+            for doc_id, term in per_doc.items():
+                bm25[doc_id] += term
+
+        # Trigram similarity only for the strongest word matches
+        shortlist = heapq.nlargest(max(limit * 10, SHORTLIST_SIZE), bm25.items(), key=itemgetter(1))
+        query_grams = _trigrams(text)
+        ceiling = self._bm25_ceiling(idfs) or 1.0
+        for doc_id, bm25_raw in shortlist:
+            doc = self._docs[doc_id]
+            if doc.text == text or not self._visible(doc.entry, trainer_id):
+                continue
+            common = len(query_grams & doc.trigrams)
+            trigram_score = common / (len(query_grams) + len(doc.trigrams) - common)
+            bm25_score = min(1.0, bm25_raw / ceiling)
+            score = TRIGRAM_WEIGHT * trigram_score + (1 - TRIGRAM_WEIGHT) * bm25_score
+            if score >= min_score:
+                offer(doc, min(score, 0.99), exact=False)
+
+        ranked = sorted(best.values(), key=lambda m: (-m.score, m.precedence, m.name))
+        return [m for m in ranked if m.score >= min_score][:limit]
+
+    def best_match(
+        self,
+        query: str,
+        *,
+        trainer_id: Optional[int] = None,
+        min_score: float = DEFAULT_MIN_SCORE,
+    ) -> Optional[ExerciseNameMatch]:
+        """
+        The single confident match for ``query``, or None if none or ambiguous.
+
+        Ties are broken first (see ExerciseNameMatch.precedence); only a
+        runner-up that the tie-break does not settle makes the match
+        ambiguous.
+        """
+        top = self.search(query, trainer_id=trainer_id, min_score=min_score)
+        if not top:
+            return None
+        best = top[0]
+        rivals = [
+            m for m in top[1:]
+            if m.score < best.score or m.precedence == best.precedence
+        ]
+        if rivals and best.score - rivals[0].score < AMBIGUITY_MARGIN:
+            return None
+        return best
+
+
+# ---------------------------------------------------------------------------
+# Shared instance
+# ---------------------------------------------------------------------------
+
+_index: Optional[ExerciseNameIndex] = None
+_build_lock = threading.Lock()
+
+
+def _current_version() -> str:
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        # add() is a no-op if another process created the key first.
+        cache.add(_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(_VERSION_KEY, '')
+    return str(version)
+
+
+def _bump_version() -> None:
+    cache.set(_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def get_exercise_name_index() -> ExerciseNameIndex:
+    """The shared index, rebuilt if the catalog changed since it was built."""
+    global _index
+    version = _current_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _build_lock:
+        if _index is None or _index.version != version:
+            rows = Exercise.objects.values_list(
+                'id', 'name', 'aliases', 'is_public', 'created_by_id',
+            )
+            _index = ExerciseNameIndex(rows.iterator(), version=version)
+        return _index
+
+
+def invalidate_exercise_name_index() -> None:
+    """
+    Mark the shared index stale.
+
+    The version is bumped now, so lookups later in this transaction see the
+    change. It is bumped again after commit, so no other process keeps an
+    index it rebuilt from pre-commit rows.
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
@@ -0,0 +1,416 @@
+"""
+Rule-based fast path for natural-language workout and nutrition logs.
+
+Simple inputs such as "3x8 bench 185" or "2 eggs and toast" are parsed
+with a small grammar and matched against the exercise and food catalogs,
+without a model call. Exercise names resolve through the shared name index
+(workouts.services.exercise_name_index). Every clause of the input must parse and match a
+catalog entry; otherwise parse_log_fast() returns None and the caller
+falls through to the LLM parser.
+
+The result has the same shape as the LLM parser's output. Its confidence
+is the lowest confidence of any parsed item. Callers use the fast result
+only at FAST_PATH_MIN_CONFIDENCE or above.
+
+Which stage served each parse is counted in the cache (see
+get_parse_stage_stats()) to track how much traffic skips the LLM.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Optional
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from workouts.models import FoodItem
+from workouts.services.exercise_name_index import (
+    get_exercise_name_index,
+    normalize_exercise_name,
+)
+
+if TYPE_CHECKING:
+    from users.models import User
+
+logger = logging.getLogger(__name__)
+
+FAST_PATH_MIN_CONFIDENCE: float = 0.9
+MAX_CLAUSES: int = 8
+
+# Plausibility bounds; anything outside goes to the LLM
+MAX_SETS = 20
+MAX_REPS = 100
+MAX_WEIGHT = 1500.0
+
+
+class ParseStage(str, Enum):
+    """Which stage produced a parse."""
+    RULES = 'rules'
+    LLM = 'llm'
+
+
+# ---------------------------------------------------------------------------
+# Grammar
+# ---------------------------------------------------------------------------
+
+_NUMBER_WORDS: dict[str, int] = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+}
+
+_UNIT_ALIASES: dict[str, str] = {
+    'g': FoodItem.ServingUnit.GRAMS, 'gram': FoodItem.ServingUnit.GRAMS,
+    'grams': FoodItem.ServingUnit.GRAMS,
+    'oz': FoodItem.ServingUnit.OUNCES, 'ounce': FoodItem.ServingUnit.OUNCES,
+    'ounces': FoodItem.ServingUnit.OUNCES,
+    'cup': FoodItem.ServingUnit.CUPS, 'cups': FoodItem.ServingUnit.CUPS,
+    'tbsp': FoodItem.ServingUnit.TABLESPOONS, 'tsp': FoodItem.ServingUnit.TEASPOONS,
+    'piece': FoodItem.ServingUnit.PIECES, 'pieces': FoodItem.ServingUnit.PIECES,
+    'slice': FoodItem.ServingUnit.SLICES, 'slices': FoodItem.ServingUnit.SLICES,
+    'ml': FoodItem.ServingUnit.ML,
+    'scoop': FoodItem.ServingUnit.SCOOP, 'scoops': FoodItem.ServingUnit.SCOOP,
+    'serving': FoodItem.ServingUnit.SERVING, 'servings': FoodItem.ServingUnit.SERVING,
+}
+
+# Units where "2 eggs" means two servings without ambiguity
+_COUNT_UNITS = {
+    FoodItem.ServingUnit.PIECES, FoodItem.ServingUnit.SLICES,
+    FoodItem.ServingUnit.SCOOP, FoodItem.ServingUnit.SERVING,
+}
+
+_CLAUSE_SPLIT = re.compile(r'\s*(?:,|;|\n|\+|&|\band\b|\bthen\b|\bplus\b)\s*')
+_LEADING_FILLER = re.compile(
+    r"^(?:(?:i|i've|ive|just|also|then|ate|had|did|drank|eaten|done|some)\s+)+"
+)
+_TRAILING_MEAL = re.compile(r'\s+(?:for|at)\s+(?:breakfast|lunch|dinner|snack)$')
+_NUMBER = r'\d+(?:\.\d+)?'
+_WORD_COUNT = '|'.join(_NUMBER_WORDS)
+_WORD_QTY = f'{_WORD_COUNT}|half'
+
+_SETS_X_REPS = re.compile(rf'\b(?P<sets>\d+)\s*[x×*]\s*(?P<reps>\d+(?:\s*-\s*\d+)?)\b')
+_SETS_OF_REPS = re.compile(
+    rf'\b(?P<sets>\d+|{_WORD_COUNT})\s+sets?\s+(?:of\s+|x\s*)?(?P<reps>\d+(?:\s*-\s*\d+)?)(?:\s*reps?)?\b'
+)
+_REPS_ONLY = re.compile(r'\b(?P<reps>\d+)\s*reps?\b')
+_WEIGHT = re.compile(
+    rf'(?:@\s*)?(?P<weight>{_NUMBER})\s*(?P<unit>lbs?|pounds?|kgs?|kilos?|kilograms?)?\b'
+)
+_BODYWEIGHT = re.compile(r'\b(?:bw|bodyweight|body weight)\b')
+_EXERCISE_CONNECTORS = {'at', 'for', 'of', 'x', 'sets', 'set', 'reps', 'rep', '@', 'with'}
+
+_FOOD = re.compile(
+    rf'^(?:(?P<qty>{_NUMBER})\s*|(?P<qty_word>{_WORD_QTY})\s+)?'
+    rf'(?:(?P<unit>{"|".join(sorted(_UNIT_ALIASES, key=len, reverse=True))})\b\s*)?'
+    r'(?:of\s+)?(?P<name>[a-z][a-z\' -]*)$'
+)
+
+
+@dataclass(frozen=True)
+class _ExerciseClause:
+    phrase: str
+    sets: int
+    reps: int | str
+    weight: float
+    unit: str
+
+
+@dataclass(frozen=True)
+class _FoodClause:
+    phrase: str
+    quantity: float
+    unit: Optional[str]
+
+
+def _split_clauses(text: str) -> list[str]:
+    clauses = []
+    for raw in _CLAUSE_SPLIT.split(text.lower()):
+        clause = _TRAILING_MEAL.sub('', _LEADING_FILLER.sub('', raw.strip(' .!'))).strip()
+        if clause:
+            clauses.append(clause)
+    return clauses
+
+
+def _to_count(token: str) -> int:
+    return int(token) if token.isdigit() else _NUMBER_WORDS[token]
+
+
+def _parse_exercise_clause(clause: str) -> Optional[_ExerciseClause]:
+    match = _SETS_X_REPS.search(clause) or _SETS_OF_REPS.search(clause)
+    if match:
+        sets = _to_count(match.group('sets'))
+    else:
+        match = _REPS_ONLY.search(clause)
+        if match is None:
+            return None
+        sets = 1
+    reps_text = re.sub(r'\s+', '', match.group('reps'))
+    reps: int | str = int(reps_text) if reps_text.isdigit() else reps_text
+    rest = f'{clause[:match.start()]} {clause[match.end():]}'
+
+    weight, unit = 0.0, 'lbs'
+    if _BODYWEIGHT.search(rest):
+        rest = _BODYWEIGHT.sub(' ', rest)
+    weights = list(_WEIGHT.finditer(rest))
+    if len(weights) > 1:
+        return None
+    if weights:
+        weight = float(weights[0].group('weight'))
+        if (weights[0].group('unit') or '').startswith('k'):
+            unit = 'kg'
+        rest = f'{rest[:weights[0].start()]} {rest[weights[0].end():]}'
+
+    words = [w for w in re.split(r'\s+', rest.strip()) if w and w not in _EXERCISE_CONNECTORS]
+    phrase = ' '.join(words)
+    if not phrase or re.search(r'\d', phrase):
+        return None
+    max_reps = int(str(reps).split('-')[-1])
+    if not (1 <= sets <= MAX_SETS and 1 <= max_reps <= MAX_REPS and weight <= MAX_WEIGHT):
+        return None
+    return _ExerciseClause(phrase=phrase, sets=sets, reps=reps, weight=weight, unit=unit)
+
+
+def _parse_food_clause(clause: str) -> Optional[_FoodClause]:
+    match = _FOOD.match(clause)
+    if match is None:
+        return None
+    if match.group('qty') is not None:
+        quantity = float(match.group('qty'))
+    elif match.group('qty_word') == 'half':
+        quantity = 0.5
+    elif match.group('qty_word') is not None:
+        quantity = float(_NUMBER_WORDS[match.group('qty_word')])
+    else:
+        quantity = 1.0
+    if quantity <= 0:
+        return None
+    unit = _UNIT_ALIASES.get(match.group('unit') or '')
+    return _FoodClause(phrase=match.group('name').strip(), quantity=quantity, unit=unit)
+
+
+def _name_variants(phrase: str) -> set[str]:
+    """The phrase plus simple singular/plural forms."""
+    variants = {phrase, f'{phrase}s'}
+    if phrase.endswith('ies'):
+        variants.add(f'{phrase[:-3]}y')
+    if phrase.endswith('es'):
+        variants.add(phrase[:-2])
+    if phrase.endswith('s'):
+        variants.add(phrase[:-1])
+    return variants
+
+
+# ---------------------------------------------------------------------------
+# Catalog matching
+# ---------------------------------------------------------------------------
+
+def _visibility(user: Optional[User]) -> Q:
+    """Public catalog entries plus the trainer's own (same rule as food swaps)."""
+    visible = Q(is_public=True)
+    if user is None:
+        return visible
+    if user.role == 'TRAINER':
+        return visible | Q(created_by_id=user.id)
+    trainer_id = getattr(user, 'parent_trainer_id', None)
+    if trainer_id:
+        visible |= Q(created_by_id=trainer_id)
+    return visible
+
+
+def _catalog_owner_id(user: Optional[User]) -> Optional[int]:
+    """The trainer whose private catalog entries ``user`` may see."""
+    if user is None:
+        return None
+    if user.role == 'TRAINER':
+        return user.id
+    return getattr(user, 'parent_trainer_id', None)
+
+
+def _match_exercises(
+    clauses: list[_ExerciseClause],
+    user: Optional[User],
+    recent_exercises: list[str],
+) -> dict[str, tuple[str, float]]:
+    """Map each clause phrase to (catalog name, confidence) where it matches."""
+    index = get_exercise_name_index()
+    trainer_id = _catalog_owner_id(user)
+
+    matches: dict[str, tuple[str, float]] = {}
+    for clause in clauses:
+        phrase = clause.phrase
+        match = index.best_match(phrase, trainer_id=trainer_id)
+        if match is not None and match.exact:
+            matches[phrase] = (match.name, 0.95 if match.via_alias else 1.0)
+        elif match is not None and match.score >= FAST_PATH_MIN_CONFIDENCE:
+            matches[phrase] = (match.name, min(match.score, 0.9))
+        else:
+            # "bench" with "Barbell Bench Press" in the trainee's program
+            tokens = set(normalize_exercise_name(phrase).split())
+            recent = {
+                n for n in recent_exercises
+                if tokens <= set(normalize_exercise_name(n).split())
+            }
+            if len(recent) == 1:
+                matches[phrase] = (recent.pop(), 0.9)
+    return matches
+
+
+def _match_foods(clauses: list[_FoodClause], user: Optional[User]) -> dict[str, tuple[FoodItem, float]]:
+    """Map each clause phrase to (food item, confidence) where it matches."""
+    variants_for = {c.phrase: _name_variants(c.phrase) for c in clauses}
+    all_variants = set().union(*variants_for.values()) if variants_for else set()
+    foods = list(
+        FoodItem.objects
+        .annotate(name_lower=Lower('name'))
+        .filter(_visibility(user), name_lower__in=all_variants)
+    )
+
+    matches: dict[str, tuple[FoodItem, float]] = {}
+    for phrase, variants in variants_for.items():
+        candidates = [f for f in foods if getattr(f, 'name_lower') in variants]
+        if len(candidates) > 1:
+            unbranded = [f for f in candidates if not f.brand]
+            if len(unbranded) != 1:
+                continue
+            matches[phrase] = (unbranded[0], 0.9)
+        elif candidates:
+            matches[phrase] = (candidates[0], 1.0)
+    return matches
+
+
+def _servings(clause: _FoodClause, food: FoodItem) -> Optional[tuple[float, float]]:
+    """(servings, confidence) for a quantity, or None if the units do not line up."""
+    if clause.unit is None:
+        confidence = 1.0 if food.serving_unit in _COUNT_UNITS else 0.9
+        return clause.quantity, confidence
+    if clause.unit == FoodItem.ServingUnit.SERVING:
+        return clause.quantity, 1.0
+    if clause.unit == food.serving_unit:
+        return clause.quantity / food.serving_size, 1.0
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class FastParseResult:
+    """A complete rule-based parse, in the LLM parser's output shape."""
+    meals: list[dict[str, Any]] = field(default_factory=list)
+    exercises: list[dict[str, Any]] = field(default_factory=list)
+    confidence: float = 0.0
+
+    def as_parsed_data(self) -> dict[str, Any]:
+        return {
+            'nutrition': {'meals': self.meals},
+            'workout': {'exercises': self.exercises},
+            'confidence': self.confidence,
+            'needs_clarification': False,
+            'clarification_question': None,
+        }
+
+
+def parse_log_fast(
+    user_input: str,
+    user: Optional[User] = None,
+    context: Optional[dict[str, Any]] = None,
+) -> Optional[FastParseResult]:
+    """
+    Parse ``user_input`` without the LLM.
+
+    Returns None unless every clause parsed and matched the catalog
+    visible to ``user``. Runs at most one exercise and one food query.
+    """
+    clauses = _split_clauses(user_input)
+    if not clauses or len(clauses) > MAX_CLAUSES:
+        return None
+
+    exercise_clauses: list[_ExerciseClause] = []
+    food_clauses: list[_FoodClause] = []
+    order: list[_ExerciseClause | _FoodClause] = []
+    for text in clauses:
+        exercise_clause = _parse_exercise_clause(text)
+        if exercise_clause is not None:
+            exercise_clauses.append(exercise_clause)
+            order.append(exercise_clause)
+            continue
+        food_clause = _parse_food_clause(text)
+        if food_clause is None:
+            return None
+        food_clauses.append(food_clause)
+        order.append(food_clause)
+
+    recent = list((context or {}).get('recent_exercises') or [])
+    exercise_matches = _match_exercises(exercise_clauses, user, recent) if exercise_clauses else {}
+    food_matches = _match_foods(food_clauses, user) if food_clauses else {}
+
+    meals: list[dict[str, Any]] = []
+    exercises: list[dict[str, Any]] = []
+    confidence = 1.0
+    for item in order:
+        if isinstance(item, _ExerciseClause):
+            if item.phrase not in exercise_matches:
+                return None
+            name, match_confidence = exercise_matches[item.phrase]
+            exercises.append({
+                'exercise_name': name,
+                'sets': item.sets,
+                'reps': item.reps,
+                'weight': item.weight,
+                'unit': item.unit,
+                'timestamp': None,
+            })
+        else:
+            if item.phrase not in food_matches:
+                return None
+            food, match_confidence = food_matches[item.phrase]
+            servings = _servings(item, food)
+            if servings is None:
+                return None
+            amount, unit_confidence = servings
+            match_confidence = min(match_confidence, unit_confidence)
+            meals.append({
+                'name': food.name if amount == 1 else f'{food.name} x{amount:g}',
+                'protein': round(food.protein * amount, 1),
+                'carbs': round(food.carbs * amount, 1),
+                'fat': round(food.fat * amount, 1),
+                'calories': round(food.calories * amount),
+                'timestamp': None,
+            })
+        confidence = min(confidence, match_confidence)
+
+    return FastParseResult(meals=meals, exercises=exercises, confidence=confidence)
+
+
+# ---------------------------------------------------------------------------
+# Stage hit rates
+# ---------------------------------------------------------------------------
+
+_STAGE_KEY_PREFIX = 'nl_parse:stage'
+
+
+def record_parse_stage(stage: ParseStage) -> None:
+    """Count one parse served by ``stage``."""
+    key = f'{_STAGE_KEY_PREFIX}:{stage.value}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+    logger.info('nl_parse stage=%s', stage.value)
+
+
+def get_parse_stage_stats() -> dict[str, Any]:
+    """Parse counts per stage and the share handled without the LLM."""
+    keys = {f'{_STAGE_KEY_PREFIX}:{stage.value}': stage.value for stage in ParseStage}
+    found = cache.get_many(list(keys))
+    counts = {stage: int(found.get(key) or 0) for key, stage in keys.items()}
+    total = sum(counts.values())
+    return {
+        'counts': counts,
+        'total': total,
+        'llm_offload_ratio': round(counts[ParseStage.RULES.value] / total, 3) if total else 0.0,
+    }
@@ -1,16 +1,27 @@
 """
 Natural Language Parser Service for workout and nutrition logging.
-Uses OpenAI API to parse user input into structured data.
+Simple inputs are parsed by the rule-based fast path (log_fast_parser);
+everything else goes to the OpenAI API.
 """
 from __future__ import annotations
 
 import json
 import logging
-from typing import Any, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 from django.conf import settings
 from openai import OpenAI
 from pydantic import BaseModel, ValidationError
 
+from workouts.services.log_fast_parser import (
+    FAST_PATH_MIN_CONFIDENCE,
+    ParseStage,
+    parse_log_fast,
+    record_parse_stage,
+)
+
+if TYPE_CHECKING:
+    from users.models import User
+
 logger = logging.getLogger(__name__)
 
 # OpenAI client - initialized lazily to avoid import-time errors
@@ -71,15 +82,17 @@ class NaturalLanguageParserService:
     
     This service:
     1. Takes raw user input (text or speech transcript)
-    2. Calls OpenAI API with structured prompt
-    3. Validates response using Pydantic
-    4. Returns structured data ready for database insertion
+    2. Tries the rule-based fast path against the exercise and food catalogs
+    3. Otherwise calls OpenAI API with structured prompt
+    4. Validates response using Pydantic
+    5. Returns structured data ready for database insertion
     """
     
     @staticmethod
     def parse_user_input(
         user_input: str,
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        user: Optional[User] = None,
     ) -> Tuple[Dict[str, Any], Optional[str]]:
         """
         Parse natural language input into structured log data.
@@ -87,6 +100,8 @@ class NaturalLanguageParserService:
         Args:
             user_input: Raw user input string
             context: Optional context (user's program, recent exercises, etc.)
+            user: Optional user whose trainer's custom exercises and foods
+                the fast path may match
         
         Returns:
             Tuple of (parsed_data, error_message)
@@ -102,7 +117,13 @@ class NaturalLanguageParserService:
         """
         if not user_input or not user_input.strip():
             return {}, "User input is empty"
-        
+
+        fast_result = parse_log_fast(user_input, user=user, context=context)
+        if fast_result is not None and fast_result.confidence >= FAST_PATH_MIN_CONFIDENCE:
+            record_parse_stage(ParseStage.RULES)
+            return fast_result.as_parsed_data(), None
+        record_parse_stage(ParseStage.LLM)
+
         # Get OpenAI client (lazy initialization)
         client = get_openai_client()
         if not client:
@@ -1073,8 +1073,8 @@ def generate_program_with_ai(request: GenerateProgramRequest) -> GeneratedProgra
     Raises:
         ValueError: If both AI and deterministic generation fail.
     """
+    from trainer import llm_gateway
     from trainer.ai_config import get_builder_config, get_api_key
-    from trainer.ai_chat import get_chat_model
     from workouts.ai_prompts import get_structured_program_generation_prompt
     from langchain_core.messages import HumanMessage
 
@@ -1117,9 +1117,8 @@ def generate_program_with_ai(request: GenerateProgramRequest) -> GeneratedProgra
         return generate_program(request)
 
     try:
-        llm = get_chat_model(gen_config)
-        response = llm.invoke([HumanMessage(content=prompt)])
-        raw_text = str(response.content)
+        response = llm_gateway.invoke([HumanMessage(content=prompt)], config=gen_config)
+        raw_text = str(response.message.content)
 
         ai_data = _parse_ai_response(raw_text)
         _validate_ai_program(ai_data, valid_exercise_ids)
@@ -1204,8 +1203,8 @@ def modify_program_with_ai(
     Raises:
         ValueError: If AI modification fails.
     """
+    from trainer import llm_gateway
     from trainer.ai_config import get_ai_config, get_api_key, AIModelConfig
-    from trainer.ai_chat import get_chat_model
     from workouts.ai_prompts import get_program_modification_prompt
     from langchain_core.messages import HumanMessage
 
@@ -1246,9 +1245,8 @@ def modify_program_with_ai(
         max_tokens=4096,
     )
 
-    llm = get_chat_model(gen_config)
-    response = llm.invoke([HumanMessage(content=prompt)])
-    raw_text = str(response.content)
+    response = llm_gateway.invoke([HumanMessage(content=prompt)], config=gen_config)
+    raw_text = str(response.message.content)
 
     ai_data = _parse_ai_response(raw_text)
 
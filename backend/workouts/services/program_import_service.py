@@ -22,7 +22,6 @@ from django.utils import timezone
 from users.models import User
 from workouts.models import (
     DecisionLog,
-    Exercise,
     PlanSession,
     PlanSlot,
     PlanWeek,
@@ -30,6 +29,7 @@ from workouts.models import (
     TrainingPlan,
     UndoSnapshot,
 )
+from workouts.services.exercise_name_index import get_exercise_name_index
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +44,9 @@ VALID_SLOT_ROLES = {
     'accessory', 'warmup', 'cooldown',
 }
 
+# Fuzzy name matches below this score are reported as not found
+IMPORT_MIN_MATCH_SCORE = 0.75
+
 
 # ---------------------------------------------------------------------------
 # Dataclasses
@@ -215,25 +218,17 @@ def _validate_and_build(
         if row.get('exercise_name', '').strip()
     }
 
-    # Lookup exercises (case-insensitive)
-    from django.db.models import Q
-    from django.db.models.functions import Lower
-    lower_names = {n.lower() for n in exercise_names}
-    exercises = Exercise.objects.annotate(
-        name_lower=Lower('name'),
-    ).filter(
-        Q(name_lower__in=lower_names) & (
-            Q(is_public=True) | Q(created_by=trainer)
-        )
-    )
-    exercise_map: dict[str, int] = {
-        e.name_lower: e.pk for e in exercises  # type: ignore[attr-defined]
-    }
-
-    # Check for missing exercises
-    for name in exercise_names:
-        if name.lower() not in exercise_map:
+    # Resolve names through the shared index (abbreviations, plurals, typos)
+    index = get_exercise_name_index()
+    exercise_map: dict[str, int] = {}
+    for name in sorted(exercise_names):
+        match = index.best_match(name, trainer_id=trainer.id, min_score=IMPORT_MIN_MATCH_SCORE)
+        if match is None:
             errors.append(f"Exercise not found: '{name}'")
+            continue
+        exercise_map[name.lower()] = match.exercise_id
+        if not match.exact:
+            warnings.append(f"Exercise '{name}' matched to '{match.name}'")
 
     # Build week → session → slot structure
     weeks: dict[int, dict[str, Any]] = {}
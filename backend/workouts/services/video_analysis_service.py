@@ -17,16 +17,15 @@ from typing import Any
 
 from django.core.files.uploadedfile import UploadedFile
 from django.db import transaction
-from django.db.models.functions import Lower
 from django.utils import timezone
 
 from users.models import User
 from workouts.models import (
     DecisionLog,
-    Exercise,
     UndoSnapshot,
     VideoAnalysis,
 )
+from workouts.services.exercise_name_index import get_exercise_name_index
 
 logger = logging.getLogger(__name__)
 
@@ -245,20 +244,10 @@ def _match_exercise(exercise_name: str, trainee: User) -> int | None:
     if not exercise_name:
         return None
 
-    from django.db.models import Q
-
-    trainer = trainee.parent_trainer
-    exercise = (
-        Exercise.objects
-        .annotate(name_lower=Lower('name'))
-        .filter(
-            Q(name_lower=exercise_name.lower()) & (
-                Q(is_public=True) | Q(created_by=trainer)
-            )
-        )
-        .first()
+    match = get_exercise_name_index().best_match(
+        exercise_name, trainer_id=trainee.parent_trainer_id,
     )
-    return exercise.pk if exercise else None
+    return match.exercise_id if match else None
 
 
 def _analyze_video_with_ai(analysis: VideoAnalysis) -> dict[str, Any]:
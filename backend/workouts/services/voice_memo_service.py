@@ -2,20 +2,42 @@
 Voice Memo Service — v6.5 Step 14.
 
 Workflow:
-1. Trainee uploads audio → VoiceMemo created (status=uploaded)
-2. OpenAI Whisper transcribes audio → status=transcribed
+1. Trainee uploads audio → VoiceMemo created (status=uploaded) and the
+   request returns immediately. Audio whose SHA-256 matches an earlier
+   memo of the same trainee reuses that memo instead of being processed
+   again.
+2. A bounded worker pool picks the memo up after the upload commits:
+   OpenAI Whisper transcribes audio → status=transcribed
 3. Natural language parser extracts structured data → status=parsed
-4. On failure → status=failed with error_message
+4. On failure → status=failed with error_message. Transient Whisper
+   errors (timeouts, rate limits, 5xx) are retried with backoff first.
+5. A memo still uploaded / transcribing / parsing VOICE_MEMO_STALE_AFTER
+   after its last status change was lost with its worker (restart, crash);
+   the sweep_voice_memos command fails it, and a re-upload of the same
+   audio starts over. Worker writes only apply while the memo is still in
+   the status the worker left it in, so a swept memo stays failed.
+
+Every status change is published to the trainee's channel group
+(voice_memos_<trainee_id>, see workouts.consumers.VoiceMemoConsumer).
+The pool and its queue limit are per process.
 """
 from __future__ import annotations
 
-import base64
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any
+from datetime import timedelta
+from typing import Any, TypeVar
 
 from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 from users.models import User
 from workouts.models import VoiceMemo
@@ -26,98 +48,86 @@ ALLOWED_AUDIO_FORMATS = {'mp3', 'wav', 'm4a', 'webm', 'ogg', 'flac'}
 MAX_AUDIO_SIZE_BYTES = 25 * 1024 * 1024  # 25MB (Whisper limit)
 ALLOWED_EXTENSIONS = {f'.{fmt}' for fmt in ALLOWED_AUDIO_FORMATS}
 
+VOICE_MEMO_WORKERS: int = int(os.getenv('VOICE_MEMO_WORKERS', '4'))
+VOICE_MEMO_MAX_QUEUED: int = int(os.getenv('VOICE_MEMO_MAX_QUEUED', '50'))  # queued + running
+VOICE_MEMO_MAX_ATTEMPTS: int = 3
+RETRY_BACKOFF_SECONDS: float = 2.0
+VOICE_MEMO_STALE_AFTER = timedelta(minutes=30)
+
+# Statuses a worker moves on from; a memo left in one was abandoned
+IN_PROGRESS_STATUSES: tuple[str, ...] = (VoiceMemo.Status.UPLOADED, VoiceMemo.Status.TRANSCRIBING)
+# A transcribed memo is still being parsed unless its transcript is blank
+IN_PROGRESS = Q(status__in=IN_PROGRESS_STATUSES) | (
+    Q(status=VoiceMemo.Status.TRANSCRIBED) & ~Q(transcript__regex=r'^\s*$')
+)
+STALE_MEMO_ERROR = "Processing did not finish. Please upload the memo again."
+
+T = TypeVar('T')
+
+
+class VoiceMemoQueueFullError(Exception):
+    """Too many voice memos are waiting to be processed; the client should retry later."""
+
 
 @dataclass(frozen=True)
 class TranscriptionResult:
-    """Result of voice memo transcription + parsing."""
+    """Current state of a submitted voice memo."""
     memo_id: str
     status: str
     transcript: str
     parsed_result: dict[str, Any]
     error: str
+    deduplicated: bool = False
 
 
-def upload_and_transcribe(
+def submit_voice_memo(
     *,
     trainee: User,
-    audio_file: UploadedFile,
+    audio_file: UploadedFile[bytes],
 ) -> TranscriptionResult:
     """
-    Upload audio, transcribe via Whisper, parse via NLP.
-    Returns the result synchronously.
+    Accept an audio upload and queue it for transcription and parsing.
+
+    Returns at once with status=uploaded, or with the existing memo's
+    state if the same audio was uploaded before and did not fail or stall.
+
+    Raises:
+        ValueError: If the file is too large or in an unsupported format.
+        VoiceMemoQueueFullError: If the worker queue is full.
     """
-    # Validate file
     _validate_audio_file(audio_file)
 
+    audio_sha256 = _content_hash(audio_file)
+    existing = (
+        VoiceMemo.objects
+        .filter(trainee=trainee, audio_sha256=audio_sha256)
+        .exclude(status=VoiceMemo.Status.FAILED)
+        .exclude(IN_PROGRESS, status_changed_at__lt=timezone.now() - VOICE_MEMO_STALE_AFTER)
+        .order_by('-created_at')
+        .first()
+    )
+    if existing is not None:
+        return _result(existing, deduplicated=True)
+
+    if _in_flight() >= VOICE_MEMO_MAX_QUEUED:
+        raise VoiceMemoQueueFullError("Voice memo processing is busy. Please try again shortly.")
+
     # Detect format
     name = audio_file.name or ''
     ext = os.path.splitext(name)[1].lower().lstrip('.')
     if ext not in ALLOWED_AUDIO_FORMATS:
         ext = 'mp3'  # default
 
-    # Create VoiceMemo record
     memo = VoiceMemo.objects.create(
         trainee=trainee,
         audio_file=audio_file,
         audio_format=ext,
+        audio_sha256=audio_sha256,
         status=VoiceMemo.Status.UPLOADED,
     )
-
-    # Transcribe
-    try:
-        memo.status = VoiceMemo.Status.TRANSCRIBING
-        memo.save(update_fields=['status'])
-
-        transcript, confidence, language = _transcribe_audio(memo)
-
-        memo.transcript = transcript
-        memo.transcription_confidence = confidence
-        memo.transcription_language = language
-        memo.status = VoiceMemo.Status.TRANSCRIBED
-        memo.save(update_fields=[
-            'transcript', 'transcription_confidence',
-            'transcription_language', 'status',
-        ])
-    except Exception as exc:
-        memo.status = VoiceMemo.Status.FAILED
-        memo.error_message = f"Transcription failed: {exc}"
-        memo.save(update_fields=['status', 'error_message'])
-        logger.error("Voice memo transcription failed: %s", exc, exc_info=True)
-        return TranscriptionResult(
-            memo_id=str(memo.pk),
-            status=memo.status,
-            transcript='',
-            parsed_result={},
-            error=memo.error_message,
-        )
-
-    # Parse transcript via NLP
-    if memo.transcript.strip():
-        try:
-            parsed = _parse_transcript(memo.transcript, trainee)
-            memo.parsed_result = parsed
-            memo.status = VoiceMemo.Status.PARSED
-            memo.save(update_fields=['parsed_result', 'status'])
-        except Exception as exc:
-            memo.status = VoiceMemo.Status.FAILED
-            memo.error_message = f"Parsing failed: {exc}"
-            memo.save(update_fields=['status', 'error_message'])
-            logger.error("Voice memo parsing failed: %s", exc, exc_info=True)
-            return TranscriptionResult(
-                memo_id=str(memo.pk),
-                status=memo.status,
-                transcript=memo.transcript,
-                parsed_result={},
-                error=memo.error_message,
-            )
-
-    return TranscriptionResult(
-        memo_id=str(memo.pk),
-        status=memo.status,
-        transcript=memo.transcript,
-        parsed_result=memo.parsed_result,
-        error='',
-    )
+    memo_id = memo.pk
+    transaction.on_commit(lambda: _enqueue(memo_id))
+    return _result(memo)
 
 
 def get_voice_memo(
@@ -144,11 +154,37 @@ def list_voice_memos(
     )
 
 
+def fail_stale_voice_memos() -> int:
+    """
+    Fail memos stuck uploaded / transcribing / parsing past VOICE_MEMO_STALE_AFTER.
+
+    Their worker is gone (the pool is per process), so they would never
+    finish. Each is published as failed. Returns the number failed.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        stale = list(
+            VoiceMemo.objects.select_for_update(skip_locked=True)
+            .filter(IN_PROGRESS, status_changed_at__lt=now - VOICE_MEMO_STALE_AFTER)
+        )
+        VoiceMemo.objects.filter(pk__in=[memo.pk for memo in stale]).update(
+            status=VoiceMemo.Status.FAILED,
+            status_changed_at=now,
+            error_message=STALE_MEMO_ERROR,
+        )
+    for memo in stale:
+        memo.status = VoiceMemo.Status.FAILED
+        memo.status_changed_at = now
+        memo.error_message = STALE_MEMO_ERROR
+        _publish_status(memo)
+    return len(stale)
+
+
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
-def _validate_audio_file(audio_file: UploadedFile) -> None:
+def _validate_audio_file(audio_file: UploadedFile[bytes]) -> None:
     """Validate audio file format and size."""
     if audio_file.size is not None and audio_file.size > MAX_AUDIO_SIZE_BYTES:
         raise ValueError(
@@ -165,6 +201,193 @@ def _validate_audio_file(audio_file: UploadedFile) -> None:
         )
 
 
+def _content_hash(audio_file: UploadedFile[bytes]) -> str:
+    digest = hashlib.sha256()
+    for chunk in audio_file.chunks():
+        digest.update(chunk)
+    audio_file.seek(0)
+    return digest.hexdigest()
+
+
+def _result(memo: VoiceMemo, deduplicated: bool = False) -> TranscriptionResult:
+    return TranscriptionResult(
+        memo_id=str(memo.pk),
+        status=memo.status,
+        transcript=memo.transcript,
+        parsed_result=memo.parsed_result,
+        error=memo.error_message,
+        deduplicated=deduplicated,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Worker pool
+# ---------------------------------------------------------------------------
+
+_pool_lock = threading.Lock()
+_pool: ThreadPoolExecutor | None = None
+_in_flight_count = 0
+
+
+def _in_flight() -> int:
+    with _pool_lock:
+        return _in_flight_count
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=VOICE_MEMO_WORKERS,
+                thread_name_prefix='voice-memo',
+            )
+        return _pool
+
+
+def _enqueue(memo_id: Any) -> None:
+    global _in_flight_count
+    with _pool_lock:
+        _in_flight_count += 1
+    try:
+        _executor().submit(_run_memo_job, memo_id)
+    except RuntimeError:
+        # Interpreter shutting down; the memo stays uploaded
+        with _pool_lock:
+            _in_flight_count -= 1
+        logger.warning("Could not queue voice memo %s.", memo_id)
+
+
+def _run_memo_job(memo_id: Any) -> None:
+    """Worker thread: process one memo, then release its queue slot."""
+    global _in_flight_count
+    from django.db import connection
+
+    try:
+        process_voice_memo(memo_id)
+    except Exception:
+        logger.exception("Voice memo %s processing crashed.", memo_id)
+    finally:
+        with _pool_lock:
+            _in_flight_count -= 1
+        connection.close()
+
+
+class _StepFailed(Exception):
+    def __init__(self, step: str, cause: Exception) -> None:
+        super().__init__(f"{step} failed: {cause}")
+        self.cause = cause
+
+
+def process_voice_memo(memo_id: Any) -> None:
+    """Transcribe and parse an uploaded memo, publishing each status change."""
+    memo = VoiceMemo.objects.select_related('trainee').filter(pk=memo_id).first()
+    if memo is None or memo.status != VoiceMemo.Status.UPLOADED:
+        return
+
+    try:
+        if not _set_status(memo, VoiceMemo.Status.TRANSCRIBING):
+            return
+        transcript, confidence, language = _run_step('Transcription', _transcribe_audio, memo)
+        memo.transcript = transcript
+        memo.transcription_confidence = confidence
+        memo.transcription_language = language
+        if not _set_status(
+            memo, VoiceMemo.Status.TRANSCRIBED,
+            'transcript', 'transcription_confidence', 'transcription_language',
+        ):
+            return
+
+        if memo.transcript.strip():
+            # The parser reports errors as values, not exceptions, so there
+            # is no transient failure to retry
+            memo.parsed_result = _run_step(
+                'Parsing', _parse_transcript, memo.transcript, memo.trainee, attempts=1,
+            )
+            _set_status(memo, VoiceMemo.Status.PARSED, 'parsed_result')
+    except _StepFailed as exc:
+        logger.error("Voice memo %s: %s", memo.pk, exc, exc_info=exc.cause)
+        memo.error_message = str(exc)
+        _set_status(memo, VoiceMemo.Status.FAILED, 'error_message')
+
+
+def _run_step(
+    step: str,
+    func: Callable[..., T],
+    *args: Any,
+    attempts: int = VOICE_MEMO_MAX_ATTEMPTS,
+) -> T:
+    """Run ``func``, retrying transient provider errors with exponential backoff."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args)
+        except Exception as exc:
+            if attempt == attempts or not _is_transient(exc):
+                raise _StepFailed(step, exc) from exc
+            delay = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logger.warning("%s attempt %d failed (%s); retrying in %.0fs.", step, attempt, exc, delay)
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Timeouts, connection errors, rate limits and server errors are worth retrying."""
+    import openai
+
+    if isinstance(exc, (ConnectionError, TimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    status_code = getattr(exc, 'status_code', None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+def _set_status(memo: VoiceMemo, status: str, *fields: str) -> bool:
+    """
+    Move the memo from the status this worker left it in to ``status``.
+
+    Returns False, writing and publishing nothing, if the memo changed
+    underneath the worker (the stale sweep failed it).
+    """
+    now = timezone.now()
+    updated = VoiceMemo.objects.filter(pk=memo.pk, status=memo.status).update(
+        status=status,
+        status_changed_at=now,
+        **{field: getattr(memo, field) for field in fields},
+    )
+    if not updated:
+        logger.info("Voice memo %s left %s before the worker finished; dropping its result.", memo.pk, memo.status)
+        return False
+    memo.status = status
+    memo.status_changed_at = now
+    _publish_status(memo)
+    return True
+
+
+def _publish_status(memo: VoiceMemo) -> None:
+    """Send the memo's state to the trainee's voice memo channel group (best-effort)."""
+    try:
+        from channels.layers import get_channel_layer
+        from asgiref.sync import async_to_sync
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+
+        async_to_sync(channel_layer.group_send)(
+            f'voice_memos_{memo.trainee_id}',
+            {
+                'type': 'voice_memo.status',
+                'memo_id': str(memo.pk),
+                'status': memo.status,
+                'transcript': memo.transcript,
+                'parsed_result': memo.parsed_result,
+                'error': memo.error_message,
+                'timestamp': timezone.now().isoformat(),
+            },
+        )
+    except Exception as exc:
+        logger.warning("Failed to publish status for voice memo %s: %s", memo.pk, exc)
+
+
 def _transcribe_audio(memo: VoiceMemo) -> tuple[str, float, str]:
     """
     Call OpenAI Whisper API to transcribe audio.
@@ -207,17 +430,12 @@ def _parse_transcript(transcript: str, trainee: User) -> dict[str, Any]:
     """Feed transcript through the natural language parser."""
     from workouts.services.natural_language_parser import NaturalLanguageParserService
 
-    result = NaturalLanguageParserService.parse_user_input(
+    parsed, error = NaturalLanguageParserService.parse_user_input(
         user_input=transcript,
         context=None,
+        user=trainee,
     )
-
-    if result is None:
-        return {}
-
-    # Convert Pydantic model to dict
-    if hasattr(result, 'model_dump'):
-        return result.model_dump()
-    elif hasattr(result, 'dict'):
-        return result.dict()
-    return {}
+    # A clarification question still comes with a usable partial parse
+    if error and not parsed.get('needs_clarification'):
+        raise ValueError(error)
+    return parsed
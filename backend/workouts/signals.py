@@ -0,0 +1,34 @@
+"""
+Signal handlers for the workouts app.
+
+Keeps the in-memory exercise name index consistent with the catalog. Bulk
+operations (``QuerySet.update``, ``bulk_create``) do not fire these
+signals; callers using them on names or aliases must call
+``invalidate_exercise_name_index()`` themselves.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from workouts.models import Exercise
+from workouts.services.exercise_name_index import invalidate_exercise_name_index
+
+# Fields the name index is built from
+_INDEXED_FIELDS = frozenset({'name', 'aliases', 'is_public', 'created_by', 'created_by_id'})
+
+
+@receiver(post_save, sender=Exercise)
+def on_exercise_saved(
+    sender: type[Exercise], instance: Exercise, update_fields: Any = None, **kwargs: Any
+) -> None:
+    if update_fields is not None and not _INDEXED_FIELDS & set(update_fields):
+        return
+    invalidate_exercise_name_index()
+
+
+@receiver(post_delete, sender=Exercise)
+def on_exercise_deleted(sender: type[Exercise], instance: Exercise, **kwargs: Any) -> None:
+    invalidate_exercise_name_index()
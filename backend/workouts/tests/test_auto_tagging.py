@@ -13,11 +13,13 @@ Covers:
 """
 from __future__ import annotations
 
+import json
 from unittest.mock import patch
 
 from django.test import TestCase
 from rest_framework.test import APIClient
 
+from trainer.llm_fake import scripted_llm
 from users.models import User
 from workouts.models import (
     DecisionLog,
@@ -121,6 +123,15 @@ class RequestAutoTagTests(TestCase):
         with self.assertRaises(ValueError):
             request_auto_tag(exercise_id=99999, user=self.trainer)
 
+    def test_calls_provider_through_gateway(self) -> None:
+        reply = '```json\n' + json.dumps(MOCK_AI_RESPONSE) + '\n```'
+        with scripted_llm(reply) as llm:
+            result = request_auto_tag(exercise_id=self.exercise.pk, user=self.trainer)
+            self.assertIn('Bench Press', llm.prompts[0][0].content)
+
+        draft = ExerciseTagDraft.objects.get(pk=result.draft_id)
+        self.assertEqual(draft.stance, 'supine')
+
 
 # ---------------------------------------------------------------------------
 # Service Tests — apply_draft
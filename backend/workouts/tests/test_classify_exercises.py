@@ -0,0 +1,88 @@
+"""
+Tests for the classify_exercises command's concurrent AI path and checkpointing.
+"""
+from __future__ import annotations
+
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from trainer.llm_fake import scripted_llm
+from workouts.management.commands.classify_exercises import ExerciseClassification
+from workouts.models import Exercise
+
+
+def _reply(*exercises: Exercise, level: str = 'advanced') -> str:
+    return json.dumps([
+        {'id': str(ex.id), 'difficulty_level': level, 'suitable_for_goals': ['strength']}
+        for ex in exercises
+    ])
+
+
+class ClassifyExercisesAITests(TestCase):
+    def setUp(self) -> None:
+        self.bench = Exercise.objects.create(name='Bench Press', muscle_group='chest', is_public=True)
+        self.fly = Exercise.objects.create(name='Cable Fly', muscle_group='chest', is_public=True)
+        self.squat = Exercise.objects.create(name='Back Squat', muscle_group='quads', is_public=True)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.checkpoint = Path(self.tmp.name) / 'classify.json'
+
+    def _run(self, *args: str) -> str:
+        out = StringIO()
+        call_command('classify_exercises', '--concurrency', '1', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_packs_exercises_per_muscle_group(self) -> None:
+        with scripted_llm(_reply(self.bench, self.fly), _reply(self.squat)) as llm:
+            self._run()
+            self.assertEqual(len(llm.prompts), 2)
+
+        self.bench.refresh_from_db()
+        self.assertEqual(self.bench.difficulty_level, 'advanced')
+        self.assertEqual(self.bench.suitable_for_goals, ['strength'])
+
+    def test_failed_batch_falls_back_to_heuristic(self) -> None:
+        with scripted_llm(ValueError('bad json'), _reply(self.squat)):
+            self._run()
+
+        self.fly.refresh_from_db()
+        self.squat.refresh_from_db()
+        self.assertEqual(self.fly.difficulty_level, 'beginner')  # heuristic: "cable"
+        self.assertEqual(self.squat.difficulty_level, 'advanced')
+
+    def test_resumes_from_checkpoint(self) -> None:
+        self.checkpoint.write_text(json.dumps({'done': [self.bench.id, self.fly.id]}))
+
+        with scripted_llm(_reply(self.squat, level='beginner')) as llm:
+            out = self._run('--force', '--checkpoint', str(self.checkpoint))
+            self.assertEqual(len(llm.prompts), 1)
+
+        self.assertIn('2 already saved, 1 remaining', out)
+        self.bench.refresh_from_db()
+        self.squat.refresh_from_db()
+        self.assertIsNone(self.bench.difficulty_level)
+        self.assertEqual(self.squat.difficulty_level, 'beginner')
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_interrupted_run_keeps_finished_batches(self) -> None:
+        chest = {
+            str(ex.id): ExerciseClassification('advanced', ['strength'])
+            for ex in (self.bench, self.fly)
+        }
+        with patch(
+            'workouts.management.commands.classify_exercises._classify_batch_with_ai',
+            side_effect=[chest, KeyboardInterrupt()],
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self._run('--checkpoint', str(self.checkpoint))
+
+        self.bench.refresh_from_db()
+        self.assertEqual(self.bench.difficulty_level, 'advanced')
+        saved = json.loads(self.checkpoint.read_text())['done']
+        self.assertEqual(sorted(saved), sorted([self.bench.id, self.fly.id]))
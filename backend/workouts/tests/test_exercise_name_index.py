@@ -0,0 +1,138 @@
+"""
+Tests for the shared in-memory exercise name index.
+"""
+from __future__ import annotations
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from users.models import User
+from workouts.services.exercise_name_index import (
+    ExerciseNameIndex,
+    get_exercise_name_index,
+    normalize_exercise_name,
+)
+from workouts.models import Exercise
+from workouts.services.program_import_service import parse_csv_and_create_draft
+
+CATALOG = [
+    (1, 'Bench Press', [], True, None),
+    (2, 'Dumbbell Bench Press', [], True, None),
+    (3, 'Romanian Deadlift', [], True, None),
+    (4, 'Deadlift', [], True, None),
+    (5, 'Pull-Up', [], True, None),
+    (6, 'Barbell Row', [], True, None),
+    (7, 'Pendlay Row', [], True, None),
+    (8, 'Back Squat', ['Squat'], True, None),
+    (9, 'Dumbbell Lateral Raise', [], True, None),
+    (10, 'Sled Push', [], False, 42),
+]
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_expands_abbreviations_and_singularizes(self) -> None:
+        self.assertEqual(normalize_exercise_name('DB Bench'), 'dumbbell bench')
+        self.assertEqual(normalize_exercise_name('RDLs'), 'romanian deadlift')
+        self.assertEqual(normalize_exercise_name('Pullups'), 'pull up')
+        self.assertEqual(normalize_exercise_name('Pull-Ups'), 'pull up')
+        self.assertEqual(normalize_exercise_name('Cable Crunches'), 'cable crunch')
+        self.assertEqual(normalize_exercise_name('Leg Press'), 'leg press')
+
+
+class SearchTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.index = ExerciseNameIndex(CATALOG)
+
+    def test_exact_after_normalization(self) -> None:
+        for query, expected in [
+            ('rdl', 'Romanian Deadlift'),
+            ('pullups', 'Pull-Up'),
+            ('bench', 'Bench Press'),
+            ('squat', 'Back Squat'),
+        ]:
+            match = self.index.best_match(query)
+            assert match is not None, query
+            self.assertEqual(match.name, expected)
+            self.assertTrue(match.exact)
+
+        self.assertTrue(self.index.best_match('squat').via_alias)  # type: ignore[union-attr]
+
+    def test_fuzzy_match_ranks_closest_first(self) -> None:
+        results = self.index.search('DB bench')
+        self.assertEqual(results[0].name, 'Dumbbell Bench Press')
+        self.assertFalse(results[0].exact)
+        self.assertGreater(results[0].score, results[1].score)
+
+    def test_typo_is_tolerated(self) -> None:
+        match = self.index.best_match('dumbell lateral raises')
+        assert match is not None
+        self.assertEqual(match.exercise_id, 9)
+
+    def test_ambiguous_or_unknown_has_no_best_match(self) -> None:
+        self.assertIsNone(self.index.best_match('row'))
+        self.assertIsNone(self.index.best_match('zercher carry'))
+
+    def test_private_exercises_need_their_trainer(self) -> None:
+        self.assertIsNone(self.index.best_match('sled push'))
+        self.assertIsNone(self.index.best_match('sled push', trainer_id=7))
+        self.assertEqual(self.index.best_match('sled push', trainer_id=42).exercise_id, 10)  # type: ignore[union-attr]
+
+    def test_trainer_copy_wins_a_tie_with_the_public_exercise(self) -> None:
+        index = ExerciseNameIndex(CATALOG + [(11, 'Bench Press', [], False, 42)])
+
+        self.assertEqual(index.best_match('bench press', trainer_id=42).exercise_id, 11)  # type: ignore[union-attr]
+        self.assertEqual(index.best_match('bench press', trainer_id=7).exercise_id, 1)  # type: ignore[union-attr]
+        self.assertEqual(index.best_match('bench press').exercise_id, 1)  # type: ignore[union-attr]
+
+    def test_name_wins_a_tie_with_another_exercises_alias(self) -> None:
+        index = ExerciseNameIndex(CATALOG + [(11, 'Assisted Pull-Up', ['Pull Up'], True, None)])
+
+        match = index.best_match('pull up')
+        assert match is not None
+        self.assertEqual((match.exercise_id, match.via_alias), (5, False))
+
+    def test_identical_names_stay_ambiguous(self) -> None:
+        index = ExerciseNameIndex(CATALOG + [(11, 'Bench Press', [], True, None)])
+        self.assertIsNone(index.best_match('bench press'))
+
+
+class SharedIndexTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.exercise = Exercise.objects.create(name='Bench Press', is_public=True)
+
+    def test_rebuilt_when_catalog_changes(self) -> None:
+        index = get_exercise_name_index()
+        self.assertIs(get_exercise_name_index(), index)
+
+        Exercise.objects.create(name='Hip Thrust', is_public=True)
+        rebuilt = get_exercise_name_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.best_match('hip thrusts').name, 'Hip Thrust')  # type: ignore[union-attr]
+
+        self.exercise.delete()
+        self.assertIsNone(get_exercise_name_index().best_match('bench press'))
+
+    def test_unrelated_field_update_keeps_index(self) -> None:
+        index = get_exercise_name_index()
+        self.exercise.difficulty_level = 'beginner'
+        self.exercise.save(update_fields=['difficulty_level'])
+        self.assertIs(get_exercise_name_index(), index)
+
+    def test_program_import_reports_fuzzy_matches(self) -> None:
+        trainer = User.objects.create_user(
+            email='index_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        Exercise.objects.create(name='Dumbbell Bench Press', is_public=True)
+        csv = (
+            "week,day_of_week,session_label,order,exercise_name,slot_role,sets,reps_min,reps_max\n"
+            "1,1,Push,1,Bench Presses,primary_compound,3,8,12\n"
+            "1,1,Push,2,Dumbell Bench Press,primary_compound,3,8,12\n"
+            "1,1,Push,3,Zercher Carry,accessory,3,8,12\n"
+        )
+        result = parse_csv_and_create_draft(trainer=trainer, csv_content=csv)
+
+        self.assertEqual(result.errors, ["Exercise not found: 'Zercher Carry'"])
+        self.assertEqual(
+            result.warnings, ["Exercise 'Dumbell Bench Press' matched to 'Dumbbell Bench Press'"],
+        )
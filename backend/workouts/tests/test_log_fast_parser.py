@@ -0,0 +1,123 @@
+"""
+Tests for the rule-based natural-language log parser that runs before the LLM.
+"""
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from users.models import User
+from workouts.models import Exercise, FoodItem
+from workouts.services.log_fast_parser import get_parse_stage_stats, parse_log_fast
+from workouts.services.natural_language_parser import NaturalLanguageParserService
+
+
+class FastParserTestBase(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.trainer = User.objects.create_user(
+            email='parser_trainer@test.com', password='pass1234', role='TRAINER',
+        )
+        self.trainee = User.objects.create_user(
+            email='parser_trainee@test.com', password='pass1234', role='TRAINEE',
+            parent_trainer=self.trainer,
+        )
+        Exercise.objects.create(name='Bench Press', is_public=True)
+        Exercise.objects.create(name='Back Squat', aliases=['Squat'], is_public=True)
+        Exercise.objects.create(name='Barbell Row', is_public=True)
+        Exercise.objects.create(name='Pendlay Row', is_public=True)
+        Exercise.objects.create(name='Sled Push', created_by=self.trainer, is_public=False)
+        FoodItem.objects.create(
+            name='Egg', serving_size=1, serving_unit=FoodItem.ServingUnit.PIECES,
+            calories=70, protein=6.0, carbs=0.5, fat=5.0, is_public=True,
+        )
+        FoodItem.objects.create(
+            name='Toast', serving_size=1, serving_unit=FoodItem.ServingUnit.SLICES,
+            calories=80, protein=3.0, carbs=15.0, fat=1.0, is_public=True,
+        )
+        FoodItem.objects.create(
+            name='Chicken Breast', serving_size=100, serving_unit=FoodItem.ServingUnit.GRAMS,
+            calories=165, protein=31.0, carbs=0.0, fat=3.6, is_public=True,
+        )
+
+
+class ParseLogFastTests(FastParserTestBase):
+    def test_sets_reps_weight_shorthand(self) -> None:
+        result = parse_log_fast('3x8 bench 185')
+        assert result is not None
+        self.assertEqual(result.confidence, 1.0)
+        self.assertEqual(result.exercises, [{
+            'exercise_name': 'Bench Press', 'sets': 3, 'reps': 8,
+            'weight': 185.0, 'unit': 'lbs', 'timestamp': None,
+        }])
+
+    def test_sets_of_reps_with_kg_and_alias(self) -> None:
+        result = parse_log_fast('did 5 sets of 5 squat at 100kg')
+        assert result is not None
+        self.assertEqual(result.exercises[0]['exercise_name'], 'Back Squat')
+        self.assertEqual((result.exercises[0]['sets'], result.exercises[0]['weight']), (5, 100.0))
+        self.assertEqual(result.exercises[0]['unit'], 'kg')
+        self.assertEqual(result.confidence, 0.95)
+
+    def test_foods_scale_macros(self) -> None:
+        result = parse_log_fast('2 eggs and toast')
+        assert result is not None
+        self.assertEqual([m['name'] for m in result.meals], ['Egg x2', 'Toast'])
+        self.assertEqual(result.meals[0]['calories'], 140)
+        self.assertEqual(result.meals[0]['protein'], 12.0)
+
+    def test_gram_quantity(self) -> None:
+        result = parse_log_fast('ate 200g chicken breast for lunch')
+        assert result is not None
+        self.assertEqual(result.meals[0]['calories'], 330)
+
+    def test_mixed_workout_and_food(self) -> None:
+        result = parse_log_fast('3x10 bench at 135, 2 eggs')
+        assert result is not None
+        self.assertEqual(len(result.exercises), 1)
+        self.assertEqual(len(result.meals), 1)
+
+    def test_unknown_clause_falls_through(self) -> None:
+        self.assertIsNone(parse_log_fast('2 eggs and a chicken burrito bowl'))
+        self.assertIsNone(parse_log_fast('felt great today, hit a PR'))
+
+    def test_ambiguous_exercise_falls_through(self) -> None:
+        self.assertIsNone(parse_log_fast('4x8 row 135'))
+
+    def test_recent_program_exercise_resolves_ambiguity(self) -> None:
+        result = parse_log_fast('4x8 row 135', context={'recent_exercises': ['Pendlay Row']})
+        assert result is not None
+        self.assertEqual(result.exercises[0]['exercise_name'], 'Pendlay Row')
+        self.assertEqual(result.confidence, 0.9)
+
+    def test_unit_mismatch_falls_through(self) -> None:
+        self.assertIsNone(parse_log_fast('1 cup chicken breast'))
+
+    def test_trainer_catalog_visible_to_trainee_only(self) -> None:
+        self.assertIsNone(parse_log_fast('3x20 sled push 90'))
+        self.assertIsNotNone(parse_log_fast('3x20 sled push 90', user=self.trainee))
+
+    def test_implausible_numbers_fall_through(self) -> None:
+        self.assertIsNone(parse_log_fast('3x8 bench 18500'))
+
+
+class ParserServiceFastPathTests(FastParserTestBase):
+    @patch('workouts.services.natural_language_parser.get_openai_client')
+    def test_simple_input_skips_llm(self, get_client) -> None:
+        parsed, error = NaturalLanguageParserService.parse_user_input('3x8 bench 185')
+        self.assertIsNone(error)
+        self.assertEqual(parsed['workout']['exercises'][0]['exercise_name'], 'Bench Press')
+        get_client.assert_not_called()
+
+    @patch('workouts.services.natural_language_parser.get_openai_client', return_value=None)
+    def test_complex_input_goes_to_llm_and_stats_count_both(self, get_client) -> None:
+        NaturalLanguageParserService.parse_user_input('2 eggs and toast')
+        _, error = NaturalLanguageParserService.parse_user_input('big burrito, not sure of the size')
+        self.assertEqual(error, 'OpenAI API key not configured')
+        get_client.assert_called_once()
+
+        stats = get_parse_stage_stats()
+        self.assertEqual(stats['counts'], {'rules': 1, 'llm': 1})
+        self.assertEqual(stats['llm_offload_ratio'], 0.5)
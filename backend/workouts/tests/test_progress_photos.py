@@ -5,10 +5,11 @@ from __future__ import annotations
 
 import io
 import json
+import tempfile
 from datetime import date, timedelta
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -17,6 +18,9 @@ from users.models import User
 from workouts.models import ProgressPhoto
 
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
 def _make_image(name: str = "test.jpg", size: tuple[int, int] = (100, 100)) -> SimpleUploadedFile:
     """Create a small in-memory JPEG for upload tests."""
     buf = io.BytesIO()
@@ -25,6 +29,7 @@ def _make_image(name: str = "test.jpg", size: tuple[int, int] = (100, 100)) -> S
     return SimpleUploadedFile(name, buf.read(), content_type="image/jpeg")
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class ProgressPhotoTestBase(TestCase):
     """Shared setup: trainer, two trainees (one assigned, one not), API clients."""
 
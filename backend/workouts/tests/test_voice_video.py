@@ -2,18 +2,24 @@
 Tests for Voice Memo + Video Analysis — v6.5 Step 14.
 
 Covers:
-- Voice memo upload, transcription (mocked), parsing (mocked)
+- Voice memo upload, background transcription (mocked), parsing (mocked)
+- Voice memo retries, content-hash deduplication, status publishing
+- Stalled voice memos: swept to failed, never reused by deduplication or
+  revived by their worker
 - Video upload, analysis (mocked), confirm
 - API endpoints
 - File validation
 """
 from __future__ import annotations
 
-from io import BytesIO
+import tempfile
+from io import BytesIO, StringIO
 from unittest.mock import MagicMock, patch
 
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from rest_framework.test import APIClient
 
 from users.models import User
@@ -24,9 +30,14 @@ from workouts.models import (
     VoiceMemo,
 )
 from workouts.services.voice_memo_service import (
+    VOICE_MEMO_STALE_AFTER,
+    TranscriptionResult,
+    VoiceMemoQueueFullError,
+    fail_stale_voice_memos,
     get_voice_memo,
     list_voice_memos,
-    upload_and_transcribe,
+    process_voice_memo,
+    submit_voice_memo,
 )
 from workouts.services.video_analysis_service import (
     confirm_analysis,
@@ -36,6 +47,9 @@ from workouts.services.video_analysis_service import (
 )
 
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -94,59 +108,197 @@ MOCK_VIDEO_AI_RESPONSE: dict = {
 # Voice Memo Service Tests
 # ---------------------------------------------------------------------------
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@patch('workouts.services.voice_memo_service._enqueue', side_effect=process_voice_memo)
 class VoiceMemoServiceTests(TestCase):
 
     def setUp(self) -> None:
         self.trainer = _create_trainer()
         self.trainee = _create_trainee(self.trainer)
 
-    @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
-    @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_upload_and_transcribe(self, mock_trans: object, mock_parse: object) -> None:
-        result = upload_and_transcribe(
-            trainee=self.trainee,
-            audio_file=_audio_file(),
-        )
-        self.assertEqual(result.status, 'parsed')
-        self.assertIn('bench press', result.transcript.lower())
-        self.assertIn('workout', result.parsed_result)
+    def _submit(self, audio_file: SimpleUploadedFile | None = None) -> TranscriptionResult:
+        """Submit a memo and run the queued job inline once the upload commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return submit_voice_memo(trainee=self.trainee, audio_file=audio_file or _audio_file())
 
     @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_creates_memo_record(self, mock_trans: object, mock_parse: object) -> None:
-        result = upload_and_transcribe(
-            trainee=self.trainee,
-            audio_file=_audio_file(),
-        )
+    def test_upload_returns_before_processing(self, mock_trans: object, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        result = self._submit()
+        self.assertEqual(result.status, 'uploaded')
+        self.assertEqual(result.transcript, '')
+        mock_enqueue.assert_called_once()
+
         memo = VoiceMemo.objects.get(pk=result.memo_id)
         self.assertEqual(memo.status, 'parsed')
+        self.assertIn('bench press', memo.transcript.lower())
+        self.assertIn('workout', memo.parsed_result)
         self.assertEqual(memo.transcription_language, 'en')
+        self.assertEqual(len(memo.audio_sha256), 64)
 
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=Exception("API error"))
-    def test_transcription_failure(self, mock_trans: object) -> None:
-        result = upload_and_transcribe(
-            trainee=self.trainee,
-            audio_file=_audio_file(),
+    def test_transcription_failure(self, mock_trans: MagicMock, mock_enqueue: MagicMock) -> None:
+        result = self._submit()
+        memo = VoiceMemo.objects.get(pk=result.memo_id)
+        self.assertEqual(memo.status, 'failed')
+        self.assertIn('Transcription failed', memo.error_message)
+        self.assertEqual(mock_trans.call_count, 1)  # not a transient error
+
+    @patch('workouts.services.voice_memo_service.RETRY_BACKOFF_SECONDS', 0)
+    @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
+    def test_transient_transcription_error_is_retried(self, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        with patch(
+            'workouts.services.voice_memo_service._transcribe_audio',
+            side_effect=[TimeoutError('slow'), _mock_transcribe(None)],
+        ) as mock_trans:
+            result = self._submit()
+        self.assertEqual(mock_trans.call_count, 2)
+        self.assertEqual(VoiceMemo.objects.get(pk=result.memo_id).status, 'parsed')
+
+    @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
+    @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
+    def test_reupload_of_same_audio_is_deduplicated(self, mock_trans: MagicMock, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        first = self._submit()
+        second = self._submit()
+        self.assertTrue(second.deduplicated)
+        self.assertEqual(second.memo_id, first.memo_id)
+        self.assertEqual(second.status, 'parsed')
+        self.assertEqual(mock_trans.call_count, 1)
+        self.assertEqual(VoiceMemo.objects.count(), 1)
+
+        different = self._submit(_audio_file(size=2048))
+        self.assertFalse(different.deduplicated)
+
+    @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=Exception("API error"))
+    def test_failed_memo_is_not_reused(self, mock_trans: object, mock_enqueue: MagicMock) -> None:
+        first = self._submit()
+        second = self._submit()
+        self.assertNotEqual(second.memo_id, first.memo_id)
+
+    @patch('workouts.services.voice_memo_service._in_flight', return_value=50)
+    def test_full_queue_rejects_upload(self, mock_in_flight: object, mock_enqueue: MagicMock) -> None:
+        with self.assertRaises(VoiceMemoQueueFullError):
+            self._submit()
+        self.assertFalse(VoiceMemo.objects.exists())
+
+    @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
+    @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
+    def test_publishes_each_status(self, mock_trans: object, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        published: list[str] = []
+        with patch(
+            'workouts.services.voice_memo_service._publish_status',
+            side_effect=lambda memo: published.append(memo.status),
+        ):
+            self._submit()
+        self.assertEqual(published, ['transcribing', 'transcribed', 'parsed'])
+
+    @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
+    @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
+    def test_publish_errors_are_swallowed(self, mock_trans: object, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        with patch('channels.layers.get_channel_layer', side_effect=RuntimeError('no event loop')):
+            result = self._submit()
+        self.assertEqual(VoiceMemo.objects.get(pk=result.memo_id).status, 'parsed')
+
+    @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
+    def test_parse_error_fails_without_retry(self, mock_trans: object, mock_enqueue: MagicMock) -> None:
+        with patch(
+            'workouts.services.natural_language_parser.NaturalLanguageParserService.parse_user_input',
+            return_value=({}, 'Failed to parse input: timed out'),
+        ) as mock_parse:
+            result = self._submit()
+        memo = VoiceMemo.objects.get(pk=result.memo_id)
+        self.assertEqual(memo.status, 'failed')
+        self.assertIn('Parsing failed: Failed to parse input', memo.error_message)
+        self.assertEqual(mock_parse.call_count, 1)
+
+    def test_stalled_memo_is_swept_and_not_reused(self, mock_enqueue: MagicMock) -> None:
+        mock_enqueue.side_effect = None  # the worker never runs
+        stalled = self._submit()
+        self.assertEqual(self._submit().memo_id, stalled.memo_id)  # still in time
+
+        VoiceMemo.objects.filter(pk=stalled.memo_id).update(
+            status_changed_at=timezone.now() - VOICE_MEMO_STALE_AFTER,
         )
-        self.assertEqual(result.status, 'failed')
-        self.assertIn('Transcription failed', result.error)
+        retried = self._submit()
+        self.assertFalse(retried.deduplicated)
+
+        published: list[tuple[str, str]] = []
+        out = StringIO()
+        with patch(
+            'workouts.services.voice_memo_service._publish_status',
+            side_effect=lambda memo: published.append((str(memo.pk), memo.status)),
+        ):
+            call_command('sweep_voice_memos', stdout=out)
+        self.assertIn('Failed 1 voice memo(s)', out.getvalue())
+        self.assertEqual(published, [(stalled.memo_id, 'failed')])
+        self.assertEqual(VoiceMemo.objects.get(pk=retried.memo_id).status, 'uploaded')
+
+    def test_memo_stalled_while_parsing_is_swept(self, mock_enqueue: MagicMock) -> None:
+        # A worker that died mid-parse leaves the memo transcribed
+        parsing = VoiceMemo.objects.create(
+            trainee=self.trainee, audio_file=_audio_file(),
+            status=VoiceMemo.Status.TRANSCRIBED, transcript='bench 3x10',
+        )
+        blank = VoiceMemo.objects.create(
+            trainee=self.trainee, audio_file=_audio_file(size=2048),
+            status=VoiceMemo.Status.TRANSCRIBED, transcript='  ',
+        )
+        VoiceMemo.objects.update(status_changed_at=timezone.now() - VOICE_MEMO_STALE_AFTER)
+
+        self.assertEqual(fail_stale_voice_memos(), 1)
+        self.assertEqual(VoiceMemo.objects.get(pk=parsing.pk).status, 'failed')
+        self.assertEqual(VoiceMemo.objects.get(pk=blank.pk).status, 'transcribed')
+
+    def test_long_queue_wait_is_not_stalled(self, mock_enqueue: MagicMock) -> None:
+        # Uploaded long ago, but the worker only just picked it up
+        memo = VoiceMemo.objects.create(
+            trainee=self.trainee, audio_file=_audio_file(),
+            status=VoiceMemo.Status.TRANSCRIBING,
+        )
+        VoiceMemo.objects.filter(pk=memo.pk).update(
+            created_at=timezone.now() - 2 * VOICE_MEMO_STALE_AFTER,
+        )
+        self.assertEqual(fail_stale_voice_memos(), 0)
+        self.assertEqual(VoiceMemo.objects.get(pk=memo.pk).status, 'transcribing')
 
-    def test_invalid_format(self) -> None:
+    @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
+    def test_worker_does_not_revive_swept_memo(self, mock_parse: MagicMock, mock_enqueue: MagicMock) -> None:
+        mock_enqueue.side_effect = None
+        result = self._submit()
+
+        def transcribe_then_get_swept(memo: VoiceMemo) -> tuple[str, float, str]:
+            VoiceMemo.objects.filter(pk=memo.pk).update(
+                status_changed_at=timezone.now() - VOICE_MEMO_STALE_AFTER,
+            )
+            fail_stale_voice_memos()
+            return _mock_transcribe(memo)
+
+        with patch(
+            'workouts.services.voice_memo_service._transcribe_audio',
+            side_effect=transcribe_then_get_swept,
+        ):
+            process_voice_memo(result.memo_id)
+        memo = VoiceMemo.objects.get(pk=result.memo_id)
+        self.assertEqual(memo.status, 'failed')
+        self.assertEqual(memo.transcript, '')
+        mock_parse.assert_not_called()
+
+    def test_invalid_format(self, mock_enqueue: MagicMock) -> None:
         with self.assertRaises(ValueError):
-            upload_and_transcribe(
+            submit_voice_memo(
                 trainee=self.trainee,
                 audio_file=SimpleUploadedFile('test.exe', b'\x00' * 100),
             )
 
-    def test_file_too_large(self) -> None:
+    def test_file_too_large(self, mock_enqueue: MagicMock) -> None:
         large_file = SimpleUploadedFile('test.mp3', b'\x00' * (26 * 1024 * 1024))
         with self.assertRaises(ValueError):
-            upload_and_transcribe(trainee=self.trainee, audio_file=large_file)
+            submit_voice_memo(trainee=self.trainee, audio_file=large_file)
 
     @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_get_and_list(self, mock_trans: object, mock_parse: object) -> None:
-        result = upload_and_transcribe(trainee=self.trainee, audio_file=_audio_file())
+    def test_get_and_list(self, mock_trans: object, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        result = self._submit()
         memo = get_voice_memo(memo_id=result.memo_id, trainee=self.trainee)
         self.assertEqual(str(memo.pk), result.memo_id)
 
@@ -155,8 +307,8 @@ class VoiceMemoServiceTests(TestCase):
 
     @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_wrong_trainee_cannot_access(self, mock_trans: object, mock_parse: object) -> None:
-        result = upload_and_transcribe(trainee=self.trainee, audio_file=_audio_file())
+    def test_wrong_trainee_cannot_access(self, mock_trans: object, mock_parse: object, mock_enqueue: MagicMock) -> None:
+        result = self._submit()
         other = User.objects.create_user(
             email='other@test.com', password='pass', role='TRAINEE',
             parent_trainer=self.trainer,
@@ -169,6 +321,7 @@ class VoiceMemoServiceTests(TestCase):
 # Video Analysis Service Tests
 # ---------------------------------------------------------------------------
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class VideoAnalysisServiceTests(TestCase):
 
     def setUp(self) -> None:
@@ -237,6 +390,8 @@ class VideoAnalysisServiceTests(TestCase):
 # API Tests — Voice Memos
 # ---------------------------------------------------------------------------
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@patch('workouts.services.voice_memo_service._enqueue', side_effect=process_voice_memo)
 class VoiceMemoAPITests(TestCase):
 
     def setUp(self) -> None:
@@ -247,19 +402,34 @@ class VoiceMemoAPITests(TestCase):
 
     @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_upload_api(self, mock_trans: object, mock_parse: object) -> None:
+    def test_upload_api(self, mock_trans: object, mock_parse: object, mock_enqueue: object) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                '/api/workouts/voice-memos/',
+                {'audio_file': _audio_file()},
+                format='multipart',
+            )
+        self.assertEqual(resp.status_code, 202)
+        self.assertIn('memo_id', resp.data)
+        self.assertEqual(resp.data['status'], 'uploaded')
+        self.assertFalse(resp.data['deduplicated'])
+
+        detail = self.client.get(f"/api/workouts/voice-memos/{resp.data['memo_id']}/")
+        self.assertEqual(detail.data['status'], 'parsed')
+
+    @patch('workouts.services.voice_memo_service._in_flight', return_value=50)
+    def test_upload_api_queue_full(self, mock_in_flight: object, mock_enqueue: object) -> None:
         resp = self.client.post(
             '/api/workouts/voice-memos/',
             {'audio_file': _audio_file()},
             format='multipart',
         )
-        self.assertEqual(resp.status_code, 201)
-        self.assertIn('memo_id', resp.data)
-        self.assertEqual(resp.data['status'], 'parsed')
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp['Retry-After'], '30')
 
     @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_list_api(self, mock_trans: object, mock_parse: object) -> None:
+    def test_list_api(self, mock_trans: object, mock_parse: object, mock_enqueue: object) -> None:
         self.client.post('/api/workouts/voice-memos/', {'audio_file': _audio_file()}, format='multipart')
         resp = self.client.get('/api/workouts/voice-memos/list/')
         self.assertEqual(resp.status_code, 200)
@@ -267,7 +437,7 @@ class VoiceMemoAPITests(TestCase):
 
     @patch('workouts.services.voice_memo_service._parse_transcript', side_effect=_mock_parse)
     @patch('workouts.services.voice_memo_service._transcribe_audio', side_effect=_mock_transcribe)
-    def test_detail_api(self, mock_trans: object, mock_parse: object) -> None:
+    def test_detail_api(self, mock_trans: object, mock_parse: object, mock_enqueue: object) -> None:
         upload_resp = self.client.post(
             '/api/workouts/voice-memos/',
             {'audio_file': _audio_file()},
@@ -277,7 +447,7 @@ class VoiceMemoAPITests(TestCase):
         resp = self.client.get(f'/api/workouts/voice-memos/{memo_id}/')
         self.assertEqual(resp.status_code, 200)
 
-    def test_trainer_cannot_upload(self) -> None:
+    def test_trainer_cannot_upload(self, mock_enqueue: object) -> None:
         self.client.force_authenticate(self.trainer)
         resp = self.client.post(
             '/api/workouts/voice-memos/',
@@ -286,7 +456,7 @@ class VoiceMemoAPITests(TestCase):
         )
         self.assertEqual(resp.status_code, 403)
 
-    def test_missing_file(self) -> None:
+    def test_missing_file(self, mock_enqueue: object) -> None:
         resp = self.client.post('/api/workouts/voice-memos/', {}, format='multipart')
         self.assertEqual(resp.status_code, 400)
 
@@ -295,6 +465,7 @@ class VoiceMemoAPITests(TestCase):
 # API Tests — Video Analysis
 # ---------------------------------------------------------------------------
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class VideoAnalysisAPITests(TestCase):
 
     def setUp(self) -> None:
@@ -831,7 +831,8 @@ class DailyLogViewSet(viewsets.ModelViewSet[DailyLog]):
         parser_service = NaturalLanguageParserService()
         parsed_data, error_message = parser_service.parse_user_input(
             user_input=user_input,
-            context=context
+            context=context,
+            user=user,
         )
         
         if error_message:
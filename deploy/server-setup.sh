@@ -74,15 +74,24 @@ else
     echo "Swap already exists, skipping."
 fi
 
-# --- 6. Create app directory and backup cron ---
-echo "[6/7] Setting up app directory and backups..."
-mkdir -p /opt/fitnessai/backups
+# --- 6. Create app directory, backup and job crons ---
+echo "[6/7] Setting up app directory, backups and scheduled jobs..."
+mkdir -p /opt/fitnessai/backups /opt/fitnessai/logs
 chown -R deploy:deploy /opt/fitnessai
 
 CRON_LINE="0 3 * * * /opt/fitnessai/deploy/backup.sh >> /opt/fitnessai/backups/backup.log 2>&1"
 (crontab -u deploy -l 2>/dev/null | grep -v "backup.sh"; echo "$CRON_LINE") | crontab -u deploy -
 echo "Backup cron installed for deploy user."
 
+# Fail voice memos whose in-process worker died with a restart
+SWEEP_LINE="*/10 * * * * docker exec fitnessai_backend python manage.py sweep_voice_memos >> /opt/fitnessai/logs/jobs.log 2>&1"
+(crontab -u deploy -l 2>/dev/null | grep -v "sweep_voice_memos"; echo "$SWEEP_LINE") | crontab -u deploy -
+
+# Pushes are sent by the push_worker container; warn when its outbox backs up
+PUSH_CHECK_LINE="*/5 * * * * docker exec fitnessai_backend python manage.py deliver_push_notifications --check >> /opt/fitnessai/logs/jobs.log 2>&1"
+(crontab -u deploy -l 2>/dev/null | grep -v "deliver_push_notifications"; echo "$PUSH_CHECK_LINE") | crontab -u deploy -
+echo "Job crons installed for deploy user."
+
 # --- 7. SSH hardening (LAST — so we don't lose access mid-setup) ---
 echo "[7/7] Hardening SSH..."
 echo "NOTE: Root login will be disabled. Use 'ssh deploy@<ip>' after this."
@@ -34,6 +34,53 @@ async function getValidToken(): Promise<string | null> {
 
 type ButtonStatus = "idle" | "downloading" | "success";
 
+const EXPORT_POLL_INTERVAL_MS = 2000;
+
+interface ExportJobStatus {
+  status: "pending" | "running" | "completed" | "failed";
+  progress_pct: number;
+  download_url?: string;
+  error?: string;
+}
+
+/**
+ * Large exports answer 202 with a background job instead of the file:
+ * poll the job until it completes, then fetch the finished file.
+ */
+async function responseToBlob(
+  response: Response,
+  requestUrl: string,
+  signal: AbortSignal,
+  onProgress: (pct: number) => void,
+): Promise<Blob> {
+  if (response.status !== 202) return response.blob();
+
+  const job = (await response.json()) as { status_url: string };
+  const statusUrl = new URL(job.status_url, requestUrl).toString();
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, EXPORT_POLL_INTERVAL_MS));
+    const token = await getValidToken();
+    if (!token || signal.aborted) {
+      throw new DOMException("Export polling aborted", "AbortError");
+    }
+    const headers = { Authorization: `Bearer ${token}` };
+    const statusResponse = await fetch(statusUrl, { headers, signal });
+    if (!statusResponse.ok) throw new Error("Export job status unavailable");
+
+    const current = (await statusResponse.json()) as ExportJobStatus;
+    onProgress(current.progress_pct);
+    if (current.status === "failed") throw new Error(current.error);
+    if (current.status === "completed" && current.download_url) {
+      const fileResponse = await fetch(
+        new URL(current.download_url, requestUrl).toString(),
+        { headers, signal },
+      );
+      if (!fileResponse.ok) throw new Error("Export download failed");
+      return fileResponse.blob();
+    }
+  }
+}
+
 export function ExportButton({
   url,
   filename,
@@ -43,6 +90,7 @@ export function ExportButton({
 }: ExportButtonProps) {
   const { t } = useLocale();
   const [status, setStatus] = useState<ButtonStatus>("idle");
+  const [progress, setProgress] = useState<number | null>(null);
   const abortRef = useRef<AbortController | null>(null);
 
   const handleDownload = useCallback(async () => {
@@ -52,6 +100,7 @@ export function ExportButton({
     abortRef.current = controller;
 
     setStatus("downloading");
+    setProgress(null);
 
     function onSuccess(): void {
       if (controller.signal.aborted) return;
@@ -88,7 +137,12 @@ export function ExportButton({
             toast.error(t("error.failedToDownloadCsv"));
             return;
           }
-          const blob = await retryResponse.blob();
+          const blob = await responseToBlob(
+            retryResponse,
+            url,
+            controller.signal,
+            setProgress,
+          );
           triggerDownload(blob, filename);
           onSuccess();
           return;
@@ -108,7 +162,12 @@ export function ExportButton({
         return;
       }
 
-      const blob = await response.blob();
+      const blob = await responseToBlob(
+        response,
+        url,
+        controller.signal,
+        setProgress,
+      );
       triggerDownload(blob, filename);
       onSuccess();
     } catch (error: unknown) {
@@ -116,6 +175,7 @@ export function ExportButton({
       toast.error(t("error.failedToDownloadCsv"));
     } finally {
       setStatus((prev) => (prev === "success" ? "success" : "idle"));
+      setProgress(null);
     }
   }, [url, filename]);
 
@@ -143,7 +203,11 @@ export function ExportButton({
         ) : (
           <Download className="mr-2 h-4 w-4" />
         )}
-        {isDownloading ? "Downloading..." : label}
+        {isDownloading
+          ? progress === null
+            ? "Downloading..."
+            : `Preparing... ${Math.round(progress)}%`
+          : label}
       </Button>
     </>
   );
@@ -76,6 +76,11 @@ export interface RevenuePayment {
 export interface MonthlyRevenuePoint {
   month: string;
   amount: string;
+  gross: string;
+  refunds: string;
+  new_subscribers: number;
+  churned_subscribers: number;
+  mrr: string;
 }
 
 export interface RevenueAnalytics {
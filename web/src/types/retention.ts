@@ -35,6 +35,8 @@ export interface RetentionTrendPoint {
 
 export interface RetentionAnalytics {
   period_days: number;
+  /** When the stored snapshot was computed; null when scored live. */
+  computed_at: string | null;
   summary: RetentionSummary;
   trainees: TraineeEngagement[];
   trends: RetentionTrendPoint[];
@@ -42,6 +44,11 @@ export interface RetentionAnalytics {
 
 export interface AtRiskResponse {
   period_days: number;
+  computed_at: string | null;
   at_risk_count: number;
+  page: number;
+  num_pages: number;
+  has_next: boolean;
+  has_previous: boolean;
   trainees: TraineeEngagement[];
 }